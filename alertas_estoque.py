@@ -0,0 +1,374 @@
+# ============================================================================
+# MÓDULO ALERTAS_ESTOQUE - PONTO DE REPOSIÇÃO E ALERTAS DE ESTOQUE BAIXO
+# ============================================================================
+# Cada produto pode ter um ponto de reposição (produtos.ponto_reposicao).
+# Quando a quantidade chega a esse ponto o produto entra em alerta; quando
+# o estoque é reposto acima dele, sai do alerta.
+#
+# COMO FUNCIONA (INCREMENTAL, SEM VARREDURAS):
+# - Um evento da sessão do SQLAlchemy (before_flush) olha apenas os
+#   produtos alterados naquele flush (vendas, entradas, ajustes) e compara
+#   o nível antigo com o novo: nenhum, "baixo" ou "esgotado"
+# - Só as MUDANÇAS de nível gravam algo: a linha do produto em
+#   alertas_estoque é criada, atualizada ou removida na mesma transação.
+#   Uma venda que não cruza o ponto de reposição não custa nada a mais.
+# - A tabela alertas_estoque contém somente os produtos em alerta, com
+#   índice por empresa: listar os alertas de milhares de empresas lê essa
+#   tabela pequena, nunca a tabela produtos
+# - Os eventos são enviados aos destinos configurados somente depois do
+#   COMMIT (uma transação desfeita não gera alerta)
+#
+# DESTINOS DOS EVENTOS (ALERTAS_DESTINO no .env, separados por vírgula):
+#   log                     imprime no console (padrão)
+#   arquivo:alertas.jsonl   acrescenta um JSON por linha no arquivo
+#   fila                    fila local em memória (alertas_estoque.fila)
+# Outros destinos: registrar_destino(funcao), onde funcao recebe o evento (dict).
+#
+# USO:
+#   definir_ponto_reposicao(db, codigo=10, ponto=50, company_id="1")
+#   for alerta in listar_alertas(db, company_id="1"):
+#       print(alerta["nome"], alerta["quantidade"], alerta["nivel"])
+# ============================================================================
+
+import json
+import os
+import queue
+import sys
+import threading
+from datetime import datetime
+
+from sqlalchemy import delete, event, func, insert, inspect, update
+from sqlalchemy.orm import Session
+
+from database import AlertaEstoque, Produto, repetir_em_conflito
+
+# ============================================================================
+# NÍVEIS DE ALERTA
+# ============================================================================
+NIVEL_BAIXO = "baixo"
+NIVEL_ESGOTADO = "esgotado"
+
+# Tipos de evento enviados aos destinos
+EVENTO_BAIXO = "estoque_baixo"
+EVENTO_ESGOTADO = "estoque_esgotado"
+EVENTO_NORMALIZADO = "estoque_normalizado"
+
+
+def nivel_de_alerta(quantidade, ponto_reposicao):
+    """
+    Nível de alerta para uma quantidade e um ponto de reposição.
+
+    Returns:
+        str | None: "esgotado", "baixo" ou None (sem alerta / sem ponto definido)
+    """
+    if ponto_reposicao is None:
+        return None
+    quantidade = quantidade or 0
+    if quantidade <= 0:
+        return NIVEL_ESGOTADO
+    if quantidade <= ponto_reposicao:
+        return NIVEL_BAIXO
+    return None
+
+# ============================================================================
+# DESTINOS DOS EVENTOS (LOG, ARQUIVO, FILA LOCAL)
+# ============================================================================
+
+def destino_log(evento):
+    """Imprime o evento no console (stderr, para não misturar com saídas da CLI)."""
+    print(f"[ALERTA] {evento['tipo']}: {evento['nome']} (empresa {evento['company_id']}) - "
+          f"{evento['quantidade']} un, ponto de reposição {evento['ponto_reposicao']}", file=sys.stderr)
+
+
+class DestinoArquivo:
+    """Acrescenta cada evento como uma linha JSON no arquivo."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._trava = threading.Lock()
+
+    def __call__(self, evento):
+        linha = json.dumps(evento, ensure_ascii=False) + "\n"
+        with self._trava, open(self.caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(linha)
+
+
+# Fila local para consumidores no mesmo processo (ex: uma thread que envia e-mails)
+fila = queue.Queue()
+
+def destino_fila(evento):
+    fila.put(evento)
+
+
+_destinos = None
+_trava_destinos = threading.Lock()
+
+def _destinos_do_ambiente():
+    destinos = []
+    for nome in os.getenv("ALERTAS_DESTINO", "log").split(","):
+        nome = nome.strip()
+        if nome == "log":
+            destinos.append(destino_log)
+        elif nome == "fila":
+            destinos.append(destino_fila)
+        elif nome.startswith("arquivo:"):
+            destinos.append(DestinoArquivo(nome[len("arquivo:"):]))
+        elif nome and nome != "nenhum":
+            raise ValueError(f"Destino de alertas desconhecido: {nome}")
+    return destinos
+
+
+def destinos():
+    """Destinos ativos (na primeira chamada, lidos de ALERTAS_DESTINO)."""
+    global _destinos
+    with _trava_destinos:
+        if _destinos is None:
+            _destinos = _destinos_do_ambiente()
+        return list(_destinos)
+
+
+def registrar_destino(destino):
+    """Acrescenta um destino: qualquer função que receba o evento (dict)."""
+    global _destinos
+    with _trava_destinos:
+        if _destinos is None:
+            _destinos = _destinos_do_ambiente()
+        _destinos.append(destino)
+
+
+def definir_destinos(lista):
+    """Substitui todos os destinos (lista vazia desativa o envio)."""
+    global _destinos
+    with _trava_destinos:
+        _destinos = list(lista)
+
+
+def _enviar(eventos):
+    for evento in eventos:
+        for destino in destinos():
+            try:
+                destino(evento)
+            except Exception as e:  # um destino com falha não impede os demais
+                print(f"[ERRO] Falha ao enviar alerta de estoque: {e}", file=sys.stderr)
+
+# ============================================================================
+# AVALIAÇÃO INCREMENTAL (EVENTOS DA SESSÃO)
+# ============================================================================
+_CHAVE_TRANSICOES = "alertas_transicoes"
+_CHAVE_EVENTOS = "alertas_eventos"
+
+
+def _valor_anterior(estado, atributo):
+    """Valor do atributo antes das alterações ainda não gravadas."""
+    historico = estado.attrs[atributo].history
+    if historico.deleted:
+        return historico.deleted[0]
+    if historico.added:  # novo valor sem valor anterior carregado
+        return None
+    return getattr(estado.object, atributo)
+
+
+def _avaliar_antes_do_flush(session, flush_context, instances):
+    """Compara o nível antigo e o novo de cada produto alterado neste flush."""
+    transicoes = session.info.setdefault(_CHAVE_TRANSICOES, [])
+    for produto in list(session.new) + list(session.dirty):
+        if not isinstance(produto, Produto):
+            continue
+        estado = inspect(produto)
+        if produto in session.dirty and not (
+            estado.attrs.quantidade.history.has_changes() or estado.attrs.ponto_reposicao.history.has_changes()
+        ):
+            continue
+
+        novo = nivel_de_alerta(produto.quantidade, produto.ponto_reposicao)
+        if produto in session.new:
+            anterior = None
+        elif produto.em_alerta:
+            anterior = nivel_de_alerta(_valor_anterior(estado, "quantidade"),
+                                       _valor_anterior(estado, "ponto_reposicao")) or NIVEL_BAIXO
+        else:
+            anterior = None
+        if novo == anterior:
+            continue
+
+        produto.em_alerta = novo is not None
+        transicoes.append((produto, anterior, novo))
+
+
+def _gravar_apos_flush(session, flush_context):
+    """Grava as mudanças de nível em alertas_estoque (mesma transação)."""
+    transicoes = session.info.pop(_CHAVE_TRANSICOES, None)
+    if not transicoes:
+        return
+    conexao = session.connection()
+    agora = datetime.utcnow()
+    eventos = session.info.setdefault(_CHAVE_EVENTOS, [])
+    for produto, anterior, novo in transicoes:
+        if novo is None:
+            conexao.execute(delete(AlertaEstoque).where(AlertaEstoque.produto_id == produto.id))
+            tipo = EVENTO_NORMALIZADO
+        elif anterior is None:
+            # Remove antes de inserir: protege contra linha órfã (ex: alerta
+            # reconstruído por outro processo)
+            conexao.execute(delete(AlertaEstoque).where(AlertaEstoque.produto_id == produto.id))
+            conexao.execute(insert(AlertaEstoque).values(
+                company_id=produto.company_id, produto_id=produto.id, nivel=novo, desde=agora, atualizado_em=agora
+            ))
+            tipo = EVENTO_ESGOTADO if novo == NIVEL_ESGOTADO else EVENTO_BAIXO
+        else:
+            conexao.execute(update(AlertaEstoque).where(AlertaEstoque.produto_id == produto.id)
+                            .values(nivel=novo, atualizado_em=agora))
+            tipo = EVENTO_ESGOTADO if novo == NIVEL_ESGOTADO else EVENTO_BAIXO
+        eventos.append({
+            "tipo": tipo,
+            "company_id": produto.company_id,
+            "produto_id": produto.id,
+            "codigo": produto.codigo,
+            "nome": produto.nome,
+            "quantidade": produto.quantidade,
+            "ponto_reposicao": produto.ponto_reposicao,
+            "nivel_anterior": anterior,
+            "nivel": novo,
+            "data_hora": agora.isoformat()
+        })
+
+
+def _enviar_apos_commit(session):
+    eventos = session.info.pop(_CHAVE_EVENTOS, None)
+    if eventos:
+        _enviar(eventos)
+
+
+def _descartar_apos_rollback(session):
+    session.info.pop(_CHAVE_TRANSICOES, None)
+    session.info.pop(_CHAVE_EVENTOS, None)
+
+
+# Vale para todas as sessões (SessionLocal e as criadas pelas migrações)
+event.listen(Session, "before_flush", _avaliar_antes_do_flush)
+event.listen(Session, "after_flush", _gravar_apos_flush)
+event.listen(Session, "after_commit", _enviar_apos_commit)
+event.listen(Session, "after_soft_rollback", lambda session, transacao: _descartar_apos_rollback(session))
+
+# ============================================================================
+# FUNÇÕES DE LÓGICA PURA (PARA API E CLI)
+# ============================================================================
+
+@repetir_em_conflito("ponto_reposicao")
+def definir_ponto_reposicao(db_session, codigo, ponto, company_id=None):
+    """
+    Define (ou remove, com ponto=None) o ponto de reposição de um produto.
+
+    Se o produto já estiver abaixo do novo ponto, o alerta é gerado na hora.
+
+    Returns:
+        Produto | None: Produto alterado (None se o código não existir)
+    """
+    if ponto is not None and ponto < 0:
+        raise ValueError("Ponto de reposição não pode ser negativo")
+    consulta = db_session.query(Produto).filter_by(codigo=codigo)
+    if company_id is not None:
+        consulta = consulta.filter_by(company_id=company_id)
+    produto = consulta.first()
+    if produto is None:
+        return None
+    produto.ponto_reposicao = ponto
+    db_session.commit()
+    return produto
+
+
+def listar_alertas(db_session, company_id=None, nivel=None):
+    """
+    Produtos em alerta, lidos de alertas_estoque (junção com produtos só pela chave primária).
+
+    Args:
+        company_id: Empresa (None lista todas)
+        nivel: "baixo" ou "esgotado" (None lista os dois)
+
+    Returns:
+        list: Dicionários ordenados por empresa e quantidade
+    """
+    consulta = db_session.query(
+        AlertaEstoque.company_id, AlertaEstoque.nivel, AlertaEstoque.desde,
+        Produto.id, Produto.codigo, Produto.nome, Produto.quantidade, Produto.ponto_reposicao
+    ).join(Produto, Produto.id == AlertaEstoque.produto_id)
+    if company_id is not None:
+        consulta = consulta.filter(AlertaEstoque.company_id == company_id)
+    if nivel is not None:
+        consulta = consulta.filter(AlertaEstoque.nivel == nivel)
+
+    return [{
+        "company_id": linha.company_id,
+        "produto_id": linha.id,
+        "codigo": linha.codigo,
+        "nome": linha.nome,
+        "quantidade": linha.quantidade,
+        "ponto_reposicao": linha.ponto_reposicao,
+        "nivel": linha.nivel,
+        "desde": linha.desde.isoformat() if linha.desde else None
+    } for linha in consulta.order_by(AlertaEstoque.company_id, Produto.quantidade, Produto.id)]
+
+
+def resumo_por_empresa(db_session):
+    """
+    Quantidade de produtos em alerta por empresa e nível (só lê alertas_estoque).
+
+    Returns:
+        dict: {company_id: {"baixo": n, "esgotado": n}}
+    """
+    resumo = {}
+    linhas = db_session.query(AlertaEstoque.company_id, AlertaEstoque.nivel, func.count()).group_by(
+        AlertaEstoque.company_id, AlertaEstoque.nivel
+    )
+    for company_id, nivel, total in linhas:
+        resumo.setdefault(company_id, {NIVEL_BAIXO: 0, NIVEL_ESGOTADO: 0})[nivel] = total
+    return resumo
+
+
+def reconstruir_alertas(db_session, company_id=None):
+    """
+    Recalcula alertas_estoque a partir de produtos (ferramenta de manutenção).
+
+    Único ponto que percorre a tabela produtos, e só os produtos com ponto
+    de reposição definido. Útil depois de importações feitas fora do ORM.
+    Não envia eventos.
+
+    Returns:
+        int: Produtos em alerta após a reconstrução
+    """
+    filtro_produtos = [Produto.ponto_reposicao.isnot(None)]
+    filtro_alertas = []
+    if company_id is not None:
+        filtro_produtos.append(Produto.company_id == company_id)
+        filtro_alertas.append(AlertaEstoque.company_id == company_id)
+
+    conexao = db_session.connection()
+    conexao.execute(delete(AlertaEstoque).where(*filtro_alertas))
+    abaixo = Produto.quantidade <= Produto.ponto_reposicao
+    # Só as linhas cujo em_alerta muda: o UPDATE renova atualizado_em, e tudo
+    # que ele marcar é relido pelos terminais de loja (sync_pdv) e exportado
+    conexao.execute(update(Produto).where(*filtro_produtos, Produto.em_alerta.is_distinct_from(abaixo))
+                    .values(em_alerta=abaixo))
+    if company_id is None:
+        conexao.execute(update(Produto).where(Produto.ponto_reposicao.is_(None),
+                                              Produto.em_alerta.is_distinct_from(False))
+                        .values(em_alerta=False))
+
+    agora = datetime.utcnow()
+    linhas = conexao.execute(
+        Produto.__table__.select().with_only_columns(Produto.id, Produto.company_id, Produto.quantidade,
+                                                     Produto.ponto_reposicao)
+        .where(*filtro_produtos, abaixo)
+    ).fetchall()
+    if linhas:
+        conexao.execute(insert(AlertaEstoque), [{
+            "company_id": linha.company_id, "produto_id": linha.id,
+            "nivel": nivel_de_alerta(linha.quantidade, linha.ponto_reposicao),
+            "desde": agora, "atualizado_em": agora
+        } for linha in linhas])
+    db_session.commit()
+    return len(linhas)
+
+# ============================================================================
+# FIM DO MÓDULO ALERTAS_ESTOQUE
+# ============================================================================
@@ -0,0 +1,465 @@
+# ============================================================================
+# ARQUIVO: api.py
+# SISTEMA DE GESTÃO - QUATRO CANTOS (API HTTP)
+# ============================================================================
+#
+# DESCRIÇÃO:
+# Serviço HTTP (ASGI) que expõe as funções de lógica pura dos módulos:
+# registrar_entrada_produto, registrar_saida_produto,
+# calcular_metricas_capacidade, calcular_metricas_financeiras e
+# processar_funcionario.
+#
+# - Cada requisição recebe sua própria sessão do banco (database.get_db)
+# - O usuário é autenticado por token (POST /auth/login) e só enxerga os
+#   produtos da própria empresa (multi-tenancy)
+# - Com DATABASE_SHARDS, as rotas de estoque usam a sessão do shard da
+#   empresa do usuário (db_da_empresa; veja shards.py)
+# - As respostas são montadas com os métodos to_dict() dos modelos (listagens
+#   usam serializacao.py: mesmas chaves, sem criar objetos ORM)
+#
+# DEPENDÊNCIAS OPCIONAIS:
+#   pip install fastapi uvicorn
+#
+# EXECUÇÃO:
+#   python api.py                          # 1 processo na porta 8000
+#   python api.py --workers 4 --porta 8080
+#   (ou API_WORKERS / API_PORTA no .env)
+#
+# Métricas no formato Prometheus: GET /metricas (veja metricas.py)
+# Teste de carga: veja carga_api.py
+# ============================================================================
+
+import argparse
+import hmac
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from fastapi import Depends, FastAPI, Header, HTTPException
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from sqlalchemy.orm import joinedload
+
+from alertas_estoque import definir_ponto_reposicao, listar_alertas
+from auth_utils import generate_api_key, hash_token, verify_password
+from busca_produtos import buscar_produtos
+from database import (ConflitoConcorrencia, SessionLocal, definir_chave_consistencia, get_db, init_db, instrumentacao_ativa,
+                      leitura_replica, operacao_sql)
+from estoque_entrada import registrar_entrada_produto
+from estoque_saida import registrar_saida_produto
+from financeiro import calcular_metricas_financeiras
+from metricas import TIPO_CONTEUDO, texto_prometheus
+from models import TokenAcesso, Usuario
+from operacional import calcular_metricas_capacidade
+from rh import processar_funcionario
+from serializacao import funcionarios_json, produtos_json, usuarios_json
+from shards import SHARD_CACHE_TTL, EmpresaEmMigracao, sessao_da_empresa, sharding_ativo
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+VALIDADE_TOKEN_HORAS = int(os.getenv("API_TOKEN_HORAS", "12"))
+METRICAS_TOKEN = os.getenv("METRICAS_TOKEN")  # se definido, GET /metricas exige "Bearer <token>"
+
+
+@asynccontextmanager
+async def _ciclo_de_vida(app):
+    # Cada processo (worker) verifica o esquema uma vez ao subir
+    init_db()
+    yield
+
+
+app = FastAPI(
+    title="Quatro Cantos API",
+    description="API HTTP do Sistema de Gestão Empresarial Quatro Cantos",
+    lifespan=_ciclo_de_vida
+)
+
+
+if instrumentacao_ativa():
+    # SQL_INSTRUMENTACAO=1: cada requisição é uma operação lógica (contadores e N+1)
+    @app.middleware("http")
+    async def _operacao_sql_por_requisicao(request, call_next):
+        with operacao_sql(f"{request.method} {request.url.path}"):
+            return await call_next(request)
+
+
+@app.exception_handler(ConflitoConcorrencia)
+async def _conflito_concorrencia(request, erro):
+    # O produto mudou em todas as tentativas (veja database.repetir_em_conflito)
+    return JSONResponse(status_code=409, content={"detail": erro.to_dict()})
+
+
+@app.exception_handler(EmpresaEmMigracao)
+async def _empresa_em_migracao(request, erro):
+    # Escrita durante a mudança de shard da empresa: o cliente tenta de novo
+    return JSONResponse(status_code=503, content={"detail": str(erro)},
+                        headers={"Retry-After": str(int(SHARD_CACHE_TTL) + 1)})
+
+# ============================================================================
+# CORPOS DAS REQUISIÇÕES
+# ============================================================================
+
+class LoginEntrada(BaseModel):
+    email: str
+    senha: str
+
+
+class EntradaProdutoEntrada(BaseModel):
+    codigo: int
+    nome: str
+    quantidade: int
+    valor_unitario: float = 0.0
+    data: Optional[str] = None
+    fornecedor: Optional[str] = None
+    local: Optional[str] = None
+
+
+class SaidaProdutoEntrada(BaseModel):
+    nome: str
+    quantidade: int
+
+
+class PontoReposicaoEntrada(BaseModel):
+    codigo: int
+    ponto: Optional[int] = None
+
+
+class CapacidadeEntrada(BaseModel):
+    turnos: int
+
+
+class PlanejamentoEntrada(BaseModel):
+    configuracoes: List[dict]
+    inicio: str
+    fim: str
+    demanda_diaria: Optional[float] = None
+
+
+class PlanoProducaoEntrada(BaseModel):
+    configuracoes: Optional[List[dict]] = None
+    horizonte_dias: int = 90
+    inicio: Optional[str] = None
+    demanda_diaria: Optional[Dict[int, float]] = None
+    demanda_pendente: Optional[Dict[int, float]] = None
+
+
+class MetricasFinanceirasEntrada(BaseModel):
+    agua: float
+    luz: float
+    impostos: float
+    salarios: float
+    total_pallets: int = 1000
+
+
+class FuncionarioEntrada(BaseModel):
+    nome: str
+    cargo: str = "Operário"
+    horas_extras: float = 0.0
+
+
+class FolhaEntrada(BaseModel):
+    funcionarios: List[FuncionarioEntrada]
+
+# ============================================================================
+# AUTENTICAÇÃO E PERMISSÕES
+# ============================================================================
+
+def usuario_autenticado(authorization: Optional[str] = Header(None), db=Depends(get_db)):
+    """
+    Dependência que identifica o usuário pelo cabeçalho "Authorization: Bearer <token>".
+
+    Uma única consulta indexada por token_hash traz token, usuário e empresa.
+
+    Returns:
+        Usuario: Usuário autenticado (ativo e de empresa ativa)
+    """
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Token de acesso não informado")
+
+    token = db.query(TokenAcesso).options(
+        joinedload(TokenAcesso.usuario).joinedload(Usuario.empresa)
+    ).filter(TokenAcesso.token_hash == hash_token(authorization[7:].strip())).first()
+
+    if not token or token.expira_em < datetime.utcnow():
+        raise HTTPException(status_code=401, detail="Token inválido ou expirado")
+
+    usuario = token.usuario
+    if not usuario.ativo or not usuario.empresa.ativa:
+        raise HTTPException(status_code=403, detail="Usuário ou empresa inativos")
+    # Leia-o-que-escreveu: depois de uma venda da empresa, as leituras dela
+    # ficam no primário durante a janela da réplica (DATABASE_READ_JANELA)
+    definir_chave_consistencia(db, usuario.empresa_id)
+    return usuario
+
+
+def exigir_permissao(codigo_modulo):
+    """Cria uma dependência que exige permissão no módulo (admin sempre pode)."""
+    def verificar(usuario=Depends(usuario_autenticado)):
+        if not usuario.tem_permissao(codigo_modulo):
+            raise HTTPException(status_code=403, detail=f"Sem permissão para o módulo '{codigo_modulo}'")
+        return usuario
+    return verificar
+
+
+def db_da_empresa(usuario=Depends(usuario_autenticado), db=Depends(get_db)):
+    """
+    Sessão com os dados da empresa do usuário.
+
+    Sem DATABASE_SHARDS é a própria sessão de get_db; com shards, uma sessão
+    no shard da empresa (o catálogo e os usuários continuam no principal).
+    """
+    if not sharding_ativo():
+        yield db
+        return
+    sessao = sessao_da_empresa(usuario.empresa_id)
+    definir_chave_consistencia(sessao, usuario.empresa_id)
+    try:
+        yield sessao
+    finally:
+        sessao.close()
+
+
+def company_id_do_usuario(usuario):
+    """Produtos guardam a empresa em produtos.company_id (texto)."""
+    return str(usuario.empresa_id)
+
+# ============================================================================
+# ROTAS
+# ============================================================================
+
+@app.get("/saude")
+def saude():
+    """Verificação simples de disponibilidade (não acessa o banco)."""
+    return {"status": "ok"}
+
+
+@app.get("/metricas", response_class=PlainTextResponse)
+def metricas(authorization: Optional[str] = Header(None)):
+    """Contadores e histogramas deste processo no formato texto do Prometheus."""
+    if METRICAS_TOKEN and not hmac.compare_digest(authorization or "", f"Bearer {METRICAS_TOKEN}"):
+        raise HTTPException(status_code=401, detail="Token de métricas inválido")
+    return PlainTextResponse(texto_prometheus(), media_type=TIPO_CONTEUDO)
+
+
+@app.post("/auth/login")
+def login(dados: LoginEntrada, db=Depends(get_db)):
+    """Autentica o usuário e devolve um token de acesso."""
+    usuario = db.query(Usuario).options(joinedload(Usuario.empresa)).filter(
+        Usuario.email == dados.email.strip().lower()
+    ).first()
+
+    if not usuario or not verify_password(dados.senha, usuario.senha_hash):
+        raise HTTPException(status_code=401, detail="Email ou senha incorretos")
+    if not usuario.ativo or not usuario.empresa.ativa:
+        raise HTTPException(status_code=403, detail="Usuário ou empresa inativos")
+
+    token = generate_api_key()
+    expira_em = datetime.utcnow() + timedelta(hours=VALIDADE_TOKEN_HORAS)
+    db.add(TokenAcesso(usuario_id=usuario.id, token_hash=hash_token(token), expira_em=expira_em))
+    usuario.ultimo_login = datetime.utcnow()
+    db.commit()
+
+    return {
+        "token": token,
+        "expira_em": expira_em.isoformat(),
+        "usuario": usuario.to_dict(include_permissions=True)
+    }
+
+
+@app.get("/produtos")
+def listar_produtos(todos: bool = False, usuario=Depends(exigir_permissao("estoque_saida"))):
+    """
+    Lista os produtos da empresa do usuário (por padrão só os com estoque).
+
+    Mesmo formato de Produto.to_dict(), mas gerado por projeção de colunas
+    e enviado em pedaços (sem criar objetos ORM nem montar a lista inteira).
+    """
+    company_id = company_id_do_usuario(usuario)
+
+    def gerar():
+        # Sessão própria: a resposta continua sendo enviada depois que a
+        # sessão de get_db (usada na autenticação) já foi fechada
+        db = sessao_da_empresa(usuario.empresa_id) if sharding_ativo() else SessionLocal()
+        definir_chave_consistencia(db, usuario.empresa_id)
+        try:
+            with leitura_replica(db):
+                yield from produtos_json(db, company_id=company_id, apenas_com_estoque=not todos)
+        finally:
+            db.close()
+
+    return StreamingResponse(gerar(), media_type="application/json")
+
+
+@app.get("/funcionarios")
+def listar_funcionarios(usuario=Depends(exigir_permissao("rh"))):
+    """Funcionários da empresa do usuário (mesmo formato de Funcionario.to_dict(), em pedaços)."""
+    company_id = company_id_do_usuario(usuario)
+
+    def gerar():
+        db = sessao_da_empresa(usuario.empresa_id) if sharding_ativo() else SessionLocal()
+        definir_chave_consistencia(db, usuario.empresa_id)
+        try:
+            with leitura_replica(db):
+                yield from funcionarios_json(db, company_id=company_id)
+        finally:
+            db.close()
+
+    return StreamingResponse(gerar(), media_type="application/json")
+
+
+@app.get("/usuarios")
+def listar_usuarios(usuario=Depends(usuario_autenticado)):
+    """Usuários da empresa, com as permissões (somente administradores)."""
+    if not usuario.is_admin:
+        raise HTTPException(status_code=403, detail="Somente administradores listam os usuários")
+    empresa_id = usuario.empresa_id
+
+    def gerar():
+        # Usuários ficam sempre no banco principal (também com DATABASE_SHARDS)
+        db = SessionLocal()
+        try:
+            with leitura_replica(db):
+                yield from usuarios_json(db, empresa_id=empresa_id, include_permissions=True)
+        finally:
+            db.close()
+
+    return StreamingResponse(gerar(), media_type="application/json")
+
+
+@app.get("/produtos/busca")
+def busca_produtos(q: str, limite: int = 20, usuario=Depends(exigir_permissao("estoque_saida")), db=Depends(db_da_empresa)):
+    """Busca produtos da empresa do usuário por prefixo e aproximação (erros de digitação)."""
+    return buscar_produtos(db, q, company_id=company_id_do_usuario(usuario), limite=max(1, min(limite, 100)))
+
+
+@app.post("/estoque/entrada")
+def entrada_produto(dados: EntradaProdutoEntrada, usuario=Depends(exigir_permissao("estoque_entrada")), db=Depends(db_da_empresa),
+                    idempotency_key: Optional[str] = Header(None)):
+    """
+    Registra a entrada de um produto no estoque da empresa do usuário.
+
+    Com o cabeçalho Idempotency-Key, repetir a requisição devolve a resposta
+    original sem somar de novo ao estoque (veja idempotencia.py).
+    """
+    try:
+        produto, is_novo = registrar_entrada_produto(
+            db, dados.codigo, dados.nome, dados.quantidade,
+            valor_unitario=dados.valor_unitario, data=dados.data,
+            fornecedor=dados.fornecedor, local=dados.local,
+            company_id=company_id_do_usuario(usuario), chave_idempotencia=idempotency_key
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"novo": is_novo, "produto": produto.to_dict()}
+
+
+@app.post("/estoque/saida")
+def saida_produto(dados: SaidaProdutoEntrada, usuario=Depends(exigir_permissao("estoque_saida")), db=Depends(db_da_empresa),
+                  idempotency_key: Optional[str] = Header(None)):
+    """
+    Registra a venda/saída de um produto da empresa do usuário.
+
+    Com o cabeçalho Idempotency-Key, repetir a requisição devolve a resposta
+    original ("repetida": true) sem baixar o estoque de novo.
+    """
+    try:
+        resultado = registrar_saida_produto(db, dados.nome, dados.quantidade, company_id=company_id_do_usuario(usuario),
+                                            chave_idempotencia=idempotency_key)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if resultado["produto"] is not None:
+        resultado["produto"] = resultado["produto"].to_dict()
+    return resultado
+
+
+@app.post("/estoque/reposicao")
+def ponto_reposicao(dados: PontoReposicaoEntrada, usuario=Depends(exigir_permissao("estoque_entrada")), db=Depends(db_da_empresa)):
+    """Define (ou remove, com ponto nulo) o ponto de reposição de um produto da empresa."""
+    try:
+        produto = definir_ponto_reposicao(db, dados.codigo, dados.ponto, company_id=company_id_do_usuario(usuario))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    if produto is None:
+        raise HTTPException(status_code=404, detail="Produto não encontrado")
+    return {"produto": produto.to_dict(), "ponto_reposicao": produto.ponto_reposicao, "em_alerta": bool(produto.em_alerta)}
+
+
+@app.get("/estoque/alertas")
+def alertas_estoque(nivel: Optional[str] = None, usuario=Depends(exigir_permissao("estoque_entrada")), db=Depends(db_da_empresa)):
+    """Produtos da empresa abaixo do ponto de reposição ("baixo" ou "esgotado")."""
+    return listar_alertas(db, company_id=company_id_do_usuario(usuario), nivel=nivel)
+
+
+@app.post("/operacional/capacidade")
+def capacidade(dados: CapacidadeEntrada, usuario=Depends(exigir_permissao("operacional"))):
+    """Calcula a capacidade de produção para 1, 2 ou 3 turnos."""
+    if dados.turnos < 1 or dados.turnos > 3:
+        raise HTTPException(status_code=422, detail="Turnos deve ser 1, 2 ou 3")
+    return calcular_metricas_capacidade(dados.turnos)
+
+
+@app.post("/operacional/planejamento")
+def planejamento_capacidade(dados: PlanejamentoEntrada, usuario=Depends(exigir_permissao("operacional"))):
+    """Capacidade e utilização por calendário para um ou vários cenários (linhas, turnos, feriados, paradas)."""
+    from planejamento_capacidade import comparar_cenarios
+    try:
+        return comparar_cenarios(dados.configuracoes, dados.inicio, dados.fim, dados.demanda_diaria)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/operacional/plano-producao")
+def plano_producao(dados: PlanoProducaoEntrada, usuario=Depends(exigir_permissao("operacional")), db=Depends(db_da_empresa)):
+    """Cruza estoque, demanda e capacidade da empresa: turnos mínimos e data da primeira falta por cenário."""
+    from planejamento_producao import planejar_producao
+    try:
+        return planejar_producao(db, company_id=company_id_do_usuario(usuario), configuracoes=dados.configuracoes,
+                                 horizonte_dias=dados.horizonte_dias, inicio=dados.inicio,
+                                 demanda_diaria=dados.demanda_diaria, demanda_pendente=dados.demanda_pendente)
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+@app.post("/financeiro/metricas")
+def metricas_financeiras(dados: MetricasFinanceirasEntrada, usuario=Depends(exigir_permissao("financeiro"))):
+    """Calcula custos, preço de venda, projeções e indicadores."""
+    if min(dados.agua, dados.luz, dados.impostos, dados.salarios) < 0:
+        raise HTTPException(status_code=422, detail="Valores não podem ser negativos")
+    return calcular_metricas_financeiras(dados.agua, dados.luz, dados.impostos, dados.salarios, dados.total_pallets)
+
+
+@app.post("/rh/folha")
+def folha_pagamento(dados: FolhaEntrada, usuario=Depends(exigir_permissao("rh"))):
+    """Calcula a folha de pagamento (ordenada por nome, como no console)."""
+    resultados = [
+        processar_funcionario(f.nome, f.cargo, max(0.0, f.horas_extras))
+        for f in dados.funcionarios
+    ]
+    resultados.sort(key=lambda r: r["nome"])
+    return resultados
+
+# ============================================================================
+# PONTO DE ENTRADA (SERVIDOR UVICORN)
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor HTTP da API Quatro Cantos")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--porta", type=int, default=int(os.getenv("API_PORTA", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "1")),
+                        help="Processos servindo requisições (cada um com seu pool de conexões)")
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    # Com workers > 1 o uvicorn importa "api:app" em cada processo filho
+    uvicorn.run("api:app", host=args.host, port=args.porta, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
+
+# ============================================================================
+# FIM DO ARQUIVO API.PY
+# ============================================================================
@@ -11,6 +11,17 @@
 
 import bcrypt
 
+from metricas import LATENCIA_SENHA, LOGINS, medir
+
+# Métricas de login (veja metricas.py)
+_LOGINS_SUCESSO = LOGINS.rotulos("sucesso")
+_LOGINS_FALHA = LOGINS.rotulos("falha")
+
+
+def _contar_login(valida):
+    (_LOGINS_SUCESSO if valida else _LOGINS_FALHA).inc()
+
+
 def hash_password(password: str) -> str:
     """
     Gera um hash seguro da senha usando bcrypt.
@@ -38,6 +49,7 @@ def hash_password(password: str) -> str:
     return hashed.decode('utf-8')
 
 
+@medir(LATENCIA_SENHA, apos=_contar_login, operacao="login")
 def verify_password(password: str, hashed: str) -> bool:
     """
     Verifica se uma senha corresponde ao hash armazenado.
@@ -80,6 +92,21 @@ def generate_api_key() -> str:
     return secrets.token_urlsafe(32)
 
 
+def hash_token(token: str) -> str:
+    """
+    Gera o hash SHA-256 de um token de API.
+    
+    Diferente das senhas, tokens gerados por generate_api_key() já têm 256 bits
+    de entropia, então um hash rápido (sem salt) é seguro e permite buscar
+    o token por igualdade em um índice a cada requisição.
+    
+    Returns:
+        Hash hexadecimal com 64 caracteres
+    """
+    import hashlib
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
 # ============================================================================
 # EXEMPLO DE USO
 # ============================================================================
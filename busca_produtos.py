@@ -0,0 +1,566 @@
+# ============================================================================
+# MÓDULO BUSCA_PRODUTOS - BUSCA DE PRODUTOS POR TEXTO (PREFIXO E APROXIMADA)
+# ============================================================================
+# Permite encontrar produtos digitando parte do nome, código, categoria ou
+# fornecedor, tolerando erros de digitação ("parafso" encontra "Parafuso").
+# Os resultados são ordenados por relevância e sempre filtrados pela
+# empresa (company_id).
+#
+# TRÊS IMPLEMENTAÇÕES, ESCOLHIDAS AUTOMATICAMENTE PELO BANCO:
+# 1. SQLite com FTS5: tabela virtual produtos_busca mantida por triggers
+#    (cada INSERT/UPDATE/DELETE em produtos atualiza o índice na mesma
+#    transação; vendas não mexem no índice porque só alteram quantidade)
+# 2. PostgreSQL com pg_trgm: índice GIN de trigramas sobre o texto do produto
+#    (mantido pelo próprio PostgreSQL)
+# 3. Índice em memória (Python puro): para bancos sem FTS5/pg_trgm; é
+#    montado na primeira busca e atualizado pelos eventos do ORM
+#
+# ERROS DE DIGITAÇÃO (1 E 3): as palavras de cada empresa ficam indexadas
+# pelas suas deleções de uma letra (Vocabulario). "parafso" e "parafuso"
+# têm a deleção "parafso" em comum, então os candidatos saem de
+# len(palavra)+1 consultas a dicionário, sem percorrer o vocabulário, e só
+# palavras da própria empresa são sugeridas. No FTS5 o vocabulário da
+# empresa é montado na primeira busca aproximada e depois relê apenas os
+# produtos alterados (índice company_id, atualizado_em).
+#
+# As estruturas do banco (1 e 2) são criadas pela migração 0007.
+#
+# USO:
+#   resultados = buscar_produtos(db, "paraf", company_id="1")
+#   for r in resultados:
+#       print(r["nome"], r["quantidade"], r["tipo_match"])
+# ============================================================================
+
+import bisect
+import re
+import threading
+import unicodedata
+from datetime import timedelta
+from difflib import SequenceMatcher
+
+from sqlalchemy import event, inspect, text
+
+from database import Produto
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+TABELA_FTS = "produtos_busca"
+INDICE_TRIGRAMAS = "ix_produtos_busca_trgm"
+
+# Peso de cada campo na relevância (nome pesa mais que fornecedor)
+PESOS_CAMPOS = {"nome": 10.0, "codigo": 5.0, "categoria": 2.0, "fornecedor": 1.0}
+
+# Semelhança mínima (0 a 1) para aceitar um termo como erro de digitação
+SEMELHANCA_MINIMA = 0.75
+
+# Produtos relidos antes da última alteração vista, ao atualizar o
+# vocabulário do FTS5 (transações que terminaram fora de ordem)
+MARGEM_VOCABULARIO_S = 5
+
+# Texto pesquisável no PostgreSQL (a mesma expressão do índice GIN)
+EXPRESSAO_PG = (
+    "lower(coalesce(nome, '') || ' ' || coalesce(codigo::text, '') || ' ' || "
+    "coalesce(categoria, '') || ' ' || coalesce(fornecedor, ''))"
+)
+
+# ============================================================================
+# NORMALIZAÇÃO DE TEXTO
+# ============================================================================
+
+def normalizar_termo(texto):
+    """Minúsculas e sem acentos ("Açúcar" -> "acucar"), como o tokenizador do FTS5."""
+    decomposto = unicodedata.normalize("NFKD", str(texto).lower())
+    return "".join(c for c in decomposto if not unicodedata.combining(c))
+
+
+def tokens(texto):
+    """Quebra o texto em palavras normalizadas."""
+    if texto is None:
+        return []
+    return re.findall(r"\w+", normalizar_termo(texto))
+
+
+def _parecidos(termo, candidatos):
+    """Candidatos com grafia parecida (diferença de tamanho <= 2 e semelhança mínima)."""
+    encontrados = []
+    for candidato in candidatos:
+        if candidato == termo or abs(len(candidato) - len(termo)) > 2:
+            continue
+        if SequenceMatcher(None, termo, candidato).ratio() >= SEMELHANCA_MINIMA:
+            encontrados.append(candidato)
+    return encontrados
+
+
+def _delecoes(palavra):
+    """A palavra e ela sem cada uma das letras ("abc" -> abc, bc, ac, ab)."""
+    return {palavra} | {palavra[:i] + palavra[i + 1:] for i in range(len(palavra))}
+
+
+class Vocabulario:
+    """
+    Palavras indexadas pelas deleções de uma letra (para erros de digitação).
+
+    Uma letra trocada, faltando, sobrando ou duas letras vizinhas invertidas
+    deixam as duas grafias com uma deleção em comum. Os candidatos são
+    confirmados por _parecidos (mesma semelhança mínima de antes).
+    """
+
+    def __init__(self):
+        self._palavras = set()
+        self._por_delecao = {}
+
+    def __len__(self):
+        return len(self._palavras)
+
+    def adicionar(self, palavra):
+        if palavra in self._palavras:
+            return
+        self._palavras.add(palavra)
+        for delecao in _delecoes(palavra):
+            self._por_delecao.setdefault(delecao, []).append(palavra)
+
+    def variacoes(self, palavra):
+        """Palavras do vocabulário com grafia parecida (sem a própria palavra)."""
+        if len(palavra) < 3:
+            return []
+        candidatos = set()
+        for delecao in _delecoes(palavra):
+            candidatos.update(self._por_delecao.get(delecao, ()))
+        return _parecidos(palavra, sorted(candidatos))
+
+# ============================================================================
+# INSTALAÇÃO NO BANCO (CHAMADA PELA MIGRAÇÃO 0007)
+# ============================================================================
+
+def fts5_disponivel(bind):
+    """Verifica se o SQLite foi compilado com FTS5."""
+    if bind.dialect.name != "sqlite":
+        return False
+    with bind.connect() as conn:
+        opcoes = {linha[0] for linha in conn.execute(text("PRAGMA compile_options"))}
+    return "ENABLE_FTS5" in opcoes
+
+
+def instalar_busca_sqlite(bind, tamanho_lote=10000):
+    """
+    Cria o índice FTS5, os triggers de atualização e indexa os produtos existentes.
+
+    A coluna "empresa" guarda "emp<company_id>": a busca exige esse termo,
+    então o FTS5 só percorre produtos da empresa consultada.
+    """
+    valores_novos = (
+        "new.id, 'emp' || coalesce(new.company_id, ''), new.nome, "
+        "new.codigo, new.categoria, new.fornecedor"
+    )
+    comandos = [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABELA_FTS} USING fts5("
+        "empresa, nome, codigo, categoria, fornecedor, "
+        "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')",
+        # Relevância padrão (bm25) com os pesos de cada coluna
+        f"INSERT INTO {TABELA_FTS}({TABELA_FTS}, rank) VALUES ('rank', 'bm25(0.0, "
+        f"{PESOS_CAMPOS['nome']}, {PESOS_CAMPOS['codigo']}, {PESOS_CAMPOS['categoria']}, {PESOS_CAMPOS['fornecedor']})')",
+        f"CREATE TRIGGER IF NOT EXISTS trg_produtos_busca_insert AFTER INSERT ON produtos BEGIN "
+        f"INSERT INTO {TABELA_FTS}(rowid, empresa, nome, codigo, categoria, fornecedor) VALUES ({valores_novos}); END",
+        # Só dispara quando muda um campo pesquisável (vendas alteram apenas quantidade)
+        f"CREATE TRIGGER IF NOT EXISTS trg_produtos_busca_update "
+        f"AFTER UPDATE OF company_id, nome, codigo, categoria, fornecedor ON produtos BEGIN "
+        f"DELETE FROM {TABELA_FTS} WHERE rowid = old.id; "
+        f"INSERT INTO {TABELA_FTS}(rowid, empresa, nome, codigo, categoria, fornecedor) VALUES ({valores_novos}); END",
+        f"CREATE TRIGGER IF NOT EXISTS trg_produtos_busca_delete AFTER DELETE ON produtos BEGIN "
+        f"DELETE FROM {TABELA_FTS} WHERE rowid = old.id; END",
+    ]
+    with bind.begin() as conn:
+        for comando in comandos:
+            conn.execute(text(comando))
+
+    # Produtos já cadastrados, em lotes por faixa de id (transações curtas)
+    inserir = text(
+        f"INSERT INTO {TABELA_FTS}(rowid, empresa, nome, codigo, categoria, fornecedor) "
+        "SELECT id, 'emp' || coalesce(company_id, ''), nome, codigo, categoria, fornecedor "
+        f"FROM produtos WHERE id > :inicio AND id <= :fim AND id NOT IN (SELECT rowid FROM {TABELA_FTS})"
+    )
+    with bind.connect() as conn:
+        maior_id = conn.execute(text("SELECT MAX(id) FROM produtos")).scalar() or 0
+    for inicio in range(0, maior_id, tamanho_lote):
+        with bind.begin() as conn:
+            conn.execute(inserir, {"inicio": inicio, "fim": inicio + tamanho_lote})
+
+
+def instalar_busca_postgresql(bind):
+    """
+    Ativa a extensão pg_trgm e cria o índice GIN de trigramas (CONCURRENTLY).
+
+    Returns:
+        bool: False se a extensão não pôde ser criada (sem permissão);
+              nesse caso a busca usa o índice em memória
+    """
+    from sqlalchemy.exc import DBAPIError
+    from migrations import criar_indice
+
+    try:
+        with bind.begin() as conn:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    except DBAPIError:
+        return False
+    criar_indice(bind, INDICE_TRIGRAMAS, "produtos", [f"({EXPRESSAO_PG}) gin_trgm_ops"], metodo="gin")
+    return True
+
+# ============================================================================
+# ESCOLHA DA IMPLEMENTAÇÃO
+# ============================================================================
+_tipos_por_engine = {}
+
+def tipo_de_busca(bind):
+    """
+    Retorna qual implementação atende este banco: "fts5", "trigrama" ou "memoria".
+
+    O resultado é guardado por engine (a verificação usa reflexão).
+    """
+    engine = bind.engine
+    if engine not in _tipos_por_engine:
+        inspetor = inspect(engine)
+        if engine.dialect.name == "sqlite" and inspetor.has_table(TABELA_FTS):
+            tipo = "fts5"
+        elif engine.dialect.name == "postgresql" and any(
+            indice["name"] == INDICE_TRIGRAMAS for indice in inspetor.get_indexes("produtos")
+        ):
+            tipo = "trigrama"
+        else:
+            tipo = "memoria"
+        _tipos_por_engine[engine] = tipo
+    return _tipos_por_engine[engine]
+
+# ============================================================================
+# IMPLEMENTAÇÃO 1: SQLITE FTS5
+# ============================================================================
+
+def _expressao_fts(alternativas_por_token, company_id):
+    """
+    Monta a consulta MATCH do FTS5.
+
+    Cada palavra vira (prefixo OR variações), e todas as palavras são
+    obrigatórias: "paraf inox" -> ("paraf"* ) AND ("inox"*).
+    """
+    grupos = []
+    for token, variacoes in alternativas_por_token:
+        opcoes = [f'"{token}"*'] + [f'"{v}"' for v in variacoes]
+        grupos.append("(" + " OR ".join(opcoes) + ")")
+    expressao = "{nome codigo categoria fornecedor} : (" + " AND ".join(grupos) + ")"
+    if company_id is not None:
+        expressao = f'empresa : "emp{company_id}" AND ' + expressao
+    return expressao
+
+
+def _ids_fts(db, expressao, limite, ignorar=()):
+    consulta = text(
+        f"SELECT rowid, rank FROM {TABELA_FTS} WHERE {TABELA_FTS} MATCH :expressao "
+        "ORDER BY rank LIMIT :limite"
+    )
+    linhas = db.execute(consulta, {"expressao": expressao, "limite": limite + len(ignorar)}).fetchall()
+    # bm25 do FTS5 é negativo (mais negativo = mais relevante)
+    return [(linha[0], -linha[1]) for linha in linhas if linha[0] not in ignorar][:limite]
+
+
+_vocabularios_fts = {}   # (engine, company_id) -> (Vocabulario, última alteração lida)
+_trava_vocabularios = threading.Lock()
+
+
+def _vocabulario_fts(db, company_id, tamanho_lote=10000):
+    """
+    Vocabulário da empresa (nome, código, categoria, fornecedor) para as variações.
+
+    Montado na primeira busca aproximada da empresa; nas seguintes, relê só
+    os produtos com atualizado_em a partir da última alteração vista. Palavras
+    de produtos excluídos ou renomeados continuam no vocabulário, mas não
+    encontram nada: o MATCH final só devolve produtos existentes da empresa.
+    """
+    chave = (db.get_bind().engine, company_id)
+    with _trava_vocabularios:
+        vocabulario, ultima = _vocabularios_fts.get(chave, (None, None))
+        consulta = db.query(Produto.nome, Produto.codigo, Produto.categoria, Produto.fornecedor,
+                            Produto.atualizado_em)
+        if company_id is not None:
+            consulta = consulta.filter(Produto.company_id == company_id)
+        if vocabulario is None:
+            vocabulario = Vocabulario()
+        elif ultima is not None:
+            consulta = consulta.filter(Produto.atualizado_em >= ultima - timedelta(seconds=MARGEM_VOCABULARIO_S))
+        else:
+            consulta = consulta.filter(Produto.atualizado_em.isnot(None))
+        lidos = set()   # categoria e fornecedor se repetem muito: cada texto é quebrado uma vez
+        for nome, codigo, categoria, fornecedor, atualizado_em in consulta.yield_per(tamanho_lote):
+            valores = [nome, codigo]
+            for valor in (categoria, fornecedor):
+                if valor not in lidos:
+                    lidos.add(valor)
+                    valores.append(valor)
+            for valor in valores:
+                for palavra in tokens(valor):
+                    vocabulario.adicionar(palavra)
+            if atualizado_em is not None and (ultima is None or atualizado_em > ultima):
+                ultima = atualizado_em
+        _vocabularios_fts[chave] = (vocabulario, ultima)
+        return vocabulario
+
+
+def _buscar_fts(db, palavras, company_id, limite, fuzzy):
+    encontrados = [(id_, score, "exato") for id_, score in
+                   _ids_fts(db, _expressao_fts([(p, []) for p in palavras], company_id), limite)]
+
+    if fuzzy and len(encontrados) < limite:
+        vocabulario = _vocabulario_fts(db, company_id)
+        alternativas = [(p, vocabulario.variacoes(p)) for p in palavras]
+        if any(variacoes for _, variacoes in alternativas):
+            ja_encontrados = {id_ for id_, _, _ in encontrados}
+            aproximados = _ids_fts(db, _expressao_fts(alternativas, company_id),
+                                   limite - len(encontrados), ja_encontrados)
+            encontrados += [(id_, score, "aproximado") for id_, score in aproximados]
+    return encontrados
+
+# ============================================================================
+# IMPLEMENTAÇÃO 2: POSTGRESQL PG_TRGM
+# ============================================================================
+
+def _buscar_trigramas(db, palavras, company_id, limite, fuzzy):
+    parametros = {"consulta": " ".join(palavras), "limite": limite}
+    # Correspondência direta: todas as palavras aparecem no texto (o LIKE também usa o índice GIN)
+    condicoes_diretas = []
+    for numero, palavra in enumerate(palavras):
+        parametros[f"p{numero}"] = f"%{palavra}%"
+        condicoes_diretas.append(f"{EXPRESSAO_PG} LIKE :p{numero}")
+    direta = " AND ".join(condicoes_diretas)
+    condicao = f"({direta})"
+    if fuzzy:
+        # <% : semelhança por palavra acima do limite (pg_trgm.word_similarity_threshold)
+        condicao = f"({direta} OR :consulta <% {EXPRESSAO_PG})"
+    filtro_empresa = ""
+    if company_id is not None:
+        filtro_empresa = "company_id = :company_id AND "
+        parametros["company_id"] = company_id
+
+    linhas = db.execute(text(
+        f"SELECT id, word_similarity(:consulta, {EXPRESSAO_PG}) AS score, ({direta}) AS exato "
+        f"FROM produtos WHERE {filtro_empresa}{condicao} "
+        "ORDER BY exato DESC, score DESC LIMIT :limite"
+    ), parametros).fetchall()
+    return [(linha[0], float(linha[1]), "exato" if linha[2] else "aproximado") for linha in linhas]
+
+# ============================================================================
+# IMPLEMENTAÇÃO 3: ÍNDICE EM MEMÓRIA (PYTHON PURO)
+# ============================================================================
+
+class IndiceMemoria:
+    """
+    Índice invertido simples por empresa: palavra -> ids dos produtos.
+
+    - Prefixo: as palavras de cada empresa ficam em lista ordenada (bisect)
+    - Aproximada: candidatos pelas deleções de uma letra (Vocabulario)
+    - Relevância: soma dos pesos dos campos onde cada palavra aparece
+    """
+
+    def __init__(self):
+        self._documentos = {}   # id -> (company_id, {palavra: peso})
+        self._postagens = {}    # (company_id, palavra) -> set(ids)
+        self._palavras = {}     # company_id -> lista ordenada de palavras
+        self._vocabularios = {} # company_id -> Vocabulario
+
+    def __len__(self):
+        return len(self._documentos)
+
+    def adicionar(self, id_produto, company_id, nome, codigo, categoria, fornecedor):
+        """Indexa (ou reindexa) um produto."""
+        self.remover(id_produto)
+        pesos = {}
+        for campo, valor in (("nome", nome), ("codigo", codigo), ("categoria", categoria), ("fornecedor", fornecedor)):
+            for palavra in tokens(valor):
+                pesos[palavra] = max(pesos.get(palavra, 0.0), PESOS_CAMPOS[campo])
+        self._documentos[id_produto] = (company_id, pesos)
+        palavras_empresa = self._palavras.setdefault(company_id, [])
+        vocabulario = self._vocabularios.setdefault(company_id, Vocabulario())
+        for palavra in pesos:
+            chave = (company_id, palavra)
+            if chave not in self._postagens:
+                self._postagens[chave] = set()
+                bisect.insort(palavras_empresa, palavra)
+                vocabulario.adicionar(palavra)
+            self._postagens[chave].add(id_produto)
+
+    def remover(self, id_produto):
+        """Remove um produto do índice (se estiver indexado)."""
+        documento = self._documentos.pop(id_produto, None)
+        if documento is None:
+            return
+        company_id, pesos = documento
+        for palavra in pesos:
+            ids = self._postagens.get((company_id, palavra))
+            if ids is not None:
+                ids.discard(id_produto)
+
+    def _ids_com_prefixo(self, company_id, prefixo):
+        palavras = self._palavras.get(company_id, [])
+        inicio = bisect.bisect_left(palavras, prefixo)
+        ids = set()
+        for palavra in palavras[inicio:]:
+            if not palavra.startswith(prefixo):
+                break
+            ids |= self._postagens[(company_id, palavra)]
+        return ids
+
+    def _variacoes(self, company_id, palavra):
+        vocabulario = self._vocabularios.get(company_id)
+        if vocabulario is None:
+            return []
+        return [p for p in vocabulario.variacoes(palavra) if self._postagens[(company_id, p)]]
+
+    def _pontuar(self, ids, palavras, variacoes=None):
+        """Soma, para cada palavra, o maior peso entre os termos que ela encontrou."""
+        variacoes = variacoes or [()] * len(palavras)
+        pontuados = []
+        for id_produto in ids:
+            pesos = self._documentos[id_produto][1]
+            score = 0.0
+            for palavra, alternativas in zip(palavras, variacoes):
+                score += max((peso for termo, peso in pesos.items()
+                              if termo.startswith(palavra) or termo in alternativas), default=0.0)
+            pontuados.append((id_produto, score))
+        pontuados.sort(key=lambda item: (-item[1], item[0]))
+        return pontuados
+
+    def buscar(self, palavras, company_id, limite, fuzzy):
+        empresas = [company_id] if company_id is not None else list(self._palavras)
+        encontrados = []
+        for empresa in empresas:
+            conjuntos = [self._ids_com_prefixo(empresa, palavra) for palavra in palavras]
+            ids = set.intersection(*conjuntos)
+            encontrados += [(i, s, "exato") for i, s in self._pontuar(ids, palavras)]
+        encontrados.sort(key=lambda item: -item[1])
+        encontrados = encontrados[:limite]
+
+        if fuzzy and len(encontrados) < limite:
+            ja_encontrados = {id_ for id_, _, _ in encontrados}
+            aproximados = []
+            for empresa in empresas:
+                variacoes = [set(self._variacoes(empresa, palavra)) for palavra in palavras]
+                conjuntos = []
+                for palavra, alternativas in zip(palavras, variacoes):
+                    ids = self._ids_com_prefixo(empresa, palavra)
+                    for variacao in alternativas:
+                        ids |= self._postagens[(empresa, variacao)]
+                    conjuntos.append(ids)
+                ids = set.intersection(*conjuntos) - ja_encontrados
+                aproximados += [(i, s, "aproximado") for i, s in self._pontuar(ids, palavras, variacoes)]
+            aproximados.sort(key=lambda item: -item[1])
+            encontrados += aproximados[:limite - len(encontrados)]
+        return encontrados
+
+
+_indices_memoria = {}
+
+def _indice_memoria(db, tamanho_lote=10000):
+    """Índice em memória do engine da sessão (montado na primeira busca)."""
+    engine = db.get_bind().engine
+    indice = _indices_memoria.get(engine)
+    if indice is None:
+        indice = IndiceMemoria()
+        consulta = db.query(
+            Produto.id, Produto.company_id, Produto.nome, Produto.codigo, Produto.categoria, Produto.fornecedor
+        ).order_by(Produto.id).yield_per(tamanho_lote)
+        for linha in consulta:
+            indice.adicionar(*linha)
+        _indices_memoria[engine] = indice
+    return indice
+
+
+def _atualizar_indice_memoria(mapper, connection, produto):
+    """Evento do ORM: mantém o índice em memória após INSERT/UPDATE."""
+    indice = _indices_memoria.get(connection.engine)
+    if indice is None:
+        return
+    estado = inspect(produto)
+    campos = ("company_id", "nome", "codigo", "categoria", "fornecedor")
+    if estado.persistent and produto.id in indice._documentos and not any(
+        estado.attrs[campo].history.has_changes() for campo in campos
+    ):
+        return  # venda: só a quantidade mudou
+    indice.adicionar(produto.id, produto.company_id, produto.nome, produto.codigo,
+                     produto.categoria, produto.fornecedor)
+
+
+def _remover_do_indice_memoria(mapper, connection, produto):
+    indice = _indices_memoria.get(connection.engine)
+    if indice is not None:
+        indice.remover(produto.id)
+
+
+event.listen(Produto, "after_insert", _atualizar_indice_memoria)
+event.listen(Produto, "after_update", _atualizar_indice_memoria)
+event.listen(Produto, "after_delete", _remover_do_indice_memoria)
+
+# ============================================================================
+# FUNÇÃO PRINCIPAL DE BUSCA
+# ============================================================================
+
+def buscar_produtos(db, termo, company_id=None, limite=20, fuzzy=True):
+    """
+    Busca produtos por nome, código, categoria ou fornecedor.
+
+    Cada palavra digitada é tratada como prefixo ("paraf" encontra
+    "Parafuso"). Se houver menos resultados que o limite e fuzzy=True,
+    completa com correspondências aproximadas (erros de digitação).
+
+    Args:
+        db: Sessão do banco de dados
+        termo: Texto digitado
+        company_id: Empresa (multi-tenancy); None busca em todas
+        limite: Máximo de resultados
+        fuzzy: Se True inclui correspondências aproximadas
+
+    Returns:
+        list: Dicionários com id, codigo, nome, categoria, fornecedor,
+              quantidade, valor, score e tipo_match ("exato" ou "aproximado"),
+              do mais relevante para o menos relevante
+    """
+    palavras = tokens(termo)
+    if not palavras or limite <= 0:
+        return []
+
+    tipo = tipo_de_busca(db.get_bind())
+    if tipo == "fts5":
+        encontrados = _buscar_fts(db, palavras, company_id, limite, fuzzy)
+    elif tipo == "trigrama":
+        encontrados = _buscar_trigramas(db, palavras, company_id, limite, fuzzy)
+    else:
+        encontrados = _indice_memoria(db).buscar(palavras, company_id, limite, fuzzy)
+
+    if not encontrados:
+        return []
+
+    # Dados atuais dos produtos (quantidade sempre vem da tabela produtos)
+    linhas = db.query(
+        Produto.id, Produto.codigo, Produto.nome, Produto.categoria, Produto.fornecedor,
+        Produto.quantidade, Produto.valor_unitario
+    ).filter(Produto.id.in_([id_ for id_, _, _ in encontrados])).all()
+    por_id = {linha.id: linha for linha in linhas}
+
+    resultados = []
+    for id_produto, score, tipo_match in encontrados:
+        linha = por_id.get(id_produto)
+        if linha is None:
+            continue  # removido depois da indexação
+        resultados.append({
+            "id": linha.id,
+            "codigo": linha.codigo,
+            "nome": linha.nome,
+            "categoria": linha.categoria,
+            "fornecedor": linha.fornecedor,
+            "quantidade": linha.quantidade,
+            "valor": linha.valor_unitario,
+            "score": round(score, 4),
+            "tipo_match": tipo_match
+        })
+    return resultados
+
+# ============================================================================
+# FIM DO MÓDULO BUSCA_PRODUTOS
+# ============================================================================
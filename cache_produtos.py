@@ -0,0 +1,254 @@
+# ============================================================================
+# MÓDULO CACHE_PRODUTOS - CACHE DE LEITURA DO CATÁLOGO DE PRODUTOS
+# ============================================================================
+# Cada venda ou entrada precisa localizar o produto pelo nome ou pelo
+# código. A associação código/nome -> produto quase nunca muda, então este
+# cache guarda, por processo, o resultado dessa resolução:
+#
+#   (company_id, codigo)            -> id do produto
+#   (company_id, nome_normalizado)  -> id do produto
+#
+# REGRAS:
+# - A QUANTIDADE EM ESTOQUE NUNCA VEM DO CACHE. O cache só resolve o id;
+#   o produto é sempre carregado do banco pela chave primária antes de
+#   alterar o saldo (session.get), então vendas e entradas continuam exatas.
+# - Se o produto do id em cache não corresponder mais à chave (renomeado,
+#   trocado de empresa ou excluído), a entrada é descartada e a busca
+#   normal é feita.
+# - registrar_entrada_produto invalida explicitamente as chaves do produto
+#   alterado; o TTL limita o tempo que uma entrada resolvida antes de uma
+#   alteração feita por outro processo continua no cache.
+# - Despejo LRU quando o número de entradas passa do limite.
+#
+# CONFIGURAÇÃO (.env):
+#   CACHE_PRODUTOS_TAMANHO=10000   entradas no máximo (0 desativa o cache)
+#   CACHE_PRODUTOS_TTL=300         segundos de validade de cada entrada
+#
+# USO:
+#   produto = buscar_produto_por_nome(db, "Parafuso", company_id="1")
+#   print(estatisticas())  # acertos, falhas, taxa de acerto...
+# ============================================================================
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from database import Produto, normalizar_nome
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+TAMANHO_PADRAO = int(os.getenv("CACHE_PRODUTOS_TAMANHO", "10000"))
+TTL_PADRAO = float(os.getenv("CACHE_PRODUTOS_TTL", "300"))
+
+# ============================================================================
+# CACHE LRU COM TTL
+# ============================================================================
+
+class CacheLRU:
+    """
+    Dicionário limitado com despejo LRU, validade (TTL) e contadores.
+
+    Seguro para várias threads (a API atende requisições em paralelo).
+    """
+
+    def __init__(self, tamanho_maximo=TAMANHO_PADRAO, ttl=TTL_PADRAO, relogio=time.monotonic):
+        self.tamanho_maximo = tamanho_maximo
+        self.ttl = ttl
+        self._relogio = relogio
+        self._dados = OrderedDict()  # chave -> (expira_em, valor)
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.falhas = 0
+        self.expirados = 0
+        self.despejados = 0
+        self.invalidados = 0
+
+    def __len__(self):
+        return len(self._dados)
+
+    def obter(self, chave):
+        """Retorna o valor guardado ou None (falha ou entrada expirada)."""
+        with self._trava:
+            item = self._dados.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None
+            if item[0] <= self._relogio():
+                del self._dados[chave]
+                self.expirados += 1
+                self.falhas += 1
+                return None
+            self._dados.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def guardar(self, chave, valor):
+        if self.tamanho_maximo <= 0:
+            return
+        with self._trava:
+            self._dados[chave] = (self._relogio() + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.tamanho_maximo:
+                self._dados.popitem(last=False)
+                self.despejados += 1
+
+    def remover(self, chave):
+        with self._trava:
+            if self._dados.pop(chave, None) is not None:
+                self.invalidados += 1
+
+    def limpar(self):
+        with self._trava:
+            self._dados.clear()
+
+    def zerar_contadores(self):
+        with self._trava:
+            self.acertos = self.falhas = self.expirados = self.despejados = self.invalidados = 0
+
+    def estatisticas(self):
+        """Contadores do cache (taxa_acerto entre 0 e 1)."""
+        consultas = self.acertos + self.falhas
+        return {
+            "entradas": len(self._dados),
+            "tamanho_maximo": self.tamanho_maximo,
+            "ttl_segundos": self.ttl,
+            "acertos": self.acertos,
+            "falhas": self.falhas,
+            "taxa_acerto": self.acertos / consultas if consultas else 0.0,
+            "expirados": self.expirados,
+            "despejados": self.despejados,
+            "invalidados": self.invalidados,
+        }
+
+
+# Cache único do processo
+cache = CacheLRU()
+
+# ============================================================================
+# CHAVES E INVALIDAÇÃO
+# ============================================================================
+
+def _chave_codigo(company_id, codigo):
+    # O console passa o código como texto; a coluna é inteira
+    return ("codigo", company_id, int(codigo))
+
+
+def _chave_nome(company_id, nome_normalizado):
+    return ("nome", company_id, nome_normalizado)
+
+
+def _guardar(produto, company_id_consultado):
+    """Guarda o id do produto nas duas chaves (código e nome) da consulta feita."""
+    cache.guardar(_chave_codigo(company_id_consultado, produto.codigo), produto.id)
+    cache.guardar(_chave_nome(company_id_consultado, produto.nome_normalizado), produto.id)
+
+
+def invalidar_produto(produto):
+    """
+    Remove as chaves do produto do cache (com e sem filtro de empresa).
+
+    Chamada por registrar_entrada_produto depois do commit.
+    """
+    for company_id in {produto.company_id, None}:
+        cache.remover(_chave_codigo(company_id, produto.codigo))
+        cache.remover(_chave_nome(company_id, produto.nome_normalizado))
+
+
+def limpar_cache():
+    """Esvazia o cache (ex: após importações em massa ou em testes)."""
+    cache.limpar()
+
+
+def estatisticas():
+    """Acertos, falhas, taxa de acerto, despejos e invalidações do cache."""
+    return cache.estatisticas()
+
+# ============================================================================
+# RESOLUÇÃO DE PRODUTOS (LEITURA PELO CACHE)
+# ============================================================================
+
+def _carregar_pelo_id(db_session, chave, produto_id, confere):
+    """
+    Carrega o produto do banco pela chave primária (saldo sempre atual).
+
+    Se o produto não existir mais ou não corresponder à chave, descarta a
+    entrada e retorna None (quem chamou faz a busca normal).
+    """
+    produto = db_session.get(Produto, produto_id)
+    if produto is None or not confere(produto):
+        cache.remover(chave)
+        return None
+    return produto
+
+
+def _consultar_por_codigo(db_session, codigo, company_id):
+    """Busca normal no banco (falha no cache) e guarda o resultado."""
+    consulta = db_session.query(Produto).filter_by(codigo=codigo)
+    if company_id is not None:
+        consulta = consulta.filter_by(company_id=company_id)
+    produto = consulta.first()
+    if produto is not None:
+        _guardar(produto, company_id)
+    return produto
+
+
+def _consultar_por_nome(db_session, nome_normalizado, company_id):
+    consulta = db_session.query(Produto).filter(Produto.nome_normalizado == nome_normalizado)
+    if company_id is not None:
+        consulta = consulta.filter(Produto.company_id == company_id)
+    produto = consulta.first()
+    if produto is not None:
+        _guardar(produto, company_id)
+    return produto
+
+
+def buscar_produto_por_codigo(db_session, codigo, company_id=None):
+    """
+    Produto pelo código, usando o cache para resolver o id.
+
+    Args:
+        db_session: Sessão do banco
+        codigo: Código do produto (int ou texto numérico, como vem do console)
+        company_id: Empresa (None procura em todas, como a consulta original)
+
+    Returns:
+        Produto | None: Objeto do banco (quantidade sempre lida do banco)
+
+    Raises:
+        ValueError: Código que não é um número inteiro
+    """
+    codigo = int(codigo)
+    chave = _chave_codigo(company_id, codigo)
+    produto_id = cache.obter(chave)
+    if produto_id is not None:
+        produto = _carregar_pelo_id(db_session, chave, produto_id, lambda p: (
+            p.codigo == codigo and (company_id is None or p.company_id == company_id)
+        ))
+        if produto is not None:
+            return produto
+    return _consultar_por_codigo(db_session, codigo, company_id)
+
+
+def buscar_produto_por_nome(db_session, nome, company_id=None):
+    """
+    Produto pelo nome (sem diferenciar maiúsculas), usando o cache para resolver o id.
+
+    Returns:
+        Produto | None: Objeto do banco (quantidade sempre lida do banco)
+    """
+    nome_normalizado = normalizar_nome(nome)
+    chave = _chave_nome(company_id, nome_normalizado)
+    produto_id = cache.obter(chave)
+    if produto_id is not None:
+        produto = _carregar_pelo_id(db_session, chave, produto_id, lambda p: (
+            p.nome_normalizado == nome_normalizado and (company_id is None or p.company_id == company_id)
+        ))
+        if produto is not None:
+            return produto
+    return _consultar_por_nome(db_session, nome_normalizado, company_id)
+
+# ============================================================================
+# FIM DO MÓDULO CACHE_PRODUTOS
+# ============================================================================
@@ -0,0 +1,279 @@
+# ============================================================================
+# ARQUIVO: carga_api.py
+# TESTE DE CARGA DA API HTTP (LATÊNCIA p50/p99 E REQUISIÇÕES POR SEGUNDO)
+# ============================================================================
+#
+# DESCRIÇÃO:
+# Dispara requisições concorrentes contra a API (api.py) e mede a latência
+# de cada uma. No final mostra p50, p90, p99, máximo, requisições por
+# segundo e erros. Usa apenas a biblioteca padrão (threads + http.client
+# com conexões persistentes).
+#
+# USO:
+#   # 1) Sobe o servidor com 4 workers, cria dados de teste e mede 20 s
+#   python carga_api.py --iniciar-servidor --workers 4 --semear 1000 --duracao 20
+#
+#   # 2) Contra um servidor já em execução
+#   python carga_api.py --url http://127.0.0.1:8000 --email carga@exemplo.com --senha carga123
+#
+# CENÁRIOS (--cenario):
+#   saude       GET  /saude (sem banco, mede o overhead do servidor)
+#   produtos    GET  /produtos
+#   saida       POST /estoque/saida (1 unidade de um produto aleatório)
+#   capacidade  POST /operacional/capacidade
+#   misto       80% produtos/capacidade, 20% saida
+# ============================================================================
+
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlparse
+
+EMAIL_PADRAO = "carga@exemplo.com"
+SENHA_PADRAO = "carga123"
+CNPJ_CARGA = "99999999000199"
+
+# ============================================================================
+# PREPARAÇÃO DOS DADOS DE TESTE
+# ============================================================================
+
+def semear_dados(qtd_produtos, email=EMAIL_PADRAO, senha=SENHA_PADRAO):
+    """
+    Cria (se não existirem) uma empresa, um usuário admin e produtos de teste.
+
+    Os produtos recebem nomes "Produto Carga N" e estoque alto, para que o
+    cenário de saída não esgote durante o teste.
+    """
+    from auth_utils import hash_password
+    from database import Produto, SessionLocal, init_db
+    from models import Empresa, Usuario
+
+    init_db()
+    db = SessionLocal()
+    try:
+        empresa = db.query(Empresa).filter(Empresa.cnpj == CNPJ_CARGA).first()
+        if not empresa:
+            empresa = Empresa(nome="Empresa Teste de Carga", cnpj=CNPJ_CARGA, segmento="Outro", ativa=True)
+            db.add(empresa)
+            db.flush()
+
+        if not db.query(Usuario).filter(Usuario.email == email).first():
+            db.add(Usuario(empresa_id=empresa.id, nome="Usuário de Carga", email=email,
+                           senha_hash=hash_password(senha), ativo=True, is_admin=True))
+
+        company_id = str(empresa.id)
+        existentes = db.query(Produto).filter(Produto.company_id == company_id).count()
+        db.add_all([
+            Produto(company_id=company_id, codigo=i, nome=f"Produto Carga {i}",
+                    quantidade=1_000_000, valor_unitario=round(random.uniform(1, 100), 2))
+            for i in range(existentes + 1, qtd_produtos + 1)
+        ])
+        db.commit()
+    finally:
+        db.close()
+
+# ============================================================================
+# CLIENTE HTTP
+# ============================================================================
+
+class Cliente:
+    """Conexão HTTP persistente (keep-alive), uma por thread."""
+
+    def __init__(self, url, token=None):
+        partes = urlparse(url)
+        self.conexao = HTTPConnection(partes.hostname, partes.port or 80, timeout=30)
+        self.cabecalhos = {"Content-Type": "application/json"}
+        if token:
+            self.cabecalhos["Authorization"] = f"Bearer {token}"
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        dados = json.dumps(corpo) if corpo is not None else None
+        try:
+            self.conexao.request(metodo, caminho, body=dados, headers=self.cabecalhos)
+            resposta = self.conexao.getresponse()
+            conteudo = resposta.read()
+        except (OSError, ConnectionError):
+            self.conexao.close()  # reconecta na próxima requisição
+            raise
+        return resposta.status, conteudo
+
+
+def obter_token(url, email, senha):
+    status, conteudo = Cliente(url).requisitar("POST", "/auth/login", {"email": email, "senha": senha})
+    if status != 200:
+        raise SystemExit(f"Falha no login ({status}): {conteudo.decode('utf-8', 'replace')}")
+    return json.loads(conteudo)["token"]
+
+
+def aguardar_servidor(url, tempo_maximo=30):
+    limite = time.time() + tempo_maximo
+    while time.time() < limite:
+        try:
+            if Cliente(url).requisitar("GET", "/saude")[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit("Servidor não respondeu a tempo")
+
+# ============================================================================
+# CENÁRIOS
+# ============================================================================
+
+def montar_requisicao(cenario, qtd_produtos):
+    """Retorna (metodo, caminho, corpo) da próxima requisição do cenário."""
+    if cenario == "misto":
+        cenario = "saida" if random.random() < 0.2 else random.choice(["produtos", "capacidade"])
+    if cenario == "saude":
+        return "GET", "/saude", None
+    if cenario == "produtos":
+        return "GET", "/produtos", None
+    if cenario == "capacidade":
+        return "POST", "/operacional/capacidade", {"turnos": random.randint(1, 3)}
+    if cenario == "saida":
+        nome = f"Produto Carga {random.randint(1, max(1, qtd_produtos))}"
+        return "POST", "/estoque/saida", {"nome": nome, "quantidade": 1}
+    raise ValueError(f"Cenário desconhecido: {cenario}")
+
+# ============================================================================
+# EXECUÇÃO DA CARGA
+# ============================================================================
+
+def executar_carga(url, token, cenario, concorrencia, duracao, qtd_produtos, aquecimento=2.0):
+    """
+    Executa a carga com N threads durante 'duracao' segundos.
+
+    Os primeiros 'aquecimento' segundos não entram nas estatísticas
+    (conexões sendo abertas, caches frios).
+
+    Returns:
+        dict: Estatísticas (latências em ms, rps, erros)
+    """
+    from metricas import percentil
+
+    latencias = []
+    erros = []
+    trava = threading.Lock()
+    inicio_medicao = time.perf_counter() + aquecimento
+    fim = inicio_medicao + duracao
+
+    def trabalhador():
+        cliente = Cliente(url, token)
+        minhas_latencias = []
+        meus_erros = 0
+        while True:
+            agora = time.perf_counter()
+            if agora >= fim:
+                break
+            metodo, caminho, corpo = montar_requisicao(cenario, qtd_produtos)
+            try:
+                status, _ = cliente.requisitar(metodo, caminho, corpo)
+                ok = status < 400
+            except OSError:
+                ok = False
+            depois = time.perf_counter()
+            if agora >= inicio_medicao:
+                minhas_latencias.append(depois - agora)
+                if not ok:
+                    meus_erros += 1
+        with trava:
+            latencias.extend(minhas_latencias)
+            erros.append(meus_erros)
+
+    threads = [threading.Thread(target=trabalhador) for _ in range(concorrencia)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencias.sort()
+    total = len(latencias)
+    return {
+        "cenario": cenario,
+        "concorrencia": concorrencia,
+        "duracao_s": duracao,
+        "requisicoes": total,
+        "erros": sum(erros),
+        "rps": total / duracao if duracao else 0.0,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p90_ms": percentil(latencias, 90) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "max_ms": (latencias[-1] if latencias else 0.0) * 1000,
+    }
+
+
+def exibir_resultado(resultado):
+    print("\n" + "="*70)
+    print(f"   TESTE DE CARGA - CENÁRIO '{resultado['cenario']}'")
+    print("="*70)
+    print(f"   Concorrência:        {resultado['concorrencia']} conexões")
+    print(f"   Duração medida:      {resultado['duracao_s']:.0f} s")
+    print(f"   Requisições:         {resultado['requisicoes']} ({resultado['erros']} erros)")
+    print(f"   Requisições/s:       {resultado['rps']:.1f}")
+    print("-"*70)
+    print(f"   p50:                 {resultado['p50_ms']:.2f} ms")
+    print(f"   p90:                 {resultado['p90_ms']:.2f} ms")
+    print(f"   p99:                 {resultado['p99_ms']:.2f} ms")
+    print(f"   máximo:              {resultado['max_ms']:.2f} ms")
+    print("="*70)
+
+# ============================================================================
+# PONTO DE ENTRADA
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga da API Quatro Cantos")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--email", default=EMAIL_PADRAO)
+    parser.add_argument("--senha", default=SENHA_PADRAO)
+    parser.add_argument("--cenario", default="misto", choices=["saude", "produtos", "saida", "capacidade", "misto"])
+    parser.add_argument("--concorrencia", type=int, default=16, help="Conexões simultâneas")
+    parser.add_argument("--duracao", type=float, default=10.0, help="Segundos de medição")
+    parser.add_argument("--aquecimento", type=float, default=2.0, help="Segundos descartados no início")
+    parser.add_argument("--semear", type=int, default=0, metavar="N",
+                        help="Cria empresa/usuário de teste e N produtos antes da carga")
+    parser.add_argument("--iniciar-servidor", action="store_true",
+                        help="Sobe api.py em segundo plano (na porta da --url) durante o teste")
+    parser.add_argument("--workers", type=int, default=1, help="Workers do servidor iniciado")
+    parser.add_argument("--json", dest="arquivo_json", help="Grava o resultado neste arquivo JSON")
+    args = parser.parse_args(argv)
+
+    if args.semear:
+        semear_dados(args.semear, args.email, args.senha)
+
+    servidor = None
+    if args.iniciar_servidor:
+        partes = urlparse(args.url)
+        servidor = subprocess.Popen([
+            sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "api.py"),
+            "--host", partes.hostname, "--porta", str(partes.port or 80), "--workers", str(args.workers)
+        ])
+
+    try:
+        aguardar_servidor(args.url)
+        token = obter_token(args.url, args.email, args.senha) if args.cenario != "saude" else None
+        resultado = executar_carga(args.url, token, args.cenario, args.concorrencia,
+                                   args.duracao, args.semear or 100, args.aquecimento)
+        resultado["workers"] = args.workers if servidor else None
+    finally:
+        if servidor:
+            servidor.terminate()
+            servidor.wait()
+
+    exibir_resultado(resultado)
+    if args.arquivo_json:
+        with open(args.arquivo_json, "w", encoding="utf-8") as arquivo:
+            json.dump(resultado, arquivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
+
+# ============================================================================
+# FIM DO ARQUIVO CARGA_API.PY
+# ============================================================================
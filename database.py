@@ -14,15 +14,31 @@
 # TABELAS DO SISTEMA:
 # 1. produtos: Armazena itens do estoque
 # 2. funcionarios: Armazena dados dos colaboradores
+# 3. movimentacoes_estoque: Hist\u00f3rico de entradas e sa\u00eddas de estoque
 # ============================================================================
 
 # ============================================================================
 # IMPORTA\u00c7\u00d5ES DE BIBLIOTECAS
 # ============================================================================
+import atexit
+import contextvars
+import functools
+import json
 import os  # Para ler vari\u00e1veis de ambiente do sistema operacional
-from sqlalchemy import create_engine, Column, Integer, String, Float  # Core do SQLAlchemy
+import random
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime  # Data/hora das movimenta\u00e7\u00f5es de estoque
+from functools import lru_cache
+from sqlalchemy import create_engine, event, Column, Integer, String, Float, Boolean, DateTime, Index  # Core do SQLAlchemy
+from sqlalchemy.ext.compiler import compiles  # SQL espec\u00edfico por banco (agora_utc)
 from sqlalchemy.ext.declarative import declarative_base  # Base para criar modelos
-from sqlalchemy.orm import sessionmaker  # Gerenciador de sess\u00f5es do banco
+from sqlalchemy.orm import Session, sessionmaker, validates  # Gerenciador de sess\u00f5es do banco
+from sqlalchemy.orm.exc import StaleDataError  # Conflito de vers\u00e3o (concorr\u00eancia otimista)
+from sqlalchemy.sql.expression import FunctionElement
 from dotenv import load_dotenv  # Para carregar configura\u00e7\u00f5es do arquivo .env
 
 # ============================================================================
@@ -54,6 +70,144 @@ if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
 # Ele traduz comandos Python em SQL espec\u00edfico do banco (SQLite, PostgreSQL, etc.)
 engine = create_engine(DATABASE_URL)
 
+# ============================================================================
+# RÉPLICA DE LEITURA (OPCIONAL)
+# ============================================================================
+# Com DATABASE_READ_URL, listagens e relatórios podem ler de uma réplica
+# (com pool próprio) e deixar o primário para as vendas e entradas.
+#
+# - Por padrão TUDO vai para o primário. Só as consultas feitas dentro de
+#   leitura_replica(sessao) vão para a réplica: uma venda nunca calcula o
+#   saldo a partir de um dado atrasado da réplica.
+# - Ao sair do bloco, os objetos da sessão são expirados; usados depois
+#   (ex: session.get na venda), são relidos do primário.
+# - Leia-o-que-escreveu: o bloco usa o primário se a sessão tem alterações
+#   não confirmadas, ou se a sessão (ou a mesma chave de consistência, ex:
+#   a empresa do usuário na API) confirmou uma escrita há menos de
+#   DATABASE_READ_JANELA segundos, o atraso tolerado da réplica.
+# - As conexões da réplica são abertas somente leitura (PRAGMA query_only
+#   no SQLite, default_transaction_read_only no PostgreSQL).
+#
+# A janela é por processo: com vários workers da API, uma leitura logo após
+# a venda pode cair em outro worker; ajuste a janela ao atraso da réplica.
+#
+# Teste local com dois arquivos SQLite (a "réplica" é uma cópia):
+#   DATABASE_URL=sqlite:///dados.db DATABASE_READ_URL=sqlite:///replica.db
+# ============================================================================
+DATABASE_READ_URL = os.getenv("DATABASE_READ_URL")
+if DATABASE_READ_URL and DATABASE_READ_URL.startswith("postgres://"):
+    DATABASE_READ_URL = DATABASE_READ_URL.replace("postgres://", "postgresql://", 1)
+JANELA_LEITURA_PRIMARIO = float(os.getenv("DATABASE_READ_JANELA", "5"))  # segundos após uma escrita
+
+
+def _criar_engine_leitura(url):
+    """Engine da réplica, com conexões somente leitura."""
+    argumentos = {}
+    if url.startswith("postgresql"):
+        argumentos["connect_args"] = {"options": "-c default_transaction_read_only=on"}
+    engine_replica = create_engine(url, **argumentos)
+    if engine_replica.dialect.name == "sqlite":
+        @event.listens_for(engine_replica, "connect")
+        def _somente_leitura(conexao_dbapi, registro):
+            conexao_dbapi.execute("PRAGMA query_only = ON")
+    return engine_replica
+
+
+engine_leitura = _criar_engine_leitura(DATABASE_READ_URL) if DATABASE_READ_URL else engine
+_escritas_recentes = {}   # chave de consistência -> instante (monotonic) da última escrita confirmada
+
+
+def _consulta_de_leitura(clausula):
+    """SELECT sem FOR UPDATE (texto puro e DML sempre vão para o primário)."""
+    return (clausula is not None and getattr(clausula, "is_select", False)
+            and getattr(clausula, "_for_update_arg", None) is None)
+
+
+class SessaoRoteada(Session):
+    """
+    Sessão que usa o primário para tudo, exceto as consultas de leitura
+    feitas dentro de leitura_replica(), que vão para engine_leitura.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self.info.get("_replica") and engine_leitura is not engine:
+            if getattr(clause, "is_dml", False):
+                self.info["_escrita_pendente"] = True
+            elif (not self._flushing and not self.info.get("_escrita_pendente")
+                  and _consulta_de_leitura(clause)):
+                return engine_leitura
+        return super().get_bind(mapper, clause=clause, **kw)
+
+
+@event.listens_for(SessaoRoteada, "after_flush")
+def _marcar_escrita(sessao, contexto_flush):
+    sessao.info["_escrita_pendente"] = True
+
+
+@event.listens_for(SessaoRoteada, "after_commit")
+def _registrar_escrita(sessao):
+    if sessao.info.pop("_escrita_pendente", False):
+        agora = time.monotonic()
+        sessao.info["_ultima_escrita"] = agora
+        chave = sessao.info.get("chave_consistencia")
+        if chave is not None:
+            _escritas_recentes[chave] = agora
+
+
+@event.listens_for(SessaoRoteada, "after_rollback")
+def _descartar_escrita(sessao):
+    sessao.info.pop("_escrita_pendente", None)
+
+
+def definir_chave_consistencia(sessao, chave):
+    """
+    Liga a sessão a uma chave (ex: empresa do usuário): uma escrita confirmada
+    por qualquer sessão com a mesma chave faz as leituras dessa chave usarem
+    o primário durante DATABASE_READ_JANELA segundos.
+    """
+    sessao.info["chave_consistencia"] = chave
+
+
+def _pode_ler_da_replica(sessao):
+    if engine_leitura is engine or sessao.bind is not engine:
+        return False   # sem réplica, ou sessão de outro banco (shard)
+    if sessao.new or sessao.dirty or sessao.deleted or sessao.info.get("_escrita_pendente"):
+        return False
+    ultima = max(sessao.info.get("_ultima_escrita", float("-inf")),
+                 _escritas_recentes.get(sessao.info.get("chave_consistencia"), float("-inf")))
+    return time.monotonic() - ultima >= JANELA_LEITURA_PRIMARIO
+
+
+@contextmanager
+def leitura_replica(sessao):
+    """
+    As consultas do bloco vão para a réplica (se configurada e se não houver
+    escrita recente desta sessão ou da sua chave de consistência).
+
+    Uso:
+        with leitura_replica(db_session):
+            produtos = db_session.query(Produto).all()
+    """
+    if sessao.info.get("_replica") or not _pode_ler_da_replica(sessao):
+        yield sessao
+        return
+    sessao.info["_replica"] = True
+    try:
+        yield sessao
+    finally:
+        sessao.info.pop("_replica", None)
+        # Objetos lidos da réplica são relidos do primário quando usados de novo
+        sessao.expire_all()
+
+
+def le_da_replica(funcao):
+    """Decorador: a função (que recebe a sessão como 1º argumento) roda em leitura_replica()."""
+    @functools.wraps(funcao)
+    def na_replica(sessao, *args, **kwargs):
+        with leitura_replica(sessao):
+            return funcao(sessao, *args, **kwargs)
+    return na_replica
+
 # ============================================================================
 # CONFIGURA\u00c7\u00c3O DO SESSIONMAKER (F\u00c1BRICA DE SESS\u00d5ES)
 # ============================================================================
@@ -63,7 +217,20 @@ engine = create_engine(DATABASE_URL)
 # - autocommit=False: Precisamos chamar commit() manualmente para salvar altera\u00e7\u00f5es
 # - autoflush=False: Controle manual de quando sincronizar com o banco
 # - bind=engine: Vincula ao engine criado acima
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# - class_=SessaoRoteada: leituras marcadas com leitura_replica() podem ir para a réplica
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=SessaoRoteada)
+
+
+def _instrumentar_pools():
+    """Métricas do pool de conexões (retiradas, conexões em uso, saturação); veja metricas.py."""
+    from metricas import instrumentar_pool
+
+    instrumentar_pool(engine)
+    if engine_leitura is not engine:
+        instrumentar_pool(engine_leitura)
+
+
+_instrumentar_pools()
 
 # ============================================================================
 # CRIA\u00c7\u00c3O DA CLASSE BASE PARA MODELOS
@@ -72,6 +239,36 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 # Todos os modelos herdam desta classe para terem funcionalidades ORM
 Base = declarative_base()
 
+def normalizar_nome(nome):
+    """
+    Normaliza o nome de um produto para buscas (sem espaços nas pontas, minúsculo).
+    
+    É a mesma regra usada na coluna produtos.nome_normalizado, permitindo
+    buscar por igualdade em um índice em vez de aplicar lower() na consulta.
+    
+    Returns:
+        str | None: Nome normalizado (None se o nome for vazio)
+    """
+    if nome is None:
+        return None
+    return nome.strip().lower()
+
+
+class agora_utc(FunctionElement):
+    """Momento atual em UTC calculado pelo banco (DEFAULT de colunas DateTime)."""
+    type = DateTime()
+    inherit_cache = True
+
+
+@compiles(agora_utc)
+def _agora_utc_padrao(elemento, compilador, **kw):
+    return "CURRENT_TIMESTAMP"  # SQLite: já é UTC
+
+
+@compiles(agora_utc, "postgresql")
+def _agora_utc_postgresql(elemento, compilador, **kw):
+    return "timezone('utc', now())"  # coluna sem fuso: não depende do TimeZone da sessão
+
 # ============================================================================
 # MODELO 1: PRODUTO (TABELA DE ESTOQUE)
 # ============================================================================
@@ -92,6 +289,8 @@ class Produto(Base):
     - fornecedor: Nome do fornecedor
     - local_armazem: Localiza\u00e7\u00e3o f\u00edsica no armaz\u00e9m
     - valor_unitario: Pre\u00e7o por unidade (padr\u00e3o: 0.0)
+    - versao: Versão da linha, incrementada a cada alteração (concorrência otimista)
+    - atualizado_em: Momento da última alteração (sincronização dos terminais)
     """
     __tablename__ = "produtos"  # Nome da tabela no banco de dados
 
@@ -115,6 +314,32 @@ class Produto(Base):
     fornecedor = Column(String)
     local_armazem = Column(String)
     valor_unitario = Column(Float, default=0.0)
+    nome_normalizado = Column(String)  # lower(strip(nome)), mantido por _normalizar_nome
+    ponto_reposicao = Column(Integer)  # Alerta quando quantidade <= ponto (None = sem alerta)
+    em_alerta = Column(Boolean)  # Está em alertas_estoque? Mantido por alertas_estoque.py
+    # Versão da linha (concorrência otimista): todo UPDATE pelo ORM exige a
+    # versão lida e a incrementa; veja repetir_em_conflito. Migração 0011.
+    versao = Column(Integer, nullable=False, default=1, server_default="1")
+    # Momento da última alteração (UTC): marca d'água da sincronização dos
+    # terminais de loja (sync_pdv.py). Migração 0014; DEFAULT no banco e
+    # NOT NULL pela 0015, para que cargas por SQL direto também a preencham.
+    atualizado_em = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow,
+                           server_default=agora_utc())
+
+    # Índices compostos por empresa (multi-tenancy): as buscas sempre filtram
+    # company_id primeiro. Criados em bancos existentes pela migração 0003.
+    __table_args__ = (
+        Index("ix_produtos_company_codigo", "company_id", "codigo"),
+        Index("ix_produtos_company_nome_normalizado", "company_id", "nome_normalizado"),
+        Index("ix_produtos_company_atualizado", "company_id", "atualizado_em"),
+    )
+    __mapper_args__ = {"version_id_col": versao}
+
+    @validates("nome")
+    def _normalizar_nome(self, chave, valor):
+        """Mantém nome_normalizado sincronizado sempre que o nome muda."""
+        self.nome_normalizado = normalizar_nome(valor)
+        return valor
 
     def to_dict(self):
         """
@@ -170,6 +395,10 @@ class Funcionario(Base):
     nome = Column(String, index=True)  # Indexado para busca rápida por nome
     cargo = Column(String)
     admissao = Column(String)
+
+    __table_args__ = (
+        Index("ix_funcionarios_company_nome", "company_id", "nome"),
+    )
     
     def to_dict(self):
         """
@@ -186,24 +415,281 @@ class Funcionario(Base):
             "admissao": self.admissao
         }
 
+# ============================================================================
+# MODELO 3: MOVIMENTAÇÃO DE ESTOQUE (LEDGER DE ENTRADAS E SAÍDAS)
+# ============================================================================
+
+class MovimentacaoEstoque(Base):
+    """
+    Modelo de dados para o histórico de movimentações de estoque.
+    
+    Cada entrada (registrar_entrada_produto) ou saída (registrar_saida_produto)
+    grava uma linha aqui, na mesma transação que altera Produto.quantidade.
+    O saldo continua em produtos.quantidade; esta tabela é apenas o histórico.
+    
+    CAMPOS (COLUNAS):
+    - id: Identificador único automático (chave primária)
+    - company_id: Empresa proprietária do produto
+    - produto_id: Produto movimentado
+    - tipo: "entrada" ou "saida"
+    - quantidade: Quantidade movimentada (sempre positiva)
+    - valor_unitario: Preço unitário no momento da movimentação
+    - data_hora: Momento da movimentação (UTC)
+    """
+    __tablename__ = "movimentacoes_estoque"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(String)
+    produto_id = Column(Integer, nullable=False)
+    tipo = Column(String(10), nullable=False)
+    quantidade = Column(Integer, nullable=False)
+    valor_unitario = Column(Float, default=0.0)
+    data_hora = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_movimentacoes_company_produto_data", "company_id", "produto_id", "data_hora"),
+    )
+
+    def to_dict(self):
+        """
+        Converte a movimentação para dicionário Python.
+        
+        Returns:
+            dict: Dicionário com os dados da movimentação
+        """
+        return {
+            "id": self.id,
+            "company_id": self.company_id,
+            "produto_id": self.produto_id,
+            "tipo": self.tipo,
+            "quantidade": self.quantidade,
+            "valor_unitario": self.valor_unitario,
+            "data_hora": self.data_hora.isoformat() if self.data_hora else None
+        }
+
+# ============================================================================
+# MODELO 4: ALERTA DE ESTOQUE (PRODUTOS ABAIXO DO PONTO DE REPOSIÇÃO)
+# ============================================================================
+
+class AlertaEstoque(Base):
+    """
+    Modelo de dados para os produtos abaixo do ponto de reposição.
+    
+    A tabela só contém os produtos em alerta: uma linha é criada quando a
+    quantidade cai até o ponto de reposição e removida quando o estoque é
+    reposto (veja alertas_estoque.py). Consultar os alertas de uma ou de
+    milhares de empresas lê apenas esta tabela, sem percorrer produtos.
+    
+    CAMPOS (COLUNAS):
+    - id: Identificador único automático (chave primária)
+    - company_id: Empresa proprietária do produto
+    - produto_id: Produto em alerta (um alerta por produto)
+    - nivel: "baixo" (quantidade <= ponto) ou "esgotado" (quantidade <= 0)
+    - desde: Momento em que o produto entrou em alerta (UTC)
+    - atualizado_em: Última mudança de nível (UTC)
+    """
+    __tablename__ = "alertas_estoque"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(String)
+    produto_id = Column(Integer, nullable=False, unique=True)
+    nivel = Column(String(10), nullable=False)
+    desde = Column(DateTime, default=datetime.utcnow, nullable=False)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_alertas_estoque_company_nivel", "company_id", "nivel"),
+    )
+
+    def to_dict(self):
+        """
+        Converte o alerta para dicionário Python.
+        
+        Returns:
+            dict: Dicionário com os dados do alerta
+        """
+        return {
+            "id": self.id,
+            "company_id": self.company_id,
+            "produto_id": self.produto_id,
+            "nivel": self.nivel,
+            "desde": self.desde.isoformat() if self.desde else None,
+            "atualizado_em": self.atualizado_em.isoformat() if self.atualizado_em else None
+        }
+
+# ============================================================================
+# MODELO 5: PREVISÃO DE DEMANDA (SUGESTÃO DE COMPRA POR PRODUTO)
+# ============================================================================
+
+class PrevisaoDemanda(Base):
+    """
+    Modelo de dados para a previsão de demanda de cada produto.
+    
+    Gravada pela rotina noturna de previsao_demanda.py a partir do histórico
+    de saídas (movimentacoes_estoque). Há no máximo uma linha por produto:
+    a rotina substitui as previsões da empresa a cada execução.
+    
+    CAMPOS (COLUNAS):
+    - company_id: Empresa proprietária do produto
+    - produto_id: Produto previsto (uma previsão por produto)
+    - taxa_diaria: Demanda prevista por dia (suavização exponencial)
+    - media_7d / media_28d: Médias móveis de vendas por dia
+    - desvio_diario: Desvio padrão das vendas diárias na janela
+    - estoque: Quantidade em estoque no momento do cálculo
+    - dias_cobertura: Dias até acabar o estoque (None se não há demanda)
+    - quantidade_sugerida: Quantidade a comprar agora (0 se não precisa)
+    - calculado_em: Momento do cálculo (UTC)
+    """
+    __tablename__ = "previsoes_demanda"
+
+    id = Column(Integer, primary_key=True, index=True)
+    company_id = Column(String)
+    produto_id = Column(Integer, nullable=False, unique=True)
+    taxa_diaria = Column(Float, nullable=False)
+    media_7d = Column(Float, nullable=False)
+    media_28d = Column(Float, nullable=False)
+    desvio_diario = Column(Float, nullable=False)
+    estoque = Column(Integer, nullable=False)
+    dias_cobertura = Column(Float)
+    quantidade_sugerida = Column(Integer, nullable=False)
+    calculado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index("ix_previsoes_demanda_company_sugerida", "company_id", "quantidade_sugerida"),
+    )
+
+    def to_dict(self):
+        """
+        Converte a previsão para dicionário Python.
+        
+        Returns:
+            dict: Dicionário com os dados da previsão
+        """
+        return {
+            "company_id": self.company_id,
+            "produto_id": self.produto_id,
+            "taxa_diaria": self.taxa_diaria,
+            "media_7d": self.media_7d,
+            "media_28d": self.media_28d,
+            "desvio_diario": self.desvio_diario,
+            "estoque": self.estoque,
+            "dias_cobertura": self.dias_cobertura,
+            "quantidade_sugerida": self.quantidade_sugerida,
+            "calculado_em": self.calculado_em.isoformat() if self.calculado_em else None
+        }
+
+# ============================================================================
+# MODELO 6: CHAVE DE IDEMPOTÊNCIA (ENTRADAS E VENDAS REPETIDAS PELO CLIENTE)
+# ============================================================================
+
+class ChaveIdempotencia(Base):
+    """
+    Resultado guardado de uma entrada ou venda feita com chave de idempotência.
+
+    Gravada na mesma transação que altera o estoque (veja idempotencia.py):
+    se o cliente repetir a requisição com a mesma chave (ex: depois de um
+    timeout), recebe este resultado em vez de aplicar a operação de novo.
+
+    CAMPOS (COLUNAS):
+    - company_id: Empresa da operação ("" quando não informada)
+    - operacao: "entrada" ou "venda"
+    - chave: Chave enviada pelo cliente (única por empresa e operação)
+    - impressao: SHA-256 dos parâmetros (a mesma chave com outros parâmetros é recusada)
+    - resultado: Resultado original, em JSON
+    - criada_em / expira_em: Validade da chave (IDEMPOTENCIA_TTL_HORAS)
+    """
+    __tablename__ = "chaves_idempotencia"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(String, nullable=False, default="")
+    operacao = Column(String(20), nullable=False)
+    chave = Column(String(200), nullable=False)
+    impressao = Column(String(64), nullable=False)
+    resultado = Column(String, nullable=False)
+    criada_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expira_em = Column(DateTime, nullable=False, index=True)
+
+    __table_args__ = (
+        Index("ux_chaves_idempotencia", "company_id", "operacao", "chave", unique=True),
+    )
+
+# ============================================================================
+# MODELO 7: EVENTO DO OUTBOX (ALTERAÇÕES DE ESTOQUE PARA OUTROS SISTEMAS)
+# ============================================================================
+
+class EventoOutbox(Base):
+    """
+    Evento de alteração de estoque a entregar a outros sistemas (BI, e-commerce).
+
+    Gravado na mesma transação da entrada ou venda (veja outbox.py) e lido
+    pelo relay em ordem de id, que entrega aos destinos configurados.
+
+    CAMPOS (COLUNAS):
+    - id: Posição do evento (o relay lê por faixa de id, sem varrer tabelas)
+    - company_id: Empresa do produto
+    - tipo: "estoque_entrada", "estoque_saida" ou outro tipo registrado
+    - produto_id: Produto alterado
+    - dados: Conteúdo do evento, em JSON
+    - criado_em: Momento da gravação (UTC)
+    """
+    __tablename__ = "eventos_outbox"
+
+    id = Column(Integer, primary_key=True)
+    company_id = Column(String)
+    tipo = Column(String(50), nullable=False)
+    produto_id = Column(Integer)
+    dados = Column(String, nullable=False)
+    criado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+
+class CursorOutbox(Base):
+    """Último evento confirmado por cada consumidor do outbox (relay)."""
+    __tablename__ = "outbox_cursores"
+
+    nome = Column(String(100), primary_key=True)
+    ultimo_id = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+# ============================================================================
+# MODELO 8: ESTADO DA SINCRONIZAÇÃO (TERMINAL DE LOJA)
+# ============================================================================
+
+class EstadoSincronizacao(Base):
+    """
+    Marcas da sincronização de um terminal de loja com a central (sync_pdv.py).
+
+    Fica no banco LOCAL do terminal: a marca d'água do catálogo recebido e
+    a última venda local já enviada à central.
+    """
+    __tablename__ = "sincronizacao_estado"
+
+    chave = Column(String(50), primary_key=True)
+    valor = Column(String, nullable=False)
+    atualizado_em = Column(DateTime, default=datetime.utcnow, nullable=False)
+
 # ============================================================================
 # FUN\u00c7\u00d5ES AUXILIARES PARA GERENCIAMENTO DO BANCO
 # ============================================================================
 
 def init_db():
     """
-    Inicializa o banco de dados criando todas as tabelas definidas.
+    Inicializa o banco de dados aplicando as migra\u00e7\u00f5es pendentes.
     
-    Esta fun\u00e7\u00e3o executa o comando CREATE TABLE para cada modelo definido.
+    A primeira migra\u00e7\u00e3o executa o comando CREATE TABLE para cada modelo definido.
     Se as tabelas j\u00e1 existirem, elas N\u00c3O ser\u00e3o recriadas (sem perda de dados).
+    As migra\u00e7\u00f5es seguintes adicionam colunas e \u00edndices em bancos j\u00e1 existentes
+    (veja migrations.py).
     
     QUANDO USAR:
     - Na primeira execu\u00e7\u00e3o do sistema
     - Ap\u00f3s adicionar novos modelos
     - Ao configurar ambiente de desenvolvimento
     """
-    # create_all() cria todas as tabelas dos modelos que herdam de Base
-    Base.metadata.create_all(bind=engine)
+    # Import local: migrations importa este m\u00f3dulo (evita import circular)
+    from migrations import inicializar_esquema
+    
+    # Caso normal: banco j\u00e1 atualizado, basta uma consulta (sem reflex\u00e3o)
+    inicializar_esquema()
 
 def get_db():
     """
@@ -233,12 +719,392 @@ def get_db():
     finally:
         db.close()  # Garante fechamento da conex\u00e3o
 
+# ============================================================================
+# CONCORRÊNCIA OTIMISTA (VERSÃO DOS PRODUTOS)
+# ============================================================================
+# Produto.versao é a version_id_col do mapeamento: o UPDATE gerado pelo ORM
+# é "... WHERE id = :id AND versao = :versao_lida" e grava versao + 1. Se
+# outra transação alterou o produto depois da leitura, nenhuma linha é
+# atualizada e o flush levanta StaleDataError, em vez de sobrescrever em
+# silêncio o saldo, o preço ou o fornecedor gravados pela outra.
+#
+# repetir_em_conflito desfaz a transação e executa a operação de novo (que
+# relê o produto), com espera aleatória crescente entre as tentativas
+# ("full jitter": evita que as mesmas transações colidam de novo em
+# sincronia). Esgotadas as tentativas, levanta ConflitoConcorrencia.
+#
+# Configuração (.env):
+#   CONFLITO_TENTATIVAS=5        execuções da operação antes de desistir
+#   CONFLITO_ESPERA_MS=5         espera máxima antes da 2ª tentativa (dobra a cada uma)
+#   CONFLITO_ESPERA_MAX_MS=200   teto da espera
+# ============================================================================
+CONFLITO_TENTATIVAS = int(os.getenv("CONFLITO_TENTATIVAS", "5"))
+CONFLITO_ESPERA_MS = float(os.getenv("CONFLITO_ESPERA_MS", "5"))
+CONFLITO_ESPERA_MAX_MS = float(os.getenv("CONFLITO_ESPERA_MAX_MS", "200"))
+
+
+class ConflitoConcorrencia(RuntimeError):
+    """
+    A operação colidiu com alterações concorrentes em todas as tentativas.
+
+    Nada foi gravado (a transação foi desfeita); o chamador pode repetir
+    a operação mais tarde. to_dict() dá o erro em formato estruturado.
+    """
+
+    def __init__(self, operacao, tentativas, detalhe=None):
+        super().__init__(f"Conflito de concorrência em '{operacao}': o registro foi alterado por outra "
+                         f"transação em {tentativas} tentativa(s); nada foi gravado")
+        self.operacao = operacao
+        self.tentativas = tentativas
+        self.detalhe = detalhe
+
+    def to_dict(self):
+        return {
+            "erro": "conflito_concorrencia",
+            "operacao": self.operacao,
+            "tentativas": self.tentativas,
+            "mensagem": str(self),
+            "detalhe": self.detalhe,
+        }
+
+
+def espera_com_jitter(tentativa, base_ms=None, maximo_ms=None):
+    """Segundos de espera antes da tentativa seguinte: aleatório em [0, min(máximo, base * 2^(n-1))]."""
+    base_ms = CONFLITO_ESPERA_MS if base_ms is None else base_ms
+    maximo_ms = CONFLITO_ESPERA_MAX_MS if maximo_ms is None else maximo_ms
+    return random.uniform(0, min(maximo_ms, base_ms * 2 ** (tentativa - 1))) / 1000
+
+
+def repetir_em_conflito(operacao, tentativas=None):
+    """
+    Decorador: repete a função quando o flush/commit encontra uma versão desatualizada.
+
+    A função recebe a sessão como primeiro argumento e deve ler o que
+    altera e confirmar (commit) dentro dela: cada tentativa começa com a
+    sessão desfeita (rollback) e relê os dados.
+
+    Args:
+        operacao: Nome da operação (mensagens e métrica de conflitos)
+        tentativas: Execuções no máximo (padrão: CONFLITO_TENTATIVAS)
+    """
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def envoltorio(db_session, *args, **kwargs):
+            maximo = tentativas or CONFLITO_TENTATIVAS
+            for tentativa in range(1, maximo + 1):
+                try:
+                    return funcao(db_session, *args, **kwargs)
+                except StaleDataError as erro:
+                    db_session.rollback()
+                    from metricas import CONFLITOS
+                    CONFLITOS.rotulos(operacao).inc()
+                    if tentativa == maximo:
+                        raise ConflitoConcorrencia(operacao, tentativa, str(erro)) from erro
+                    time.sleep(espera_com_jitter(tentativa))
+        return envoltorio
+    return decorar
+
+# ============================================================================
+# INSTRUMENTAÇÃO DE SQL (OPCIONAL)
+# ============================================================================
+# Com SQL_INSTRUMENTACAO=1 (ou ativar_instrumentacao()), cada comando enviado
+# ao banco é medido por eventos da engine (before/after_cursor_execute):
+#
+# - impressão digital: o SQL com literais e listas IN trocados por "?", para
+#   agrupar comandos iguais com parâmetros diferentes
+# - duração, linhas afetadas (rowcount do driver; None quando ele não sabe,
+#   como em SELECT no SQLite) e a função do sistema que originou o comando
+# - log de consultas lentas (SQL_LENTA_MS) no stderr e, opcionalmente, em
+#   um arquivo JSONL (SQL_LOG_ARQUIVO)
+# - contadores por operação lógica: cada transação é uma operação (nomeada
+#   pela função que emitiu o primeiro comando), ou o bloco operacao_sql("nome")
+# - detector de N+1: avisa quando uma operação repete o mesmo comando mais
+#   de SQL_N_MAIS_UM vezes (ex: lazy load de usuario.empresa em um laço)
+#
+# Desativada, nenhum evento é registrado e o custo é zero.
+# ============================================================================
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "0") or 0)          # 0 = sem log de lentas
+SQL_N_MAIS_UM = int(os.getenv("SQL_N_MAIS_UM", "10"))               # repetições toleradas por operação
+SQL_LOG_ARQUIVO = os.getenv("SQL_LOG_ARQUIVO")                      # JSONL das lentas e avisos N+1
+
+_RE_TEXTOS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_LISTAS = re.compile(r"\(\s*(?:\?|%s|%\(\w+\)s|:\w+)(?:\s*,\s*(?:\?|%s|%\(\w+\)s|:\w+))+\s*\)")
+_RE_ESPACOS = re.compile(r"\s+")
+
+_PASTA_PROJETO = os.path.dirname(os.path.abspath(__file__))
+_ESTE_ARQUIVO = os.path.abspath(__file__)
+
+_trava_sql = threading.Lock()
+_estatisticas_sql = {}      # impressão digital -> [execuções, segundos, máximo, linhas, {chamador: n}]
+_operacoes_sql = {}         # nome -> [execuções, comandos, segundos, maior nº de comandos]
+_avisos_n_mais_um = []
+_operacao_atual = contextvars.ContextVar("operacao_sql", default=None)
+_instrumentacao = {"engine": None, "limiar_lenta": 0.0, "limite_repeticoes": SQL_N_MAIS_UM,
+                   "arquivo": None}
+
+
+@lru_cache(maxsize=4096)
+def impressao_digital_sql(comando):
+    """SQL normalizado: literais viram ?, listas IN viram (?...) e espaços são unificados."""
+    comando = _RE_TEXTOS.sub("?", comando)
+    comando = _RE_NUMEROS.sub("?", comando)
+    comando = _RE_LISTAS.sub("(?...)", comando)
+    return _RE_ESPACOS.sub(" ", comando).strip()
+
+
+_arquivos_do_sistema = {}  # co_filename -> é código do sistema?
+
+
+def _arquivo_do_sistema(caminho):
+    if caminho.startswith("<"):  # código gerado com exec() (ex: pelo SQLAlchemy)
+        return False
+    caminho = os.path.abspath(caminho)
+    return (caminho.startswith(_PASTA_PROJETO) and caminho != _ESTE_ARQUIVO
+            and "site-packages" not in caminho)
+
+
+def _chamador():
+    """modulo.funcao do primeiro quadro da pilha que é código do sistema."""
+    conhecidos = _arquivos_do_sistema
+    quadro = sys._getframe(2)
+    while quadro is not None:
+        codigo = quadro.f_code
+        do_sistema = conhecidos.get(codigo.co_filename)
+        if do_sistema is None:
+            do_sistema = conhecidos[codigo.co_filename] = _arquivo_do_sistema(codigo.co_filename)
+        if do_sistema:
+            return f"{quadro.f_globals.get('__name__', '?')}.{codigo.co_name}"
+        quadro = quadro.f_back
+    return "?"
+
+
+class _Operacao:
+    __slots__ = ("nome", "comandos", "segundos", "repeticoes", "avisados")
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.comandos = 0
+        self.segundos = 0.0
+        self.repeticoes = {}
+        self.avisados = set()
+
+
+def _registrar_evento(tipo, dados):
+    """Imprime no stderr e acrescenta ao arquivo JSONL (se configurado)."""
+    if tipo == "sql_lenta":
+        print(f"[SQL LENTA] {dados['ms']:.1f} ms em {dados['chamador']}: {dados['sql'][:300]}", file=sys.stderr)
+    else:
+        print(f"[N+1] {dados['operacao']}: {dados['repeticoes']} comandos iguais "
+              f"(chamador {dados['chamador']}): {dados['sql'][:300]}", file=sys.stderr)
+    if _instrumentacao["arquivo"]:
+        linha = json.dumps(dict(dados, tipo=tipo, em=time.time()), ensure_ascii=False)
+        with _trava_sql, open(_instrumentacao["arquivo"], "a", encoding="utf-8") as arquivo:
+            arquivo.write(linha + "\n")
+
+
+def _fechar_operacao(operacao):
+    with _trava_sql:
+        total = _operacoes_sql.setdefault(operacao.nome, [0, 0, 0.0, 0])
+        total[0] += 1
+        total[1] += operacao.comandos
+        total[2] += operacao.segundos
+        total[3] = max(total[3], operacao.comandos)
+
+
+def _antes_do_comando(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("_inicios_sql", []).append(time.perf_counter())
+
+
+def _depois_do_comando(conn, cursor, statement, parameters, context, executemany):
+    duracao = time.perf_counter() - conn.info["_inicios_sql"].pop()
+    digital = impressao_digital_sql(statement)
+    chamador = _chamador()
+    linhas = cursor.rowcount if cursor.rowcount is not None and cursor.rowcount >= 0 else None
+
+    with _trava_sql:
+        estatistica = _estatisticas_sql.get(digital)
+        if estatistica is None:
+            estatistica = _estatisticas_sql[digital] = [0, 0.0, 0.0, 0, {}]
+        estatistica[0] += 1
+        estatistica[1] += duracao
+        estatistica[2] = max(estatistica[2], duracao)
+        estatistica[3] += linhas or 0
+        estatistica[4][chamador] = estatistica[4].get(chamador, 0) + 1
+
+    # Operação lógica: bloco operacao_sql() ou a transação desta conexão
+    operacao = _operacao_atual.get()
+    if operacao is None:
+        operacao = conn.info.get("_operacao_sql")
+        if operacao is None:
+            operacao = conn.info["_operacao_sql"] = _Operacao(chamador)
+    operacao.comandos += 1
+    operacao.segundos += duracao
+    repeticoes = operacao.repeticoes[digital] = operacao.repeticoes.get(digital, 0) + 1
+    if repeticoes > _instrumentacao["limite_repeticoes"] and digital not in operacao.avisados:
+        operacao.avisados.add(digital)
+        aviso = {"operacao": operacao.nome, "chamador": chamador, "repeticoes": repeticoes, "sql": digital}
+        with _trava_sql:
+            _avisos_n_mais_um.append(aviso)
+        _registrar_evento("n_mais_um", aviso)
+
+    if _instrumentacao["limiar_lenta"] and duracao >= _instrumentacao["limiar_lenta"]:
+        _registrar_evento("sql_lenta", {"ms": duracao * 1000, "chamador": chamador, "linhas": linhas,
+                                        "sql": digital})
+
+
+def _erro_no_comando(contexto):
+    inicios = contexto.connection.info.get("_inicios_sql") if contexto.connection is not None else None
+    if inicios:
+        inicios.pop()
+
+
+def _fim_da_transacao(conn):
+    operacao = conn.info.pop("_operacao_sql", None)
+    if operacao is not None:
+        _fechar_operacao(operacao)
+
+
+_EVENTOS_SQL = [
+    ("before_cursor_execute", _antes_do_comando),
+    ("after_cursor_execute", _depois_do_comando),
+    ("handle_error", _erro_no_comando),
+    ("commit", _fim_da_transacao),
+    ("rollback", _fim_da_transacao),
+]
+
+
+def ativar_instrumentacao(engine_alvo=None, limiar_lenta_ms=None, limite_repeticoes=None, arquivo=None):
+    """
+    Liga a instrumentação na engine (padrão: a engine do sistema).
+
+    Args:
+        limiar_lenta_ms: Comandos com duração >= este valor vão para o log (0 = desligado)
+        limite_repeticoes: Comandos iguais tolerados por operação antes do aviso de N+1
+        arquivo: JSONL onde gravar consultas lentas e avisos (None = só stderr)
+    """
+    engine_alvo = engine_alvo or engine
+    if _instrumentacao["engine"] is not None:
+        desativar_instrumentacao()
+    _instrumentacao.update(
+        engine=engine_alvo,
+        limiar_lenta=(SQL_LENTA_MS if limiar_lenta_ms is None else limiar_lenta_ms) / 1000,
+        limite_repeticoes=SQL_N_MAIS_UM if limite_repeticoes is None else limite_repeticoes,
+        arquivo=SQL_LOG_ARQUIVO if arquivo is None else arquivo,
+    )
+    for nome, funcao in _EVENTOS_SQL:
+        event.listen(engine_alvo, nome, funcao)
+
+
+def desativar_instrumentacao():
+    """Remove os eventos (as estatísticas acumuladas são mantidas)."""
+    engine_alvo = _instrumentacao["engine"]
+    if engine_alvo is None:
+        return
+    for nome, funcao in _EVENTOS_SQL:
+        event.remove(engine_alvo, nome, funcao)
+    _instrumentacao["engine"] = None
+
+
+def instrumentacao_ativa():
+    return _instrumentacao["engine"] is not None
+
+
+@contextmanager
+def operacao_sql(nome):
+    """
+    Agrupa os comandos do bloco em uma operação lógica (contadores e N+1),
+    mesmo que o bloco use várias transações. Ex: uma requisição da API.
+    """
+    operacao = _Operacao(nome)
+    token = _operacao_atual.set(operacao)
+    try:
+        yield operacao
+    finally:
+        _operacao_atual.reset(token)
+        if operacao.comandos:
+            _fechar_operacao(operacao)
+
+
+def estatisticas_sql(limite=20, ordenar_por="tempo_total_ms"):
+    """
+    Comandos agrupados por impressão digital, dos mais caros aos mais baratos.
+
+    Returns:
+        list: dicts com sql, execucoes, tempo_total_ms, tempo_medio_ms,
+              tempo_max_ms, linhas e os chamadores mais frequentes
+    """
+    with _trava_sql:
+        itens = [(digital, list(valores[:4]), dict(valores[4])) for digital, valores in _estatisticas_sql.items()]
+    resultado = [{
+        "sql": digital,
+        "execucoes": execucoes,
+        "tempo_total_ms": round(segundos * 1000, 3),
+        "tempo_medio_ms": round(segundos * 1000 / execucoes, 3),
+        "tempo_max_ms": round(maximo * 1000, 3),
+        "linhas": linhas,
+        "chamadores": dict(sorted(chamadores.items(), key=lambda item: -item[1])[:3]),
+    } for digital, (execucoes, segundos, maximo, linhas), chamadores in itens]
+    resultado.sort(key=lambda item: -item[ordenar_por])
+    return resultado[:limite] if limite else resultado
+
+
+def operacoes_sql():
+    """Contadores por operação lógica (execuções, comandos, tempo e pior caso)."""
+    with _trava_sql:
+        itens = list(_operacoes_sql.items())
+    return sorted(({
+        "operacao": nome,
+        "execucoes": execucoes,
+        "comandos": comandos,
+        "comandos_por_execucao": round(comandos / execucoes, 2),
+        "max_comandos": maximo,
+        "tempo_total_ms": round(segundos * 1000, 3),
+    } for nome, (execucoes, comandos, segundos, maximo) in itens), key=lambda item: -item["comandos"])
+
+
+def avisos_n_mais_um():
+    with _trava_sql:
+        return list(_avisos_n_mais_um)
+
+
+def limpar_estatisticas_sql():
+    with _trava_sql:
+        _estatisticas_sql.clear()
+        _operacoes_sql.clear()
+        _avisos_n_mais_um.clear()
+
+
+def relatorio_sql(limite=10, arquivo=sys.stderr):
+    """Imprime os comandos mais caros, as operações e os avisos de N+1."""
+    print("\n" + "=" * 70, file=arquivo)
+    print("   INSTRUMENTAÇÃO DE SQL", file=arquivo)
+    print("=" * 70, file=arquivo)
+    for item in estatisticas_sql(limite):
+        print(f"{item['execucoes']:>7}x {item['tempo_total_ms']:>10.1f} ms (máx {item['tempo_max_ms']:.1f}) "
+              f"{next(iter(item['chamadores']), '?')}: {item['sql'][:120]}", file=arquivo)
+    print("-" * 70, file=arquivo)
+    for item in operacoes_sql()[:limite]:
+        print(f"{item['operacao']:<45} {item['execucoes']:>6} exec. {item['comandos_por_execucao']:>8} "
+              f"comandos/exec. (máx {item['max_comandos']})", file=arquivo)
+    avisos = avisos_n_mais_um()
+    if avisos:
+        print("-" * 70, file=arquivo)
+        print(f"{len(avisos)} aviso(s) de N+1 (veja acima)", file=arquivo)
+    print("=" * 70, file=arquivo)
+
+
+if os.getenv("SQL_INSTRUMENTACAO", "").lower() in ("1", "true", "sim"):
+    ativar_instrumentacao()
+    atexit.register(relatorio_sql)
+
 # ============================================================================
 # FIM DO M\u00d3DULO DATABASE
 # ============================================================================
 # Este m\u00f3dulo \u00e9 a base de toda a persist\u00eancia de dados do sistema.
 # Qualquer outro m\u00f3dulo que precise acessar o banco deve importar:
 # - SessionLocal: para criar sess\u00f5es
-# - Produto/Funcionario: para manipular dados
+# - Produto/Funcionario/MovimentacaoEstoque: para manipular dados
 # - init_db(): para inicializar o banco
+# - leitura_replica()/le_da_replica: para leituras que podem ir à réplica
 # ============================================================================
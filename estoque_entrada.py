@@ -14,16 +14,49 @@
 # - Validação e tratamento de duplicidade
 # ============================================================================
 
-from database import Produto
+from database import Produto, MovimentacaoEstoque, repetir_em_conflito
+import alertas_estoque  # registra a avaliação de estoque baixo a cada alteração de saldo
+import outbox  # com OUTBOX=1, grava um evento por movimentação na mesma transação
+from cache_produtos import buscar_produto_por_codigo, invalidar_produto
+from idempotencia import executar_idempotente, produto_de_json, produto_para_json
+from metricas import ENTRADAS, LATENCIA_ENTRADA, UNIDADES_RECEBIDAS, medir
+from sqlalchemy import inspect
+
+# ============================================================================
+# MÉTRICAS (veja metricas.py)
+# ============================================================================
+_ENTRADAS_NOVO = ENTRADAS.rotulos("novo")
+_ENTRADAS_REPOSICAO = ENTRADAS.rotulos("reposicao")
+
+
+def _contar_entrada(resultado):
+    produto, is_novo = resultado
+    if inspect(produto).transient:
+        return   # resultado guardado de uma chave de idempotência (nada foi aplicado)
+    (_ENTRADAS_NOVO if is_novo else _ENTRADAS_REPOSICAO).inc()
 
 # ============================================================================
 # FUNÇÕES DE LÓGICA PURA (PARA API E CLI)
 # ============================================================================
 
-def registrar_entrada_produto(db_session, codigo, nome, quantidade, valor_unitario=0.0, data=None, fornecedor=None, local=None):
+@medir(LATENCIA_ENTRADA, apos=_contar_entrada, operacao="entrada")
+@repetir_em_conflito("entrada")
+def registrar_entrada_produto(db_session, codigo, nome, quantidade, valor_unitario=0.0, data=None, fornecedor=None, local=None, company_id=None,
+                              chave_idempotencia=None):
     """
     Registra a entrada de um produto no estoque (Lógica Pura).
     
+    Args:
+        company_id: Empresa dona do produto (multi-tenancy). Se informado,
+                    o código só é procurado entre os produtos dessa empresa.
+        chave_idempotencia: Chave do cliente (opcional). Repetida com os mesmos
+                    dados, devolve o resultado original sem somar de novo ao
+                    estoque (o produto devolvido é o retrato daquele momento).
+    
+    Se outra transação alterar o produto entre a leitura e o commit, a
+    entrada é refeita sobre os dados novos (repetir_em_conflito); se o
+    conflito persistir, levanta database.ConflitoConcorrencia.
+    
     Retorna:
         tuple: (produto_objeto, is_novo_produto)
     """
@@ -31,9 +64,33 @@ def registrar_entrada_produto(db_session, codigo, nome, quantidade, valor_unitar
         raise ValueError("Nome do produto é obrigatório")
     if quantidade <= 0:
         raise ValueError("Quantidade deve ser maior que zero")
-    
-    # Verifica se o produto já existe pelo código
-    produto = db_session.query(Produto).filter_by(codigo=codigo).first() # Busca por código único
+
+    def aplicar():
+        return _aplicar_entrada(db_session, codigo, nome, quantidade, valor_unitario, data, fornecedor, local, company_id)
+
+    if chave_idempotencia is None:
+        produto, is_novo = aplicar()
+        db_session.commit()
+    else:
+        parametros = {"codigo": codigo, "nome": nome, "quantidade": quantidade, "valor_unitario": valor_unitario,
+                      "data": data, "fornecedor": fornecedor, "local": local}
+        (produto, is_novo), repetida = executar_idempotente(
+            db_session, "entrada", chave_idempotencia, company_id, parametros, aplicar,
+            serializar=lambda resultado: {"produto": produto_para_json(resultado[0]), "novo": resultado[1]},
+            desserializar=lambda dados: (produto_de_json(dados["produto"]), dados["novo"]))
+        if repetida:
+            return (produto, is_novo)
+
+    UNIDADES_RECEBIDAS.inc(quantidade)
+    invalidar_produto(produto)  # código/nome voltam a ser resolvidos pelo banco
+    return (produto, is_novo)
+
+
+def _aplicar_entrada(db_session, codigo, nome, quantidade, valor_unitario, data, fornecedor, local, company_id):
+    """Altera (ou cria) o produto e grava o histórico, sem commit."""
+    # Verifica se o produto já existe pelo código (o cache só resolve o id;
+    # o produto, com o saldo atual, é sempre lido do banco)
+    produto = buscar_produto_por_codigo(db_session, codigo, company_id)
     
     if produto:
         # Atualizar produto existente
@@ -44,13 +101,14 @@ def registrar_entrada_produto(db_session, codigo, nome, quantidade, valor_unitar
         if fornecedor:
             produto.fornecedor = fornecedor
         if local:
-            produto.local = local
+            produto.local_armazem = local
         
-        db_session.commit()
+        _registrar_movimentacao(db_session, produto, quantidade)
         return (produto, False)
     else:
         # Criar novo produto
         novo_produto = Produto(
+            company_id=company_id,
             codigo=codigo,
             nome=nome,
             quantidade=quantidade,
@@ -61,17 +119,32 @@ def registrar_entrada_produto(db_session, codigo, nome, quantidade, valor_unitar
         )
         
         db_session.add(novo_produto)
-        db_session.commit()
+        db_session.flush()  # Gera o id usado no histórico de movimentações
+        _registrar_movimentacao(db_session, novo_produto, quantidade)
         return (novo_produto, True)
 
 
+def _registrar_movimentacao(db_session, produto, quantidade):
+    """Grava a entrada no histórico (mesma transação da atualização do saldo)."""
+    db_session.add(MovimentacaoEstoque(
+        company_id=produto.company_id,
+        produto_id=produto.id,
+        tipo="entrada",
+        quantidade=quantidade,
+        valor_unitario=produto.valor_unitario
+    ))
+
+
 # ============================================================================
 # FUNÇÕES INTERATIVAS (CLI)
 # ============================================================================
 
-def cadastrar_produtos(db_session):
+def cadastrar_produtos(db_session, company_id=None):
     """
     Cadastra múltiplos produtos no estoque (Interface Console).
+
+    Args:
+        company_id: Empresa do usuário logado (None: instalação sem login)
     """
     print("\n" + "="*70)
     print("   MÓDULO DE ESTOQUE - ENTRADA DE PRODUTOS")
@@ -132,7 +205,8 @@ def cadastrar_produtos(db_session):
         # Chama a função pura
         try:
             produto, is_novo = registrar_entrada_produto(
-                db_session, codigo, nome, quantidade, valor_unitario=valor, data=data, fornecedor=fornecedor, local=local
+                db_session, codigo, nome, quantidade, valor_unitario=valor, data=data, fornecedor=fornecedor, local=local,
+                company_id=company_id
             )
             
             valor_total = quantidade * valor
@@ -176,9 +250,5 @@ def cadastrar_produtos(db_session):
     print("═"*70)
 
 
-# Alias para manter compatibilidade com main.py
-cadastrar_produto = cadastrar_produtos
-
-
 if __name__ == "__main__":
     print(" Testando o Módulo de Entrada de Estoque...\n")
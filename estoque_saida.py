@@ -15,17 +15,48 @@
 # - Tratamento de pedidos parciais
 # ============================================================================
 
-from database import Produto
-from sqlalchemy import func
+from database import Produto, MovimentacaoEstoque, leitura_replica, repetir_em_conflito
+import alertas_estoque  # registra a avaliação de estoque baixo a cada alteração de saldo
+import outbox  # com OUTBOX=1, grava um evento por movimentação na mesma transação
+from cache_produtos import buscar_produto_por_nome
+from idempotencia import executar_idempotente, produto_de_json, produto_para_json
+from metricas import FATURAMENTO, LATENCIA_VENDA, UNIDADES_VENDIDAS, VENDAS, medir
+
+# ============================================================================
+# MÉTRICAS (veja metricas.py)
+# ============================================================================
+_VENDAS_POR_STATUS = {status: VENDAS.rotulos(status) for status in ("sucesso", "parcial", "erro")}
+
+
+def _contar_venda(resultado):
+    if resultado.get("repetida"):
+        return   # resultado guardado de uma chave de idempotência (nada foi aplicado)
+    _VENDAS_POR_STATUS[resultado["status"]].inc()
+    if resultado.get("qtd_vendida"):
+        UNIDADES_VENDIDAS.inc(resultado["qtd_vendida"])
+        FATURAMENTO.inc(resultado["valor_venda"])
 
 # ============================================================================
 # FUNÇÕES DE LÓGICA PURA (PARA API E CLI)
 # ============================================================================
 
-def registrar_saida_produto(db_session, nome_buscado, qtd_desejada):
+@medir(LATENCIA_VENDA, apos=_contar_venda, operacao="venda")
+@repetir_em_conflito("venda")
+def registrar_saida_produto(db_session, nome_buscado, qtd_desejada, company_id=None, chave_idempotencia=None):
     """
     Registra a saída de um produto do estoque (Lógica Pura).
 
+    Args:
+        company_id: Empresa dona do produto (multi-tenancy). Se informado,
+                    o nome só é procurado entre os produtos dessa empresa.
+        chave_idempotencia: Chave do cliente (opcional). Repetida com os mesmos
+                    dados, devolve o resultado original (com "repetida": True)
+                    sem baixar o estoque de novo.
+
+    Se outra venda baixar o mesmo produto entre a leitura do saldo e o
+    commit, a venda é refeita com o saldo novo (repetir_em_conflito); se o
+    conflito persistir, levanta database.ConflitoConcorrencia.
+
     Retorna:
         dict: Resultado da operação com status, tipo de atendimento, valores, etc.
     """
@@ -34,8 +65,34 @@ def registrar_saida_produto(db_session, nome_buscado, qtd_desejada):
     if qtd_desejada <= 0:
         raise ValueError("Quantidade deve ser maior que zero")
 
-    # Busca case-insensitive
-    produto = db_session.query(Produto).filter(func.lower(Produto.nome) == nome_buscado.lower()).first()
+    def aplicar():
+        return _aplicar_saida(db_session, nome_buscado, qtd_desejada, company_id)
+
+    if chave_idempotencia is None:
+        resultado = aplicar()
+        if resultado["status"] in ["sucesso", "parcial"]:
+            db_session.commit()
+        return resultado
+
+    parametros = {"nome": nome_buscado, "quantidade": qtd_desejada}
+    resultado, _ = executar_idempotente(db_session, "venda", chave_idempotencia, company_id, parametros, aplicar,
+                                        serializar=_saida_para_json, desserializar=_saida_de_json)
+    return resultado
+
+
+def _saida_para_json(resultado):
+    return dict(resultado, produto=produto_para_json(resultado["produto"]))
+
+
+def _saida_de_json(dados):
+    return dict(dados, produto=produto_de_json(dados["produto"]), repetida=True)
+
+
+def _aplicar_saida(db_session, nome_buscado, qtd_desejada, company_id):
+    """Calcula a venda, baixa o saldo e grava o histórico, sem commit."""
+    # Busca case-insensitive pelo nome normalizado; o cache resolve o id e o
+    # produto (com o saldo) é sempre carregado do banco pela chave primária
+    produto = buscar_produto_por_nome(db_session, nome_buscado, company_id)
 
     if not produto:
         return {
@@ -93,7 +150,14 @@ def registrar_saida_produto(db_session, nome_buscado, qtd_desejada):
         return resultado
 
     if resultado["status"] in ["sucesso", "parcial"]:
-        db_session.commit()
+        # Histórico da venda na mesma transação da baixa de estoque
+        db_session.add(MovimentacaoEstoque(
+            company_id=produto.company_id,
+            produto_id=produto.id,
+            tipo="saida",
+            quantidade=resultado["qtd_vendida"],
+            valor_unitario=valor_unitario
+        ))
 
     return resultado
 
@@ -102,9 +166,12 @@ def registrar_saida_produto(db_session, nome_buscado, qtd_desejada):
 # FUNÇÕES INTERATIVAS (CLI)
 # ============================================================================
 
-def vender_produto(db_session):
+def vender_produto(db_session, company_id=None):
     """
     Registra vendas/saídas de produtos do estoque (Interface Console).
+
+    Args:
+        company_id: Empresa do usuário logado (None: instalação sem login)
     """
     print("\n" + "="*70)
     print("   MÓDULO DE ESTOQUE - SAÍDA DE PRODUTOS (VENDAS)")
@@ -114,17 +181,23 @@ def vender_produto(db_session):
     print("\nPRODUTOS DISPONÍVEIS EM ESTOQUE:")
     print("─"*70)
     
-    produtos = db_session.query(Produto).filter(Produto.quantidade > 0).all()
-    
-    if not produtos:
-        print("\n[AVISO] Nenhum produto disponível em estoque!")
-        print("   Cadastre produtos primeiro no Módulo de Entrada.")
-        return
-    
-    for i, p in enumerate(produtos, 1):
-        valor_estoque = p.quantidade * p.valor_unitario
-        print(f"{i}. {p.nome}")
-        print(f"   Código: {p.codigo} | Qtd: {p.quantidade} un | R$ {p.valor_unitario:.2f}/un | Total: R$ {valor_estoque:.2f}")
+    # Listagem e valorização podem vir da réplica de leitura (se configurada);
+    # a venda em si relê o produto do primário
+    with leitura_replica(db_session):
+        consulta = db_session.query(Produto).filter(Produto.quantidade > 0)
+        if company_id is not None:
+            consulta = consulta.filter(Produto.company_id == company_id)
+        produtos = consulta.all()
+        
+        if not produtos:
+            print("\n[AVISO] Nenhum produto disponível em estoque!")
+            print("   Cadastre produtos primeiro no Módulo de Entrada.")
+            return
+        
+        for i, p in enumerate(produtos, 1):
+            valor_estoque = p.quantidade * p.valor_unitario
+            print(f"{i}. {p.nome}")
+            print(f"   Código: {p.codigo} | Qtd: {p.quantidade} un | R$ {p.valor_unitario:.2f}/un | Total: R$ {valor_estoque:.2f}")
     
     print("─"*70)
     
@@ -154,7 +227,7 @@ def vender_produto(db_session):
         
         # Chama a função pura
         try:
-            resultado = registrar_saida_produto(db_session, nome_produto, qtd_desejada)
+            resultado = registrar_saida_produto(db_session, nome_produto, qtd_desejada, company_id=company_id)
             
             print("\n" + "─"*70)
             
@@ -167,6 +240,8 @@ def vender_produto(db_session):
                 print(f"   Valor Total da Venda: R$ {resultado['valor_venda']:.2f}")
                 print(f"   Saldo Anterior: {resultado['saldo_anterior']} unidades")
                 print(f"   Saldo Atual: {resultado['saldo_restante']} unidades")
+                if resultado['produto'].em_alerta:
+                    print(f"   [ALERTA] Abaixo do ponto de reposição ({resultado['produto'].ponto_reposicao} un). Providencie reposição!")
                 print("─"*70)
                 total_vendas += resultado['valor_venda']
                 qtd_vendas += 1
@@ -191,6 +266,14 @@ def vender_produto(db_session):
                 print(f"   {resultado.get('mensagem', 'Erro desconhecido')}")
                 if resultado.get('tipo') == 'esgotado':
                     print(f"   Produto '{nome_produto}' está sem estoque!")
+                elif resultado.get('produto') is None:
+                    # Sugere produtos parecidos (prefixo ou erro de digitação)
+                    from busca_produtos import buscar_produtos
+                    sugestoes = buscar_produtos(db_session, nome_produto, company_id=company_id, limite=5)
+                    if sugestoes:
+                        print("   Você quis dizer:")
+                        for s in sugestoes:
+                            print(f"   - {s['nome']} (Código: {s['codigo']} | Qtd: {s['quantidade']} un)")
                 print("─"*70)
                 
         except Exception as e:
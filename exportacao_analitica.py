@@ -0,0 +1,429 @@
+# ============================================================================
+# MÓDULO EXPORTACAO_ANALITICA - PRODUTOS, FUNCIONÁRIOS E MOVIMENTAÇÕES EM PARQUET
+# ============================================================================
+# Em vez de copiar dados.db para análise, este módulo exporta as tabelas em
+# arquivos colunares (Parquet ou Arrow IPC) particionados por empresa e mês,
+# no layout lido diretamente por DuckDB, pandas, Spark e pyarrow.dataset:
+#
+#   analitico/movimentacoes/company_id=3/mes=2026-10/principal-20261019T154318-0001.parquet
+#   analitico/produtos/company_id=3/mes=2026-10/...       (mês da última alteração)
+#   analitico/funcionarios/company_id=3/...               (sem data: só por empresa)
+#
+# MEMÓRIA CONSTANTE (EXPORTAÇÕES DE VÁRIOS GB):
+# - Cursor no servidor (stream_results/yield_per, como serializacao.py):
+#   as linhas chegam em lotes, nunca a tabela inteira
+# - A consulta vem ordenada por (company_id, data, id): a ordenação fica com
+#   o banco (em disco, se preciso) e cada partição chega inteira, uma de
+#   cada vez. Só um arquivo fica aberto, e em memória ficam no máximo
+#   EXPORTACAO_LINHAS_POR_GRUPO linhas (um grupo de linhas do arquivo).
+#
+# EXPORTAÇÃO INCREMENTAL (MARCA D'ÁGUA EM <destino>/_estado.json):
+# - movimentacoes: só as de id maior que o último exportado (a tabela só
+#   recebe inserções). Ids que faltam no intervalo (transações confirmadas
+#   fora de ordem) são procurados de novo por EXPORTACAO_ESPERA_LACUNA s.
+# - produtos: só os alterados desde a última marca (produtos.atualizado_em),
+#   relendo EXPORTACAO_MARGEM_S segundos antes dela. Um produto pode
+#   aparecer em mais de um arquivo: o atual é o de maior atualizado_em.
+# - funcionarios: sem coluna de alteração; cada exportação substitui a
+#   pasta inteira.
+# Os arquivos são gravados numa pasta temporária e movidos para o destino
+# só no fim; então a marca é gravada. Uma exportação interrompida não
+# deixa arquivos pela metade (no pior caso, linhas repetidas: use o id).
+# Com shards, cada shard é lido com as suas marcas (o nome do shard vai no
+# nome do arquivo) e só exporta as empresas que o catálogo põe nele (uma
+# cópia em andamento ou uma origem mantida não entra em dobro).
+#
+# EMPRESA QUE MUDOU DE SHARD (shards.mover_empresa):
+# No destino as linhas ganham ids novos, então a marca do destino traria o
+# histórico inteiro de novo enquanto os arquivos da origem continuam lá.
+# O estado guarda, por tabela, de qual posição do catálogo (shard e
+# empresa_shards.atualizado_em) veio cada empresa; quando ela muda, as
+# pastas company_id=<empresa> da tabela são apagadas e a empresa é
+# exportada inteira a partir do shard atual.
+#
+# DEPENDÊNCIA OPCIONAL:
+#   pip install pyarrow
+#
+# USO:
+#   python exportacao_analitica.py exportar --destino analitico
+#   python exportacao_analitica.py exportar --destino analitico --tabelas movimentacoes --formato arrow
+#   python exportacao_analitica.py exportar --destino analitico --completa
+#   python exportacao_analitica.py status --destino analitico
+#
+# Leitura (exemplo com DuckDB):
+#   SELECT company_id, mes, sum(quantidade) FROM read_parquet(
+#       'analitico/movimentacoes/*/*/*.parquet', hive_partitioning = true) GROUP BY ALL
+# ============================================================================
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from datetime import datetime, timedelta
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import Boolean, DateTime, Float, Integer, and_, or_, select
+
+from database import Funcionario, MovimentacaoEstoque, Produto
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+TAMANHO_LOTE = int(os.getenv("EXPORTACAO_LOTE", "10000"))                    # linhas por leitura do cursor
+LINHAS_POR_GRUPO = int(os.getenv("EXPORTACAO_LINHAS_POR_GRUPO", "100000"))    # linhas por grupo no arquivo
+MARGEM_S = float(os.getenv("EXPORTACAO_MARGEM_S", "60"))
+ESPERA_LACUNA = float(os.getenv("EXPORTACAO_ESPERA_LACUNA", "600"))
+MAXIMO_LACUNAS = 10000
+
+FORMATOS = {"parquet": ".parquet", "arrow": ".arrow"}
+SEM_EMPRESA = "__HIVE_DEFAULT_PARTITION__"   # company_id nulo (convenção do Hive)
+ARQUIVO_ESTADO = "_estado.json"
+
+# Tabela exportada -> (modelo, coluna da data que define o mês, tipo de incremento)
+TABELAS = {
+    "produtos": (Produto, "atualizado_em", "alteracao"),
+    "funcionarios": (Funcionario, None, "completa"),
+    "movimentacoes": (MovimentacaoEstoque, "data_hora", "id"),
+}
+
+_TIPOS_ARROW = {Integer: pa.int64(), Float: pa.float64(), Boolean: pa.bool_(), DateTime: pa.timestamp("us")}
+
+# ============================================================================
+# ESQUEMA E PARTIÇÕES
+# ============================================================================
+
+def _tipo_arrow(coluna):
+    for tipo_sql, tipo_arrow in _TIPOS_ARROW.items():
+        if isinstance(coluna.type, tipo_sql):
+            return tipo_arrow
+    return pa.string()
+
+
+def colunas_exportadas(modelo):
+    """Colunas gravadas nos arquivos (company_id fica no caminho da partição)."""
+    return [coluna for coluna in modelo.__table__.columns if coluna.name != "company_id"]
+
+
+def esquema(modelo):
+    return pa.schema([pa.field(coluna.name, _tipo_arrow(coluna)) for coluna in colunas_exportadas(modelo)])
+
+
+def _caminho_particao(company_id, mes):
+    partes = [f"company_id={quote(str(company_id), safe='') if company_id is not None else SEM_EMPRESA}"]
+    if mes is not None:
+        partes.append(f"mes={mes}")
+    return os.path.join(*partes)
+
+
+class _EscritorParticionado:
+    """
+    Grava linhas que chegam agrupadas por partição (consulta ordenada).
+
+    Cada partição vira um arquivo; a cada LINHAS_POR_GRUPO linhas um
+    grupo de linhas (record batch) é gravado. Quando a partição muda, o
+    arquivo anterior é fechado: só um fica aberto.
+    """
+
+    def __init__(self, pasta, schema, formato, prefixo):
+        self.pasta = pasta
+        self.schema = schema
+        self.formato = formato
+        self.prefixo = prefixo
+        self.arquivos = []
+        self.linhas = 0
+        self._particao = None
+        self._escritor = None
+        self._pendentes = []
+
+    def acrescentar(self, particao, linha):
+        if particao != self._particao:
+            self._fechar_particao()
+            self._particao = particao
+        self._pendentes.append(linha)
+        if len(self._pendentes) >= LINHAS_POR_GRUPO:
+            self._gravar()
+
+    def _abrir(self):
+        pasta = os.path.join(self.pasta, _caminho_particao(*self._particao))
+        os.makedirs(pasta, exist_ok=True)
+        caminho = os.path.join(pasta, f"{self.prefixo}-{len(self.arquivos) + 1:04d}{FORMATOS[self.formato]}")
+        self.arquivos.append(caminho)
+        if self.formato == "parquet":
+            return pq.ParquetWriter(caminho, self.schema, compression="zstd")
+        return pa.ipc.new_file(caminho, self.schema)
+
+    def _gravar(self):
+        colunas = list(zip(*self._pendentes))
+        lote = pa.RecordBatch.from_arrays(
+            [pa.array(valores, type=campo.type) for valores, campo in zip(colunas, self.schema)], schema=self.schema)
+        if self._escritor is None:
+            self._escritor = self._abrir()
+        if self.formato == "parquet":
+            self._escritor.write_table(pa.Table.from_batches([lote]))
+        else:
+            self._escritor.write_batch(lote)
+        self.linhas += len(self._pendentes)
+        self._pendentes = []
+
+    def _fechar_particao(self):
+        if self._pendentes:
+            self._gravar()
+        if self._escritor is not None:
+            self._escritor.close()
+            self._escritor = None
+
+    def fechar(self):
+        self._fechar_particao()
+        return self.arquivos
+
+# ============================================================================
+# LEITURA EM LOTES (CURSOR NO SERVIDOR)
+# ============================================================================
+
+def _mes(valor):
+    return valor.strftime("%Y-%m") if valor is not None else "sem-data"
+
+
+def _ids_nao_vistos(vistos, primeiro, ultimo):
+    for indice, byte in enumerate(vistos):
+        if byte == 0xFF:
+            continue
+        for bit in range(8):
+            id_faixa = primeiro + indice * 8 + bit
+            if id_faixa <= ultimo and not byte & (1 << bit):
+                yield id_faixa
+
+
+def _exportar_tabela(bind, nome, estado, pasta, formato, prefixo, completa, pertence=None, refazer=()):
+    """
+    Lê a tabela (ou o que mudou desde a marca) e grava os arquivos em `pasta`.
+
+    Args:
+        pertence: pertence(company_id) -> bool; linhas de empresas que não
+                  estão neste shard são lidas (contam para a marca) e descartadas
+        refazer: Empresas exportadas inteiras, ignorando a marca
+
+    Returns:
+        tuple: (linhas exportadas, novo estado da tabela, empresas exportadas)
+    """
+    modelo, coluna_data, incremento = TABELAS[nome]
+    colunas = colunas_exportadas(modelo)
+    tabela = modelo.__table__
+    indice_data = [coluna.name for coluna in colunas].index(coluna_data) if coluna_data else None
+    consulta = select(tabela.c.company_id, *colunas)
+    novo_estado = dict(estado)
+    agora = time.time()
+
+    if incremento == "id":
+        ultimo_id = 0 if completa else estado.get("ultimo_id", 0)
+        lacunas = {} if completa else {int(i): desde for i, desde in estado.get("lacunas", {}).items()
+                                       if agora - desde <= ESPERA_LACUNA}
+        with bind.connect() as conn:
+            # A tabela pode encolher (empresa que saiu do shard): a marca não volta
+            limite = max(ultimo_id, conn.execute(select(tabela.c.id).order_by(tabela.c.id.desc()).limit(1)).scalar() or 0)
+        condicao = tabela.c.id.between(ultimo_id + 1, limite)
+        if lacunas:
+            condicao = or_(condicao, tabela.c.id.in_(list(lacunas)))
+        if refazer:
+            condicao = or_(condicao, and_(tabela.c.company_id.in_(list(refazer)), tabela.c.id <= limite))
+        consulta = consulta.where(condicao)
+    elif incremento == "alteracao":
+        marca = None if completa else estado.get("marca")
+        if marca:
+            condicao = tabela.c[coluna_data] >= datetime.fromisoformat(marca) - timedelta(seconds=MARGEM_S)
+            if refazer:
+                condicao = or_(condicao, tabela.c.company_id.in_(list(refazer)))
+            consulta = consulta.where(condicao)
+    # Uma partição de cada vez (empresa, mês): a ordenação é feita pelo banco
+    ordem = [tabela.c.company_id] + ([tabela.c[coluna_data]] if coluna_data else []) + [tabela.c.id]
+    consulta = consulta.order_by(*ordem)
+
+    escritor = _EscritorParticionado(os.path.join(pasta, nome), esquema(modelo), formato, prefixo)
+    maior_data = None
+    empresa, exportar_empresa, empresas = object(), True, set()
+    if incremento == "id":
+        # Um bit por id da faixa (as linhas não vêm em ordem de id): 12,5 MB por 100 milhões
+        vistos = bytearray((limite - ultimo_id + 7) // 8)
+    with bind.connect() as conn:
+        resultado = conn.execution_options(stream_results=True, yield_per=TAMANHO_LOTE).execute(consulta)
+        for lote in resultado.partitions(TAMANHO_LOTE):
+            for linha in lote:
+                valores = tuple(linha[1:])
+                data = valores[indice_data] if indice_data is not None else None
+                if incremento == "id":
+                    # Linhas de `refazer` abaixo da marca não estão no mapa de bits
+                    if lacunas.pop(valores[0], None) is None and valores[0] > ultimo_id:
+                        deslocamento = valores[0] - ultimo_id - 1
+                        vistos[deslocamento >> 3] |= 1 << (deslocamento & 7)
+                elif data is not None and (maior_data is None or data > maior_data):
+                    maior_data = data
+                if linha[0] != empresa:   # as linhas vêm agrupadas por empresa
+                    empresa = linha[0]
+                    exportar_empresa = pertence is None or pertence(empresa)
+                    if exportar_empresa:
+                        empresas.add(empresa)
+                if exportar_empresa:
+                    escritor.acrescentar((empresa, _mes(data) if coluna_data else None), valores)
+    escritor.fechar()
+
+    if incremento == "id":
+        # Ids da faixa que não vieram ainda podem ser confirmados (ou foram desfeitos)
+        for faltante in _ids_nao_vistos(vistos, ultimo_id + 1, limite):
+            if len(lacunas) >= MAXIMO_LACUNAS:
+                break
+            lacunas[faltante] = agora
+        novo_estado.update(ultimo_id=limite, lacunas={str(i): desde for i, desde in lacunas.items()})
+    elif incremento == "alteracao" and maior_data is not None:
+        anterior_marca = estado.get("marca")
+        if not anterior_marca or completa or maior_data > datetime.fromisoformat(anterior_marca):
+            novo_estado["marca"] = maior_data.isoformat()
+    novo_estado["exportado_em"] = datetime.utcnow().isoformat()
+    return escritor.linhas, novo_estado, empresas
+
+# ============================================================================
+# EXPORTAÇÃO (ARQUIVOS TEMPORÁRIOS -> DESTINO -> MARCA D'ÁGUA)
+# ============================================================================
+
+def ler_estado(destino):
+    caminho = os.path.join(destino, ARQUIVO_ESTADO)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+
+def _gravar_estado(destino, estado):
+    caminho = os.path.join(destino, ARQUIVO_ESTADO)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(estado, arquivo, ensure_ascii=False, indent=2)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _publicar(pasta_temporaria, destino, nome, substituir, refazer=()):
+    """
+    Move os arquivos gerados para o destino (renomeações no mesmo disco).
+
+    As pastas das empresas em `refazer` são apagadas antes: os arquivos
+    novos trazem a empresa inteira.
+    """
+    origem = os.path.join(pasta_temporaria, nome)
+    final = os.path.join(destino, nome)
+    if substituir:
+        antiga = final + ".antiga"
+        if os.path.exists(final):
+            os.replace(final, antiga)
+        if os.path.isdir(origem):
+            os.replace(origem, final)
+        shutil.rmtree(antiga, ignore_errors=True)
+        return
+    for company_id in refazer:
+        shutil.rmtree(os.path.join(final, _caminho_particao(company_id, None)), ignore_errors=True)
+    for raiz, _, arquivos in os.walk(origem):
+        relativo = os.path.relpath(raiz, origem)
+        os.makedirs(os.path.join(final, relativo), exist_ok=True)
+        for arquivo in arquivos:
+            os.replace(os.path.join(raiz, arquivo), os.path.join(final, relativo, arquivo))
+
+
+def exportar(destino, tabelas=None, formato="parquet", completa=False, shards=None, saida=sys.stderr):
+    """
+    Exporta as tabelas para `destino` (incremental, a não ser com completa=True).
+
+    Args:
+        tabelas: Nomes em TABELAS (padrão: todas)
+        formato: "parquet" ou "arrow"
+        completa: Ignora as marcas d'água e exporta tudo de novo
+        shards: Shards lidos (padrão: todos os configurados)
+
+    Returns:
+        dict: Linhas exportadas por tabela
+    """
+    from shards import engine_do_shard, nomes_dos_shards, posicoes_das_empresas, shard_dono, sharding_ativo
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato desconhecido: {formato} (use {', '.join(FORMATOS)})")
+    tabelas = tabelas or list(TABELAS)
+    for nome in tabelas:
+        if nome not in TABELAS:
+            raise ValueError(f"Tabela desconhecida: {nome} (use {', '.join(TABELAS)})")
+
+    os.makedirs(destino, exist_ok=True)
+    estado = ler_estado(destino)
+    carimbo = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    totais = {}
+    shards = shards or nomes_dos_shards()
+    posicoes = posicoes_das_empresas()
+    for shard in shards:
+        bind = engine_do_shard(shard)
+        pertence = (lambda company_id: shard_dono(posicoes, company_id) == shard) if sharding_ativo() else None
+        for nome in tabelas:
+            incremento = TABELAS[nome][2]
+            chave = f"{shard}/{nome}"
+            # Empresa -> [shard, carimbo do catálogo] de onde vieram os arquivos
+            # dela (funcionários não precisam: a pasta é sempre refeita)
+            origens = estado.setdefault("empresas", {}).setdefault(nome, {}) if incremento != "completa" else None
+            refazer = set()
+            if origens is not None and not completa:
+                refazer = {company_id for company_id, (dono, situacao, carimbo_catalogo) in posicoes.items()
+                           if dono == shard and situacao == "ativa" and company_id in origens
+                           and origens[company_id] != [dono, carimbo_catalogo]}
+            pasta_temporaria = os.path.join(destino, f".tmp-{carimbo}-{shard}")
+            inicio = time.perf_counter()
+            try:
+                linhas, estado[chave], empresas = _exportar_tabela(
+                    bind, nome, estado.get(chave, {}), pasta_temporaria, formato, f"{shard}-{carimbo}", completa,
+                    pertence, refazer)
+                # Funcionários (sem marca) e exportações completas substituem a
+                # pasta da tabela (uma vez: os shards seguintes acrescentam)
+                substituir = (incremento == "completa" or completa) and shard == shards[0]
+                _publicar(pasta_temporaria, destino, nome, substituir, refazer)
+            finally:
+                shutil.rmtree(pasta_temporaria, ignore_errors=True)
+            for company_id in (empresas | refazer) if origens is not None else ():
+                if company_id is not None:
+                    origens[str(company_id)] = [shard, posicoes.get(str(company_id), (None, None, None))[2]]
+            if refazer:
+                print(f"[EXPORTAÇÃO] {shard}/{nome}: empresa(s) {', '.join(sorted(refazer))} mudaram de shard; "
+                      f"partições refeitas", file=saida)
+            _gravar_estado(destino, estado)
+            totais[nome] = totais.get(nome, 0) + linhas
+            print(f"[EXPORTAÇÃO] {shard}/{nome}: {linhas} linha(s) em {time.perf_counter() - inicio:.1f} s",
+                  file=saida)
+    return totais
+
+# ============================================================================
+# INTERFACE DE LINHA DE COMANDO
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Exportação analítica em Parquet/Arrow por empresa e mês")
+    acoes = parser.add_subparsers(dest="acao", required=True)
+    p = acoes.add_parser("exportar", help="Exporta o que mudou desde a última exportação")
+    p.add_argument("--tabelas", default=",".join(TABELAS), help="Tabelas separadas por vírgula")
+    p.add_argument("--formato", choices=list(FORMATOS), default="parquet")
+    p.add_argument("--completa", action="store_true", help="Ignora as marcas d'água e exporta tudo")
+    p.add_argument("--shard", action="append", help="Exporta só este shard (pode repetir)")
+    s = acoes.add_parser("status", help="Marcas d'água da pasta de destino")
+    for sub in (p, s):
+        sub.add_argument("--destino", default="analitico", help="Pasta de destino")
+    args = parser.parse_args(argv)
+
+    if args.acao == "status":
+        print(json.dumps(ler_estado(args.destino), ensure_ascii=False, indent=2))
+        return 0
+    from database import init_db
+    init_db()
+    totais = exportar(args.destino, args.tabelas.split(","), args.formato, args.completa, args.shard)
+    print(", ".join(f"{nome}: {linhas} linha(s)" for nome, linhas in totais.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+# ============================================================================
+# FIM DO MÓDULO EXPORTACAO_ANALITICA
+# ============================================================================
@@ -0,0 +1,440 @@
+# ============================================================================
+# ARQUIVO: gerador_dados.py
+# GERADOR DE DADOS SINTÉTICOS PARA TESTES DE CARGA (CARGA EM LOTE)
+# ============================================================================
+#
+# DESCRIÇÃO:
+# Popula o banco (DATABASE_URL) com volume realista sem passar pelos
+# input() do console:
+#
+#   empresas             segmentos sorteados
+#   usuarios             1 admin + vendedores por empresa; senha com hash
+#                        bcrypt calculado UMA vez e reutilizado
+#   usuario_permissoes   vendedores com estoque_entrada e estoque_saida
+#   produtos             categorias e fornecedores com distribuição
+#                        assimétrica (Zipf: poucos concentram muitos itens)
+#   movimentacoes        histórico de entradas e saídas; os produtos mais
+#                        populares concentram as vendas
+#   funcionarios         por empresa, com cargos e datas de admissão; com
+#                        --arquivo-funcionarios, também um CSV para
+#                        "quatro_cantos rh folha --arquivo"
+#
+# DESEMPENHO:
+# - Cada empresa tem seu próprio gerador aleatório (semente, empresa): o
+#   resultado é o mesmo com 1 ou N processos e em qualquer ordem.
+# - Os ids de empresas, usuários e produtos são calculados (faixa fixa por
+#   empresa), então as empresas são carregadas em paralelo (--processos)
+#   sem consultar o banco.
+# - PostgreSQL: COPY FROM STDIN (psycopg2). SQLite: executemany direto no
+#   driver, synchronous=OFF na conexão de carga e índice de busca (FTS5)
+#   reconstruído uma vez no final em vez de um trigger por linha.
+# - Dados acrescentados após os já existentes (ids continuam do maior).
+#
+# DEPENDÊNCIA OPCIONAL:
+#   pip install numpy
+#
+# USO:
+#   python gerador_dados.py --empresas 100 --produtos 10000 --movimentacoes 20 --processos 8
+#   python gerador_dados.py --empresas 10 --produtos 1000 --funcionarios 5000 --arquivo-funcionarios funcionarios.csv
+# ============================================================================
+
+import argparse
+import csv
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import create_engine, func, select, text
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+SENHA_PADRAO = "carga123"
+DOMINIO_EMAIL = "gerado.local"
+TAMANHO_LOTE = 50000          # linhas por executemany / COPY
+DIAS_HISTORICO = 180          # movimentações espalhadas nos últimos N dias
+ANOS_ADMISSAO = 15            # admissões espalhadas nos últimos N anos
+
+SEGMENTOS = ["Indústria", "Comércio", "Serviços", "Logística", "Outro"]
+TIPOS_MATERIAL = ["Matéria-Prima", "Semi-Acabado", "Acabado", "MRO"]
+PESOS_TIPOS = [0.35, 0.2, 0.35, 0.1]
+UNIDADES = ["UN", "KG", "M", "L", "PC", "CX", "SC"]
+PESOS_UNIDADES = [0.5, 0.15, 0.1, 0.05, 0.1, 0.07, 0.03]
+CATEGORIAS = [
+    "Parafuso", "Porca", "Arruela", "Rolamento", "Correia", "Engrenagem", "Mola", "Chapa",
+    "Tubo", "Perfil", "Cabo", "Conector", "Sensor", "Motor", "Válvula", "Mangueira",
+    "Filtro", "Junta", "Retentor", "Bucha", "Eixo", "Polia", "Abraçadeira", "Rebite",
+    "Tinta", "Solvente", "Adesivo", "Lubrificante", "Embalagem", "Etiqueta", "Caixa", "Pallet",
+]
+VARIANTES = ["Inox", "Zincado", "Reforçado", "Leve", "Industrial", "Premium", "Standard", "Compacto",
+             "Galvanizado", "Nylon", "Aço", "Alumínio", "Latão", "PVC", "Borracha", "Cerâmico"]
+FORNECEDORES_POR_EMPRESA = 200
+ASSIMETRIA = 1.1              # expoente Zipf de categorias, fornecedores e popularidade
+CARGOS = ["Operário", "Supervisor", "Gerente", "Diretor"]
+PESOS_CARGOS = [0.7, 0.2, 0.08, 0.02]
+PERMISSOES_VENDEDOR = ["estoque_entrada", "estoque_saida"]
+
+
+def _pesos_zipf(n, expoente=ASSIMETRIA):
+    pesos = 1.0 / np.arange(1, n + 1) ** expoente
+    return pesos / pesos.sum()
+
+# ============================================================================
+# PLANO DE CARGA (IDS CALCULADOS POR EMPRESA)
+# ============================================================================
+
+def montar_plano(engine, empresas, produtos_por_empresa, usuarios_por_empresa, movimentacoes_por_produto, semente,
+                 senha=SENHA_PADRAO, data_referencia=None, funcionarios_por_empresa=0):
+    """
+    Parâmetros compartilhados por todos os processos de carga.
+
+    Os ids começam depois dos já existentes; a empresa de índice i (0..n-1)
+    usa as faixas [base + i*tamanho + 1, base + (i+1)*tamanho]. O histórico
+    termina em data_referencia (padrão: agora).
+    """
+    from auth_utils import hash_password
+    from database import Produto
+    from models import Empresa, Permissao, Usuario
+
+    with engine.connect() as conn:
+        bases = {
+            nome: conn.execute(select(func.coalesce(func.max(modelo.id), 0))).scalar()
+            for nome, modelo in (("empresa", Empresa), ("usuario", Usuario), ("produto", Produto))
+        }
+        permissoes = [linha[0] for linha in conn.execute(
+            select(Permissao.id).where(Permissao.codigo.in_(PERMISSOES_VENDEDOR)).order_by(Permissao.id))]
+
+    return {
+        "url": engine.url.render_as_string(hide_password=False),
+        "empresas": empresas,
+        "produtos_por_empresa": produtos_por_empresa,
+        "usuarios_por_empresa": max(1, usuarios_por_empresa),
+        "movimentacoes_por_produto": movimentacoes_por_produto,
+        "funcionarios_por_empresa": funcionarios_por_empresa,
+        "semente": semente,
+        "senha_hash": hash_password(senha),  # bcrypt uma única vez
+        "bases": bases,
+        "permissoes": permissoes,
+        "agora": (datetime.fromisoformat(str(data_referencia)) if data_referencia
+                  else datetime.now()).replace(microsecond=0).isoformat(sep=" "),
+    }
+
+
+def email_usuario(usuario_id):
+    """Email dos usuários gerados (o id garante que é único)."""
+    return f"usuario{usuario_id}@{DOMINIO_EMAIL}"
+
+# ============================================================================
+# GERAÇÃO DE UMA EMPRESA (VETORIZADA)
+# ============================================================================
+
+def gerar_empresa(plano, indice):
+    """
+    Linhas de todas as tabelas de uma empresa.
+
+    Returns:
+        dict: tabela -> (colunas, lista de tuplas)
+    """
+    from database import normalizar_nome
+
+    rng = np.random.default_rng([plano["semente"], indice])
+    empresa_id = plano["bases"]["empresa"] + indice + 1
+    company_id = str(empresa_id)
+    n_usuarios = plano["usuarios_por_empresa"]
+    n_produtos = plano["produtos_por_empresa"]
+    primeiro_usuario = plano["bases"]["usuario"] + indice * n_usuarios + 1
+    primeiro_produto = plano["bases"]["produto"] + indice * n_produtos + 1
+    agora = plano["agora"]
+    # Marca d'água de sync_pdv e da exportação: momento real da carga (UTC),
+    # não a data de referência do histórico
+    alterado = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+
+    tabelas = {
+        "empresas": (
+            ("id", "nome", "cnpj", "segmento", "ativa", "data_cadastro", "data_atualizacao"),
+            [(empresa_id, f"Empresa Gerada {empresa_id}", f"{empresa_id:014d}",
+              SEGMENTOS[rng.integers(len(SEGMENTOS))], True, agora, agora)],
+        )
+    }
+
+    ids_usuarios = range(primeiro_usuario, primeiro_usuario + n_usuarios)
+    tabelas["usuarios"] = (
+        ("id", "empresa_id", "nome", "email", "senha_hash", "ativo", "is_admin", "data_cadastro", "data_atualizacao"),
+        [(u, empresa_id, f"{'Admin' if u == primeiro_usuario else 'Vendedor'} {u}", email_usuario(u),
+          plano["senha_hash"], True, u == primeiro_usuario, agora, agora) for u in ids_usuarios],
+    )
+    tabelas["usuario_permissoes"] = (
+        ("usuario_id", "permissao_id"),
+        [(u, p) for u in ids_usuarios[1:] for p in plano["permissoes"]],
+    )
+
+    # Produtos: categoria e fornecedor com distribuição Zipf
+    ids = np.arange(primeiro_produto, primeiro_produto + n_produtos)
+    categorias = rng.choice(len(CATEGORIAS), size=n_produtos, p=_pesos_zipf(len(CATEGORIAS)))
+    variantes = rng.integers(len(VARIANTES), size=n_produtos)
+    fornecedores = rng.choice(FORNECEDORES_POR_EMPRESA, size=n_produtos, p=_pesos_zipf(FORNECEDORES_POR_EMPRESA)) + 1
+    tipos = rng.choice(len(TIPOS_MATERIAL), size=n_produtos, p=PESOS_TIPOS)
+    unidades = rng.choice(len(UNIDADES), size=n_produtos, p=PESOS_UNIDADES)
+    quantidades = np.where(rng.random(n_produtos) < 0.05, 0, np.rint(rng.lognormal(5, 1.2, n_produtos))).astype(np.int64)
+    valores = np.round(rng.lognormal(3, 1.0, n_produtos), 2)
+    corredores = rng.integers(1, 41, size=n_produtos)
+    prateleiras = rng.integers(1, 11, size=n_produtos)
+
+    linhas = []
+    for k, (categoria, variante, fornecedor, tipo, unidade, quantidade, valor, corredor, prateleira) in enumerate(zip(
+            categorias.tolist(), variantes.tolist(), fornecedores.tolist(), tipos.tolist(), unidades.tolist(),
+            quantidades.tolist(), valores.tolist(), corredores.tolist(), prateleiras.tolist())):
+        codigo = k + 1
+        nome = f"{CATEGORIAS[categoria]} {VARIANTES[variante]} {codigo}"
+        linhas.append((
+            primeiro_produto + k, company_id, codigo, nome, TIPOS_MATERIAL[tipo], CATEGORIAS[categoria],
+            UNIDADES[unidade], quantidade, f"Fornecedor {fornecedor:03d}", f"C{corredor:02d}-P{prateleira:02d}",
+            valor, normalizar_nome(nome), alterado,
+        ))
+    tabelas["produtos"] = (
+        ("id", "company_id", "codigo", "nome", "tipo_material", "categoria", "unidade_medida", "quantidade",
+         "fornecedor", "local_armazem", "valor_unitario", "nome_normalizado", "atualizado_em"),
+        linhas,
+    )
+
+    # Histórico: produtos populares (Zipf sobre uma permutação) vendem mais
+    n_mov = int(round(n_produtos * plano["movimentacoes_por_produto"]))
+    if n_mov and n_produtos:
+        popularidade = rng.permutation(n_produtos)[
+            rng.choice(n_produtos, size=n_mov, p=_pesos_zipf(n_produtos))]
+        saida = rng.random(n_mov) < 0.8
+        quantidade_mov = rng.geometric(0.3, size=n_mov)
+        quantidade_mov[~saida] *= 20  # reposições em lotes maiores
+        fim = np.datetime64(agora.replace(" ", "T"), "s")
+        instantes = fim - rng.integers(0, DIAS_HISTORICO * 86400, size=n_mov).astype("timedelta64[s]")
+        instantes = np.sort(instantes)
+        datas = np.char.replace(np.datetime_as_string(instantes, unit="s"), "T", " ").tolist()
+        tabelas["movimentacoes_estoque"] = (
+            ("company_id", "produto_id", "tipo", "quantidade", "valor_unitario", "data_hora"),
+            list(zip([company_id] * n_mov, (ids[popularidade]).tolist(),
+                     np.where(saida, "saida", "entrada").tolist(), quantidade_mov.tolist(),
+                     valores[popularidade].tolist(), datas)),
+        )
+
+    # Funcionários: cargos com PESOS_CARGOS; id gerado pelo banco
+    n_funcionarios = plano["funcionarios_por_empresa"]
+    if n_funcionarios:
+        cargos = rng.choice(len(CARGOS), size=n_funcionarios, p=PESOS_CARGOS).tolist()
+        hoje = np.datetime64(agora[:10], "D")
+        admissoes = np.datetime_as_string(
+            hoje - rng.integers(0, ANOS_ADMISSAO * 365, size=n_funcionarios).astype("timedelta64[D]")).tolist()
+        tabelas["funcionarios"] = (
+            ("company_id", "nome", "cargo", "admissao"),
+            [(company_id, f"Funcionário {i + 1}", CARGOS[c], a) for i, (c, a) in enumerate(zip(cargos, admissoes))],
+        )
+    return tabelas
+
+# ============================================================================
+# CARGA EM LOTE (COPY / EXECUTEMANY)
+# ============================================================================
+
+def _copiar_postgresql(conexao_driver, tabela, colunas, linhas):
+    """COPY FROM STDIN em CSV (psycopg2). Retorna False se o driver não suporta."""
+    cursor = conexao_driver.cursor()
+    if not hasattr(cursor, "copy_expert"):
+        return False
+    for inicio in range(0, len(linhas), TAMANHO_LOTE):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(linhas[inicio:inicio + TAMANHO_LOTE])
+        buffer.seek(0)
+        cursor.copy_expert(f"COPY {tabela} ({', '.join(colunas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return True
+
+
+def carregar_tabela(conn, tabela, colunas, linhas):
+    """Insere as linhas com o caminho mais rápido do banco conectado."""
+    if not linhas:
+        return
+    if conn.dialect.name == "postgresql" and _copiar_postgresql(conn.connection.dbapi_connection, tabela, colunas, linhas):
+        return
+    if conn.dialect.name == "sqlite":
+        comando = f"INSERT INTO {tabela} ({', '.join(colunas)}) VALUES ({', '.join('?' * len(colunas))})"
+        for inicio in range(0, len(linhas), TAMANHO_LOTE):
+            conn.exec_driver_sql(comando, linhas[inicio:inicio + TAMANHO_LOTE])
+        return
+    # Outros bancos: INSERT em lote pelo Core (tipos convertidos pelo SQLAlchemy)
+    from database import Base
+    tabela_core = Base.metadata.tables[tabela]
+    datas = {c for c in colunas if c in ("data_hora", "data_cadastro", "data_atualizacao", "atualizado_em")}
+    registros = [
+        {c: (datetime.fromisoformat(v) if c in datas and isinstance(v, str) else v) for c, v in zip(colunas, linha)}
+        for linha in linhas
+    ]
+    for inicio in range(0, len(registros), TAMANHO_LOTE):
+        conn.execute(tabela_core.insert(), registros[inicio:inicio + TAMANHO_LOTE])
+
+
+ORDEM_TABELAS = ["empresas", "usuarios", "usuario_permissoes", "produtos", "movimentacoes_estoque", "funcionarios"]
+
+_engines = {}
+
+
+def _engine_do_processo(url):
+    """Uma engine por processo de carga (não reaproveita conexões do processo pai)."""
+    if url not in _engines:
+        argumentos = {"connect_args": {"timeout": 3600}} if url.startswith("sqlite") else {}
+        _engines[url] = create_engine(url, **argumentos)
+    return _engines[url]
+
+
+def carregar_empresas(plano, indices):
+    """
+    Gera e grava as empresas indicadas, uma transação por empresa.
+
+    Returns:
+        dict: Linhas gravadas por tabela
+    """
+    engine = _engine_do_processo(plano["url"])
+    contagem = dict.fromkeys(ORDEM_TABELAS, 0)
+    for indice in indices:
+        tabelas = gerar_empresa(plano, indice)
+        with engine.begin() as conn:
+            if conn.dialect.name == "sqlite":
+                conn.exec_driver_sql("PRAGMA synchronous = OFF")
+            for tabela in ORDEM_TABELAS:
+                if tabela in tabelas:
+                    colunas, linhas = tabelas[tabela]
+                    carregar_tabela(conn, tabela, colunas, linhas)
+                    contagem[tabela] += len(linhas)
+    return contagem
+
+# ============================================================================
+# PREPARAÇÃO E FINALIZAÇÃO DO BANCO
+# ============================================================================
+
+def _pausar_indice_busca(engine):
+    """SQLite: sem trigger de busca durante a carga (reconstruído no final)."""
+    from busca_produtos import tipo_de_busca
+    if tipo_de_busca(engine) != "fts5":
+        return False
+    with engine.begin() as conn:
+        conn.execute(text("DROP TRIGGER IF EXISTS trg_produtos_busca_insert"))
+    return True
+
+
+def _finalizar(engine, reconstruir_busca):
+    from busca_produtos import instalar_busca_sqlite
+
+    if reconstruir_busca:
+        instalar_busca_sqlite(engine, TAMANHO_LOTE)  # recria o trigger e indexa os produtos novos
+    with engine.begin() as conn:
+        if engine.dialect.name == "postgresql":
+            # Ids gravados explicitamente: avança as sequências
+            for tabela in ("empresas", "usuarios", "produtos"):
+                conn.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{tabela}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {tabela}))"
+                ))
+        conn.execute(text("ANALYZE"))
+
+
+def gerar_dados(empresas, produtos_por_empresa, usuarios_por_empresa=5, movimentacoes_por_produto=10,
+                semente=42, processos=1, senha=SENHA_PADRAO, data_referencia=None, engine=None,
+                funcionarios_por_empresa=0):
+    """
+    Gera e carrega os dados no banco (veja o cabeçalho do módulo).
+
+    Returns:
+        dict: Linhas gravadas por tabela, tempo total e ids da primeira e
+              última empresa geradas
+    """
+    if engine is None:
+        from database import engine
+    from database import init_db
+
+    init_db()
+    inicio = time.perf_counter()
+    plano = montar_plano(engine, empresas, produtos_por_empresa, usuarios_por_empresa,
+                         movimentacoes_por_produto, semente, senha, data_referencia, funcionarios_por_empresa)
+    reconstruir_busca = _pausar_indice_busca(engine)
+
+    contagem = dict.fromkeys(ORDEM_TABELAS, 0)
+    try:
+        if processos <= 1:
+            parciais = [carregar_empresas(plano, range(empresas))]
+        else:
+            grupos = [range(i, empresas, processos) for i in range(processos)]
+            with ProcessPoolExecutor(max_workers=processos) as executor:
+                parciais = list(executor.map(carregar_empresas, [plano] * processos, grupos))
+    finally:
+        _finalizar(engine, reconstruir_busca)
+    for parcial in parciais:
+        for tabela, quantidade in parcial.items():
+            contagem[tabela] += quantidade
+
+    primeira = plano["bases"]["empresa"] + 1
+    return {
+        "linhas": contagem,
+        "total_linhas": sum(contagem.values()),
+        "segundos": round(time.perf_counter() - inicio, 2),
+        "empresas": [primeira, primeira + empresas - 1] if empresas else [],
+    }
+
+
+def gerar_funcionarios(quantidade, semente=42):
+    """Lista de dicts (nome, cargo, horas_extras) com a distribuição de PESOS_CARGOS (entrada da folha)."""
+    rng = np.random.default_rng([semente, 1 << 30])
+    cargos = rng.choice(len(CARGOS), size=quantidade, p=PESOS_CARGOS).tolist()
+    horas = rng.choice([0, 0, 0, 5, 10, 20, 40], size=quantidade).tolist()
+    return [
+        {"nome": f"Funcionário {i + 1}", "cargo": CARGOS[c], "horas_extras": h}
+        for i, (c, h) in enumerate(zip(cargos, horas))
+    ]
+
+
+def gravar_funcionarios_csv(caminho, funcionarios):
+    with open(caminho, "w", newline="", encoding="utf-8") as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=["nome", "cargo", "horas_extras"])
+        escritor.writeheader()
+        escritor.writerows(funcionarios)
+
+# ============================================================================
+# PONTO DE ENTRADA
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera dados sintéticos em massa no banco (DATABASE_URL)")
+    parser.add_argument("--empresas", type=int, default=10)
+    parser.add_argument("--produtos", type=int, default=10000, help="Produtos por empresa")
+    parser.add_argument("--usuarios", type=int, default=5, help="Usuários por empresa (o primeiro é admin)")
+    parser.add_argument("--movimentacoes", type=float, default=10, help="Movimentações por produto (média)")
+    parser.add_argument("--funcionarios", type=int, default=0, help="Funcionários por empresa")
+    parser.add_argument("--arquivo-funcionarios",
+                        help="Grava também um CSV com --funcionarios linhas para \"rh folha --arquivo\"")
+    parser.add_argument("--semente", type=int, default=42)
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 1,
+                        help="Processos de carga, cada um com um grupo de empresas")
+    parser.add_argument("--senha", default=SENHA_PADRAO, help="Senha de todos os usuários gerados")
+    parser.add_argument("--data-referencia", help="Fim do histórico (AAAA-MM-DD; padrão: agora)")
+    args = parser.parse_args(argv)
+
+    resultado = gerar_dados(args.empresas, args.produtos, args.usuarios, args.movimentacoes,
+                            args.semente, args.processos, args.senha, args.data_referencia,
+                            funcionarios_por_empresa=args.funcionarios)
+    for tabela, quantidade in resultado["linhas"].items():
+        print(f"{tabela:<22} {quantidade:>12,}".replace(",", "."))
+    taxa = resultado["total_linhas"] / resultado["segundos"] if resultado["segundos"] else 0
+    print(f"{'TOTAL':<22} {resultado['total_linhas']:>12,} em {resultado['segundos']} s "
+          f"({taxa:,.0f} linhas/s)".replace(",", "."))
+
+    if args.funcionarios and args.arquivo_funcionarios:
+        gravar_funcionarios_csv(args.arquivo_funcionarios, gerar_funcionarios(args.funcionarios, args.semente))
+        print(f"{args.funcionarios} funcionários gravados em {args.arquivo_funcionarios}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# ============================================================================
+# FIM DO ARQUIVO GERADOR_DADOS.PY
+# ============================================================================
@@ -7,7 +7,9 @@
 
 from datetime import datetime
 from auth_utils import hash_password, verify_password
+from database import le_da_replica
 from models import Empresa, Usuario, Permissao, criar_permissoes_padrao
+from serializacao import COLUNAS_EMPRESA, iterar_dicts, iterar_usuarios
 from sqlalchemy import func
 
 # ============================================================================
@@ -89,6 +91,7 @@ def cadastrar_empresa(db):
         print(f"\nErro ao cadastrar empresa: {e}")
         return None
 
+@le_da_replica
 def listar_empresas(db):
     """
     Lista todas as empresas cadastradas.
@@ -100,20 +103,38 @@ def listar_empresas(db):
     print("   EMPRESAS CADASTRADAS")
     print("="*70)
     
-    empresas = db.query(Empresa).order_by(Empresa.nome).all()
+    # Projeção de colunas (sem objetos ORM) e contagem de usuários em uma
+    # consulta agrupada, em vez de carregar emp.usuarios de cada empresa
+    empresas = list(iterar_dicts(db, COLUNAS_EMPRESA, ordem=Empresa.nome))
     
     if not empresas:
         print("\nNenhuma empresa cadastrada no sistema.")
         return
     
+    usuarios_por_empresa = dict(
+        db.query(Usuario.empresa_id, func.count(Usuario.id)).group_by(Usuario.empresa_id).all()
+    )
+    
+    # Com DATABASE_SHARDS, os produtos de cada empresa vêm do shard dela
+    # (todos os shards consultados em paralelo)
+    from shards import localizar_empresa, resumo_por_empresa, sharding_ativo
+    resumo = None
+    if sharding_ativo():
+        resumo, erros = resumo_por_empresa()
+        for shard, mensagem in erros.items():
+            print(f"\n[ALERTA] Shard '{shard}' indisponível: {mensagem}")
+    
     for emp in empresas:
-        status = "ATIVA" if emp.ativa else "INATIVA"
-        print(f"\nID: {emp.id}")
-        print(f"Nome: {emp.nome}")
-        print(f"CNPJ: {emp.cnpj}")
-        print(f"Segmento: {emp.segmento}")
+        status = "ATIVA" if emp["ativa"] else "INATIVA"
+        print(f"\nID: {emp['id']}")
+        print(f"Nome: {emp['nome']}")
+        print(f"CNPJ: {emp['cnpj']}")
+        print(f"Segmento: {emp['segmento']}")
         print(f"Status: {status}")
-        print(f"Usuários: {len(emp.usuarios)}")
+        print(f"Usuários: {usuarios_por_empresa.get(emp['id'], 0)}")
+        if resumo is not None:
+            dados = resumo.get(str(emp["id"])) or {"shard": localizar_empresa(emp["id"])[0], "produtos": 0, "valor_estoque": 0.0}
+            print(f"Shard: {dados['shard']} | Produtos: {dados['produtos']} | Estoque: R$ {dados['valor_estoque']:,.2f}")
         print("-" * 70)
 
 # ============================================================================
@@ -226,6 +247,7 @@ def cadastrar_usuario(db):
         print(f"\nErro ao cadastrar usuário: {e}")
         return None
 
+@le_da_replica
 def listar_usuarios(db):
     """
     Lista todos os usuários do sistema.
@@ -237,38 +259,42 @@ def listar_usuarios(db):
     print("   USUÁRIOS CADASTRADOS")
     print("="*70)
     
-    usuarios = db.query(Usuario).order_by(Usuario.empresa_id, Usuario.nome).all()
-    
-    if not usuarios:
-        print("\nNenhum usuário cadastrado no sistema.")
-        return
+    # Projeção de colunas em lotes, com as permissões de cada lote em uma
+    # consulta só (sem objetos ORM nem uma consulta por usuário)
+    nomes_empresas = dict(db.query(Empresa.id, Empresa.nome).all())
+    usuarios = iterar_usuarios(db, include_permissions=True, ordem=[Usuario.empresa_id, Usuario.nome])
     
     empresa_atual = None
+    nenhum = True
     for user in usuarios:
-        if empresa_atual != user.empresa_id:
-            empresa_atual = user.empresa_id
+        nenhum = False
+        if empresa_atual != user["empresa_id"]:
+            empresa_atual = user["empresa_id"]
             print(f"\n{'='*70}")
-            print(f"EMPRESA: {user.empresa.nome}")
+            print(f"EMPRESA: {nomes_empresas.get(empresa_atual)}")
             print(f"{'='*70}")
         
-        status = "ATIVO" if user.ativo else "INATIVO"
-        tipo = "ADMIN" if user.is_admin else "USUÁRIO"
+        status = "ATIVO" if user["ativo"] else "INATIVO"
+        tipo = "ADMIN" if user["is_admin"] else "USUÁRIO"
         
-        print(f"\nID: {user.id} | {tipo}")
-        print(f"Nome: {user.nome}")
-        print(f"Email: {user.email}")
+        print(f"\nID: {user['id']} | {tipo}")
+        print(f"Nome: {user['nome']}")
+        print(f"Email: {user['email']}")
         print(f"Status: {status}")
         
-        if not user.is_admin and user.permissoes:
-            perms = [p.nome for p in user.permissoes if p.ativa]
+        if not user["is_admin"] and user["permissoes"]:
+            perms = [p["nome"] for p in user["permissoes"] if p["ativa"]]
             if perms:
                 print(f"Permissões: {', '.join(perms)}")
-        elif not user.is_admin:
+        elif not user["is_admin"]:
             print("Permissões: Nenhuma configurada")
         else:
             print("Permissões: TODAS (Administrador)")
         
         print("-" * 70)
+    
+    if nenhum:
+        print("\nNenhum usuário cadastrado no sistema.")
 
 # ============================================================================
 # FUNÇÕES DE GERENCIAMENTO DE PERMISSÕES
@@ -313,7 +339,7 @@ def configurar_permissoes_usuario(db, usuario_id=None):
     
     if not permissoes:
         print("\nCriando permissões padrão do sistema...")
-        criar_permissoes_padrao(db)
+        criar_permissoes_padrao(db, forcar=True)
         permissoes = db.query(Permissao).filter(Permissao.ativa == True).all()
     
     print("\n" + "="*70)
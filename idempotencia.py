@@ -0,0 +1,203 @@
+# ============================================================================
+# MÓDULO IDEMPOTENCIA - ENTRADAS E VENDAS REPETIDAS PELO CLIENTE
+# ============================================================================
+# Um cliente que não recebeu a resposta (timeout, queda de rede) repete a
+# requisição, e sem proteção a entrada ou a venda é aplicada duas vezes.
+# Com uma chave de idempotência (cabeçalho Idempotency-Key na API, campo
+# chave_idempotencia na linha de comando), a repetição devolve o resultado
+# original, guardado em chaves_idempotencia, sem alterar o estoque.
+#
+# - A verificação e a gravação ficam na MESMA transação da operação: o
+#   estoque e a chave são confirmados juntos (ou nenhum dos dois).
+# - Duas requisições simultâneas com a mesma chave: o índice único
+#   (company_id, operacao, chave) deixa só uma gravar; a outra é desfeita
+#   inteira e devolve o resultado da primeira.
+# - A mesma chave com parâmetros diferentes é recusada
+#   (ChaveIdempotenciaReutilizada): é erro do cliente, não repetição.
+# - Sem chave, nada muda: nenhuma consulta a mais no caminho da venda.
+#   Com chave, uma consulta pelo índice único e um INSERT na transação.
+# - As chaves valem IDEMPOTENCIA_TTL_HORAS (padrão 24). As expiradas são
+#   apagadas em lotes a cada IDEMPOTENCIA_LIMPEZA_A_CADA chaves gravadas
+#   pelo processo, ou pela linha de comando (ex: cron):
+#
+#   python idempotencia.py limpar [--lote 1000]
+# ============================================================================
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+
+from database import ChaveIdempotencia, Produto
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+TTL_HORAS = float(os.getenv("IDEMPOTENCIA_TTL_HORAS", "24"))
+LIMPEZA_A_CADA = int(os.getenv("IDEMPOTENCIA_LIMPEZA_A_CADA", "1000"))   # 0 = só pela linha de comando
+TAMANHO_LOTE_LIMPEZA = 1000
+TAMANHO_MAXIMO_CHAVE = 200
+
+_gravadas = [0]   # chaves gravadas por este processo desde a última limpeza
+
+
+class ChaveIdempotenciaReutilizada(ValueError):
+    """A chave já foi usada com outros parâmetros."""
+
+# ============================================================================
+# RESULTADOS GUARDADOS
+# ============================================================================
+
+def impressao_parametros(parametros):
+    """SHA-256 dos parâmetros da operação (ordem das chaves não importa)."""
+    texto = json.dumps(parametros, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+
+def produto_para_json(produto):
+    """Colunas do produto no momento da operação (para guardar no resultado)."""
+    if produto is None:
+        return None
+    return {atributo.key: getattr(produto, atributo.key) for atributo in Produto.__mapper__.column_attrs}
+
+
+def produto_de_json(dados):
+    """Produto fora da sessão com os valores guardados (to_dict() igual ao da resposta original)."""
+    return Produto(**dados) if dados is not None else None
+
+
+def _buscar(db_session, company_id, operacao, chave):
+    return db_session.execute(
+        select(ChaveIdempotencia.impressao, ChaveIdempotencia.resultado, ChaveIdempotencia.expira_em)
+        .where(ChaveIdempotencia.company_id == company_id, ChaveIdempotencia.operacao == operacao,
+               ChaveIdempotencia.chave == chave)
+    ).first()
+
+
+def _repetir(guardado, impressao, chave, desserializar):
+    if guardado.impressao != impressao:
+        raise ChaveIdempotenciaReutilizada(
+            f"Chave de idempotência '{chave}' já usada com outros parâmetros")
+    return desserializar(json.loads(guardado.resultado))
+
+# ============================================================================
+# EXECUÇÃO IDEMPOTENTE
+# ============================================================================
+
+def executar_idempotente(db_session, operacao, chave, company_id, parametros, aplicar, serializar, desserializar):
+    """
+    Aplica a operação uma única vez por chave e confirma a transação.
+
+    Args:
+        operacao: "entrada" ou "venda" (as chaves são separadas por operação)
+        chave: Chave enviada pelo cliente
+        company_id: Empresa (as chaves são separadas por empresa)
+        parametros: Parâmetros da operação (a impressão detecta chave reutilizada)
+        aplicar: Função sem argumentos que altera a sessão SEM commit e devolve o resultado
+        serializar: resultado -> dict/list (JSON) guardado com a chave
+        desserializar: JSON guardado -> resultado devolvido nas repetições
+
+    Returns:
+        tuple: (resultado, repetida) - repetida=True quando veio da chave guardada
+
+    Raises:
+        ValueError: Chave vazia ou longa demais
+        ChaveIdempotenciaReutilizada: Mesma chave com outros parâmetros
+    """
+    chave = str(chave).strip()
+    if not chave or len(chave) > TAMANHO_MAXIMO_CHAVE:
+        raise ValueError(f"Chave de idempotência deve ter de 1 a {TAMANHO_MAXIMO_CHAVE} caracteres")
+    company_id = "" if company_id is None else str(company_id)
+    impressao = impressao_parametros(parametros)
+    agora = datetime.utcnow()
+
+    guardado = _buscar(db_session, company_id, operacao, chave)
+    if guardado is not None:
+        if guardado.expira_em > agora:
+            return _repetir(guardado, impressao, chave, desserializar), True
+        # Expirada e ainda não limpa: vale como chave nova
+        db_session.execute(delete(ChaveIdempotencia).where(
+            ChaveIdempotencia.company_id == company_id, ChaveIdempotencia.operacao == operacao,
+            ChaveIdempotencia.chave == chave))
+
+    resultado = aplicar()
+    db_session.flush()   # id e versão finais no resultado guardado
+    db_session.add(ChaveIdempotencia(
+        company_id=company_id, operacao=operacao, chave=chave, impressao=impressao,
+        resultado=json.dumps(serializar(resultado), ensure_ascii=False, default=str),
+        criada_em=agora, expira_em=agora + timedelta(hours=TTL_HORAS)
+    ))
+    try:
+        db_session.commit()   # estoque, histórico e chave juntos
+    except IntegrityError:
+        # Outra requisição com a mesma chave confirmou primeiro: esta é
+        # desfeita inteira (o estoque não muda duas vezes)
+        db_session.rollback()
+        guardado = _buscar(db_session, company_id, operacao, chave)
+        if guardado is None:
+            raise
+        return _repetir(guardado, impressao, chave, desserializar), True
+
+    _gravadas[0] += 1
+    if LIMPEZA_A_CADA and _gravadas[0] >= LIMPEZA_A_CADA:
+        _gravadas[0] = 0
+        limpar_expiradas(db_session.get_bind(), um_lote=True)
+    return resultado, False
+
+# ============================================================================
+# LIMPEZA DAS CHAVES EXPIRADAS
+# ============================================================================
+
+def limpar_expiradas(bind=None, tamanho_lote=TAMANHO_LOTE_LIMPEZA, um_lote=False):
+    """
+    Apaga as chaves expiradas em lotes (transações curtas, pelo índice de expira_em).
+
+    Args:
+        um_lote: Apaga só um lote (limpeza durante o uso normal)
+
+    Returns:
+        int: Chaves apagadas
+    """
+    if bind is None:
+        from database import engine as bind
+    total = 0
+    while True:
+        with bind.begin() as conn:
+            ids = conn.execute(
+                select(ChaveIdempotencia.id).where(ChaveIdempotencia.expira_em <= datetime.utcnow())
+                .limit(tamanho_lote)
+            ).scalars().all()
+            if ids:
+                conn.execute(delete(ChaveIdempotencia).where(ChaveIdempotencia.id.in_(ids)))
+        total += len(ids)
+        if um_lote or len(ids) < tamanho_lote:
+            return total
+
+# ============================================================================
+# INTERFACE DE LINHA DE COMANDO
+# ============================================================================
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Chaves de idempotência de entradas e vendas")
+    acoes = parser.add_subparsers(dest="acao", required=True)
+    p = acoes.add_parser("limpar", help="Apaga as chaves expiradas")
+    p.add_argument("--lote", type=int, default=TAMANHO_LOTE_LIMPEZA, help="Chaves apagadas por transação")
+    args = parser.parse_args(argv)
+
+    from database import init_db
+    init_db()
+    apagadas = limpar_expiradas(tamanho_lote=args.lote)
+    print(f"{apagadas} chave(s) de idempotência expirada(s) apagada(s).")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+# ============================================================================
+# FIM DO MÓDULO IDEMPOTENCIA
+# ============================================================================
@@ -0,0 +1,197 @@
+# ============================================================================
+# MÓDULO INICIALIZACAO - CARREGAMENTO SOB DEMANDA E TEMPOS DE INICIALIZAÇÃO
+# ============================================================================
+# Este módulo ajuda main.py e main_auth.py a iniciarem rápido:
+# - Os módulos do sistema (estoque, financeiro, rh...) só são importados
+#   quando o usuário escolhe a opção correspondente no menu
+# - Com a opção --tempos, cada etapa da inicialização e cada import é
+#   cronometrado, e um relatório no estilo "python -X importtime" é exibido
+# - Com a opção --profile, cada função carregada por carregar_funcao() roda
+#   sob o perfilador (veja perfilador.py)
+#
+# Este módulo usa apenas a biblioteca padrão, para não pesar na inicialização.
+#
+# CONCEITOS DEMONSTRADOS:
+# - Importação dinâmica (importlib)
+# - Gerenciadores de contexto (with)
+# - Ganchos de importação (sys.meta_path)
+# ============================================================================
+
+import importlib
+import sys
+import time
+from contextlib import contextmanager
+
+# ============================================================================
+# ESTADO DA MEDIÇÃO
+# ============================================================================
+_ativo = False
+_inicio = time.perf_counter()
+_etapas = []      # (nome_etapa, duracao_segundos)
+_imports = []     # (nivel, nome_modulo, proprio_segundos, acumulado_segundos)
+
+# ============================================================================
+# CRONÔMETRO DE IMPORTS (ESTILO -X importtime)
+# ============================================================================
+
+class _LoaderCronometrado:
+    """Envolve o loader original e mede o tempo de execução do módulo."""
+
+    _pilha = []  # acumuladores dos imports em andamento (para o tempo próprio)
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, nome):
+        return getattr(self._loader, nome)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, modulo):
+        nivel = len(self._pilha)
+        self._pilha.append(0.0)
+        inicio = time.perf_counter()
+        try:
+            self._loader.exec_module(modulo)
+        finally:
+            acumulado = time.perf_counter() - inicio
+            filhos = self._pilha.pop()
+            if self._pilha:
+                self._pilha[-1] += acumulado
+            _imports.append((nivel, modulo.__name__, acumulado - filhos, acumulado))
+
+
+class _BuscadorCronometrado:
+    """Buscador em sys.meta_path que troca o loader pelo cronometrado."""
+
+    def find_spec(self, nome, caminho=None, alvo=None):
+        for buscador in sys.meta_path:
+            if buscador is self or not hasattr(buscador, "find_spec"):
+                continue
+            spec = buscador.find_spec(nome, caminho, alvo)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _LoaderCronometrado(spec.loader)
+                return spec
+        return None
+
+
+def ativar_medicao():
+    """
+    Liga a medição de tempos (opção --tempos).
+
+    Deve ser chamada antes de importar database/models, para que os imports
+    pesados (SQLAlchemy, dotenv, bcrypt) apareçam no relatório.
+    """
+    global _ativo
+    if _ativo:
+        return
+    _ativo = True
+    sys.meta_path.insert(0, _BuscadorCronometrado())
+
+
+def medicao_ativa():
+    """Retorna True se a opção --tempos foi ativada."""
+    return _ativo
+
+
+def ativar_perfil(argumentos):
+    """
+    Liga o modo --profile (ou --profile=PASTA) se a opção estiver nos argumentos.
+
+    O perfilador só é importado quando a opção é usada.
+
+    Returns:
+        bool: True se o modo --profile foi ligado
+    """
+    for argumento in argumentos:
+        if argumento == "--profile" or argumento.startswith("--profile="):
+            import perfilador
+            perfilador.ativar(argumento.partition("=")[2] or None)
+            return True
+    return False
+
+# ============================================================================
+# ETAPAS E CARREGAMENTO SOB DEMANDA
+# ============================================================================
+
+@contextmanager
+def etapa(nome):
+    """
+    Cronometra uma etapa da inicialização (ex: "Conexão com o banco").
+
+    Sem --tempos o custo é apenas o de duas leituras de relógio.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        if _ativo:
+            _etapas.append((nome, time.perf_counter() - inicio))
+
+
+def carregar_funcao(nome_modulo, nome_funcao):
+    """
+    Importa um módulo do sistema sob demanda e retorna uma de suas funções.
+
+    O import só acontece na primeira chamada; depois o Python reutiliza o
+    módulo de sys.modules.
+
+    Args:
+        nome_modulo: Nome do módulo (ex: "estoque_saida")
+        nome_funcao: Nome da função dentro do módulo (ex: "vender_produto")
+
+    Returns:
+        callable: A função solicitada (envolvida pelo perfilador no modo --profile)
+    """
+    if nome_modulo in sys.modules:
+        funcao = getattr(sys.modules[nome_modulo], nome_funcao)
+    else:
+        with etapa(f"Carregar módulo {nome_modulo}"):
+            modulo = importlib.import_module(nome_modulo)
+        funcao = getattr(modulo, nome_funcao)
+    perfilador = sys.modules.get("perfilador")
+    if perfilador is not None and perfilador.ativo():
+        return perfilador.envolver(nome_modulo, nome_funcao, funcao)
+    return funcao
+
+# ============================================================================
+# RELATÓRIO
+# ============================================================================
+
+def exibir_relatorio(limite_imports=25):
+    """
+    Exibe o relatório de tempos de inicialização.
+
+    Mostra as etapas (conexão, migrações, permissões...) e os imports mais
+    caros, com tempo próprio e acumulado em microssegundos, como o
+    "python -X importtime".
+
+    Args:
+        limite_imports: Quantos imports (os mais lentos) listar
+    """
+    if not _ativo:
+        return
+
+    total = time.perf_counter() - _inicio
+
+    print("\n" + "="*70)
+    print("   TEMPOS DE INICIALIZAÇÃO")
+    print("="*70)
+    for nome, duracao in _etapas:
+        print(f"   {nome:<45} {duracao * 1000:>10.1f} ms")
+    print("-"*70)
+    print(f"   {'Total desde o início do processo':<45} {total * 1000:>10.1f} ms")
+
+    if _imports:
+        print("\n   IMPORTS MAIS LENTOS (próprio | acumulado | módulo)")
+        print("-"*70)
+        mais_lentos = sorted(_imports, key=lambda i: i[3], reverse=True)[:limite_imports]
+        for nivel, nome, proprio, acumulado in mais_lentos:
+            print(f"   {proprio * 1e6:>10.0f} us | {acumulado * 1e6:>10.0f} us | {'  ' * nivel}{nome}")
+    print("="*70)
+
+# ============================================================================
+# FIM DO MÓDULO INICIALIZACAO
+# ============================================================================
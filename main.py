@@ -26,19 +26,24 @@
 # ============================================================================
 # IMPORTAÇÃO DOS MÓDULOS CUSTOMIZADOS DO SISTEMA
 # ============================================================================
-# Cada módulo representa uma funcionalidade específica do sistema
-import operacional       # Módulo para cálculos operacionais e produtivos
-import estoque_entrada   # Módulo para entrada de produtos no estoque
-import estoque_saida     # Módulo para saída/venda de produtos
-import financeiro        # Módulo para análises financeiras
-import rh                # Módulo de Recursos Humanos (RH)
-from database import init_db, SessionLocal  # Funções para gerenciar o banco de dados
+# Cada módulo representa uma funcionalidade específica do sistema.
+# Eles NÃO são importados aqui: carregar_funcao() importa o módulo só quando
+# a opção do menu é escolhida, deixando a inicialização mais rápida.
+# - operacional:     cálculos operacionais e produtivos
+# - estoque_entrada: entrada de produtos no estoque
+# - estoque_saida:   saída/venda de produtos
+# - financeiro:      análises financeiras
+# - rh:              Recursos Humanos (RH)
+import os                                   # Para ler a configuração do terminal de loja
+import sys                                  # Para ler as opções da linha de comando
+import inicializacao                        # Carregamento sob demanda e medição de tempos
+from inicializacao import carregar_funcao, etapa
 
 # ============================================================================
 # FUNÇÁO PRINCIPAL DO SISTEMA
 # ============================================================================
 
-def iniciar_sistema():
+def iniciar_sistema(exibir_tempos=False):
     """
     Função principal que inicializa e gerencia todo o sistema.
     
@@ -55,14 +60,29 @@ def iniciar_sistema():
     - A cada iteração, exibe o menu e aguarda entrada do usuário
     - Executa a ação correspondente à opção escolhida
     - Só encerra quando o usuário escolhe a opção '0'
+    
+    Args:
+        exibir_tempos: Se True exibe o relatório de tempos de inicialização
+                       (opção --tempos na linha de comando)
     """
     
     # ========================================================================
     # INICIALIZAÇÃO DO BANCO DE DADOS
     # ========================================================================
     print("Inicializando banco de dados...")
-    init_db()  # Chama a função que cria as tabelas caso não existam
+    with etapa("Importar database (SQLAlchemy, dotenv)"):
+        from database import init_db, SessionLocal  # Funções para gerenciar o banco de dados
+    with etapa("Verificar esquema (migrações)"):
+        init_db()  # Aplica migrações pendentes (uma consulta se já estiver atualizado)
     print("Banco de dados conectado!")
+
+    # Terminal de loja (SYNC_CENTRAL_URL no .env): recebe o catálogo e envia
+    # as vendas à central em segundo plano (veja sync_pdv.py)
+    if os.getenv("SYNC_CENTRAL_URL"):
+        carregar_funcao("sync_pdv", "iniciar_sincronizacao")()
+    
+    if exibir_tempos:
+        inicializacao.exibir_relatorio()
     
     # ========================================================================
     # CRIAÇÃO DA SESSÃO DO BANCO DE DADOS
@@ -107,29 +127,29 @@ def iniciar_sistema():
             if opcao == "1":
                 # OPÇÃO 1: Módulo Operacional
                 # Calcula a capacidade de produção baseada em turnos de trabalho
-                operacional.calcular_capacidade()
+                carregar_funcao("operacional", "calcular_capacidade")()
                 
             elif opcao == "2":
                 # OPÇÃO 2: Módulo Estoque - Entrada
                 # Cadastra novos produtos que entraram no estoque
                 # Passa db_session para o módulo poder acessar o banco
-                estoque_entrada.cadastrar_produto(db_session)
+                carregar_funcao("estoque_entrada", "cadastrar_produtos")(db_session)
                 
             elif opcao == "3":
                 # OPÇÃO 3: Módulo Estoque - Saída
                 # Registra vendas ou saídas de produtos do estoque
                 # Passa db_session para o módulo poder acessar o banco
-                estoque_saida.vender_produto(db_session)
+                carregar_funcao("estoque_saida", "vender_produto")(db_session)
                 
             elif opcao == "4":
                 # OPÇÃO 4: Módulo Financeiro
                 # Calcula custos operacionais e margem de lucro
-                financeiro.calcular_lucros()
+                carregar_funcao("financeiro", "calcular_lucros")()
                 
             elif opcao == "5":
                 # OPÇÃO 5: Módulo RH (Recursos Humanos)
                 # Calcula folha de pagamento dos funcionários
-                rh.calcular_folha_pagamento()
+                carregar_funcao("rh", "calcular_folha_pagamento")()
                 
             elif opcao == "0":
                 # OPÇÃO 0: Sair do Sistema
@@ -158,4 +178,10 @@ def iniciar_sistema():
 # (não quando é importado como módulo em outro arquivo)
 
 if __name__ == "__main__":
-    iniciar_sistema()  # Chama a função principal que inicia todo o sistema
\ No newline at end of file
+    # --tempos: exibe os tempos de inicialização (estilo python -X importtime)
+    exibir_tempos = "--tempos" in sys.argv[1:]
+    if exibir_tempos:
+        inicializacao.ativar_medicao()
+    # --profile[=PASTA]: perfil de cada módulo executado (veja perfilador.py)
+    inicializacao.ativar_perfil(sys.argv[1:])
+    iniciar_sistema(exibir_tempos)  # Chama a função principal que inicia todo o sistema
\ No newline at end of file
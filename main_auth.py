@@ -19,20 +19,32 @@
 # ============================================================================
 # IMPORTAÇÃO DOS MÓDULOS
 # ============================================================================
-import operacional
-import estoque_entrada
-import estoque_saida
-import financeiro
-import rh
-from database import init_db, SessionLocal
-from gestao_usuarios import fazer_login, menu_gestao_usuarios
-from models import criar_permissoes_padrao
+# Os módulos do sistema (operacional, estoque, financeiro, rh, gestão) NÃO
+# são importados aqui: cada um é carregado sob demanda quando a opção do menu
+# é escolhida (veja inicializacao.carregar_funcao). Database/models também
+# são importados só dentro de iniciar_sistema_autenticado(), para que a
+# opção --tempos consiga medir o custo desses imports.
+import sys
+import inicializacao
+from inicializacao import carregar_funcao, etapa
 
 # ============================================================================
 # VARIÁVEL GLOBAL PARA O USUÁRIO LOGADO
 # ============================================================================
 usuario_logado = None
 
+# ============================================================================
+# MÓDULOS DO MENU (CARREGADOS SOB DEMANDA)
+# ============================================================================
+# codigo_permissao: (texto do menu, módulo, função)
+MODULOS_MENU = [
+    ("operacional", "Modulo Operacional (Capacidade de Producao)", "operacional", "calcular_capacidade"),
+    ("estoque_entrada", "Modulo Estoque (Cadastrar Entrada de Produtos)", "estoque_entrada", "cadastrar_produtos"),
+    ("estoque_saida", "Modulo Estoque (Registrar Saida/Venda)", "estoque_saida", "vender_produto"),
+    ("financeiro", "Modulo Financeiro (Calcular Custos e Lucros)", "financeiro", "calcular_lucros"),
+    ("rh", "Modulo RH (Folha de Pagamento)", "rh", "calcular_folha_pagamento"),
+]
+
 # ============================================================================
 # FUNÇÕES AUXILIARES
 # ============================================================================
@@ -69,35 +81,17 @@ def exibir_menu_principal():
     contador = 1
     
     # Monta menu baseado nas permissões
-    if usuario_logado.is_admin or verificar_permissao("operacional"):
-        print(f"{contador} - Modulo Operacional (Capacidade de Producao)")
-        opcoes_disponiveis[str(contador)] = ("operacional", operacional.calcular_capacidade)
-        contador += 1
-    
-    if usuario_logado.is_admin or verificar_permissao("estoque_entrada"):
-        print(f"{contador} - Modulo Estoque (Cadastrar Entrada de Produtos)")
-        opcoes_disponiveis[str(contador)] = ("estoque_entrada", estoque_entrada.cadastrar_produto)
-        contador += 1
-    
-    if usuario_logado.is_admin or verificar_permissao("estoque_saida"):
-        print(f"{contador} - Modulo Estoque (Registrar Saida/Venda)")
-        opcoes_disponiveis[str(contador)] = ("estoque_saida", estoque_saida.vender_produto)
-        contador += 1
-    
-    if usuario_logado.is_admin or verificar_permissao("financeiro"):
-        print(f"{contador} - Modulo Financeiro (Calcular Custos e Lucros)")
-        opcoes_disponiveis[str(contador)] = ("financeiro", financeiro.calcular_lucros)
-        contador += 1
-    
-    if usuario_logado.is_admin or verificar_permissao("rh"):
-        print(f"{contador} - Modulo RH (Folha de Pagamento)")
-        opcoes_disponiveis[str(contador)] = ("rh", rh.calcular_folha_pagamento)
-        contador += 1
+    # (guarda apenas o nome do módulo/função; o import acontece na escolha)
+    for codigo, texto, modulo, funcao in MODULOS_MENU:
+        if usuario_logado.is_admin or verificar_permissao(codigo):
+            print(f"{contador} - {texto}")
+            opcoes_disponiveis[str(contador)] = (codigo, modulo, funcao)
+            contador += 1
     
     # Opção de gestão de usuários (só para admin)
     if usuario_logado.is_admin:
         print(f"{contador} - Gestao de Usuarios e Empresas")
-        opcoes_disponiveis[str(contador)] = ("gestao", menu_gestao_usuarios)
+        opcoes_disponiveis[str(contador)] = ("gestao", "gestao_usuarios", "menu_gestao_usuarios")
         contador += 1
     
     print("0 - Sair do Sistema")
@@ -109,15 +103,23 @@ def exibir_menu_principal():
 # FUNÇÃO PRINCIPAL COM AUTENTICAÇÃO
 # ============================================================================
 
-def iniciar_sistema_autenticado():
+def iniciar_sistema_autenticado(exibir_tempos=False):
     """
     Função principal do sistema com autenticação e controle de acesso.
+    
+    Args:
+        exibir_tempos: Se True exibe o relatório de tempos de inicialização
+                       (opção --tempos na linha de comando)
     """
     global usuario_logado
     
     # Inicializa banco de dados
     print("Inicializando banco de dados...")
-    init_db()
+    with etapa("Importar database/models (SQLAlchemy, dotenv)"):
+        from database import init_db, SessionLocal
+        from models import criar_permissoes_padrao
+    with etapa("Verificar esquema (migrações)"):
+        init_db()
     print("Banco de dados conectado!")
     
     # Cria sessão
@@ -125,7 +127,11 @@ def iniciar_sistema_autenticado():
     
     try:
         # Cria permissões padrão
-        criar_permissoes_padrao(db_session)
+        with etapa("Permissões padrão"):
+            criar_permissoes_padrao(db_session)
+        
+        if exibir_tempos:
+            inicializacao.exibir_relatorio()
         
         # Menu inicial
         while True:
@@ -142,6 +148,7 @@ def iniciar_sistema_autenticado():
             
             if opcao == "1":
                 # Login
+                fazer_login = carregar_funcao("gestao_usuarios", "fazer_login")
                 usuario_logado = fazer_login(db_session)
                 
                 if usuario_logado:
@@ -160,13 +167,23 @@ def iniciar_sistema_autenticado():
                             break
                         
                         elif escolha in opcoes_disponiveis:
-                            codigo_modulo, funcao = opcoes_disponiveis[escolha]
+                            codigo_modulo, nome_modulo, nome_funcao = opcoes_disponiveis[escolha]
+                            funcao = carregar_funcao(nome_modulo, nome_funcao)
                             
                             # Executa o módulo
                             if codigo_modulo == "gestao":
                                 funcao()
-                            elif codigo_modulo in ["estoque_entrada", "estoque_saida"]:
-                                funcao(db_session)
+                            elif codigo_modulo in ["estoque_entrada", "estoque_saida", "operacional"]:
+                                # Com DATABASE_SHARDS, os produtos ficam no shard da empresa
+                                # e cada usuário só vê e altera os produtos (e o plano de produção)
+                                # da própria empresa
+                                from shards import sessao_da_empresa, sharding_ativo
+                                company_id = str(usuario_logado.empresa_id)
+                                if sharding_ativo():
+                                    with sessao_da_empresa(usuario_logado.empresa_id) as sessao_empresa:
+                                        funcao(sessao_empresa, company_id=company_id)
+                                else:
+                                    funcao(db_session, company_id=company_id)
                             else:
                                 funcao()
                             
@@ -176,7 +193,7 @@ def iniciar_sistema_autenticado():
                 
             elif opcao == "2":
                 # Menu de gestão (para configuração inicial)
-                menu_gestao_usuarios()
+                carregar_funcao("gestao_usuarios", "menu_gestao_usuarios")()
                 
             elif opcao == "0":
                 print("\n" + "="*70)
@@ -196,7 +213,15 @@ def iniciar_sistema_autenticado():
 # ============================================================================
 
 if __name__ == "__main__":
-    iniciar_sistema_autenticado()
+    # --tempos: relatório de tempos de inicialização (estilo -X importtime)
+    exibir_tempos = "--tempos" in sys.argv[1:]
+    if exibir_tempos:
+        inicializacao.ativar_medicao()
+    # --profile[=PASTA]: perfil de cada módulo executado, inclusive do menu
+    if inicializacao.ativar_perfil(sys.argv[1:]):
+        from perfilador import envolver
+        exibir_menu_principal = envolver("main_auth", "exibir_menu_principal", exibir_menu_principal)
+    iniciar_sistema_autenticado(exibir_tempos)
 
 # ============================================================================
 # FIM DO ARQUIVO MAIN_AUTH.PY
@@ -0,0 +1,557 @@
+# ============================================================================
+# MÓDULO METRICAS - CONTADORES E HISTOGRAMAS (FORMATO PROMETHEUS)
+# ============================================================================
+# Registro de métricas do processo, exportado no formato texto do Prometheus
+# (https://prometheus.io/docs/instrumenting/exposition_formats/):
+#
+# - Contador: só cresce (vendas, unidades vendidas, logins...)
+# - Histograma: distribuição em faixas fixas + soma + contagem (latências)
+# - Medidor: valor instantâneo, atualizado pelo código ou calculado por uma
+#   função no momento da exportação (conexões em uso no pool)
+#
+# Métricas com rótulos (ex: status="sucesso") criam um filho por combinação
+# de valores; pegue o filho uma vez (metrica.rotulos("sucesso")) e guarde-o.
+#
+# CUSTO POR EVENTO: não há trava no caminho quente. Cada thread soma na sua
+# própria parcial (dicionário indexado por threading.get_ident()), então
+# nenhuma atualização se perde entre threads e a exportação soma as
+# parciais. Um inc() custa ~0,15 µs e um observar() ~0,35 µs (uma trava
+# custaria ~0,5 µs sozinha).
+#
+# As funções de lógica pura são medidas pelo decorador medir(), e o pool de
+# conexões da engine por instrumentar_pool() (chamado em database.py).
+#
+# EXPORTAÇÃO:
+# - API: GET /metricas (veja api.py)
+# - Arquivo: METRICAS_ARQUIVO=/var/lib/node_exporter/quatro_cantos.prom
+#   grava o texto a cada METRICAS_INTERVALO segundos e na saída do processo
+#   (coletor "textfile" do node_exporter). "{pid}" no caminho gera um arquivo
+#   por processo, útil com vários workers da API.
+#
+# CONFIGURAÇÃO (.env):
+#   METRICAS=1                 0 desliga a instrumentação (decoradores viram no-op)
+#   METRICAS_ARQUIVO=          caminho do arquivo .prom (vazio = não grava)
+#   METRICAS_INTERVALO=15      segundos entre gravações do arquivo
+#
+# As métricas são por processo: cada worker da API tem as suas.
+# ============================================================================
+
+import atexit
+import functools
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from threading import get_ident
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+METRICAS_ATIVAS = os.getenv("METRICAS", "1").lower() not in ("0", "false", "nao", "não")
+METRICAS_ARQUIVO = os.getenv("METRICAS_ARQUIVO")
+METRICAS_INTERVALO = float(os.getenv("METRICAS_INTERVALO", "15"))
+
+TIPO_CONTEUDO = "text/plain; version=0.0.4; charset=utf-8"
+
+# Faixas (em segundos) para operações que vão ao banco ou calculam hash
+LIMITES_LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Faixas para cálculos em memória (microssegundos)
+LIMITES_RAPIDOS = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025,
+                   0.00005, 0.0001, 0.00025, 0.0005, 0.001)
+
+# ============================================================================
+# TIPOS DE MÉTRICA
+# ============================================================================
+
+def _formatar_numero(valor):
+    """Número no formato do Prometheus (+Inf, -Inf, NaN)."""
+    if isinstance(valor, float):
+        if math.isinf(valor):
+            return "+Inf" if valor > 0 else "-Inf"
+        if math.isnan(valor):
+            return "NaN"
+        return repr(valor)
+    return str(valor)
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _rotulos_texto(nomes, valores, extra=None):
+    pares = [f'{nome}="{_escapar(valor)}"' for nome, valor in zip(nomes, valores)]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+class _Metrica:
+    """Base: nome, descrição e filhos por combinação de rótulos."""
+    tipo = None
+    _atalhos = ()   # métodos do filho usados direto quando não há rótulos
+
+    def __init__(self, nome, descricao, rotulos=()):
+        self.nome = nome
+        self.descricao = descricao
+        self.nomes_rotulos = tuple(rotulos)
+        self._filhos = {}
+        self._trava = threading.Lock()
+        if not self.nomes_rotulos:
+            padrao = self._filhos[()] = self._novo_filho()
+            for metodo in self._atalhos:
+                setattr(self, metodo, getattr(padrao, metodo))   # uma chamada a menos por evento
+
+    def _novo_filho(self):
+        raise NotImplementedError
+
+    def rotulos(self, *valores):
+        """Filho da combinação de valores (criado na primeira vez)."""
+        chave = tuple(str(valor) for valor in valores)
+        filho = self._filhos.get(chave)
+        if filho is None:
+            if len(chave) != len(self.nomes_rotulos):
+                raise ValueError(f"{self.nome}: esperados os rótulos {self.nomes_rotulos}")
+            with self._trava:
+                filho = self._filhos.setdefault(chave, self._novo_filho())
+        return filho
+
+    def _sem_rotulos(self):
+        if self.nomes_rotulos:
+            raise ValueError(f"{self.nome}: informe os rótulos {self.nomes_rotulos}")
+        return self._filhos[()]
+
+    def amostras(self):
+        """Lista de (sufixo, texto dos rótulos, valor) para a exportação."""
+        raise NotImplementedError
+
+    def exportar(self):
+        linhas = [f"# HELP {self.nome} {self.descricao}", f"# TYPE {self.nome} {self.tipo}"]
+        for sufixo, rotulos, valor in self.amostras():
+            linhas.append(f"{self.nome}{sufixo}{rotulos} {_formatar_numero(valor)}")
+        return linhas
+
+
+class _ValorContador:
+    """Soma por thread: cada thread só escreve na própria chave de _parciais."""
+    __slots__ = ("_parciais",)
+
+    def __init__(self):
+        self._parciais = {}
+
+    def inc(self, quantidade=1):
+        parciais = self._parciais
+        thread = get_ident()
+        parciais[thread] = parciais.get(thread, 0) + quantidade
+
+    @property
+    def valor(self):
+        return sum(list(self._parciais.values()))
+
+
+class Contador(_Metrica):
+    """Contador monotônico (ex: vendas registradas)."""
+    tipo = "counter"
+    _atalhos = ("inc",)
+
+    def _novo_filho(self):
+        return _ValorContador()
+
+    def inc(self, quantidade=1):
+        self._sem_rotulos().inc(quantidade)
+
+    @property
+    def valor(self):
+        return self._sem_rotulos().valor
+
+    def amostras(self):
+        return [("", _rotulos_texto(self.nomes_rotulos, chave), filho.valor)
+                for chave, filho in list(self._filhos.items())]
+
+
+class _ValorMedidor(_ValorContador):
+    __slots__ = ()
+
+    def dec(self, quantidade=1):
+        self.inc(-quantidade)
+
+    def definir(self, valor):
+        # Troca o dicionário inteiro: as parciais antigas deixam de contar
+        self._parciais = {get_ident(): valor}
+
+
+class Medidor(_Metrica):
+    """
+    Valor instantâneo. Com funcao, o valor é calculado na exportação
+    (se a função devolver None, a métrica fica de fora do texto).
+    """
+    tipo = "gauge"
+    _atalhos = ("inc", "dec", "definir")
+
+    def __init__(self, nome, descricao, rotulos=(), funcao=None):
+        self.funcao = funcao
+        super().__init__(nome, descricao, rotulos)
+
+    def _novo_filho(self):
+        return _ValorMedidor()
+
+    def inc(self, quantidade=1):
+        self._sem_rotulos().inc(quantidade)
+
+    def dec(self, quantidade=1):
+        self._sem_rotulos().dec(quantidade)
+
+    def definir(self, valor):
+        self._sem_rotulos().definir(valor)
+
+    @property
+    def valor(self):
+        if self.funcao is not None:
+            return self.funcao()
+        return self._sem_rotulos().valor
+
+    def amostras(self):
+        if self.funcao is not None:
+            valor = self.funcao()
+            return [] if valor is None else [("", "", valor)]
+        return [("", _rotulos_texto(self.nomes_rotulos, chave), filho.valor)
+                for chave, filho in list(self._filhos.items())]
+
+
+class _Distribuicao:
+    """
+    Parcial por thread: [contagem de cada faixa..., acima do maior limite, soma].
+    O total é a soma das contagens.
+    """
+    __slots__ = ("limites", "_parciais", "_tamanho")
+
+    def __init__(self, limites):
+        self.limites = limites
+        self._parciais = {}
+        self._tamanho = len(limites) + 1
+
+    def observar(self, valor):
+        parcial = self._parciais.get(get_ident())
+        if parcial is None:
+            parcial = self._parciais[get_ident()] = [0] * self._tamanho + [0.0]
+        parcial[bisect_left(self.limites, valor)] += 1   # primeira faixa com limite >= valor
+        parcial[-1] += valor
+
+    def fotografia(self):
+        """(contagens por faixa, soma, total) somando as parciais das threads."""
+        contagens = [0] * self._tamanho
+        soma = 0.0
+        for parcial in list(self._parciais.values()):
+            parcial = list(parcial)
+            for indice in range(self._tamanho):
+                contagens[indice] += parcial[indice]
+            soma += parcial[-1]
+        return contagens, soma, sum(contagens)
+
+
+class Histograma(_Metrica):
+    """Distribuição em faixas fixas (cumulativas na exportação, como o Prometheus espera)."""
+    tipo = "histogram"
+    _atalhos = ("observar",)
+
+    def __init__(self, nome, descricao, limites=LIMITES_LATENCIA, rotulos=()):
+        self.limites = tuple(sorted(float(limite) for limite in limites))
+        super().__init__(nome, descricao, rotulos)
+
+    def _novo_filho(self):
+        return _Distribuicao(self.limites)
+
+    def observar(self, valor):
+        self._sem_rotulos().observar(valor)
+
+    def fotografia(self):
+        return self._sem_rotulos().fotografia()
+
+    def amostras(self):
+        resultado = []
+        for chave, filho in list(self._filhos.items()):
+            contagens, soma, total = filho.fotografia()
+            acumulado = 0
+            for limite, contagem in zip(self.limites, contagens):
+                acumulado += contagem
+                le = f'le="{_formatar_numero(limite)}"'
+                resultado.append(("_bucket", _rotulos_texto(self.nomes_rotulos, chave, le), acumulado))
+            resultado.append(("_bucket", _rotulos_texto(self.nomes_rotulos, chave, 'le="+Inf"'), total))
+            resultado.append(("_sum", _rotulos_texto(self.nomes_rotulos, chave), soma))
+            resultado.append(("_count", _rotulos_texto(self.nomes_rotulos, chave), total))
+        return resultado
+
+# ============================================================================
+# REGISTRO
+# ============================================================================
+
+class Registro:
+    """Conjunto de métricas do processo, na ordem em que foram criadas."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._trava = threading.Lock()
+
+    def registrar(self, metrica):
+        """Adiciona a métrica; se o nome já existe com o mesmo tipo, devolve a existente."""
+        with self._trava:
+            existente = self._metricas.get(metrica.nome)
+            if existente is not None:
+                if type(existente) is not type(metrica):
+                    raise ValueError(f"Métrica '{metrica.nome}' já registrada como {existente.tipo}")
+                return existente
+            self._metricas[metrica.nome] = metrica
+            return metrica
+
+    def obter(self, nome):
+        return self._metricas.get(nome)
+
+    def texto_prometheus(self):
+        linhas = []
+        for metrica in list(self._metricas.values()):
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+REGISTRO = Registro()
+
+
+def contador(nome, descricao, rotulos=()):
+    return REGISTRO.registrar(Contador(nome, descricao, rotulos))
+
+
+def histograma(nome, descricao, limites=LIMITES_LATENCIA, rotulos=()):
+    return REGISTRO.registrar(Histograma(nome, descricao, limites, rotulos))
+
+
+def medidor(nome, descricao, rotulos=(), funcao=None):
+    return REGISTRO.registrar(Medidor(nome, descricao, rotulos, funcao))
+
+
+def texto_prometheus():
+    """Todas as métricas do processo no formato texto do Prometheus."""
+    return REGISTRO.texto_prometheus()
+
+# ============================================================================
+# MÉTRICAS DO SISTEMA
+# ============================================================================
+EXCECOES = contador("quatro_cantos_excecoes_total",
+                    "Operações que terminaram com exceção", ("operacao",))
+
+VENDAS = contador("quatro_cantos_vendas_total",
+                  "Vendas processadas por status (sucesso, parcial, erro)", ("status",))
+LATENCIA_VENDA = histograma("quatro_cantos_venda_segundos",
+                            "Duração de registrar_saida_produto")
+UNIDADES_VENDIDAS = contador("quatro_cantos_unidades_vendidas_total",
+                             "Unidades baixadas do estoque por vendas")
+FATURAMENTO = contador("quatro_cantos_faturamento_reais_total",
+                       "Valor total vendido (R$)")
+
+ENTRADAS = contador("quatro_cantos_entradas_total",
+                    "Entradas de estoque por tipo (novo produto ou reposição)", ("tipo",))
+LATENCIA_ENTRADA = histograma("quatro_cantos_entrada_segundos",
+                              "Duração de registrar_entrada_produto")
+UNIDADES_RECEBIDAS = contador("quatro_cantos_unidades_recebidas_total",
+                              "Unidades adicionadas ao estoque por entradas")
+
+CONFLITOS = contador("quatro_cantos_conflitos_concorrencia_total",
+                     "Tentativas desfeitas por versão desatualizada (concorrência otimista)", ("operacao",))
+
+OUTBOX_ENTREGUES = contador("quatro_cantos_outbox_eventos_entregues_total",
+                            "Eventos do outbox entregues pelo relay", ("consumidor",))
+OUTBOX_ATRASO = histograma("quatro_cantos_outbox_atraso_segundos",
+                           "Tempo entre a gravação do evento e a entrega pelo relay")
+
+LOGINS = contador("quatro_cantos_verificacoes_senha_total",
+                  "Verificações de senha (logins) por resultado", ("resultado",))
+LATENCIA_SENHA = histograma("quatro_cantos_verificacao_senha_segundos",
+                            "Duração de verify_password (bcrypt)")
+
+FUNCIONARIOS = contador("quatro_cantos_funcionarios_processados_total",
+                        "Funcionários processados na folha de pagamento")
+LATENCIA_FUNCIONARIO = histograma("quatro_cantos_funcionario_segundos",
+                                  "Duração de processar_funcionario", LIMITES_RAPIDOS)
+SALARIOS_BRUTOS = contador("quatro_cantos_salarios_brutos_reais_total",
+                           "Soma dos salários brutos calculados (R$)")
+
+# ============================================================================
+# DECORADOR DE MEDIÇÃO
+# ============================================================================
+
+def medir(histograma_alvo, apos=None, operacao=None):
+    """
+    Mede a duração de cada chamada no histograma e, se a função retornar
+    normalmente, chama apos(resultado) para atualizar os contadores de negócio.
+    Exceções são contadas em quatro_cantos_excecoes_total{operacao=...}.
+
+    Com METRICAS=0 a função é devolvida sem alteração.
+    """
+    def decorador(funcao):
+        if not METRICAS_ATIVAS:
+            return funcao
+
+        observar = histograma_alvo.observar
+        excecoes = EXCECOES.rotulos(operacao or funcao.__name__)
+        relogio = time.perf_counter
+
+        @functools.wraps(funcao)
+        def medida(*args, **kwargs):
+            inicio = relogio()
+            try:
+                resultado = funcao(*args, **kwargs)
+            except BaseException:
+                observar(relogio() - inicio)
+                excecoes.inc()
+                raise
+            observar(relogio() - inicio)
+            if apos is not None:
+                apos(resultado)
+            return resultado
+        return medida
+    return decorador
+
+# ============================================================================
+# POOL DE CONEXÕES DO SQLALCHEMY
+# ============================================================================
+CONEXOES_CRIADAS = contador("quatro_cantos_pool_conexoes_criadas_total",
+                            "Conexões DBAPI abertas pelo pool")
+CONEXOES_DESCARTADAS = contador("quatro_cantos_pool_conexoes_invalidadas_total",
+                                "Conexões invalidadas (erro ou desconexão)")
+RETIRADAS = contador("quatro_cantos_pool_retiradas_total",
+                     "Conexões retiradas do pool (checkout)")
+CONEXOES_EM_USO = medidor("quatro_cantos_pool_conexoes_em_uso",
+                          "Conexões retiradas e ainda não devolvidas")
+USO_CONEXAO = histograma("quatro_cantos_pool_uso_conexao_segundos",
+                         "Tempo entre a retirada e a devolução de uma conexão")
+
+_pools = []
+
+
+def _somar_pools(nome_metodo):
+    total = None
+    for pool in _pools:
+        metodo = getattr(pool, nome_metodo, None)
+        if metodo is not None:
+            total = (total or 0) + metodo()
+    return total
+
+
+def _capacidade_pools():
+    """size + max_overflow de cada QueuePool (None se algum for ilimitado ou não houver)."""
+    total = None
+    for pool in _pools:
+        if not hasattr(pool, "size"):
+            continue
+        excedente = getattr(pool, "_max_overflow", 0)
+        if excedente < 0:
+            return None
+        total = (total or 0) + pool.size() + excedente
+    return total
+
+
+def _saturacao_pools():
+    capacidade = _capacidade_pools()
+    if not capacidade:
+        return None
+    return CONEXOES_EM_USO.valor / capacidade
+
+
+medidor("quatro_cantos_pool_conexoes_ociosas",
+        "Conexões abertas paradas no pool", funcao=lambda: _somar_pools("checkedin"))
+medidor("quatro_cantos_pool_capacidade",
+        "Máximo de conexões simultâneas (pool_size + max_overflow)", funcao=_capacidade_pools)
+medidor("quatro_cantos_pool_saturacao",
+        "Fração da capacidade do pool em uso (1 = pedidos passam a esperar)", funcao=_saturacao_pools)
+
+
+def instrumentar_pool(engine):
+    """Registra os eventos de pool da engine (connect, checkout, checkin, invalidate)."""
+    if not METRICAS_ATIVAS or engine.pool in _pools:
+        return
+    from sqlalchemy import event
+
+    relogio = time.perf_counter
+    _pools.append(engine.pool)
+
+    @event.listens_for(engine, "connect")
+    def _ao_conectar(conexao_dbapi, registro):
+        CONEXOES_CRIADAS.inc()
+
+    @event.listens_for(engine, "checkout")
+    def _ao_retirar(conexao_dbapi, registro, proxy):
+        RETIRADAS.inc()
+        CONEXOES_EM_USO.inc()
+        registro.info["_metricas_retirada"] = relogio()
+
+    @event.listens_for(engine, "checkin")
+    def _ao_devolver(conexao_dbapi, registro):
+        retirada = registro.info.pop("_metricas_retirada", None)
+        if retirada is not None:
+            CONEXOES_EM_USO.dec()
+            USO_CONEXAO.observar(relogio() - retirada)
+
+    @event.listens_for(engine, "invalidate")
+    def _ao_invalidar(conexao_dbapi, registro, excecao):
+        CONEXOES_DESCARTADAS.inc()
+
+# ============================================================================
+# PERCENTIS DE AMOSTRAS (BENCHMARKS E TESTES DE CARGA)
+# ============================================================================
+
+def percentil(valores_ordenados, p):
+    """
+    Percentil p (0-100) pelo método do posto mais próximo: o menor valor com
+    pelo menos p% das amostras <= ele. Os valores já devem estar ordenados.
+
+    Usado por benchmark.py, benchmark_concorrencia.py e carga_api.py, para que
+    os p95/p99 de todos os relatórios sejam comparáveis.
+
+    Returns:
+        float: 0.0 se não houver amostras
+    """
+    if not valores_ordenados:
+        return 0.0
+    posto = math.ceil(p / 100 * len(valores_ordenados))
+    return valores_ordenados[min(len(valores_ordenados), max(1, posto)) - 1]
+
+# ============================================================================
+# GRAVAÇÃO EM ARQUIVO
+# ============================================================================
+
+def gravar_metricas(caminho=None):
+    """
+    Grava o texto das métricas em caminho (padrão: METRICAS_ARQUIVO).
+
+    A escrita é atômica (arquivo temporário + rename), então o coletor
+    nunca lê um arquivo pela metade. "{pid}" no caminho vira o PID.
+    """
+    caminho = (caminho or METRICAS_ARQUIVO).replace("{pid}", str(os.getpid()))
+    temporario = f"{caminho}.{os.getpid()}.tmp"
+    with open(temporario, "w", encoding="utf-8") as arquivo:
+        arquivo.write(texto_prometheus())
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def _gravar_periodicamente(caminho, intervalo):
+    while True:
+        time.sleep(intervalo)
+        try:
+            gravar_metricas(caminho)
+        except OSError as erro:
+            import sys
+            print(f"[ALERTA] Não foi possível gravar as métricas em {caminho}: {erro}", file=sys.stderr)
+
+
+def iniciar_gravacao_periodica(caminho=None, intervalo=None):
+    """Grava as métricas a cada intervalo (thread daemon) e uma última vez na saída."""
+    caminho = caminho or METRICAS_ARQUIVO
+    intervalo = intervalo or METRICAS_INTERVALO
+    threading.Thread(target=_gravar_periodicamente, args=(caminho, intervalo),
+                     name="gravacao-metricas", daemon=True).start()
+    atexit.register(gravar_metricas, caminho)
+
+
+if METRICAS_ATIVAS and METRICAS_ARQUIVO:
+    iniciar_gravacao_periodica()
@@ -0,0 +1,438 @@
+# ============================================================================
+# MÓDULO MIGRATIONS - MIGRAÇÕES VERSIONADAS DO BANCO DE DADOS
+# ============================================================================
+# Este módulo aplica alterações de esquema (tabelas, colunas, índices) em
+# bancos já existentes, tanto no SQLite local (dados.db) quanto no PostgreSQL.
+#
+# Base.metadata.create_all() só cria tabelas que ainda não existem: ele não
+# adiciona colunas nem índices novos em tabelas antigas. Por isso cada
+# alteração de esquema vira uma migração numerada, registrada na tabela
+# schema_version depois de aplicada.
+#
+# CONCEITOS DEMONSTRADOS:
+# - Versionamento de esquema (cada migração é aplicada uma única vez)
+# - CREATE INDEX CONCURRENTLY no PostgreSQL (sem bloquear escritas)
+# - Backfill de colunas novas em lotes pequenos (transações curtas)
+# - Interface de linha de comando com argparse
+#
+# USO (LINHA DE COMANDO):
+#   python migrations.py status            # versão atual e pendências
+#   python migrations.py upgrade           # aplica todas as pendentes
+#   python migrations.py upgrade --ate 2   # aplica até a versão 2
+#   python migrations.py upgrade --lote 500
+# ============================================================================
+
+import argparse
+import os
+from datetime import datetime
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from database import Base, engine, normalizar_nome
+import models  # registra Empresa/Usuario/Permissao em Base.metadata
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+TABELA_VERSAO = "schema_version"
+
+# Linhas atualizadas por transação nos backfills (pode ser ajustado no .env)
+TAMANHO_LOTE_PADRAO = int(os.getenv("MIGRACAO_TAMANHO_LOTE", "1000"))
+
+# Lista de migrações registradas: (versao, descricao, funcao)
+MIGRACOES = []
+
+def migracao(versao, descricao):
+    """
+    Decorador que registra uma função como migração de esquema.
+
+    A função recebe o engine e o tamanho de lote para backfills.
+    Ela deve ser idempotente: pode encontrar o banco já no estado final
+    (por exemplo, quando a migração 0001 criou as tabelas já completas).
+
+    Args:
+        versao: Número da migração (inteiro crescente, sem repetição)
+        descricao: Texto curto exibido no status e gravado em schema_version
+    """
+    def registrar(funcao):
+        if any(v == versao for v, _, _ in MIGRACOES):
+            raise ValueError(f"Migração {versao} registrada duas vezes")
+        MIGRACOES.append((versao, descricao, funcao))
+        MIGRACOES.sort(key=lambda m: m[0])
+        return funcao
+    return registrar
+
+# ============================================================================
+# OPERAÇÕES AUXILIARES (USADAS PELAS MIGRAÇÕES)
+# ============================================================================
+
+def is_postgresql(bind=None):
+    """Retorna True se o engine aponta para um PostgreSQL."""
+    return (bind or engine).dialect.name == "postgresql"
+
+def coluna_existe(bind, tabela, coluna):
+    """Verifica se a coluna já existe na tabela (via reflexão)."""
+    return any(c["name"] == coluna for c in inspect(bind).get_columns(tabela))
+
+def adicionar_coluna(bind, tabela, coluna, tipo_sql):
+    """
+    Adiciona uma coluna anulável sem valor padrão (ALTER TABLE ... ADD COLUMN).
+
+    Sem DEFAULT a operação só altera o catálogo, tanto no SQLite quanto no
+    PostgreSQL: a tabela não é reescrita e o bloqueio dura milissegundos.
+    O preenchimento das linhas existentes é feito depois por backfill_em_lotes.
+
+    Returns:
+        bool: True se a coluna foi criada, False se já existia
+    """
+    if coluna_existe(bind, tabela, coluna):
+        return False
+    with bind.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {tabela} ADD COLUMN {coluna} {tipo_sql}"))
+    return True
+
+def _indice_invalido_postgresql(conn, nome):
+    """Um CREATE INDEX CONCURRENTLY interrompido deixa o índice INVALID."""
+    resultado = conn.execute(text(
+        "SELECT NOT i.indisvalid FROM pg_index i "
+        "JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :nome"
+    ), {"nome": nome}).scalar()
+    return bool(resultado)
+
+def criar_indice(bind, nome, tabela, colunas, unico=False, metodo=None):
+    """
+    Cria um índice se ele ainda não existir.
+
+    No PostgreSQL usa CREATE INDEX CONCURRENTLY, que não bloqueia INSERT/UPDATE
+    durante a construção. Esse comando não pode rodar dentro de transação,
+    por isso a conexão é aberta em modo AUTOCOMMIT. Se uma tentativa anterior
+    foi interrompida, o índice inválido é removido (também CONCURRENTLY) e
+    recriado.
+
+    Args:
+        bind: Engine do banco
+        nome: Nome do índice
+        tabela: Tabela indexada
+        colunas: Lista de colunas ou expressões (na ordem do índice)
+        unico: Se True cria UNIQUE INDEX
+        metodo: Tipo de índice do PostgreSQL (ex: "gin"); padrão btree
+    """
+    tipo = "UNIQUE INDEX" if unico else "INDEX"
+    lista_colunas = ", ".join(colunas)
+
+    if is_postgresql(bind):
+        usando = f" USING {metodo}" if metodo else ""
+        with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            if _indice_invalido_postgresql(conn, nome):
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nome}"))
+            conn.execute(text(
+                f"CREATE {tipo} CONCURRENTLY IF NOT EXISTS {nome} ON {tabela}{usando} ({lista_colunas})"
+            ))
+    else:
+        with bind.begin() as conn:
+            conn.execute(text(f"CREATE {tipo} IF NOT EXISTS {nome} ON {tabela} ({lista_colunas})"))
+
+def backfill_em_lotes(bind, tabela, coluna_destino, colunas_origem, funcao, tamanho_lote=None):
+    """
+    Preenche uma coluna nova a partir de outras colunas, em lotes.
+
+    Percorre a tabela pela chave primária (id > último id processado) e
+    atualiza no máximo tamanho_lote linhas por transação. Assim cada
+    transação segura poucos bloqueios de linha e o sistema continua
+    vendendo enquanto a migração roda. Linhas com coluna_destino já
+    preenchida são ignoradas, então o backfill pode ser interrompido e
+    retomado.
+
+    Args:
+        bind: Engine do banco
+        tabela: Tabela a atualizar (precisa ter coluna id)
+        coluna_destino: Coluna a preencher
+        colunas_origem: Colunas lidas e passadas para funcao (na ordem)
+        funcao: Função Python que recebe os valores de origem e retorna o novo valor
+        tamanho_lote: Linhas por transação (padrão: TAMANHO_LOTE_PADRAO)
+
+    Returns:
+        int: Total de linhas atualizadas
+    """
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_PADRAO
+    selecao = text(
+        f"SELECT id, {', '.join(colunas_origem)} FROM {tabela} "
+        f"WHERE id > :ultimo_id AND {coluna_destino} IS NULL "
+        f"ORDER BY id LIMIT :limite"
+    )
+    atualizacao = text(f"UPDATE {tabela} SET {coluna_destino} = :valor WHERE id = :id")
+
+    ultimo_id = 0
+    total = 0
+    while True:
+        with bind.begin() as conn:
+            linhas = conn.execute(selecao, {"ultimo_id": ultimo_id, "limite": tamanho_lote}).fetchall()
+            if not linhas:
+                break
+            parametros = [{"id": linha[0], "valor": funcao(*linha[1:])} for linha in linhas]
+            conn.execute(atualizacao, parametros)
+        ultimo_id = linhas[-1][0]
+        total += len(linhas)
+    return total
+
+# ============================================================================
+# MIGRAÇÕES DO SISTEMA
+# ============================================================================
+# Regra: nunca altere uma migração já publicada. Para mudar o esquema,
+# acrescente uma nova no final com o próximo número.
+
+@migracao(1, "Tabelas iniciais (produtos, funcionarios, empresas, usuarios, permissoes)")
+def _m0001_tabelas_iniciais(bind, tamanho_lote):
+    # Equivalente ao antigo init_db(): cria apenas as tabelas que faltam
+    tabelas = ["produtos", "funcionarios", "empresas", "usuarios", "permissoes", "usuario_permissoes"]
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables[t] for t in tabelas])
+
+@migracao(2, "Coluna produtos.nome_normalizado com backfill")
+def _m0002_nome_normalizado(bind, tamanho_lote):
+    adicionar_coluna(bind, "produtos", "nome_normalizado", "VARCHAR")
+    # Backfill em Python: lower() do SQLite não trata acentos como str.lower()
+    backfill_em_lotes(bind, "produtos", "nome_normalizado", ["nome"], normalizar_nome, tamanho_lote)
+
+@migracao(3, "Índices compostos por empresa")
+def _m0003_indices_por_empresa(bind, tamanho_lote):
+    criar_indice(bind, "ix_produtos_company_codigo", "produtos", ["company_id", "codigo"])
+    criar_indice(bind, "ix_produtos_company_nome_normalizado", "produtos", ["company_id", "nome_normalizado"])
+    criar_indice(bind, "ix_funcionarios_company_nome", "funcionarios", ["company_id", "nome"])
+    criar_indice(bind, "ix_usuarios_empresa_id", "usuarios", ["empresa_id"])
+
+@migracao(4, "Tabela movimentacoes_estoque (histórico de entradas e saídas)")
+def _m0004_movimentacoes_estoque(bind, tamanho_lote):
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables["movimentacoes_estoque"]])
+
+@migracao(5, "Permissões padrão (operacional, estoque, financeiro, rh)")
+def _m0005_permissoes_padrao(bind, tamanho_lote):
+    with Session(bind=bind) as db:
+        models.criar_permissoes_padrao(db, forcar=True)
+
+@migracao(6, "Tabela tokens_acesso (autenticação da API)")
+def _m0006_tokens_acesso(bind, tamanho_lote):
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables["tokens_acesso"]])
+
+@migracao(7, "Índice de busca de produtos (FTS5 no SQLite, pg_trgm no PostgreSQL)")
+def _m0007_busca_produtos(bind, tamanho_lote):
+    import busca_produtos
+    if busca_produtos.fts5_disponivel(bind):
+        busca_produtos.instalar_busca_sqlite(bind, tamanho_lote or TAMANHO_LOTE_PADRAO)
+    elif is_postgresql(bind):
+        busca_produtos.instalar_busca_postgresql(bind)
+    # Sem FTS5/pg_trgm a busca usa o índice em memória (nada a criar)
+
+@migracao(8, "Ponto de reposição e tabela alertas_estoque")
+def _m0008_alertas_estoque(bind, tamanho_lote):
+    adicionar_coluna(bind, "produtos", "ponto_reposicao", "INTEGER")
+    adicionar_coluna(bind, "produtos", "em_alerta", "BOOLEAN")
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables["alertas_estoque"]])
+
+@migracao(9, "Tabela previsoes_demanda (sugestão de compra)")
+def _m0009_previsoes_demanda(bind, tamanho_lote):
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables["previsoes_demanda"]])
+
+@migracao(10, "Tabela empresa_shards (catálogo de sharding por empresa)")
+def _m0010_empresa_shards(bind, tamanho_lote):
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables["empresa_shards"]])
+
+@migracao(11, "Coluna produtos.versao (concorrência otimista)")
+def _m0011_versao_produtos(bind, tamanho_lote):
+    # DEFAULT constante: as linhas existentes ficam com versão 1 sem reescrever
+    # a tabela (SQLite e PostgreSQL 11+); cargas por SQL direto também recebem 1
+    adicionar_coluna(bind, "produtos", "versao", "INTEGER NOT NULL DEFAULT 1")
+
+@migracao(12, "Tabela chaves_idempotencia (entradas e vendas repetidas)")
+def _m0012_chaves_idempotencia(bind, tamanho_lote):
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables["chaves_idempotencia"]])
+
+@migracao(13, "Tabelas eventos_outbox e outbox_cursores (outbox transacional)")
+def _m0013_outbox(bind, tamanho_lote):
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables[t] for t in ("eventos_outbox", "outbox_cursores")])
+
+@migracao(14, "Coluna produtos.atualizado_em e tabela sincronizacao_estado (terminais de loja)")
+def _m0014_sincronizacao_terminais(bind, tamanho_lote):
+    adicionar_coluna(bind, "produtos", "atualizado_em", "TIMESTAMP")
+    # Linhas antigas entram na primeira sincronização de cada terminal
+    agora = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+    backfill_em_lotes(bind, "produtos", "atualizado_em", ["id"], lambda _id: agora, tamanho_lote)
+    criar_indice(bind, "ix_produtos_company_atualizado", "produtos", ["company_id", "atualizado_em"])
+    Base.metadata.create_all(bind=bind, tables=[Base.metadata.tables["sincronizacao_estado"]])
+
+@migracao(15, "produtos.atualizado_em obrigatório (DEFAULT no banco e backfill das cargas em lote)")
+def _m0015_atualizado_em_obrigatorio(bind, tamanho_lote):
+    # Cargas por SQL direto (gerador_dados) gravavam produtos sem atualizado_em:
+    # sync_pdv não os enviava e a exportação os arquivava em mes=sem-data.
+    # No PostgreSQL o DEFAULT vem antes do backfill (inserções concorrentes já
+    # nascem preenchidas) e o NOT NULL usa uma CHECK validada sem bloquear
+    # escritas, então o SET NOT NULL não varre a tabela (PostgreSQL 12+).
+    # O SQLite não altera colunas existentes: bancos novos já nascem com
+    # DEFAULT e NOT NULL (modelo); nos antigos fica só o backfill.
+    if is_postgresql(bind):
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE produtos ALTER COLUMN atualizado_em SET DEFAULT timezone('utc', now())"))
+    agora = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S.%f")
+    backfill_em_lotes(bind, "produtos", "atualizado_em", ["id"], lambda _id: agora, tamanho_lote)
+    if is_postgresql(bind):
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE produtos DROP CONSTRAINT IF EXISTS ck_produtos_atualizado_em"))
+            conn.execute(text("ALTER TABLE produtos ADD CONSTRAINT ck_produtos_atualizado_em "
+                              "CHECK (atualizado_em IS NOT NULL) NOT VALID"))
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE produtos VALIDATE CONSTRAINT ck_produtos_atualizado_em"))
+        with bind.begin() as conn:
+            conn.execute(text("ALTER TABLE produtos ALTER COLUMN atualizado_em SET NOT NULL"))
+            conn.execute(text("ALTER TABLE produtos DROP CONSTRAINT ck_produtos_atualizado_em"))
+
+# ============================================================================
+# CONTROLE DE VERSÃO
+# ============================================================================
+
+def _criar_tabela_versao(bind):
+    with bind.begin() as conn:
+        conn.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {TABELA_VERSAO} ("
+            "versao INTEGER PRIMARY KEY, "
+            "descricao VARCHAR(200), "
+            "aplicada_em TIMESTAMP)"
+        ))
+
+def versoes_aplicadas(bind=None):
+    """
+    Retorna o conjunto de versões já registradas em schema_version.
+
+    Returns:
+        set: Números das migrações aplicadas (vazio se a tabela não existe)
+    """
+    bind = bind or engine
+    if not inspect(bind).has_table(TABELA_VERSAO):
+        return set()
+    with bind.connect() as conn:
+        return {linha[0] for linha in conn.execute(text(f"SELECT versao FROM {TABELA_VERSAO}"))}
+
+def versao_atual(bind=None):
+    """Retorna a maior versão aplicada (0 para banco sem migrações)."""
+    return max(versoes_aplicadas(bind), default=0)
+
+def versao_mais_recente():
+    """Retorna o número da última migração registrada no código."""
+    return MIGRACOES[-1][0] if MIGRACOES else 0
+
+def esquema_atualizado(bind=None):
+    """
+    Verifica, com uma única consulta, se o banco já está na versão mais recente.
+
+    Usada na inicialização para pular a reflexão do esquema (create_all e
+    inspect) quando não há nada a aplicar, que é o caso normal.
+
+    Returns:
+        bool: True se não há migrações pendentes
+    """
+    bind = bind or engine
+    try:
+        with bind.connect() as conn:
+            versao = conn.execute(text(f"SELECT MAX(versao) FROM {TABELA_VERSAO}")).scalar()
+    except DBAPIError:
+        # Tabela schema_version ainda não existe (banco novo ou pré-migrações)
+        return False
+    return (versao or 0) >= versao_mais_recente()
+
+def migracoes_pendentes(bind=None, ate=None):
+    """Lista as migrações ainda não aplicadas (até a versão 'ate', se informada)."""
+    aplicadas = versoes_aplicadas(bind)
+    return [m for m in MIGRACOES if m[0] not in aplicadas and (ate is None or m[0] <= ate)]
+
+def aplicar_migracoes(bind=None, ate=None, tamanho_lote=None, verbose=False):
+    """
+    Aplica, em ordem, todas as migrações pendentes.
+
+    Cada migração é registrada em schema_version logo após terminar. Se o
+    processo for interrompido, a próxima execução continua da migração que
+    faltou (as operações auxiliares são idempotentes).
+
+    Args:
+        bind: Engine do banco (padrão: engine de database.py)
+        ate: Aplica somente até esta versão (inclusive)
+        tamanho_lote: Linhas por transação nos backfills
+        verbose: Se True imprime cada migração aplicada
+
+    Returns:
+        list: Versões aplicadas nesta execução
+    """
+    bind = bind or engine
+    _criar_tabela_versao(bind)
+
+    aplicadas = []
+    for versao, descricao, funcao in migracoes_pendentes(bind, ate):
+        if verbose:
+            print(f"Aplicando migração {versao:04d}: {descricao}...")
+        funcao(bind, tamanho_lote)
+        with bind.begin() as conn:
+            conn.execute(
+                text(f"INSERT INTO {TABELA_VERSAO} (versao, descricao, aplicada_em) VALUES (:v, :d, :t)"),
+                {"v": versao, "d": descricao, "t": datetime.utcnow()}
+            )
+        aplicadas.append(versao)
+    return aplicadas
+
+def inicializar_esquema(bind=None):
+    """
+    Garante que o banco está na versão mais recente (usada por init_db).
+
+    No caso normal (nada pendente) custa uma única consulta em
+    schema_version, sem reflexão do esquema. Como as permissões padrão são
+    semeadas por uma migração, um esquema atualizado também dispensa
+    a verificação feita por criar_permissoes_padrao.
+    """
+    bind = bind or engine
+    if not esquema_atualizado(bind):
+        aplicar_migracoes(bind)
+    models.marcar_permissoes_verificadas()
+
+# ============================================================================
+# INTERFACE DE LINHA DE COMANDO
+# ============================================================================
+
+def exibir_status(bind=None):
+    """Imprime a versão atual do banco e as migrações pendentes."""
+    bind = bind or engine
+    aplicadas = versoes_aplicadas(bind)
+
+    print("\n" + "="*70)
+    print("   MIGRAÇÕES DO BANCO DE DADOS")
+    print("="*70)
+    print(f"Banco: {bind.url.render_as_string(hide_password=True)}")
+    print(f"Versão atual: {max(aplicadas, default=0)} | Mais recente: {versao_mais_recente()}")
+    print("-"*70)
+    for versao, descricao, _ in MIGRACOES:
+        status = "[X]" if versao in aplicadas else "[ ]"
+        print(f"{status} {versao:04d} - {descricao}")
+    print("="*70)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Migrações de esquema do Sistema Quatro Cantos")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+
+    subparsers.add_parser("status", help="Mostra a versão atual e as migrações pendentes")
+
+    parser_upgrade = subparsers.add_parser("upgrade", help="Aplica as migrações pendentes")
+    parser_upgrade.add_argument("--ate", type=int, help="Aplica somente até esta versão")
+    parser_upgrade.add_argument("--lote", type=int, help="Linhas por transação nos backfills")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "status":
+        exibir_status()
+    elif args.comando == "upgrade":
+        aplicadas = aplicar_migracoes(ate=args.ate, tamanho_lote=args.lote, verbose=True)
+        if aplicadas:
+            print(f"\n{len(aplicadas)} migração(ões) aplicada(s). Versão atual: {versao_atual()}")
+        else:
+            print("\nNenhuma migração pendente. O banco já está atualizado.")
+
+if __name__ == "__main__":
+    main()
+
+# ============================================================================
+# FIM DO MÓDULO MIGRATIONS
+# ============================================================================
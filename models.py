@@ -93,7 +93,7 @@ class Usuario(Base):
     __tablename__ = "usuarios"
 
     id = Column(Integer, primary_key=True, index=True)
-    empresa_id = Column(Integer, ForeignKey('empresas.id'), nullable=False)
+    empresa_id = Column(Integer, ForeignKey('empresas.id'), nullable=False, index=True)
     nome = Column(String(200), nullable=False)
     email = Column(String(200), unique=True, nullable=False, index=True)
     senha_hash = Column(String(200), nullable=False)
@@ -190,54 +190,150 @@ class Permissao(Base):
             "ativa": self.ativa
         }
 
+# ============================================================================
+# MODELO 4: TOKEN DE ACESSO (AUTENTICAÇÃO DA API HTTP)
+# ============================================================================
+
+class TokenAcesso(Base):
+    """
+    Modelo de dados para os tokens de acesso da API (api.py).
+    
+    O token é gerado no login (auth_utils.generate_api_key) e entregue ao
+    cliente uma única vez. No banco fica apenas o hash SHA-256 dele, então
+    um vazamento da tabela não expõe tokens válidos.
+    
+    CAMPOS:
+    - id: Identificador único
+    - usuario_id: FK para Usuario (dono do token)
+    - token_hash: SHA-256 do token (único, indexado para a busca a cada requisição)
+    - data_criacao: Data de criação
+    - expira_em: Data/hora de expiração (UTC)
+    """
+    __tablename__ = "tokens_acesso"
+
+    id = Column(Integer, primary_key=True, index=True)
+    usuario_id = Column(Integer, ForeignKey('usuarios.id'), nullable=False, index=True)
+    token_hash = Column(String(64), unique=True, nullable=False, index=True)
+    data_criacao = Column(DateTime, default=datetime.utcnow)
+    expira_em = Column(DateTime, nullable=False)
+    
+    # Relacionamentos
+    usuario = relationship("Usuario")
+    
+    def __repr__(self):
+        return f"<TokenAcesso(id={self.id}, usuario_id={self.usuario_id}, expira_em={self.expira_em})>"
+
+# ============================================================================
+# MODELO 5: SHARD DA EMPRESA (CATÁLOGO DE SHARDING)
+# ============================================================================
+
+class EmpresaShard(Base):
+    """
+    Em qual banco (shard) ficam os dados de uma empresa (veja shards.py).
+    
+    Fica sempre no banco principal, junto com empresas e usuários. Empresas
+    sem linha aqui usam o shard padrão.
+    
+    CAMPOS:
+    - empresa_id: FK para Empresa
+    - shard: Nome do shard (chave de DATABASE_SHARDS, ou "principal")
+    - estado: "ativa" ou "congelada" (escritas bloqueadas durante uma mudança de shard)
+    - atualizado_em: Data/hora da última alteração
+    """
+    __tablename__ = "empresa_shards"
+
+    empresa_id = Column(Integer, ForeignKey('empresas.id'), primary_key=True)
+    shard = Column(String(50), nullable=False)
+    estado = Column(String(20), nullable=False, default="ativa")
+    atualizado_em = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<EmpresaShard(empresa_id={self.empresa_id}, shard='{self.shard}', estado='{self.estado}')>"
+
 # ============================================================================
 # FUNÇÕES AUXILIARES
 # ============================================================================
 
-def criar_permissoes_padrao(db):
+# Permissões criadas automaticamente em todo banco novo.
+# Para incluir uma permissão nova, acrescente-a aqui E crie uma migração
+# que chame criar_permissoes_padrao (veja migrations.py): é a versão do
+# esquema que indica se as permissões já foram semeadas.
+PERMISSOES_PADRAO = [
+    {
+        "codigo": "operacional",
+        "nome": "Módulo Operacional",
+        "descricao": "Acesso ao cálculo de capacidade produtiva"
+    },
+    {
+        "codigo": "estoque_entrada",
+        "nome": "Estoque - Entrada",
+        "descricao": "Cadastro de entrada de produtos no estoque"
+    },
+    {
+        "codigo": "estoque_saida",
+        "nome": "Estoque - Saída",
+        "descricao": "Registro de saída e vendas de produtos"
+    },
+    {
+        "codigo": "financeiro",
+        "nome": "Módulo Financeiro",
+        "descricao": "Acesso a análise de custos e lucros"
+    },
+    {
+        "codigo": "rh",
+        "nome": "Módulo RH",
+        "descricao": "Acesso à folha de pagamento e gestão de funcionários"
+    }
+]
+
+# True quando já se sabe que as permissões padrão existem no banco
+# (semeadas nesta execução ou garantidas pela versão do esquema)
+_permissoes_verificadas = False
+
+def marcar_permissoes_verificadas():
+    """
+    Indica que as permissões padrão já existem no banco.
+    
+    Chamada por migrations.inicializar_esquema quando a versão do esquema
+    já inclui a migração que semeia as permissões. Depois disso,
+    criar_permissoes_padrao não executa nenhuma consulta.
+    """
+    global _permissoes_verificadas
+    _permissoes_verificadas = True
+
+def criar_permissoes_padrao(db, forcar=False):
     """
     Cria as permissões padrão do sistema se não existirem.
     
+    Faz no máximo duas consultas: um SELECT dos códigos já existentes e um
+    INSERT em lote dos que faltam. Se as permissões já foram verificadas
+    nesta execução (ou a versão do esquema garante que existem), retorna
+    sem consultar o banco.
+    
     Args:
         db: Sessão do banco de dados
+        forcar: Se True verifica o banco mesmo que já tenha sido verificado
+        
+    Returns:
+        int: Quantidade de permissões inseridas
     """
-    permissoes_padrao = [
-        {
-            "codigo": "operacional",
-            "nome": "Módulo Operacional",
-            "descricao": "Acesso ao cálculo de capacidade produtiva"
-        },
-        {
-            "codigo": "estoque_entrada",
-            "nome": "Estoque - Entrada",
-            "descricao": "Cadastro de entrada de produtos no estoque"
-        },
-        {
-            "codigo": "estoque_saida",
-            "nome": "Estoque - Saída",
-            "descricao": "Registro de saída e vendas de produtos"
-        },
-        {
-            "codigo": "financeiro",
-            "nome": "Módulo Financeiro",
-            "descricao": "Acesso a análise de custos e lucros"
-        },
-        {
-            "codigo": "rh",
-            "nome": "Módulo RH",
-            "descricao": "Acesso à folha de pagamento e gestão de funcionários"
-        }
-    ]
+    if _permissoes_verificadas and not forcar:
+        return 0
+    
+    codigos = [perm["codigo"] for perm in PERMISSOES_PADRAO]
+    existentes = {
+        codigo for (codigo,) in
+        db.query(Permissao.codigo).filter(Permissao.codigo.in_(codigos))
+    }
+    faltantes = [dict(perm, ativa=True) for perm in PERMISSOES_PADRAO if perm["codigo"] not in existentes]
     
-    for perm_data in permissoes_padrao:
-        # Verifica se já existe
-        existe = db.query(Permissao).filter(Permissao.codigo == perm_data["codigo"]).first()
-        if not existe:
-            permissao = Permissao(**perm_data)
-            db.add(permissao)
+    if faltantes:
+        db.bulk_insert_mappings(Permissao, faltantes)
+        db.commit()
     
-    db.commit()
+    marcar_permissoes_verificadas()
     print("Permissões padrão criadas/verificadas com sucesso!")
+    return len(faltantes)
 
 # ============================================================================
 # FIM DO MÓDULO MODELS
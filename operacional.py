@@ -6,10 +6,14 @@
 # com base no número de turnos ativos (Manhã, Tarde e/ou Noite).
 # 
 # CONCEITOS DEMONSTRADOS:
-# - Entrada e validação de dados
 # - Operações matemáticas básicas (multiplicação)
 # - Estruturas condicionais (if/else)
+# - Comparação de cenários
 # - Formatação de saída de dados
+#
+# Para capacidade com calendário real (várias linhas, turnos por dia da
+# semana, feriados e paradas), veja planejamento_capacidade.py. O cruzamento
+# com o estoque e a demanda dos produtos está em planejamento_producao.py.
 # ============================================================================
 
 # ============================================================================
@@ -38,17 +42,21 @@ def calcular_metricas_capacidade(turnos):
         "percentual_uso": percentual_uso
     }
 
-def calcular_capacidade():
+def calcular_capacidade(db_session=None, company_id=None):
     """
-    Calcula a capacidade de produção da fábrica baseada nos turnos ativos.
+    Compara a capacidade de produção de 1, 2 e 3 turnos e, com base no
+    estoque e na demanda dos produtos, recomenda o número mínimo de turnos.
     
     Esta função demonstra conceitos de:
-    - Entrada e validação de dados numéricos
     - Operações matemáticas básicas (multiplicação)
     - Cálculo de porcentagens
-    - Análise de capacidade ociosa
+    - Comparação de cenários lado a lado
     - Formatação de números com separadores de milhar
     
+    Args:
+        db_session: Sessão do banco (se None, abre uma própria)
+        company_id: Empresa dos produtos (None = produtos sem empresa)
+    
     MODO: Interativo para console
     """
     
@@ -57,83 +65,87 @@ def calcular_capacidade():
     print("="*50)
     
     # ========================================================================
-    # PASSO 1: DEFINIR A CAPACIDADE FIXA POR TURNO
+    # PASSO 1: CALCULAR AS TRÊS OPÇÕES DE UMA VEZ (USANDO FUNÇÁO PURA)
     # ========================================================================
-    # Este valor é fixo e representa quantas unidades cada turno pode produzir
-    # Em uma fábrica real, esse valor viria de estudos de tempos e movimentos
-    capacidade_por_turno = 1666  # unidades por turno
-    
-    print(f"\n Capacidade por turno: {capacidade_por_turno} unidades")
+    # Em vez de perguntar quantos turnos estarão ativos, as três opções são
+    # calculadas e exibidas lado a lado
+    opcoes = [calcular_metricas_capacidade(turnos) for turnos in (1, 2, 3)]
+    
+    print(f"\n Capacidade por turno: {opcoes[0]['capacidade_por_turno']} unidades")
+    print("\n" + f"{'':<20}" + "".join(f"{str(d['turnos']) + ' turno(s)':>12}" for d in opcoes))
+    for rotulo, chave in (("Capacidade Diaria", "capacidade_diaria"),
+                          ("Capacidade Mensal", "capacidade_mensal"),
+                          ("Capacidade Anual", "capacidade_anual"),
+                          ("Ociosa por Dia", "diferenca")):
+        print(f" {rotulo:<19}" + "".join(f"{d[chave]:>12,}".replace(',', '.') for d in opcoes))
+    print(f" {'Percentual de Uso':<19}" + "".join(f"{d['percentual_uso']:>11.1f}%" for d in opcoes))
     
     # ========================================================================
-    # PASSO 2: PERGUNTAR QUANTOS TURNOS ESTARÁO ATIVOS
+    # PASSO 2: CRUZAR COM O ESTOQUE E A DEMANDA DOS PRODUTOS
     # ========================================================================
-    # A empresa pode operar em 1, 2 ou 3 turnos dependendo da demanda
-    print("\n Turnos disponiveis: Manha, Tarde, Noite")
-    
+    # Estoque atual + previsão de demanda de todos os produtos, em um único
+    # cálculo vetorizado (veja planejamento_producao.py)
     try:
-        # input() captura o texto digitado pelo usuário
-        # int() converte o texto para número inteiro
-        turnos = int(input("Quantos turnos estarao ativos (1, 2 ou 3)? "))
-        
-        # ====================================================================
-        # VALIDAÇÁO: Verificar se o número está entre 1 e 3
-        # ====================================================================
-        # Não faz sentido ter 0 turnos ou mais de 3 turnos (máximo possível)
-        if turnos < 1 or turnos > 3:
-            print("\n Erro: Por favor, escolha entre 1, 2 ou 3 turnos.")
-            return  # Comando 'return' encerra a execução da função
-            
-    except ValueError:
-        # ====================================================================
-        # TRATAMENTO DE EXCEÇÁO
-        # ====================================================================
-        # Se o usuário digitar texto (ex: "abc"), int() gera ValueError
-        # O bloco except captura esse erro e exibe mensagem amigável
-        print("\n Erro: Digite apenas numeros inteiros!")
+        from planejamento_producao import planejar_producao
+        from previsao_demanda import _filtro_empresa, prever_empresa
+        from database import SessionLocal, PrevisaoDemanda
+    except ImportError as e:
+        print(f"\n [AVISO] Comparacao com a demanda indisponivel: {e}")
+        print("="*50)
         return
-        
-    # ========================================================================
-    # PASSO 3: REALIZAR OS CÁLCULOS DE CAPACIDADE (USANDO FUNÇÁO PURA)
-    # ========================================================================
-    
-    dados = calcular_metricas_capacidade(turnos)
     
-    capacidade_diaria = dados['capacidade_diaria']
-    capacidade_mensal = dados['capacidade_mensal']
-    capacidade_anual = dados['capacidade_anual']
-    percentual_uso = dados['percentual_uso']
-    diferenca = dados['diferenca']
-    capacidade_maxima_diaria = dados['capacidade_maxima_diaria']
+    sessao_propria = db_session is None
+    if sessao_propria:
+        db_session = SessionLocal()
+    try:
+        # Sem previsão calculada ainda: calcula agora a partir do histórico de vendas
+        if db_session.query(PrevisaoDemanda.id).filter(
+                _filtro_empresa(PrevisaoDemanda.company_id, company_id)).first() is None:
+            prever_empresa(db_session, company_id)
+        plano = planejar_producao(db_session, company_id, limite_rupturas=5)
+    except Exception as e:
+        print(f"\n [AVISO] Nao foi possivel comparar com o estoque: {e}")
+        print("="*50)
+        return
+    finally:
+        if sessao_propria:
+            db_session.close()
     
     # ========================================================================
-    # PASSO 5: EXIBIR RELATÓRIO COMPLETO
+    # PASSO 3: EXIBIR A RECOMENDAÇÁO
     # ========================================================================
-    # Apresenta os resultados formatados de forma clara e organizada
     print("\n" + "="*50)
-    print(f"   RESULTADOS PARA {turnos} TURNO(S)")
+    print(f"   ESTOQUE x DEMANDA (PROXIMOS {plano['horizonte_dias']} DIAS)")
     print("="*50)
     
-    # replace(',', '.') converte separador americano para brasileiro
-    print(f"\n Capacidade Diaria:  {capacidade_diaria:,} unidades".replace(',', '.'))
-    print(f" Capacidade Mensal:  {capacidade_mensal:,} unidades".replace(',', '.'))
-    print(f" Capacidade Anual:   {capacidade_anual:,} unidades".replace(',', '.'))
-    
-    # .1f = uma casa decimal
-    print(f"\n Percentual de Uso:  {percentual_uso:.1f}% da capacidade maxima")
+    if plano["produtos_com_demanda"] == 0:
+        print("\n Nenhum produto com demanda prevista (sem historico de vendas).")
+        print("   Qualquer opcao de turnos atende.")
+        print("="*50)
+        return
     
-    # ========================================================================
-    # ANÁLISE DA CAPACIDADE (DECISÁO BASEADA EM LÓGICA)
-    # ========================================================================
-    # Verifica se há capacidade ociosa (não utilizada)
-    if diferenca > 0:
-        print(f"\n A fabrica esta operando ABAIXO da capacidade maxima.")
-        print(f"   Diferenca: {diferenca:,} unidades/dia nao produzidas".replace(',', '.'))
-        print(f"   Isso representa {capacidade_maxima_diaria - capacidade_diaria:,} unidades/dia de capacidade ociosa.".replace(',', '.'))
+    print(f"\n Produtos com demanda: {plano['produtos_com_demanda']:,} de {plano['produtos']:,}".replace(',', '.'))
+    print(f" Producao necessaria:  {plano['necessidade_producao']:,.0f} unidades".replace(',', '.'))
+    print(f" Capacidade minima:    {plano['capacidade_diaria_necessaria']:,.0f} unidades/dia".replace(',', '.'))
+    print()
+    for cenario in plano["cenarios"]:
+        if cenario["atende"]:
+            situacao = f"atende (folga de {cenario['folga_final']:,.0f} un)".replace(',', '.')
+        else:
+            situacao = f"falta estoque em {cenario['data_primeira_falta']}"
+        print(f" {cenario['cenario']:<12} {situacao}")
+    
+    # Verifica qual é o menor número de turnos que evita faltas
+    if plano["cenario_minimo"]:
+        print(f"\n RECOMENDACAO: operar com {plano['cenario_minimo']}.")
     else:
-        # Se diferença = 0, todos os 3 turnos estão ativos
-        print("\n A fabrica esta operando em capacidade TOTAL (100%)!")
-        print("   Todos os turnos estao ativos e produzindo no maximo.")
+        print(f"\n Nem 3 turnos atendem: seriam necessarios {plano['turnos_necessarios']} turnos")
+        print("   (ou reduzir a demanda / comprar de terceiros).")
+    
+    if plano["rupturas"]:
+        print("\n Proximos produtos a acabar (sem producao):")
+        for r in plano["rupturas"]:
+            print(f"   - {r['nome']} (Codigo: {r['codigo']}): {r['data_ruptura']}")
     
     print("="*50)
 
@@ -0,0 +1,452 @@
+# ============================================================================
+# MÓDULO OUTBOX - EVENTOS DE ESTOQUE PARA OUTROS SISTEMAS (OUTBOX TRANSACIONAL)
+# ============================================================================
+# Sistemas externos (BI, e-commerce, balcão) precisam saber das entradas e
+# vendas sem varrer as tabelas de estoque. Com OUTBOX=1:
+#
+# - Cada movimentação gravada (entrada ou venda) grava também uma linha em
+#   eventos_outbox, no MESMO flush e na MESMA transação: se a venda for
+#   desfeita, o evento também é; se for confirmada, o evento existe.
+# - O relay (processo separado ou thread) lê os eventos em lotes, em ordem
+#   de id ("WHERE id > :cursor ORDER BY id LIMIT :lote", pela chave
+#   primária), entrega o lote ao destino e só DEPOIS grava o cursor do
+#   consumidor em outbox_cursores. Se cair entre a entrega e o cursor, o
+#   lote é entregue de novo: entrega "pelo menos uma vez". Cada evento leva
+#   o seu id; consumidores que não toleram repetição descartam ids já vistos.
+# - Transações confirmadas fora da ordem dos ids (PostgreSQL: um id menor
+#   confirmado depois de um maior) deixam lacunas; o relay as procura de
+#   novo por OUTBOX_ESPERA_LACUNA segundos antes de considerá-las desfeitas,
+#   e o cursor gravado nunca passa da primeira lacuna pendente.
+# - O relay consulta a cada OUTBOX_INTERVALO_MS (padrão 200 ms) e, no mesmo
+#   processo, acorda logo após o commit: os consumidores recebem as
+#   alterações em menos de um segundo.
+# - Eventos entregues a TODOS os consumidores e mais antigos que
+#   OUTBOX_RETENCAO_HORAS são apagados em lotes pelo próprio relay.
+#
+# Cargas em massa (gerador_dados, cópias entre shards) não gravam eventos.
+# Com shards, cada shard tem o seu outbox: rode um relay por shard (--shard).
+#
+# DESTINOS (--destino ou OUTBOX_DESTINO):
+#   arquivo:eventos.jsonl     acrescenta um JSON por linha (com fsync)
+#   socket:/tmp/estoque.sock  envia um JSON por linha a um socket Unix local
+#   tcp:127.0.0.1:9100        idem, por TCP (ex: Windows)
+#   fila                      fila em memória (outbox.fila), relay em thread
+#   log                       imprime no console
+# Outros destinos: registrar_destino(nome, funcao), onde funcao recebe a
+# lista de eventos do lote e levanta exceção se não conseguir entregar.
+#
+# USO:
+#   python outbox.py relay --destino arquivo:eventos.jsonl --consumidor bi
+#   python outbox.py status
+#   python outbox.py limpar
+# ============================================================================
+
+import argparse
+import json
+import os
+import queue
+import socket
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, event, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+from database import CursorOutbox, EventoOutbox, MovimentacaoEstoque, Produto, espera_com_jitter
+from metricas import OUTBOX_ATRASO, OUTBOX_ENTREGUES
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+ATIVO = os.getenv("OUTBOX", "0") == "1"
+DESTINO_PADRAO = os.getenv("OUTBOX_DESTINO", "arquivo:eventos_estoque.jsonl")
+INTERVALO_MS = int(os.getenv("OUTBOX_INTERVALO_MS", "200"))
+TAMANHO_LOTE = int(os.getenv("OUTBOX_LOTE", "500"))
+ESPERA_LACUNA = float(os.getenv("OUTBOX_ESPERA_LACUNA", "10"))
+RETENCAO_HORAS = float(os.getenv("OUTBOX_RETENCAO_HORAS", "24"))
+LIMPEZA_A_CADA = 60               # segundos entre limpezas feitas pelo relay
+MAXIMO_LACUNAS = 10000            # lacunas acompanhadas por relay (saltos maiores são ignorados)
+
+EVENTO_ENTRADA = "estoque_entrada"
+EVENTO_SAIDA = "estoque_saida"
+_TIPOS_MOVIMENTACAO = {"entrada": EVENTO_ENTRADA, "saida": EVENTO_SAIDA}
+
+_CHAVE_ESCREVEU = "outbox_escreveu"
+_novos_eventos = threading.Event()   # acorda o relay do mesmo processo após o commit
+
+# ============================================================================
+# GRAVAÇÃO DOS EVENTOS (MESMA TRANSAÇÃO DA MOVIMENTAÇÃO)
+# ============================================================================
+
+def _evento_da_movimentacao(session, movimentacao):
+    # O produto já está na sessão (foi alterado neste flush): sem consulta extra
+    produto = session.get(Produto, movimentacao.produto_id)
+    return {
+        "company_id": movimentacao.company_id,
+        "tipo": _TIPOS_MOVIMENTACAO.get(movimentacao.tipo, f"estoque_{movimentacao.tipo}"),
+        "produto_id": movimentacao.produto_id,
+        "dados": json.dumps({
+            "movimentacao_id": movimentacao.id,
+            "codigo": produto.codigo if produto is not None else None,
+            "nome": produto.nome if produto is not None else None,
+            "quantidade": movimentacao.quantidade,
+            "saldo": produto.quantidade if produto is not None else None,
+            "valor_unitario": movimentacao.valor_unitario,
+            "versao": produto.versao if produto is not None else None,
+            "data_hora": movimentacao.data_hora.isoformat() if movimentacao.data_hora else None,
+        }, ensure_ascii=False),
+        "criado_em": datetime.utcnow(),
+    }
+
+
+def _gravar_apos_flush(session, flush_context):
+    """Grava um evento por movimentação nova deste flush (mesma conexão e transação)."""
+    linhas = [_evento_da_movimentacao(session, objeto) for objeto in session.new
+              if isinstance(objeto, MovimentacaoEstoque)]
+    if linhas:
+        session.connection().execute(insert(EventoOutbox), linhas)
+        session.info[_CHAVE_ESCREVEU] = True
+
+
+def _avisar_apos_commit(session):
+    if session.info.pop(_CHAVE_ESCREVEU, None):
+        _novos_eventos.set()
+
+
+def registrar_evento(db_session, tipo, dados, company_id=None, produto_id=None):
+    """Grava um evento de outro tipo na transação da sessão (confirmado no commit dela)."""
+    db_session.add(EventoOutbox(company_id=company_id, tipo=tipo, produto_id=produto_id,
+                                dados=json.dumps(dados, ensure_ascii=False, default=str)))
+    db_session.info[_CHAVE_ESCREVEU] = True
+
+
+def ativar():
+    """Passa a gravar eventos em todas as sessões (o mesmo que OUTBOX=1)."""
+    if not event.contains(Session, "after_flush", _gravar_apos_flush):
+        event.listen(Session, "after_flush", _gravar_apos_flush)
+        event.listen(Session, "after_commit", _avisar_apos_commit)
+
+
+def desativar():
+    if event.contains(Session, "after_flush", _gravar_apos_flush):
+        event.remove(Session, "after_flush", _gravar_apos_flush)
+        event.remove(Session, "after_commit", _avisar_apos_commit)
+
+
+if ATIVO:
+    ativar()
+
+# ============================================================================
+# DESTINOS (ARQUIVO, SOCKET LOCAL, FILA, LOG)
+# ============================================================================
+
+def destino_log(eventos):
+    for evento in eventos:
+        print(f"[OUTBOX] #{evento['id']} {evento['tipo']}: produto {evento['produto_id']} "
+              f"(empresa {evento['company_id']}) {evento.get('quantidade')} un, saldo {evento.get('saldo')}",
+              file=sys.stderr)
+
+
+def _linhas_json(eventos):
+    return "".join(json.dumps(evento, ensure_ascii=False) + "\n" for evento in eventos)
+
+
+class DestinoArquivo:
+    """Acrescenta o lote no arquivo, um JSON por linha, e só retorna após o fsync."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+
+    def __call__(self, eventos):
+        with open(self.caminho, "a", encoding="utf-8") as arquivo:
+            arquivo.write(_linhas_json(eventos))
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+
+class DestinoSocket:
+    """Envia o lote, um JSON por linha, a um socket Unix ("/caminho") ou TCP (("host", porta))."""
+
+    def __init__(self, endereco):
+        self.endereco = endereco
+        self._conexao = None
+
+    def _conectar(self):
+        if isinstance(self.endereco, tuple):
+            return socket.create_connection(self.endereco, timeout=5)
+        conexao = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conexao.settimeout(5)
+        conexao.connect(self.endereco)
+        return conexao
+
+    def __call__(self, eventos):
+        try:
+            if self._conexao is None:
+                self._conexao = self._conectar()
+            self._conexao.sendall(_linhas_json(eventos).encode("utf-8"))
+        except OSError:
+            self.fechar()   # reconecta na próxima tentativa (o lote é reenviado)
+            raise
+
+    def fechar(self):
+        if self._conexao is not None:
+            self._conexao.close()
+            self._conexao = None
+
+
+# Fila local para consumidores no mesmo processo (relay em thread: iniciar_relay)
+fila = queue.Queue()
+
+def destino_fila(eventos):
+    for evento in eventos:
+        fila.put(evento)
+
+
+_destinos_registrados = {"log": destino_log, "fila": destino_fila}
+
+
+def registrar_destino(nome, destino):
+    """Registra um destino pelo nome: função que recebe a lista de eventos do lote."""
+    _destinos_registrados[nome] = destino
+
+
+def destino_do_texto(texto):
+    """Cria o destino a partir de "arquivo:...", "socket:...", "tcp:host:porta" ou um nome registrado."""
+    texto = texto.strip()
+    if texto.startswith("arquivo:"):
+        return DestinoArquivo(texto[len("arquivo:"):])
+    if texto.startswith("socket:"):
+        return DestinoSocket(texto[len("socket:"):])
+    if texto.startswith("tcp:"):
+        host, _, porta = texto[len("tcp:"):].rpartition(":")
+        return DestinoSocket((host or "127.0.0.1", int(porta)))
+    if texto in _destinos_registrados:
+        return _destinos_registrados[texto]
+    raise ValueError(f"Destino do outbox desconhecido: {texto}")
+
+# ============================================================================
+# RELAY (LEITURA POR CURSOR E ENTREGA PELO MENOS UMA VEZ)
+# ============================================================================
+
+def _evento_para_dict(linha):
+    evento = {"id": linha.id, "tipo": linha.tipo, "company_id": linha.company_id,
+              "produto_id": linha.produto_id, "criado_em": linha.criado_em.isoformat()}
+    evento.update(json.loads(linha.dados))
+    return evento
+
+
+class Relay:
+    """
+    Entrega os eventos do outbox a um destino, em ordem de id.
+
+    Args:
+        destino: Função que recebe a lista de eventos (ou texto, ver destino_do_texto)
+        consumidor: Nome do cursor em outbox_cursores (um por destino)
+        bind: Engine do banco (padrão: database.engine)
+    """
+
+    def __init__(self, destino, consumidor="padrao", bind=None, tamanho_lote=None, intervalo_ms=None):
+        if bind is None:
+            from database import engine as bind
+        self.destino = destino_do_texto(destino) if isinstance(destino, str) else destino
+        self.consumidor = consumidor
+        self.bind = bind
+        self.tamanho_lote = tamanho_lote or TAMANHO_LOTE
+        self.intervalo = (INTERVALO_MS if intervalo_ms is None else intervalo_ms) / 1000
+        self._entregues = OUTBOX_ENTREGUES.rotulos(consumidor)
+        self._maximo = self._ler_cursor()   # maior id já entregue por este relay
+        self._lacunas = {}                  # id ainda não visto -> quando a lacuna apareceu
+        self._ultima_limpeza = time.monotonic()
+
+    def _ler_cursor(self):
+        with self.bind.connect() as conn:
+            ultimo = conn.execute(select(CursorOutbox.ultimo_id)
+                                  .where(CursorOutbox.nome == self.consumidor)).scalar()
+        return ultimo or 0
+
+    def _gravar_cursor(self):
+        # Nunca passa da primeira lacuna pendente: num reinício, ela é lida de novo
+        cursor = min(self._lacunas) - 1 if self._lacunas else self._maximo
+        agora = datetime.utcnow()
+        with self.bind.begin() as conn:
+            alteradas = conn.execute(CursorOutbox.__table__.update()
+                                     .where(CursorOutbox.nome == self.consumidor)
+                                     .values(ultimo_id=cursor, atualizado_em=agora)).rowcount
+            if not alteradas:
+                conn.execute(insert(CursorOutbox).values(nome=self.consumidor, ultimo_id=cursor, atualizado_em=agora))
+
+    def _ler_lote(self):
+        condicao = EventoOutbox.id > self._maximo
+        if self._lacunas:
+            condicao = or_(condicao, EventoOutbox.id.in_(list(self._lacunas)))
+        with self.bind.connect() as conn:
+            return conn.execute(select(EventoOutbox).where(condicao)
+                                .order_by(EventoOutbox.id).limit(self.tamanho_lote)).all()
+
+    def _avancar(self, linhas):
+        agora = time.monotonic()
+        for linha in linhas:
+            if self._lacunas.pop(linha.id, None) is not None:
+                continue
+            if linha.id - self._maximo - 1 + len(self._lacunas) <= MAXIMO_LACUNAS:
+                for faltante in range(self._maximo + 1, linha.id):
+                    self._lacunas[faltante] = agora
+            self._maximo = max(self._maximo, linha.id)
+        # Lacunas antigas: transação desfeita (o id nunca será confirmado)
+        for faltante in [i for i, desde in self._lacunas.items() if agora - desde > ESPERA_LACUNA]:
+            del self._lacunas[faltante]
+
+    def executar_uma_vez(self):
+        """Lê e entrega um lote; devolve quantos eventos foram entregues."""
+        linhas = self._ler_lote()
+        if not linhas:
+            if self._lacunas:
+                self._avancar([])
+            return 0
+        self.destino([_evento_para_dict(linha) for linha in linhas])   # exceção: o cursor não anda
+        self._avancar(linhas)
+        self._gravar_cursor()
+        agora = datetime.utcnow()
+        for linha in linhas:
+            OUTBOX_ATRASO.observar((agora - linha.criado_em).total_seconds())
+        self._entregues.inc(len(linhas))
+        return len(linhas)
+
+    def executar(self, parar=None):
+        """Entrega continuamente até `parar` (threading.Event) ser acionado."""
+        parar = parar or threading.Event()
+        falhas = 0
+        while not parar.is_set():
+            try:
+                entregues = self.executar_uma_vez()
+                falhas = 0
+            except Exception as e:
+                falhas += 1
+                print(f"[ERRO] Relay do outbox ({self.consumidor}): {e}", file=sys.stderr)
+                parar.wait(espera_com_jitter(falhas, base_ms=100, maximo_ms=5000))
+                continue
+            if time.monotonic() - self._ultima_limpeza > LIMPEZA_A_CADA:
+                self._ultima_limpeza = time.monotonic()
+                try:
+                    limpar_entregues(self.bind, um_lote=True)
+                except Exception as e:
+                    print(f"[ERRO] Limpeza do outbox: {e}", file=sys.stderr)
+            if entregues < self.tamanho_lote:
+                _novos_eventos.wait(self.intervalo)
+                _novos_eventos.clear()
+
+
+def iniciar_relay(destino="fila", consumidor="padrao", bind=None):
+    """Roda o relay numa thread do processo; devolve o evento que o encerra (parar.set())."""
+    parar = threading.Event()
+    relay = Relay(destino, consumidor, bind)
+    threading.Thread(target=relay.executar, args=(parar,), name=f"outbox-{consumidor}", daemon=True).start()
+    return parar
+
+# ============================================================================
+# RETENÇÃO E SITUAÇÃO DOS CONSUMIDORES
+# ============================================================================
+
+def limpar_entregues(bind=None, retencao_horas=None, tamanho_lote=1000, um_lote=False):
+    """
+    Apaga os eventos já entregues a todos os consumidores e mais antigos que a retenção.
+
+    Returns:
+        int: Eventos apagados
+    """
+    if bind is None:
+        from database import engine as bind
+    limite = datetime.utcnow() - timedelta(hours=RETENCAO_HORAS if retencao_horas is None else retencao_horas)
+    with bind.connect() as conn:
+        entregue_a_todos = conn.execute(select(func.min(CursorOutbox.ultimo_id))).scalar()
+    if not entregue_a_todos:
+        return 0   # nenhum consumidor ainda: nada pode ser apagado
+    total = 0
+    while True:
+        with bind.begin() as conn:
+            ids = conn.execute(
+                select(EventoOutbox.id).where(EventoOutbox.id <= entregue_a_todos, EventoOutbox.criado_em < limite)
+                .order_by(EventoOutbox.id).limit(tamanho_lote)
+            ).scalars().all()
+            if ids:
+                conn.execute(delete(EventoOutbox).where(EventoOutbox.id.in_(ids)))
+        total += len(ids)
+        if um_lote or len(ids) < tamanho_lote:
+            return total
+
+
+def situacao(bind=None):
+    """Cursor e eventos pendentes de cada consumidor."""
+    if bind is None:
+        from database import engine as bind
+    with bind.connect() as conn:
+        ultimo = conn.execute(select(func.max(EventoOutbox.id))).scalar() or 0
+        cursores = conn.execute(select(CursorOutbox).order_by(CursorOutbox.nome)).all()
+        return {
+            "ultimo_evento": ultimo,
+            "consumidores": [{
+                "consumidor": c.nome,
+                "ultimo_id": c.ultimo_id,
+                "pendentes": conn.execute(select(func.count()).where(EventoOutbox.id > c.ultimo_id)).scalar(),
+                "atualizado_em": c.atualizado_em.isoformat(),
+            } for c in cursores],
+        }
+
+# ============================================================================
+# INTERFACE DE LINHA DE COMANDO
+# ============================================================================
+
+def _engine_do_argumento(shard):
+    if shard:
+        from shards import engine_do_shard
+        return engine_do_shard(shard)
+    from database import engine, init_db
+    init_db()
+    return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Outbox de eventos de estoque")
+    acoes = parser.add_subparsers(dest="acao", required=True)
+    p = acoes.add_parser("relay", help="Entrega os eventos continuamente ao destino")
+    p.add_argument("--destino", default=DESTINO_PADRAO, help="arquivo:..., socket:..., tcp:host:porta, fila ou log")
+    p.add_argument("--consumidor", default="padrao", help="Nome do cursor (um por destino)")
+    p.add_argument("--lote", type=int, default=TAMANHO_LOTE, help="Eventos por leitura")
+    p.add_argument("--intervalo-ms", type=int, default=INTERVALO_MS, help="Espera entre leituras sem eventos")
+    p.add_argument("--uma-vez", action="store_true", help="Entrega o que está pendente e termina")
+    for nome, ajuda in (("status", "Cursor e pendências de cada consumidor"),
+                        ("limpar", "Apaga os eventos entregues a todos e fora da retenção")):
+        acoes.add_parser(nome, help=ajuda)
+    for sub in acoes.choices.values():
+        sub.add_argument("--shard", help="Shard do outbox (padrão: banco principal)")
+    args = parser.parse_args(argv)
+
+    bind = _engine_do_argumento(args.shard)
+    if args.acao == "status":
+        print(json.dumps(situacao(bind), ensure_ascii=False, indent=2))
+    elif args.acao == "limpar":
+        print(f"{limpar_entregues(bind)} evento(s) do outbox apagado(s).")
+    else:
+        relay = Relay(args.destino, args.consumidor, bind, args.lote, args.intervalo_ms)
+        if args.uma_vez:
+            total = 0
+            while (entregues := relay.executar_uma_vez()):
+                total += entregues
+            print(f"{total} evento(s) entregue(s) a '{args.consumidor}'.", file=sys.stderr)
+        else:
+            print(f"[OUTBOX] Relay '{args.consumidor}' -> {args.destino} (Ctrl+C para encerrar)", file=sys.stderr)
+            try:
+                relay.executar()
+            except KeyboardInterrupt:
+                pass
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+# ============================================================================
+# FIM DO MÓDULO OUTBOX
+# ============================================================================
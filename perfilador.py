@@ -0,0 +1,244 @@
+# ============================================================================
+# MÓDULO PERFILADOR - MODO --profile DOS APLICATIVOS DE CONSOLE
+# ============================================================================
+# Com "python main.py --profile" (ou main_auth.py), cada invocação de módulo
+# do menu (vender_produto, cadastrar_produtos, exibir_menu_principal...) é
+# executada sob dois perfiladores e gera arquivos próprios:
+#
+#   perfis/0003_estoque_saida.vender_produto.pstats     cProfile (determinístico)
+#   perfis/0003_estoque_saida.vender_produto.collapsed  pilhas amostradas, no
+#       formato "collapsed" (uma linha "f1;f2;f3 N" por pilha), aceito por
+#       flamegraph.pl, speedscope e inferno
+#   perfis/resumo.jsonl                                 uma linha por invocação
+#
+# e uma linha no stderr com o tempo de parede, o tempo esperando o usuário
+# digitar (input), o tempo ativo, o tempo em SQL e o número de comandos:
+#
+#   [PERFIL] estoque_saida.vender_produto   parede 9.840 s | input 9.412 s | ativo 0.428 s | SQL 121.3 ms (37 cmd)
+#
+# Ao sair, uma tabela soma os números por módulo, lado a lado.
+#
+# O tempo e os comandos de SQL vêm da instrumentação de database.py
+# (operacao_sql), ligada automaticamente no modo --profile.
+#
+# O amostrador é uma thread que lê a pilha da thread principal a cada
+# PERFIL_INTERVALO_MS (padrão 5 ms) com sys._current_frames(); as amostras
+# tiradas enquanto o programa espera o input ganham a folha
+# "[aguardando input]", para separar lentidão do sistema de tempo do usuário.
+#
+# Lendo os arquivos:
+#   python -m pstats perfis/0003_estoque_saida.vender_produto.pstats
+#   flamegraph.pl perfis/0003_estoque_saida.vender_produto.collapsed > venda.svg
+#
+# Este módulo usa apenas a biblioteca padrão.
+# ============================================================================
+
+import atexit
+import builtins
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+PASTA_PADRAO = "perfis"
+INTERVALO_PADRAO_MS = float(os.getenv("PERFIL_INTERVALO_MS", "5"))
+FOLHA_INPUT = "[aguardando input]"
+
+# ============================================================================
+# ESTADO
+# ============================================================================
+_config = {"pasta": None, "intervalo": INTERVALO_PADRAO_MS / 1000}
+_sequencia = [0]
+_resumo = {}            # "modulo.funcao" -> [invocações, parede, input, SQL, comandos]
+_em_andamento = [None]  # invocação atual (não há perfis aninhados)
+
+
+def ativar(pasta=None, intervalo_ms=None):
+    """Liga o modo --profile: os arquivos vão para pasta (padrão ./perfis)."""
+    _config["pasta"] = pasta or PASTA_PADRAO
+    if intervalo_ms:
+        _config["intervalo"] = intervalo_ms / 1000
+    os.makedirs(_config["pasta"], exist_ok=True)
+    atexit.register(exibir_resumo)
+    print(f"[PERFIL] Perfis de cada módulo serão gravados em {os.path.abspath(_config['pasta'])}",
+          file=sys.stderr)
+
+
+def ativo():
+    return _config["pasta"] is not None
+
+# ============================================================================
+# AMOSTRADOR DE PILHAS (FORMATO COLLAPSED)
+# ============================================================================
+
+class _Amostrador(threading.Thread):
+    """Lê a pilha da thread alvo a intervalos fixos e conta as pilhas iguais."""
+
+    def __init__(self, invocacao, intervalo):
+        super().__init__(name="amostrador-perfil", daemon=True)
+        self.invocacao = invocacao
+        self.intervalo = intervalo
+        self.alvo = threading.get_ident()
+        self.pilhas = {}
+        self._parar = threading.Event()
+
+    def run(self):
+        while not self._parar.wait(self.intervalo):
+            quadro = sys._current_frames().get(self.alvo)
+            nomes = []
+            # Sobe até o envoltório da invocação: o que está acima dele
+            # (loop do menu) é igual em todas as amostras
+            while quadro is not None and quadro.f_code is not _CODIGO_ENVOLTORIO:
+                codigo = quadro.f_code
+                nomes.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                quadro = quadro.f_back
+            nomes.reverse()
+            if self.invocacao.aguardando_input:
+                nomes.append(FOLHA_INPUT)
+            if nomes:
+                pilha = ";".join(nomes)
+                self.pilhas[pilha] = self.pilhas.get(pilha, 0) + 1
+
+    def parar(self):
+        self._parar.set()
+        self.join()
+
+# ============================================================================
+# INVOCAÇÃO PERFILADA
+# ============================================================================
+
+class _Invocacao:
+    """Mede uma chamada: parede, espera por input, SQL, cProfile e amostras."""
+
+    def __init__(self, nome):
+        self.nome = nome
+        self.aguardando_input = False
+        self.segundos_input = 0.0
+
+    def input_medido(self, *args):
+        self.aguardando_input = True
+        inicio = time.perf_counter()
+        try:
+            return _input_original(*args)
+        finally:
+            self.segundos_input += time.perf_counter() - inicio
+            self.aguardando_input = False
+
+
+_input_original = builtins.input
+
+
+def _operacao_sql(nome):
+    """operacao_sql() de database.py, ligando a instrumentação se preciso."""
+    from database import ativar_instrumentacao, instrumentacao_ativa, operacao_sql
+    if not instrumentacao_ativa():
+        ativar_instrumentacao()
+    return operacao_sql(nome)
+
+
+def envolver(nome_modulo, nome_funcao, funcao):
+    """Devolve a função envolvida pelo perfil (sem --profile, a própria função)."""
+    if not ativo():
+        return funcao
+
+    nome = f"{nome_modulo}.{nome_funcao}"
+
+    @functools.wraps(funcao)
+    def envoltorio(*args, **kwargs):
+        if _em_andamento[0] is not None:
+            return funcao(*args, **kwargs)   # chamada dentro de outra invocação perfilada
+        return _executar_perfilado(nome, funcao, args, kwargs)
+    return envoltorio
+
+
+def _executar_perfilado(nome, funcao, args, kwargs):
+    invocacao = _em_andamento[0] = _Invocacao(nome)
+    amostrador = _Amostrador(invocacao, _config["intervalo"])
+    perfil = cProfile.Profile()
+    builtins.input = invocacao.input_medido
+    try:
+        with _operacao_sql(nome) as operacao:
+            inicio = time.perf_counter()
+            amostrador.start()
+            perfil.enable()
+            try:
+                return funcao(*args, **kwargs)
+            finally:
+                perfil.disable()
+                parede = time.perf_counter() - inicio
+                amostrador.parar()
+                _registrar(invocacao, parede, operacao, perfil, amostrador.pilhas)
+    finally:
+        builtins.input = _input_original
+        _em_andamento[0] = None
+
+
+def _registrar(invocacao, parede, operacao, perfil, pilhas):
+    """Grava .pstats, .collapsed e a linha do resumo, e imprime a linha no stderr."""
+    _sequencia[0] += 1
+    base = os.path.join(_config["pasta"], f"{_sequencia[0]:04d}_{invocacao.nome}")
+    perfil.dump_stats(base + ".pstats")
+    with open(base + ".collapsed", "w", encoding="utf-8") as arquivo:
+        for pilha, amostras in sorted(pilhas.items()):
+            arquivo.write(f"{pilha} {amostras}\n")
+
+    dados = {
+        "sequencia": _sequencia[0],
+        "modulo": invocacao.nome,
+        "inicio": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "parede_s": round(parede, 6),
+        "input_s": round(invocacao.segundos_input, 6),
+        "ativo_s": round(parede - invocacao.segundos_input, 6),
+        "sql_s": round(operacao.segundos, 6),
+        "comandos_sql": operacao.comandos,
+        "amostras": sum(pilhas.values()),
+        "pstats": base + ".pstats",
+        "collapsed": base + ".collapsed",
+    }
+    with open(os.path.join(_config["pasta"], "resumo.jsonl"), "a", encoding="utf-8") as arquivo:
+        arquivo.write(json.dumps(dados, ensure_ascii=False) + "\n")
+
+    total = _resumo.setdefault(invocacao.nome, [0, 0.0, 0.0, 0.0, 0])
+    total[0] += 1
+    total[1] += parede
+    total[2] += invocacao.segundos_input
+    total[3] += operacao.segundos
+    total[4] += operacao.comandos
+
+    print(f"[PERFIL] {invocacao.nome:<40} parede {parede:.3f} s | input {dados['input_s']:.3f} s | "
+          f"ativo {dados['ativo_s']:.3f} s | SQL {operacao.segundos * 1000:.1f} ms ({operacao.comandos} cmd)",
+          file=sys.stderr)
+
+
+_CODIGO_ENVOLTORIO = _executar_perfilado.__code__
+
+# ============================================================================
+# RESUMO POR MÓDULO
+# ============================================================================
+
+def exibir_resumo(arquivo=None):
+    """Tabela por módulo: invocações, parede, input, ativo, SQL e comandos."""
+    if not _resumo:
+        return
+    arquivo = arquivo or sys.stderr
+    print("\n" + "=" * 100, file=arquivo)
+    print("   PERFIL POR MÓDULO (tempos em segundos)", file=arquivo)
+    print("=" * 100, file=arquivo)
+    print(f"   {'Módulo':<40} {'Vezes':>6} {'Parede':>9} {'Input':>9} {'Ativo':>9} {'SQL':>9} {'Comandos':>9}",
+          file=arquivo)
+    print("-" * 100, file=arquivo)
+    for nome, (vezes, parede, entrada, sql, comandos) in sorted(_resumo.items(), key=lambda i: -(i[1][1] - i[1][2])):
+        print(f"   {nome:<40} {vezes:>6} {parede:>9.3f} {entrada:>9.3f} {parede - entrada:>9.3f} "
+              f"{sql:>9.3f} {comandos:>9}", file=arquivo)
+    print("=" * 100, file=arquivo)
+    print(f"   Arquivos em {os.path.abspath(_config['pasta'])}", file=arquivo)
+
+# ============================================================================
+# FIM DO MÓDULO PERFILADOR
+# ============================================================================
@@ -0,0 +1,320 @@
+# ============================================================================
+# MÓDULO PLANEJAMENTO_CAPACIDADE - CAPACIDADE DE PRODUÇÃO POR CALENDÁRIO
+# ============================================================================
+# O módulo operacional calcula a capacidade com valores fixos (1666
+# unidades por turno, meses de 30 dias). Este módulo calcula a capacidade
+# real a partir de DADOS:
+#
+#   - linhas de produção, cada uma com sua produção por hora
+#   - turnos de cada linha (horas e dias da semana em que funcionam)
+#   - feriados (por fábrica) e paradas programadas (por linha)
+#
+# e produz a capacidade diária, mensal e anual de qualquer período, a
+# utilização em relação à demanda e à capacidade máxima teórica (24 h por
+# dia, todos os dias) e comparações "e se" entre várias configurações.
+#
+# CÁLCULO VETORIZADO (NUMPY):
+# O período vira um vetor de dias (datetime64). Dia da semana, feriados e
+# paradas são operações sobre o vetor inteiro, sem laço por dia. A
+# expansão do calendário de cada linha é guardada em cache (mesma linha e
+# mesmo período não são recalculados), então comparar dezenas de cenários
+# que compartilham linhas custa pouco.
+#
+# CONFIGURAÇÃO (dict ou arquivo JSON):
+#   {
+#     "nome": "Fábrica 1",
+#     "feriados": ["2026-12-25", "2027-01-01"],
+#     "linhas": [
+#       {"nome": "Linha A", "unidades_por_hora": 208.25,
+#        "trabalha_feriados": false,
+#        "turnos": [{"nome": "Manhã", "horas": 8, "dias_semana": [0, 1, 2, 3, 4]}],
+#        "paradas": [{"inicio": "2026-07-01", "fim": "2026-07-05", "horas_por_dia": 8}]}
+#     ]
+#   }
+# dias_semana: 0 = segunda ... 6 = domingo (padrão: todos os dias).
+# Em paradas, "fim" é inclusivo e horas_por_dia omitido para o dia inteiro.
+#
+# DEPENDÊNCIA OPCIONAL:
+#   pip install numpy
+#
+# USO:
+#   from planejamento_capacidade import calcular_capacidade_periodo, configuracao_padrao
+#   r = calcular_capacidade_periodo(configuracao_padrao(2), "2026-01-01", "2026-12-31")
+#   print(r["total"], r["mensal"])
+# ============================================================================
+
+import json
+from functools import lru_cache
+
+import numpy as np
+
+# ============================================================================
+# CONFIGURAÇÕES PADRÃO (EQUIVALENTES AO MÓDULO OPERACIONAL)
+# ============================================================================
+CAPACIDADE_POR_TURNO = 1666  # unidades por turno (mesmo valor de operacional.py)
+HORAS_POR_TURNO = 8
+NOMES_TURNOS = ["Manhã", "Tarde", "Noite"]
+TODOS_OS_DIAS = [0, 1, 2, 3, 4, 5, 6]
+
+# Expansões de calendário guardadas (linha + feriados + período)
+TAMANHO_CACHE_CALENDARIO = 1024
+
+
+def configuracao_padrao(turnos):
+    """
+    Configuração equivalente ao cálculo fixo de operacional.py: uma linha,
+    1666 unidades por turno de 8 horas, todos os dias, sem feriados.
+    """
+    return {
+        "nome": f"{turnos} turno(s)",
+        "feriados": [],
+        "linhas": [{
+            "nome": "Linha principal",
+            "unidades_por_hora": CAPACIDADE_POR_TURNO / HORAS_POR_TURNO,
+            "turnos": [
+                {"nome": NOMES_TURNOS[i], "horas": HORAS_POR_TURNO, "dias_semana": TODOS_OS_DIAS}
+                for i in range(turnos)
+            ],
+            "paradas": []
+        }]
+    }
+
+
+def carregar_configuracao(caminho):
+    """Lê a configuração de um arquivo JSON (um cenário ou uma lista de cenários)."""
+    with open(caminho, encoding="utf-8") as arquivo:
+        return json.load(arquivo)
+
+# ============================================================================
+# VALIDAÇÃO E NORMALIZAÇÃO (CONFIGURAÇÃO -> TUPLAS IMUTÁVEIS PARA O CACHE)
+# ============================================================================
+
+def _linha_congelada(linha):
+    """Converte a linha em tuplas (hashable), validando os valores."""
+    unidades_por_hora = float(linha.get("unidades_por_hora", 0))
+    if unidades_por_hora < 0:
+        raise ValueError(f"Linha '{linha.get('nome')}': unidades_por_hora não pode ser negativo")
+
+    horas_semana = [0.0] * 7
+    for turno in linha.get("turnos", []):
+        horas = float(turno.get("horas", HORAS_POR_TURNO))
+        if horas < 0 or horas > 24:
+            raise ValueError(f"Turno '{turno.get('nome')}': horas deve estar entre 0 e 24")
+        for dia in turno.get("dias_semana", TODOS_OS_DIAS):
+            if dia not in range(7):
+                raise ValueError(f"Turno '{turno.get('nome')}': dia da semana inválido ({dia})")
+            horas_semana[dia] += horas
+    if max(horas_semana) > 24:
+        raise ValueError(f"Linha '{linha.get('nome')}': turnos somam mais de 24 horas em um dia")
+
+    paradas = tuple(
+        (str(p["inicio"]), str(p.get("fim", p["inicio"])),
+         None if p.get("horas_por_dia") is None else float(p["horas_por_dia"]))
+        for p in linha.get("paradas", [])
+    )
+    return (unidades_por_hora, tuple(horas_semana), bool(linha.get("trabalha_feriados", False)), paradas)
+
+
+def _periodo(inicio, fim):
+    inicio = np.datetime64(str(inicio), "D")
+    fim = np.datetime64(str(fim), "D")
+    if fim < inicio:
+        raise ValueError("A data final deve ser igual ou posterior à inicial")
+    return inicio, fim
+
+# ============================================================================
+# EXPANSÃO DO CALENDÁRIO (VETORIZADA E EM CACHE)
+# ============================================================================
+
+@lru_cache(maxsize=TAMANHO_CACHE_CALENDARIO)
+def _horas_por_dia(linha, feriados, inicio, fim):
+    """
+    Horas produtivas de uma linha em cada dia do período.
+
+    Args:
+        linha: Linha congelada (_linha_congelada)
+        feriados: Tupla de datas "AAAA-MM-DD"
+        inicio, fim: numpy.datetime64 (dias), fim inclusivo
+
+    Returns:
+        numpy.ndarray: Horas por dia (somente leitura: é compartilhado pelo cache)
+    """
+    _, horas_semana, trabalha_feriados, paradas = linha
+    dias = np.arange(inicio, fim + 1, dtype="datetime64[D]")
+    # 1970-01-01 foi uma quinta-feira (dia 3 com segunda = 0)
+    dia_semana = (dias.astype(np.int64) + 3) % 7
+    horas = np.asarray(horas_semana)[dia_semana]
+
+    if feriados and not trabalha_feriados:
+        horas[np.isin(dias, np.array(feriados, dtype="datetime64[D]"))] = 0.0
+
+    if paradas:
+        # Horas perdidas por dia: soma das paradas, no máximo as horas do dia
+        n = len(dias)
+        perdidas = np.zeros(n + 1)
+        parada_inteira = np.zeros(n + 1)
+        for inicio_parada, fim_parada, horas_parada in paradas:
+            a = max(int((np.datetime64(inicio_parada, "D") - inicio).astype(int)), 0)
+            b = min(int((np.datetime64(fim_parada, "D") - inicio).astype(int)) + 1, n)
+            if a >= b:
+                continue
+            # Diferenças acumuladas: marca início e fim, depois cumsum
+            if horas_parada is None:
+                parada_inteira[a] += 1
+                parada_inteira[b] -= 1
+            else:
+                perdidas[a] += horas_parada
+                perdidas[b] -= horas_parada
+        horas = np.where(np.cumsum(parada_inteira)[:n] > 0, 0.0,
+                         np.maximum(horas - np.cumsum(perdidas)[:n], 0.0))
+
+    horas.setflags(write=False)
+    return horas
+
+
+def limpar_cache_calendario():
+    """Descarta as expansões de calendário guardadas."""
+    _horas_por_dia.cache_clear()
+
+
+def estatisticas_cache_calendario():
+    """Acertos e falhas do cache de calendário (functools.lru_cache)."""
+    info = _horas_por_dia.cache_info()
+    return {"acertos": info.hits, "falhas": info.misses, "entradas": info.currsize, "tamanho_maximo": info.maxsize}
+
+# ============================================================================
+# AGREGAÇÃO POR MÊS E ANO
+# ============================================================================
+
+def _agrupar(dias, valores, unidade):
+    """
+    Soma os valores por mês ("M") ou ano ("Y"), no último eixo.
+
+    Returns:
+        tuple: (rótulos "AAAA-MM"/"AAAA", somas)
+    """
+    periodos = dias.astype(f"datetime64[{unidade}]")
+    inicios = np.flatnonzero(np.r_[True, periodos[1:] != periodos[:-1]])
+    return [str(p) for p in periodos[inicios]], np.add.reduceat(valores, inicios, axis=-1)
+
+
+def _capacidade_diaria_matriz(configuracoes, inicio, fim):
+    """
+    Capacidade (unidades) por cenário e dia, e máxima teórica por cenário.
+
+    Returns:
+        tuple: (dias, matriz cenários x dias, lista de matrizes linhas x dias, máximo por dia de cada cenário)
+    """
+    inicio, fim = _periodo(inicio, fim)
+    dias = np.arange(inicio, fim + 1, dtype="datetime64[D]")
+    totais = np.zeros((len(configuracoes), len(dias)))
+    por_linha = []
+    maximos = np.zeros(len(configuracoes))
+    for c, config in enumerate(configuracoes):
+        feriados = tuple(sorted(str(f) for f in config.get("feriados", [])))
+        linhas = [_linha_congelada(linha) for linha in config.get("linhas", [])]
+        matriz = np.zeros((len(linhas), len(dias)))
+        for i, linha in enumerate(linhas):
+            matriz[i] = _horas_por_dia(linha, feriados, inicio, fim) * linha[0]
+        por_linha.append(matriz)
+        totais[c] = matriz.sum(axis=0)
+        maximos[c] = sum(linha[0] * 24 for linha in linhas)
+    return dias, totais, por_linha, maximos
+
+
+def _utilizacao(demanda, capacidade):
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(capacidade > 0, demanda / capacidade * 100, np.nan)
+
+
+def _lista(valores):
+    """Arrays -> listas Python (NaN vira None, para JSON)."""
+    return [None if v != v else round(float(v), 2) for v in np.ravel(valores)]
+
+# ============================================================================
+# FUNÇÕES DE LÓGICA PURA (PARA API E CLI)
+# ============================================================================
+
+def calcular_capacidade_periodo(configuracao, inicio, fim, demanda_diaria=None, incluir_diario=False):
+    """
+    Capacidade e utilização de uma configuração em um período.
+
+    Args:
+        configuracao: Dict da configuração (veja o cabeçalho do módulo)
+        inicio, fim: Datas "AAAA-MM-DD" (fim inclusivo)
+        demanda_diaria: Unidades por dia (número) ou lista com um valor por dia
+        incluir_diario: Se True inclui a capacidade de cada dia
+
+    Returns:
+        dict: total, média diária, capacidade por mês e por ano, por linha,
+              utilização da capacidade máxima teórica e, se houver demanda,
+              utilização por mês
+    """
+    return comparar_cenarios([configuracao], inicio, fim, demanda_diaria, incluir_diario)[0]
+
+
+def comparar_cenarios(configuracoes, inicio, fim, demanda_diaria=None, incluir_diario=False):
+    """
+    Compara várias configurações ("e se") no mesmo período, de uma só vez.
+
+    Todas as capacidades diárias são montadas em uma matriz cenários x dias
+    e agregadas por mês/ano em uma única operação.
+
+    Returns:
+        list: Um resultado por configuração (mesmo formato de calcular_capacidade_periodo)
+    """
+    dias, totais, por_linha, maximos = _capacidade_diaria_matriz(configuracoes, inicio, fim)
+    meses, mensal = _agrupar(dias, totais, "M")
+    anos, anual = _agrupar(dias, totais, "Y")
+    soma = totais.sum(axis=1)
+    maxima_periodo = maximos * len(dias)
+
+    demanda = None
+    if demanda_diaria is not None:
+        demanda = np.broadcast_to(np.asarray(demanda_diaria, dtype=float), (len(dias),))
+        _, demanda_mensal = _agrupar(dias, demanda, "M")
+        utilizacao_mensal = _utilizacao(demanda_mensal[np.newaxis, :], mensal)
+        utilizacao_total = _utilizacao(demanda.sum(), soma)
+
+    resultados = []
+    for c, config in enumerate(configuracoes):
+        resultado = {
+            "cenario": config.get("nome", f"Cenário {c + 1}"),
+            "inicio": str(dias[0]),
+            "fim": str(dias[-1]),
+            "dias": len(dias),
+            "dias_produtivos": int(np.count_nonzero(totais[c] > 0)),
+            "capacidade_total": round(float(soma[c]), 2),
+            "capacidade_media_diaria": round(float(soma[c] / len(dias)), 2),
+            "capacidade_maxima_teorica": round(float(maxima_periodo[c]), 2),
+            "percentual_uso_maximo": _lista(_utilizacao(soma[c], maxima_periodo[c]))[0],
+            "mensal": dict(zip(meses, _lista(mensal[c]))),
+            "anual": dict(zip(anos, _lista(anual[c]))),
+            "por_linha": {
+                linha.get("nome", f"Linha {i + 1}"): round(float(por_linha[c][i].sum()), 2)
+                for i, linha in enumerate(config.get("linhas", []))
+            },
+        }
+        if demanda is not None:
+            resultado["demanda_total"] = round(float(demanda.sum()), 2)
+            resultado["utilizacao_percentual"] = _lista(utilizacao_total[c])[0]
+            resultado["utilizacao_mensal"] = dict(zip(meses, _lista(utilizacao_mensal[c])))
+        if incluir_diario:
+            resultado["diario"] = dict(zip([str(d) for d in dias], _lista(totais[c])))
+        resultados.append(resultado)
+    return resultados
+
+
+def capacidade_diaria(configuracao, inicio, fim):
+    """
+    Capacidade de cada dia do período (para outros cálculos vetorizados).
+
+    Returns:
+        tuple: (dias como numpy.datetime64[D], capacidade por dia como numpy.ndarray)
+    """
+    dias, totais, _, _ = _capacidade_diaria_matriz([configuracao], inicio, fim)
+    return dias, totais[0]
+
+# ============================================================================
+# FIM DO MÓDULO PLANEJAMENTO_CAPACIDADE
+# ============================================================================
@@ -0,0 +1,266 @@
+# ============================================================================
+# MÓDULO PLANEJAMENTO_PRODUCAO - CAPACIDADE x ESTOQUE x DEMANDA
+# ============================================================================
+# Liga a capacidade de produção (planejamento_capacidade.py) ao estoque dos
+# produtos (produtos.quantidade) e à demanda de cada um:
+#
+#   - demanda prevista: taxa diária de previsoes_demanda (previsao_demanda.py)
+#   - demanda pendente: quantidades já pedidas e ainda não entregues
+#
+# Para cada configuração de turnos responde: a produção acompanha o consumo
+# de todos os produtos da empresa no horizonte? Se não, em que dia falta
+# estoque? Também calcula a capacidade diária mínima (e o número mínimo de
+# turnos padrão) que evita qualquer falta, e em que data cada produto
+# acaba se nada for produzido.
+#
+# CÁLCULO VETORIZADO (NUMPY):
+# O produto i, com estoque s_i e taxa d_i, acaba no dia r_i = s_i / d_i.
+# A produção acumulada necessária até o fim do dia t é
+#
+#   N(t) = soma, para r_i < t, de (d_i * t - s_i)
+#        = t * D(t) - S(t)
+#
+# onde D(t) e S(t) são somas acumuladas de d e s com os produtos ordenados
+# por r. Uma ordenação e uma busca binária por dia (O(n log n + T)) dão a
+# curva inteira, sem laço por produto. Uma configuração atende se a
+# capacidade acumulada cobre N(t) em todos os dias do horizonte; o
+# primeiro dia em que não cobre é a data da primeira falta.
+#
+# A capacidade é tratada como compartilhada entre os produtos (unidades
+# equivalentes, como em operacional.py): o resultado é o limite inferior de
+# turnos, sem considerar trocas de ferramenta entre produtos.
+#
+# DEPENDÊNCIA OPCIONAL:
+#   pip install numpy
+#
+# USO:
+#   from planejamento_producao import planejar_producao
+#   r = planejar_producao(db, company_id="1", horizonte_dias=90)
+#   print(r["cenario_minimo"], r["turnos_necessarios"])
+# ============================================================================
+
+import math
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+from database import PrevisaoDemanda, Produto, le_da_replica
+from planejamento_capacidade import CAPACIDADE_POR_TURNO, capacidade_diaria, configuracao_padrao
+from previsao_demanda import _filtro_empresa
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+HORIZONTE_DIAS = 90          # dias planejados a partir de hoje
+LIMITE_RUPTURAS = 20         # produtos listados por data de ruptura
+TOLERANCIA = 1e-6            # folga numérica na comparação capacidade x necessidade
+
+# ============================================================================
+# CARREGAMENTO (UMA CONSULTA POR EMPRESA)
+# ============================================================================
+
+@le_da_replica
+def carregar_estoque_e_demanda(db, company_id):
+    """
+    Estoque atual e taxa diária prevista de todos os produtos da empresa.
+
+    Produtos sem previsão calculada entram com taxa zero.
+
+    Returns:
+        tuple: (ids ordenados, estoque, taxa diária) como arrays numpy
+    """
+    linhas = db.execute(
+        select(Produto.id, Produto.quantidade, PrevisaoDemanda.taxa_diaria)
+        .outerjoin(PrevisaoDemanda, PrevisaoDemanda.produto_id == Produto.id)
+        .where(_filtro_empresa(Produto.company_id, company_id))
+        .order_by(Produto.id)
+    ).all()
+    n = len(linhas)
+    ids = np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=n)
+    estoque = np.fromiter((linha[1] or 0 for linha in linhas), dtype=np.float64, count=n)
+    taxa = np.fromiter((linha[2] or 0 for linha in linhas), dtype=np.float64, count=n)
+    return ids, estoque, taxa
+
+
+def _aplicar_por_id(ids, valores, por_produto, somar):
+    """Aplica um dict {produto_id: valor} sobre o array alinhado com ids."""
+    if not por_produto:
+        return valores
+    chaves = np.fromiter((int(k) for k in por_produto), dtype=np.int64, count=len(por_produto))
+    novos = np.fromiter((float(v) for v in por_produto.values()), dtype=np.float64, count=len(por_produto))
+    # ids está ordenado: busca binária; ids que não são da empresa são ignorados
+    posicoes = np.minimum(np.searchsorted(ids, chaves), max(len(ids) - 1, 0))
+    validos = ids[posicoes] == chaves if len(ids) else np.zeros(len(chaves), dtype=bool)
+    valores = valores.copy()
+    if somar:
+        np.add.at(valores, posicoes[validos], novos[validos])
+    else:
+        valores[posicoes[validos]] = novos[validos]
+    return valores
+
+# ============================================================================
+# CÁLCULO VETORIZADO
+# ============================================================================
+
+def dias_ate_ruptura(estoque, taxa):
+    """
+    Dia (fracionário, a partir do início) em que cada produto acaba sem
+    produção. Produtos sem consumo nunca acabam (inf); estoque já negativo
+    (pendências maiores que o saldo) dá ruptura imediata.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ruptura = np.where(taxa > 0, estoque / taxa, np.inf)
+    return np.where((taxa <= 0) & (estoque < 0), 0.0, np.maximum(ruptura, 0.0))
+
+
+def calcular_necessidade(estoque, taxa, horizonte_dias):
+    """
+    Produção acumulada necessária N(t) até o fim de cada dia t = 1..horizonte.
+
+    Args:
+        estoque: Estoque disponível de cada produto (já descontadas as pendências)
+        taxa: Consumo diário de cada produto (mesma ordem)
+
+    Returns:
+        numpy.ndarray: N(t) para t = 1..horizonte_dias
+    """
+    t = np.arange(1, horizonte_dias + 1, dtype=np.float64)
+    consumindo = taxa > 0
+
+    # Produtos com consumo: ordena por dia de ruptura e acumula d e s
+    r = estoque[consumindo] / taxa[consumindo]
+    ordem = np.argsort(r, kind="stable")
+    r = r[ordem]
+    soma_taxa = np.r_[0.0, np.cumsum(taxa[consumindo][ordem])]
+    soma_estoque = np.r_[0.0, np.cumsum(estoque[consumindo][ordem])]
+    k = np.searchsorted(r, t, side="left")  # quantos já acabaram antes de t
+    necessidade = t * soma_taxa[k] - soma_estoque[k]
+
+    # Produtos parados com saldo negativo: a pendência é devida já no 1º dia
+    necessidade += -estoque[~consumindo & (estoque < 0)].sum()
+    return necessidade
+
+
+def avaliar_cenario(capacidade, necessidade):
+    """
+    Compara a capacidade diária de uma configuração com a necessidade.
+
+    Returns:
+        dict: atende, índice do primeiro dia com falta (ou None), pior déficit,
+              folga no fim do horizonte e utilização (%)
+    """
+    acumulada = np.cumsum(capacidade)
+    saldo = acumulada - necessidade
+    faltas = np.flatnonzero(saldo < -TOLERANCIA)
+    total = float(acumulada[-1]) if len(acumulada) else 0.0
+    return {
+        "atende": not len(faltas),
+        "primeira_falta": int(faltas[0]) if len(faltas) else None,
+        "deficit_maximo": round(max(0.0, -float(saldo.min())), 2) if len(saldo) else 0.0,
+        "folga_final": round(float(saldo[-1]), 2) if len(saldo) else 0.0,
+        "utilizacao_percentual": round(float(necessidade[-1]) / total * 100, 2) if total > 0 else None,
+    }
+
+# ============================================================================
+# FUNÇÕES DE LÓGICA PURA (PARA API E CLI)
+# ============================================================================
+
+def planejar_producao(db, company_id=None, configuracoes=None, horizonte_dias=HORIZONTE_DIAS, inicio=None,
+                      demanda_diaria=None, demanda_pendente=None, limite_rupturas=LIMITE_RUPTURAS):
+    """
+    Cruza estoque, demanda e capacidade de todos os produtos da empresa.
+
+    Args:
+        company_id: Empresa (None = produtos cadastrados sem empresa)
+        configuracoes: Lista de configurações de planejamento_capacidade, da
+                       menor para a maior (padrão: 1, 2 e 3 turnos)
+        horizonte_dias: Quantos dias planejar a partir de inicio
+        inicio: Primeiro dia do plano (date ou "AAAA-MM-DD"; padrão: hoje)
+        demanda_diaria: {produto_id: unidades/dia} que substitui a previsão
+        demanda_pendente: {produto_id: unidades} já pedidas, descontadas do estoque
+        limite_rupturas: Quantos produtos listar por data de ruptura
+
+    Returns:
+        dict: necessidade total, capacidade diária e turnos mínimos, resultado
+              de cada cenário, cenário mínimo que atende e próximas rupturas
+    """
+    if horizonte_dias < 1:
+        raise ValueError("O horizonte deve ter pelo menos 1 dia")
+    if configuracoes is None:
+        configuracoes = [configuracao_padrao(turnos) for turnos in (1, 2, 3)]
+    inicio = date.fromisoformat(str(inicio)) if inicio else date.today()
+    fim = inicio + timedelta(days=horizonte_dias - 1)
+
+    ids, estoque, taxa = carregar_estoque_e_demanda(db, company_id)
+    taxa = _aplicar_por_id(ids, taxa, demanda_diaria, somar=False)
+    estoque = _aplicar_por_id(ids, estoque, {k: -float(v) for k, v in (demanda_pendente or {}).items()}, somar=True)
+
+    necessidade = calcular_necessidade(estoque, taxa, horizonte_dias)
+    t = np.arange(1, horizonte_dias + 1)
+    capacidade_necessaria = float(np.max(necessidade / t)) if horizonte_dias else 0.0
+
+    cenarios = []
+    cenario_minimo = None
+    for c, config in enumerate(configuracoes):
+        _, capacidade = capacidade_diaria(config, inicio, fim)
+        avaliacao = avaliar_cenario(capacidade, necessidade)
+        primeira_falta = avaliacao.pop("primeira_falta")
+        nome = config.get("nome", f"Cenário {c + 1}")
+        cenarios.append({
+            "cenario": nome,
+            "capacidade_total": round(float(capacidade.sum()), 2),
+            "atende": avaliacao.pop("atende"),
+            "data_primeira_falta": (
+                None if primeira_falta is None else (inicio + timedelta(days=primeira_falta)).isoformat()
+            ),
+            **avaliacao,
+        })
+        if cenario_minimo is None and cenarios[-1]["atende"]:
+            cenario_minimo = nome
+
+    # Próximas rupturas sem produção (só os primeiros da ordenação são lidos do banco)
+    ruptura = dias_ate_ruptura(estoque, taxa)
+    no_horizonte = np.flatnonzero(ruptura < horizonte_dias)
+    primeiros = no_horizonte[np.argsort(ruptura[no_horizonte], kind="stable")[:limite_rupturas]]
+    rupturas = []
+    if len(primeiros):
+        nomes = dict(
+            (linha[0], (linha[1], linha[2])) for linha in db.execute(
+                select(Produto.id, Produto.codigo, Produto.nome)
+                .where(Produto.id.in_([int(i) for i in ids[primeiros]]))
+            )
+        )
+        for i in primeiros:
+            codigo, nome = nomes.get(int(ids[i]), (None, None))
+            rupturas.append({
+                "produto_id": int(ids[i]),
+                "codigo": codigo,
+                "nome": nome,
+                "estoque": round(float(estoque[i]), 2),
+                "taxa_diaria": round(float(taxa[i]), 4),
+                "dias_cobertura": round(float(ruptura[i]), 2),
+                "data_ruptura": (inicio + timedelta(days=int(ruptura[i]))).isoformat(),
+            })
+
+    return {
+        "company_id": company_id,
+        "inicio": inicio.isoformat(),
+        "fim": fim.isoformat(),
+        "horizonte_dias": horizonte_dias,
+        "produtos": int(len(ids)),
+        "produtos_com_demanda": int(np.count_nonzero(taxa > 0)),
+        "estoque_total": round(float(estoque.sum()), 2),
+        "demanda_horizonte": round(float(taxa.sum() * horizonte_dias), 2),
+        "necessidade_producao": round(float(necessidade[-1]), 2),
+        "capacidade_diaria_necessaria": round(capacidade_necessaria, 2),
+        "turnos_necessarios": math.ceil(capacidade_necessaria / CAPACIDADE_POR_TURNO - TOLERANCIA),
+        "cenarios": cenarios,
+        "cenario_minimo": cenario_minimo,
+        "rupturas_no_horizonte": int(len(no_horizonte)),
+        "rupturas": rupturas,
+    }
+
+# ============================================================================
+# FIM DO MÓDULO PLANEJAMENTO_PRODUCAO
+# ============================================================================
@@ -0,0 +1,376 @@
+# ============================================================================
+# MÓDULO PREVISAO_DEMANDA - PREVISÃO DE DEMANDA E SUGESTÃO DE COMPRA
+# ============================================================================
+# Calcula, para cada produto, quanto ele vende por dia a partir do histórico
+# de saídas (movimentacoes_estoque) e grava em previsoes_demanda:
+#
+#   - médias móveis de 7 e 28 dias
+#   - taxa diária prevista (suavização exponencial simples)
+#   - desvio padrão das vendas diárias
+#   - dias de cobertura (quanto tempo o estoque atual dura)
+#   - quantidade sugerida de compra
+#
+# CÁLCULO VETORIZADO (NUMPY):
+# O histórico de uma empresa é lido em UMA consulta já agregada por
+# (produto, dia). As estatísticas de todos os produtos saem de somas
+# ponderadas com numpy.bincount sobre esses pares, sem laço por produto e
+# sem montar a matriz produtos x dias. A memória é proporcional ao número
+# de pares com venda, então empresas com 1 milhão de SKUs cabem em um
+# processo. Empresas diferentes podem ser calculadas em paralelo (--processos).
+#
+# FÓRMULAS:
+#   nível (SES)       = soma(alfa * (1-alfa)^(T-1-t) * vendas_t) + (1-alfa)^T * média
+#   estoque_seguranca = z * desvio * raiz(prazo_entrega)
+#   estoque_alvo      = taxa * (prazo_entrega + periodo_revisao) + estoque_seguranca
+#   sugerido          = max(0, arredonda_para_cima(estoque_alvo - estoque))
+#   dias_cobertura    = estoque / taxa
+#
+# DEPENDÊNCIA OPCIONAL:
+#   pip install numpy
+#
+# Com DATABASE_SHARDS, a rotina procura as empresas em todos os shards
+# (cada uma só no shard em que o catálogo a põe) e calcula cada empresa
+# numa sessão do seu shard (shards.sessao_da_empresa).
+#
+# USO (ROTINA NOTURNA):
+#   python previsao_demanda.py                     # todas as empresas
+#   python previsao_demanda.py --empresa 1 --processos 4
+# ============================================================================
+
+import argparse
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+
+from database import MovimentacaoEstoque, PrevisaoDemanda, Produto, SessionLocal
+
+# ============================================================================
+# CONFIGURAÇÕES (PODEM SER AJUSTADAS NO .env)
+# ============================================================================
+JANELA_DIAS = int(os.getenv("PREVISAO_JANELA_DIAS", "90"))         # histórico considerado
+ALFA = float(os.getenv("PREVISAO_ALFA", "0.3"))                     # peso do dia mais recente
+PRAZO_ENTREGA_DIAS = float(os.getenv("PREVISAO_PRAZO_ENTREGA_DIAS", "7"))
+PERIODO_REVISAO_DIAS = float(os.getenv("PREVISAO_PERIODO_REVISAO_DIAS", "7"))
+FATOR_SEGURANCA = float(os.getenv("PREVISAO_FATOR_SEGURANCA", "1.65"))  # z (~95% de nível de serviço)
+
+# Linhas por INSERT em lote ao gravar as previsões
+TAMANHO_LOTE_GRAVACAO = 50000
+
+# ============================================================================
+# LEITURA DO HISTÓRICO E DO ESTOQUE
+# ============================================================================
+
+def _filtro_empresa(coluna, company_id):
+    """Produtos cadastrados sem empresa (console) ficam em company_id NULL."""
+    return coluna.is_(None) if company_id is None else coluna == company_id
+
+
+def carregar_vendas_diarias(db, company_id, inicio, fim):
+    """
+    Vendas por (produto, dia) da empresa no período [inicio, fim).
+
+    Returns:
+        tuple: (produto_ids, deslocamento_dias, quantidades) como arrays numpy
+    """
+    dia = func.date(MovimentacaoEstoque.data_hora)
+    consulta = select(MovimentacaoEstoque.produto_id, dia, func.sum(MovimentacaoEstoque.quantidade)).where(
+        _filtro_empresa(MovimentacaoEstoque.company_id, company_id),
+        MovimentacaoEstoque.tipo == "saida",
+        MovimentacaoEstoque.data_hora >= datetime.combine(inicio, datetime.min.time()),
+        MovimentacaoEstoque.data_hora < datetime.combine(fim, datetime.min.time()),
+    ).group_by(MovimentacaoEstoque.produto_id, dia)
+
+    linhas = db.execute(consulta).all()
+    # Poucos dias distintos: converte cada data uma única vez
+    deslocamentos = {}
+    for _, valor, _ in linhas:
+        if valor not in deslocamentos:
+            dia_venda = date.fromisoformat(valor) if isinstance(valor, str) else valor
+            deslocamentos[valor] = (dia_venda - inicio).days
+
+    produto_ids = np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=len(linhas))
+    dias = np.fromiter((deslocamentos[linha[1]] for linha in linhas), dtype=np.int64, count=len(linhas))
+    quantidades = np.fromiter((linha[2] for linha in linhas), dtype=np.float64, count=len(linhas))
+    return produto_ids, dias, quantidades
+
+
+def carregar_estoque(db, company_id):
+    """
+    Ids e quantidades dos produtos da empresa (projeção, sem objetos ORM).
+
+    Returns:
+        tuple: (ids ordenados, quantidades) como arrays numpy
+    """
+    linhas = db.execute(
+        select(Produto.id, Produto.quantidade)
+        .where(_filtro_empresa(Produto.company_id, company_id))
+        .order_by(Produto.id)
+    ).all()
+    ids = np.fromiter((linha[0] for linha in linhas), dtype=np.int64, count=len(linhas))
+    quantidades = np.fromiter((linha[1] or 0 for linha in linhas), dtype=np.float64, count=len(linhas))
+    return ids, quantidades
+
+# ============================================================================
+# CÁLCULO VETORIZADO
+# ============================================================================
+
+def calcular_previsoes(ids, estoque, venda_ids, venda_dias, venda_qtds, janela=JANELA_DIAS, alfa=ALFA,
+                       prazo_entrega=PRAZO_ENTREGA_DIAS, periodo_revisao=PERIODO_REVISAO_DIAS,
+                       fator_seguranca=FATOR_SEGURANCA):
+    """
+    Calcula as previsões de todos os produtos de uma vez.
+
+    Args:
+        ids: Ids dos produtos (ordenados)
+        estoque: Quantidade em estoque de cada produto (mesma ordem de ids)
+        venda_ids, venda_dias, venda_qtds: Vendas agregadas por (produto, dia);
+            venda_dias é o deslocamento 0..janela-1 a partir do início da janela
+
+    Returns:
+        dict: Arrays numpy (um valor por produto) com as chaves de PrevisaoDemanda
+    """
+    n = len(ids)
+    # Posição de cada venda no array de produtos (descarta produtos excluídos)
+    posicoes = np.searchsorted(ids, venda_ids)
+    validas = (posicoes < n) & (venda_dias >= 0) & (venda_dias < janela)
+    validas[validas] &= ids[posicoes[validas]] == venda_ids[validas]
+    linhas, dias, qtds = posicoes[validas], venda_dias[validas], venda_qtds[validas]
+
+    def somar(pesos):
+        return np.bincount(linhas, weights=pesos, minlength=n)
+
+    total = somar(qtds)
+    media = total / janela
+    media_7d = somar(qtds * (dias >= janela - 7)) / min(7, janela)
+    media_28d = somar(qtds * (dias >= janela - 28)) / min(28, janela)
+    variancia = np.maximum(somar(qtds * qtds) / janela - media * media, 0.0)
+    desvio = np.sqrt(variancia)
+
+    # Suavização exponencial em forma fechada: um peso por dia da janela
+    pesos_dia = alfa * (1.0 - alfa) ** (janela - 1 - np.arange(janela))
+    taxa = somar(qtds * pesos_dia[dias]) + (1.0 - alfa) ** janela * media
+
+    estoque_seguranca = fator_seguranca * desvio * math.sqrt(prazo_entrega)
+    estoque_alvo = taxa * (prazo_entrega + periodo_revisao) + estoque_seguranca
+    sugerido = np.maximum(np.ceil(estoque_alvo - estoque - 1e-9), 0.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cobertura = np.where(taxa > 0, np.maximum(estoque, 0.0) / taxa, np.nan)
+
+    return {
+        "produto_id": ids,
+        "taxa_diaria": taxa,
+        "media_7d": media_7d,
+        "media_28d": media_28d,
+        "desvio_diario": desvio,
+        "estoque": estoque,
+        "dias_cobertura": cobertura,
+        "quantidade_sugerida": sugerido,
+    }
+
+# ============================================================================
+# GRAVAÇÃO
+# ============================================================================
+
+def gravar_previsoes(db, company_id, previsoes, calculado_em=None):
+    """
+    Substitui as previsões da empresa (DELETE + INSERT em lotes, mesma transação).
+
+    Returns:
+        int: Linhas gravadas
+    """
+    calculado_em = calculado_em or datetime.utcnow()
+    colunas = list(previsoes)
+    # tolist() converte os arrays em tipos Python de uma vez (rápido)
+    valores = {coluna: previsoes[coluna].tolist() for coluna in colunas}
+    total = len(valores["produto_id"])
+
+    # Core direto na conexão da sessão: executemany simples, sem o caminho de bulk do ORM
+    conexao = db.connection()
+    conexao.execute(delete(PrevisaoDemanda).where(_filtro_empresa(PrevisaoDemanda.company_id, company_id)))
+    for inicio in range(0, total, TAMANHO_LOTE_GRAVACAO):
+        fim = min(inicio + TAMANHO_LOTE_GRAVACAO, total)
+        lote = []
+        for i in range(inicio, fim):
+            cobertura = valores["dias_cobertura"][i]
+            lote.append({
+                "company_id": company_id,
+                "produto_id": valores["produto_id"][i],
+                "taxa_diaria": round(valores["taxa_diaria"][i], 4),
+                "media_7d": round(valores["media_7d"][i], 4),
+                "media_28d": round(valores["media_28d"][i], 4),
+                "desvio_diario": round(valores["desvio_diario"][i], 4),
+                "estoque": int(valores["estoque"][i]),
+                "dias_cobertura": None if cobertura != cobertura else round(cobertura, 2),  # NaN -> None
+                "quantidade_sugerida": int(valores["quantidade_sugerida"][i]),
+                "calculado_em": calculado_em,
+            })
+        conexao.execute(insert(PrevisaoDemanda.__table__), lote)
+    db.commit()
+    return total
+
+# ============================================================================
+# FUNÇÕES DE LÓGICA PURA (PARA ROTINA NOTURNA, API E CLI)
+# ============================================================================
+
+def prever_empresa(db, company_id, data_referencia=None, janela=JANELA_DIAS, **parametros):
+    """
+    Calcula e grava as previsões de todos os produtos de uma empresa.
+
+    Args:
+        db: Sessão do banco
+        company_id: Empresa (None = produtos sem empresa)
+        data_referencia: Primeiro dia FORA da janela (padrão: hoje, UTC);
+                         a janela vai de data_referencia - janela até ontem
+        janela: Dias de histórico
+        **parametros: alfa, prazo_entrega, periodo_revisao, fator_seguranca
+
+    Returns:
+        dict: Resumo (produtos, produtos com venda, produtos a comprar, tempo)
+    """
+    inicio_execucao = time.perf_counter()
+    fim = data_referencia or datetime.utcnow().date()
+    inicio = fim - timedelta(days=janela)
+
+    ids, estoque = carregar_estoque(db, company_id)
+    venda_ids, venda_dias, venda_qtds = carregar_vendas_diarias(db, company_id, inicio, fim)
+    previsoes = calcular_previsoes(ids, estoque, venda_ids, venda_dias, venda_qtds, janela=janela, **parametros)
+    gravar_previsoes(db, company_id, previsoes)
+
+    return {
+        "company_id": company_id,
+        "produtos": len(ids),
+        "produtos_com_venda": int(np.count_nonzero(previsoes["taxa_diaria"] > 0)),
+        "produtos_para_comprar": int(np.count_nonzero(previsoes["quantidade_sugerida"] > 0)),
+        "segundos": round(time.perf_counter() - inicio_execucao, 3),
+    }
+
+
+def listar_sugestoes(db, company_id=None, apenas_comprar=True, limite=None):
+    """
+    Previsões gravadas com nome e código do produto, das mais urgentes
+    (menos dias de cobertura) para as menos urgentes.
+
+    Returns:
+        list: Dicionários com os campos da previsão mais codigo e nome
+    """
+    consulta = db.query(PrevisaoDemanda, Produto.codigo, Produto.nome).join(
+        Produto, Produto.id == PrevisaoDemanda.produto_id
+    )
+    if company_id is not None:
+        consulta = consulta.filter(PrevisaoDemanda.company_id == company_id)
+    if apenas_comprar:
+        consulta = consulta.filter(PrevisaoDemanda.quantidade_sugerida > 0)
+    consulta = consulta.order_by(PrevisaoDemanda.dias_cobertura.is_(None), PrevisaoDemanda.dias_cobertura,
+                                 PrevisaoDemanda.produto_id)
+    if limite:
+        consulta = consulta.limit(limite)
+
+    resultados = []
+    for previsao, codigo, nome in consulta:
+        dados = previsao.to_dict()
+        dados.update({"codigo": codigo, "nome": nome})
+        resultados.append(dados)
+    return resultados
+
+
+def empresas_com_produtos(db):
+    """company_id distintos de produtos (lidos pelo índice de company_id)."""
+    return [linha[0] for linha in db.execute(select(Produto.company_id).distinct())]
+
+# ============================================================================
+# ROTINA NOTURNA (VÁRIAS EMPRESAS, OPCIONALMENTE EM PARALELO)
+# ============================================================================
+
+def _empresas_de_todos_os_shards():
+    """company_id com produtos em cada shard, só onde o catálogo põe a empresa."""
+    from shards import executar_em_shards, posicoes_das_empresas, shard_dono, sharding_ativo
+
+    if not sharding_ativo():
+        with SessionLocal() as db:
+            return empresas_com_produtos(db)
+    posicoes = posicoes_das_empresas()
+    por_shard, erros = executar_em_shards(lambda sessao, nome: empresas_com_produtos(sessao))
+    for nome, mensagem in erros.items():
+        print(f"[ALERTA] Shard '{nome}' indisponível: {mensagem}", file=sys.stderr)
+    return [company_id for nome, empresas in por_shard.items() for company_id in empresas
+            if shard_dono(posicoes, company_id) == nome]
+
+
+def _prever_em_processo(company_id, parametros):
+    from shards import descartar_conexoes_herdadas, sessao_da_empresa, sharding_ativo
+
+    # Cada processo filho abre suas próprias conexões (não herda as do pai)
+    descartar_conexoes_herdadas()
+    # Com DATABASE_SHARDS, a empresa é calculada no seu shard
+    if sharding_ativo() and str(company_id or "").isdigit():
+        db = sessao_da_empresa(int(company_id))
+    else:
+        db = SessionLocal()
+    try:
+        return prever_empresa(db, company_id, **parametros)
+    finally:
+        db.close()
+
+
+def executar_rotina(empresas=None, processos=1, **parametros):
+    """
+    Calcula as previsões das empresas informadas (padrão: todas).
+
+    Args:
+        empresas: Lista de company_id (None = todas com produtos, em todos os shards)
+        processos: Processos em paralelo (cada empresa é calculada inteira em um processo)
+
+    Returns:
+        list: Resumo de cada empresa
+    """
+    if empresas is None:
+        empresas = _empresas_de_todos_os_shards()
+
+    if processos <= 1 or len(empresas) <= 1:
+        return [_prever_em_processo(company_id, parametros) for company_id in empresas]
+    with ProcessPoolExecutor(max_workers=processos) as executor:
+        return list(executor.map(_prever_em_processo, empresas, [parametros] * len(empresas)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Previsão de demanda e sugestão de compra (rotina noturna)")
+    parser.add_argument("--empresa", action="append", dest="empresas", metavar="COMPANY_ID",
+                        help="Calcula só esta empresa (pode repetir); padrão: todas")
+    parser.add_argument("--processos", type=int, default=1, help="Empresas calculadas em paralelo")
+    parser.add_argument("--janela", type=int, default=JANELA_DIAS, help="Dias de histórico")
+    parser.add_argument("--alfa", type=float, default=ALFA, help="Suavização exponencial (0 a 1)")
+    parser.add_argument("--prazo-entrega", dest="prazo_entrega", type=float, default=PRAZO_ENTREGA_DIAS)
+    parser.add_argument("--periodo-revisao", dest="periodo_revisao", type=float, default=PERIODO_REVISAO_DIAS)
+    args = parser.parse_args(argv)
+
+    from database import init_db
+    init_db()
+
+    inicio = time.perf_counter()
+    resumos = executar_rotina(args.empresas, args.processos, janela=args.janela, alfa=args.alfa,
+                              prazo_entrega=args.prazo_entrega, periodo_revisao=args.periodo_revisao)
+    print("\n" + "="*70)
+    print("   PREVISÃO DE DEMANDA - RESUMO")
+    print("="*70)
+    for resumo in resumos:
+        print(f"   Empresa {resumo['company_id']}: {resumo['produtos']} produtos, "
+              f"{resumo['produtos_com_venda']} com venda, {resumo['produtos_para_comprar']} para comprar "
+              f"({resumo['segundos']:.2f} s)")
+    print("-"*70)
+    print(f"   Total: {sum(r['produtos'] for r in resumos)} produtos em {time.perf_counter() - inicio:.1f} s")
+    print("="*70)
+
+
+if __name__ == "__main__":
+    main()
+
+# ============================================================================
+# FIM DO MÓDULO PREVISAO_DEMANDA
+# ============================================================================
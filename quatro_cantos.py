@@ -0,0 +1,698 @@
+# ============================================================================
+# ARQUIVO: quatro_cantos.py
+# SISTEMA DE GESTÃO - QUATRO CANTOS (LINHA DE COMANDO NÃO INTERATIVA)
+# ============================================================================
+#
+# DESCRIÇÃO:
+# Interface de linha de comando que chama diretamente as funções de lógica
+# pura dos módulos, sem nenhum input(). Permite automatizar, processar
+# lotes e medir desempenho: milhares de operações pagam a inicialização do
+# Python uma única vez.
+#
+# USO:
+#   python -m quatro_cantos operacional capacidade --turnos 2
+#   python -m quatro_cantos operacional capacidade --arquivo turnos.csv
+#   python -m quatro_cantos operacional planejar --config fabrica.json --inicio 2026-01-01 --fim 2026-12-31
+#   python -m quatro_cantos operacional producao --empresa 1 --horizonte 60
+#   python -m quatro_cantos financeiro metricas --agua 500 --luz 1200 --impostos 3000 --salarios 25000
+#   python -m quatro_cantos rh folha --arquivo funcionarios.csv --formato csv
+#   python -m quatro_cantos estoque entrada --arquivo produtos.csv
+#   python -m quatro_cantos estoque saida --nome "Parafuso" --quantidade 10 --empresa 1
+#   python -m quatro_cantos estoque listar --empresa 1 --formato csv --saida estoque.csv
+#   python -m quatro_cantos estoque buscar --termo "paraf inox" --empresa 1
+#   python -m quatro_cantos estoque reposicao --codigo 10 --ponto 50 --empresa 1
+#   python -m quatro_cantos estoque alertas --empresa 1
+#   python -m quatro_cantos estoque sugestoes --empresa 1 --calcular
+#   python -m quatro_cantos shards resumo
+#   python -m quatro_cantos shards mover --empresa 3 --destino grandes
+#   python -m quatro_cantos analise relatorio --nome vendas_por_fornecedor --empresa 3 --desde 2026-01
+#   python -m quatro_cantos analise sql --consulta "SELECT mes, sum(unidades) FROM movimentacoes_mensal GROUP BY mes"
+#
+# ARQUIVOS DE ENTRADA (--arquivo):
+# - .csv: primeira linha com os nomes das colunas
+# - .json: lista de objetos
+# - .jsonl ou "-" (entrada padrão): um objeto JSON por linha
+#
+# Os nomes das colunas são os mesmos das opções (ex: codigo, nome,
+# quantidade, valor_unitario para estoque entrada). Em entrada e saída, a
+# coluna opcional empresa tem precedência sobre --empresa, e a coluna
+# opcional chave_idempotencia torna o lote seguro para reprocessar: as
+# linhas já aplicadas devolvem o resultado original.
+#
+# FORMATOS DE SAÍDA (--formato): json (padrão), jsonl ou csv
+# Código de saída: 0 se todas as operações deram certo, 1 se alguma falhou.
+# ============================================================================
+
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import sys
+
+# Os módulos do sistema são importados dentro de cada comando, para que
+# comandos que não usam banco (operacional, financeiro, rh) não carreguem
+# o SQLAlchemy.
+
+# ============================================================================
+# LEITURA DOS REGISTROS DE ENTRADA
+# ============================================================================
+
+def ler_registros(caminho):
+    """
+    Lê os registros de um arquivo de lote.
+
+    Args:
+        caminho: Caminho do arquivo (.csv, .json, .jsonl) ou "-" para stdin (JSON lines)
+
+    Returns:
+        list: Lista de dicionários, um por operação
+    """
+    if caminho == "-":
+        return [json.loads(linha) for linha in sys.stdin if linha.strip()]
+
+    with open(caminho, encoding="utf-8-sig", newline="") as arquivo:
+        if caminho.lower().endswith(".csv"):
+            return list(csv.DictReader(arquivo))
+        if caminho.lower().endswith(".jsonl"):
+            return [json.loads(linha) for linha in arquivo if linha.strip()]
+        dados = json.load(arquivo)
+        return dados if isinstance(dados, list) else [dados]
+
+
+def _registros_do_comando(args, campos):
+    """Usa o arquivo de lote, se informado, ou monta um único registro com as opções."""
+    if args.arquivo:
+        return ler_registros(args.arquivo)
+    registro = {campo: getattr(args, campo) for campo in campos}
+    faltando = [campo for campo, valor in registro.items() if valor is None and campo in args.obrigatorios]
+    if faltando:
+        raise SystemExit(f"Erro: informe --arquivo ou as opções {', '.join('--' + c for c in faltando)}")
+    return [registro]
+
+
+def _texto(valor):
+    """Converte valores vazios de CSV em None."""
+    if valor is None:
+        return None
+    valor = str(valor).strip()
+    return valor or None
+
+# ============================================================================
+# ESCRITA DOS RESULTADOS
+# ============================================================================
+
+def escrever_resultados(linhas, formato, destino):
+    """
+    Escreve os resultados no formato escolhido.
+
+    Args:
+        linhas: Lista de dicionários, ou um iterador (listagens grandes são
+                escritas linha a linha, sem montar a lista na memória)
+        formato: "json", "jsonl" ou "csv"
+        destino: Arquivo aberto para escrita
+    """
+    if formato == "json":
+        destino.write("[")
+        for numero, linha in enumerate(linhas):
+            destino.write(",\n" if numero else "\n")
+            destino.write(json.dumps(linha, ensure_ascii=False, default=str))
+        destino.write("\n]\n")
+    elif formato == "jsonl":
+        for linha in linhas:
+            destino.write(json.dumps(linha, ensure_ascii=False, default=str))
+            destino.write("\n")
+    elif formato == "csv":
+        if isinstance(linhas, list):
+            # Colunas: união das chaves, na ordem em que aparecem
+            colunas = list(dict.fromkeys(chave for linha in linhas for chave in linha))
+        else:
+            # Iterador: todas as linhas têm as mesmas chaves (as da primeira)
+            linhas = iter(linhas)
+            primeira = next(linhas, None)
+            colunas = list(primeira) if primeira else []
+            linhas = itertools.chain([primeira] if primeira else [], linhas)
+        escritor = csv.DictWriter(destino, fieldnames=colunas)
+        escritor.writeheader()
+        escritor.writerows(linhas)
+
+
+def _executar_lote(registros, operacao):
+    """
+    Executa a operação para cada registro, sem parar no primeiro erro.
+
+    Returns:
+        tuple: (lista de resultados, quantidade de erros)
+    """
+    resultados = []
+    erros = 0
+    for numero, registro in enumerate(registros, 1):
+        try:
+            resultados.append(operacao(registro))
+        except (ValueError, TypeError, KeyError) as e:
+            erros += 1
+            resultados.append({"linha": numero, "status": "erro", "mensagem": str(e)})
+        except RuntimeError as e:
+            # database.ConflitoConcorrencia (sem importar database nos comandos sem banco)
+            if not hasattr(e, "to_dict"):
+                raise
+            erros += 1
+            resultados.append(dict(e.to_dict(), linha=numero, status="erro"))
+    return resultados, erros
+
+# ============================================================================
+# COMANDOS: OPERACIONAL, FINANCEIRO E RH (SEM BANCO DE DADOS)
+# ============================================================================
+
+def comando_operacional_capacidade(args):
+    from operacional import calcular_metricas_capacidade
+
+    def operacao(registro):
+        turnos = int(registro["turnos"])
+        if turnos < 1 or turnos > 3:
+            raise ValueError("Turnos deve ser 1, 2 ou 3")
+        return calcular_metricas_capacidade(turnos)
+
+    return _executar_lote(_registros_do_comando(args, ["turnos"]), operacao)
+
+
+def comando_operacional_planejar(args):
+    from planejamento_capacidade import carregar_configuracao, comparar_cenarios, configuracao_padrao
+
+    if args.config:
+        configuracoes = carregar_configuracao(args.config)
+        if isinstance(configuracoes, dict):
+            configuracoes = [configuracoes]
+    else:
+        # Sem arquivo: compara 1, 2 e 3 turnos no calendário real do período
+        configuracoes = [configuracao_padrao(turnos) for turnos in (1, 2, 3)]
+    resultados = comparar_cenarios(configuracoes, args.inicio, args.fim, args.demanda, args.diario)
+    return resultados, 0
+
+
+def comando_operacional_producao(args):
+    from planejamento_capacidade import carregar_configuracao
+    from planejamento_producao import planejar_producao
+
+    configuracoes = None
+    if args.config:
+        configuracoes = carregar_configuracao(args.config)
+        if isinstance(configuracoes, dict):
+            configuracoes = [configuracoes]
+    db_session = _abrir_sessao(args.empresa)
+    try:
+        resultado = planejar_producao(db_session, company_id=args.empresa, configuracoes=configuracoes,
+                                      horizonte_dias=args.horizonte, inicio=args.inicio,
+                                      limite_rupturas=args.limite)
+    finally:
+        db_session.close()
+    return [resultado], 0
+
+
+def comando_financeiro_metricas(args):
+    from financeiro import calcular_metricas_financeiras
+
+    def operacao(registro):
+        valores = {campo: float(registro[campo]) for campo in ("agua", "luz", "impostos", "salarios")}
+        if any(valor < 0 for valor in valores.values()):
+            raise ValueError("Valores não podem ser negativos")
+        total_pallets = int(registro.get("total_pallets") or 1000)
+        return calcular_metricas_financeiras(total_pallets=total_pallets, **valores)
+
+    campos = ["agua", "luz", "impostos", "salarios", "total_pallets"]
+    return _executar_lote(_registros_do_comando(args, campos), operacao)
+
+
+def comando_rh_folha(args):
+    from rh import processar_funcionario
+
+    def operacao(registro):
+        nome = _texto(registro.get("nome"))
+        if not nome:
+            raise ValueError("Nome do funcionário é obrigatório")
+        horas_extras = max(0.0, float(registro.get("horas_extras") or 0))
+        return processar_funcionario(nome, _texto(registro.get("cargo")) or "Operário", horas_extras)
+
+    resultados, erros = _executar_lote(_registros_do_comando(args, ["nome", "cargo", "horas_extras"]), operacao)
+    # Mesma ordem do relatório interativo (alfabética por nome)
+    resultados.sort(key=lambda r: r.get("nome") or "")
+    return resultados, erros
+
+# ============================================================================
+# COMANDOS: ESTOQUE (COM BANCO DE DADOS)
+# ============================================================================
+
+def _abrir_sessao(empresa=None):
+    from database import init_db, SessionLocal
+    from shards import sessao_da_empresa, sharding_ativo
+    # Mensagens da inicialização vão para stderr, sem misturar com o resultado
+    with contextlib.redirect_stdout(sys.stderr):
+        init_db()
+    # Com DATABASE_SHARDS, --empresa abre a sessão no shard da empresa
+    if sharding_ativo() and empresa is not None and str(empresa).isdigit():
+        return sessao_da_empresa(int(empresa))
+    return SessionLocal()
+
+
+class _SessoesDoLote:
+    """
+    Sessões de um lote em que cada linha pode ser de uma empresa (coluna
+    "empresa", ou --empresa). Com DATABASE_SHARDS, cada empresa grava no
+    próprio shard; sem shards, todas as linhas usam a mesma sessão.
+    """
+
+    def __init__(self, empresa_padrao=None):
+        self.empresa_padrao = empresa_padrao
+        self._sessoes = {}
+
+    def empresa(self, registro):
+        return _texto(registro.get("empresa")) or self.empresa_padrao
+
+    def sessao(self, empresa):
+        from shards import sharding_ativo
+        chave = str(empresa) if sharding_ativo() and str(empresa or "").isdigit() else None
+        if chave not in self._sessoes:
+            self._sessoes[chave] = _abrir_sessao(chave)
+        return self._sessoes[chave]
+
+    def fechar(self):
+        for sessao in self._sessoes.values():
+            sessao.close()
+
+
+def comando_estoque_entrada(args):
+    from estoque_entrada import registrar_entrada_produto
+
+    sessoes = _SessoesDoLote(args.empresa)
+
+    def operacao(registro):
+        empresa = sessoes.empresa(registro)
+        produto, is_novo = registrar_entrada_produto(
+            sessoes.sessao(empresa),
+            int(registro["codigo"]),
+            _texto(registro.get("nome")),
+            int(registro["quantidade"]),
+            valor_unitario=float(registro.get("valor_unitario") or 0.0),
+            data=_texto(registro.get("data")),
+            fornecedor=_texto(registro.get("fornecedor")),
+            local=_texto(registro.get("local")),
+            company_id=empresa,
+            chave_idempotencia=_texto(registro.get("chave_idempotencia"))
+        )
+        return dict(produto.to_dict(), status="novo" if is_novo else "atualizado")
+
+    campos = ["codigo", "nome", "quantidade", "valor_unitario", "data", "fornecedor", "local", "empresa",
+              "chave_idempotencia"]
+    try:
+        return _executar_lote(_registros_do_comando(args, campos), operacao)
+    finally:
+        sessoes.fechar()
+
+
+def resultado_saida_para_dict(resultado):
+    """
+    Converte o resultado de registrar_saida_produto em dicionário serializável.
+
+    O objeto Produto é trocado pelos campos que identificam o produto.
+    """
+    dados = {chave: valor for chave, valor in resultado.items() if chave != "produto"}
+    produto = resultado.get("produto")
+    if produto is not None:
+        dados["produto_id"] = produto.id
+        dados["codigo"] = produto.codigo
+        dados["nome"] = produto.nome
+    return dados
+
+
+def comando_estoque_saida(args):
+    from estoque_saida import registrar_saida_produto
+
+    sessoes = _SessoesDoLote(args.empresa)
+
+    def operacao(registro):
+        empresa = sessoes.empresa(registro)
+        resultado = registrar_saida_produto(sessoes.sessao(empresa), _texto(registro.get("nome")),
+                                            int(registro["quantidade"]), company_id=empresa,
+                                            chave_idempotencia=_texto(registro.get("chave_idempotencia")))
+        dados = resultado_saida_para_dict(resultado)
+        dados.setdefault("nome", registro.get("nome"))
+        return dados
+
+    try:
+        resultados, _ = _executar_lote(_registros_do_comando(args, ["nome", "quantidade", "empresa", "chave_idempotencia"]), operacao)
+    finally:
+        sessoes.fechar()
+    # Produto não encontrado/esgotado também conta como falha no código de saída
+    erros = sum(1 for r in resultados if r.get("status") == "erro")
+    return resultados, erros
+
+
+def comando_estoque_listar(args):
+    from database import Produto
+    from serializacao import COLUNAS_PRODUTO, filtros_produtos, iterar_dicts
+
+    db_session = _abrir_sessao(args.empresa)
+
+    def linhas():
+        # Projeção de colunas em lotes: não cria objetos Produto (exportações grandes)
+        try:
+            yield from iterar_dicts(db_session, COLUNAS_PRODUTO,
+                                    filtros_produtos(args.empresa, apenas_com_estoque=not args.todos), Produto.id)
+        finally:
+            db_session.close()
+
+    return linhas(), 0
+
+
+def comando_estoque_buscar(args):
+    from busca_produtos import buscar_produtos
+
+    db_session = _abrir_sessao(args.empresa)
+    try:
+        resultados = buscar_produtos(db_session, args.termo, company_id=args.empresa,
+                                     limite=args.limite, fuzzy=not args.sem_aproximacao)
+    finally:
+        db_session.close()
+    return resultados, 0
+
+
+def comando_estoque_reposicao(args):
+    from alertas_estoque import definir_ponto_reposicao
+
+    sessoes = _SessoesDoLote(args.empresa)
+
+    def operacao(registro):
+        empresa = sessoes.empresa(registro)
+        ponto = _texto(registro.get("ponto"))
+        produto = definir_ponto_reposicao(sessoes.sessao(empresa), int(registro["codigo"]),
+                                          int(ponto) if ponto is not None else None, company_id=empresa)
+        if produto is None:
+            return {"status": "erro", "codigo": registro["codigo"], "mensagem": "Produto não encontrado"}
+        return {"status": "sucesso", "codigo": produto.codigo, "nome": produto.nome,
+                "quantidade": produto.quantidade, "ponto_reposicao": produto.ponto_reposicao,
+                "em_alerta": bool(produto.em_alerta)}
+
+    try:
+        resultados, _ = _executar_lote(_registros_do_comando(args, ["codigo", "ponto", "empresa"]), operacao)
+    finally:
+        sessoes.fechar()
+    erros = sum(1 for r in resultados if r.get("status") == "erro")
+    return resultados, erros
+
+
+def comando_estoque_alertas(args):
+    from alertas_estoque import listar_alertas
+
+    db_session = _abrir_sessao(args.empresa)
+    try:
+        resultados = listar_alertas(db_session, company_id=args.empresa, nivel=args.nivel)
+    finally:
+        db_session.close()
+    return resultados, 0
+
+def comando_estoque_sugestoes(args):
+    from previsao_demanda import listar_sugestoes, prever_empresa
+
+    db_session = _abrir_sessao(args.empresa)
+    try:
+        if args.calcular:
+            prever_empresa(db_session, args.empresa)
+        resultados = listar_sugestoes(db_session, company_id=args.empresa,
+                                      apenas_comprar=not args.todos, limite=args.limite)
+    finally:
+        db_session.close()
+    return resultados, 0
+
+# ============================================================================
+# COMANDOS: SHARDS (DADOS DAS EMPRESAS EM VÁRIOS BANCOS)
+# ============================================================================
+
+def comando_shards_mapa(args):
+    from shards import mapa_de_shards
+    _abrir_sessao().close()
+    return mapa_de_shards(), 0
+
+
+def comando_shards_resumo(args):
+    from shards import resumo_por_empresa
+    _abrir_sessao().close()
+    resumo, erros = resumo_por_empresa()
+    for shard, mensagem in erros.items():
+        print(f"[ALERTA] Shard '{shard}' indisponível: {mensagem}", file=sys.stderr)
+    linhas = [dict(empresa=company_id, **dados) for company_id, dados in sorted(resumo.items(), key=lambda i: str(i[0]))]
+    return linhas, len(erros)
+
+
+def comando_shards_mover(args):
+    from shards import mover_empresa
+    _abrir_sessao().close()
+    try:
+        resultado = mover_empresa(args.empresa, args.destino, tamanho_lote=args.lote,
+                                  apagar_origem=not args.manter_origem)
+    except ValueError as erro:
+        print(f"[ERRO] {erro}", file=sys.stderr)
+        return [], 1
+    return [resultado], 0
+
+# ============================================================================
+# COMANDOS: ANÁLISE (RELATÓRIOS SOBRE A EXPORTAÇÃO COLUNAR, SEM O BANCO)
+# ============================================================================
+
+def comando_analise_listar(args):
+    from relatorios_analiticos import listar_relatorios
+    return listar_relatorios(), 0
+
+
+def comando_analise_relatorio(args):
+    import duckdb
+    from relatorios_analiticos import executar_relatorio
+    try:
+        linhas, segundos = executar_relatorio(args.nome, args.pasta, empresa=args.empresa, desde=args.desde,
+                                              ate=args.ate, limite=args.limite)
+    except (ValueError, duckdb.Error) as erro:
+        print(f"[ERRO] {erro}", file=sys.stderr)
+        return [], 1
+    print(f"[ANÁLISE] {args.nome}: {len(linhas)} linha(s) em {segundos * 1000:.0f} ms", file=sys.stderr)
+    return linhas, 0
+
+
+def comando_analise_sql(args):
+    import duckdb
+    from relatorios_analiticos import motor
+    try:
+        return motor(args.pasta).consultar(args.consulta), 0
+    except (ValueError, duckdb.Error) as erro:
+        print(f"[ERRO] {erro}", file=sys.stderr)
+        return [], 1
+
+# ============================================================================
+# DEFINIÇÃO DOS SUBCOMANDOS (ARGPARSE)
+# ============================================================================
+
+def _opcoes_comuns(parser, obrigatorios=()):
+    parser.add_argument("--arquivo", "--file", dest="arquivo",
+                        help="Arquivo de lote (.csv, .json, .jsonl ou - para stdin)")
+    parser.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json",
+                        help="Formato da saída (padrão: json)")
+    parser.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    parser.set_defaults(obrigatorios=set(obrigatorios))
+
+
+def criar_parser():
+    """Monta o parser com os subcomandos de cada módulo."""
+    parser = argparse.ArgumentParser(
+        prog="python -m quatro_cantos",
+        description="Sistema Quatro Cantos - linha de comando não interativa"
+    )
+    modulos = parser.add_subparsers(dest="modulo", required=True)
+
+    # operacional capacidade
+    operacional = modulos.add_parser("operacional", help="Capacidade de produção")
+    acoes = operacional.add_subparsers(dest="acao", required=True)
+    p = acoes.add_parser("capacidade", help="Calcula a capacidade para 1, 2 ou 3 turnos")
+    p.add_argument("--turnos", type=int)
+    _opcoes_comuns(p, ["turnos"])
+    p.set_defaults(funcao=comando_operacional_capacidade)
+
+    p = acoes.add_parser("planejar", help="Capacidade por calendário (linhas, turnos, feriados, paradas)")
+    p.add_argument("--config", help="JSON com uma configuração ou lista de cenários (padrão: 1, 2 e 3 turnos)")
+    p.add_argument("--inicio", required=True, help="Data inicial (AAAA-MM-DD)")
+    p.add_argument("--fim", required=True, help="Data final, inclusiva (AAAA-MM-DD)")
+    p.add_argument("--demanda", type=float, help="Demanda em unidades por dia (para a utilização)")
+    p.add_argument("--diario", action="store_true", help="Inclui a capacidade de cada dia")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_operacional_planejar)
+
+    p = acoes.add_parser("producao", help="Turnos mínimos para o estoque e a demanda dos produtos da empresa")
+    p.add_argument("--empresa", help="company_id da empresa (padrão: produtos sem empresa)")
+    p.add_argument("--config", help="JSON com os cenários, do menor para o maior (padrão: 1, 2 e 3 turnos)")
+    p.add_argument("--inicio", help="Primeiro dia do plano (AAAA-MM-DD, padrão: hoje)")
+    p.add_argument("--horizonte", type=int, default=90, help="Dias planejados (padrão: 90)")
+    p.add_argument("--limite", type=int, default=20, help="Produtos listados por data de ruptura")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_operacional_producao)
+
+    # financeiro metricas
+    financeiro = modulos.add_parser("financeiro", help="Custos e lucros")
+    acoes = financeiro.add_subparsers(dest="acao", required=True)
+    p = acoes.add_parser("metricas", help="Calcula custos, preço de venda e projeções")
+    p.add_argument("--agua", type=float)
+    p.add_argument("--luz", type=float)
+    p.add_argument("--impostos", type=float)
+    p.add_argument("--salarios", type=float)
+    p.add_argument("--total-pallets", dest="total_pallets", type=int, default=1000)
+    _opcoes_comuns(p, ["agua", "luz", "impostos", "salarios"])
+    p.set_defaults(funcao=comando_financeiro_metricas)
+
+    # rh folha
+    rh = modulos.add_parser("rh", help="Folha de pagamento")
+    acoes = rh.add_subparsers(dest="acao", required=True)
+    p = acoes.add_parser("folha", help="Calcula a folha (INSS, IR, horas extras)")
+    p.add_argument("--nome")
+    p.add_argument("--cargo", default="Operário", help="Operário, Supervisor, Gerente ou Diretor")
+    p.add_argument("--horas-extras", dest="horas_extras", type=float, default=0.0)
+    _opcoes_comuns(p, ["nome"])
+    p.set_defaults(funcao=comando_rh_folha)
+
+    # estoque entrada | saida | listar | buscar
+    estoque = modulos.add_parser("estoque", help="Entrada, saída, listagem e busca de produtos")
+    acoes = estoque.add_subparsers(dest="acao", required=True)
+
+    p = acoes.add_parser("entrada", help="Registra entrada de produtos")
+    p.add_argument("--codigo", type=int)
+    p.add_argument("--nome")
+    p.add_argument("--quantidade", type=int)
+    p.add_argument("--valor-unitario", dest="valor_unitario", type=float, default=0.0)
+    p.add_argument("--data")
+    p.add_argument("--fornecedor")
+    p.add_argument("--local")
+    p.add_argument("--empresa", help="company_id da empresa (no lote: coluna empresa, se houver)")
+    p.add_argument("--chave-idempotencia", dest="chave_idempotencia",
+                   help="Repetida, devolve o resultado original sem somar de novo")
+    _opcoes_comuns(p, ["codigo", "nome", "quantidade"])
+    p.set_defaults(funcao=comando_estoque_entrada)
+
+    p = acoes.add_parser("saida", help="Registra vendas/saídas de produtos")
+    p.add_argument("--nome")
+    p.add_argument("--quantidade", type=int)
+    p.add_argument("--empresa", help="company_id da empresa (no lote: coluna empresa, se houver)")
+    p.add_argument("--chave-idempotencia", dest="chave_idempotencia",
+                   help="Repetida, devolve o resultado original sem baixar de novo")
+    _opcoes_comuns(p, ["nome", "quantidade"])
+    p.set_defaults(funcao=comando_estoque_saida)
+
+    p = acoes.add_parser("listar", help="Lista os produtos em estoque")
+    p.add_argument("--todos", action="store_true", help="Inclui produtos com quantidade zero")
+    p.add_argument("--empresa", help="company_id da empresa (padrão: todas)")
+    _opcoes_comuns(p)
+    p.set_defaults(funcao=comando_estoque_listar)
+
+    p = acoes.add_parser("buscar", help="Busca produtos por nome, código, categoria ou fornecedor")
+    p.add_argument("--termo", required=True, help="Texto (prefixo; tolera erros de digitação)")
+    p.add_argument("--empresa", help="company_id da empresa (padrão: todas)")
+    p.add_argument("--limite", type=int, default=20)
+    p.add_argument("--sem-aproximacao", dest="sem_aproximacao", action="store_true",
+                   help="Somente correspondências exatas/prefixo")
+    _opcoes_comuns(p)
+    p.set_defaults(funcao=comando_estoque_buscar)
+
+    p = acoes.add_parser("reposicao", help="Define o ponto de reposição (alerta de estoque baixo)")
+    p.add_argument("--codigo", type=int)
+    p.add_argument("--ponto", type=int, help="Quantidade mínima; omita para remover o alerta")
+    p.add_argument("--empresa", help="company_id da empresa")
+    _opcoes_comuns(p, ["codigo"])
+    p.set_defaults(funcao=comando_estoque_reposicao)
+
+    p = acoes.add_parser("alertas", help="Lista os produtos abaixo do ponto de reposição")
+    p.add_argument("--empresa", help="company_id da empresa (padrão: todas)")
+    p.add_argument("--nivel", choices=["baixo", "esgotado"])
+    _opcoes_comuns(p)
+    p.set_defaults(funcao=comando_estoque_alertas)
+
+    p = acoes.add_parser("sugestoes", help="Sugestões de compra da previsão de demanda")
+    p.add_argument("--empresa", help="company_id da empresa (padrão: todas)")
+    p.add_argument("--calcular", action="store_true",
+                   help="Recalcula a previsão da empresa antes de listar (senão usa a da rotina noturna)")
+    p.add_argument("--todos", action="store_true", help="Inclui produtos sem compra sugerida")
+    p.add_argument("--limite", type=int)
+    _opcoes_comuns(p)
+    p.set_defaults(funcao=comando_estoque_sugestoes)
+
+    # shards mapa | resumo | mover
+    shards = modulos.add_parser("shards", help="Empresas distribuídas em vários bancos (DATABASE_SHARDS)")
+    acoes = shards.add_subparsers(dest="acao", required=True)
+
+    p = acoes.add_parser("mapa", help="Shard e estado de cada empresa")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_shards_mapa)
+
+    p = acoes.add_parser("resumo", help="Produtos e valor em estoque por empresa (consulta todos os shards)")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_shards_resumo)
+
+    p = acoes.add_parser("mover", help="Muda os dados de uma empresa para outro shard (online)")
+    p.add_argument("--empresa", type=int, required=True, help="Id da empresa")
+    p.add_argument("--destino", required=True, help="Nome do shard de destino")
+    p.add_argument("--lote", type=int, default=1000, help="Linhas copiadas por comando (padrão: 1000)")
+    p.add_argument("--manter-origem", dest="manter_origem", action="store_true",
+                   help="Não apaga os dados do shard de origem depois da mudança")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_shards_mover)
+
+    # analise listar | relatorio | sql
+    analise = modulos.add_parser("analise", help="Relatórios pesados sobre a exportação colunar (DuckDB)")
+    acoes = analise.add_subparsers(dest="acao", required=True)
+
+    p = acoes.add_parser("listar", help="Relatórios pré-definidos")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_analise_listar)
+
+    p = acoes.add_parser("relatorio", help="Executa um relatório pré-definido")
+    p.add_argument("--nome", required=True, help="Nome do relatório (veja: analise listar)")
+    p.add_argument("--empresa", help="Id da empresa (padrão: todas)")
+    p.add_argument("--desde", help="Primeiro mês (AAAA-MM)")
+    p.add_argument("--ate", help="Último mês (AAAA-MM)")
+    p.add_argument("--limite", type=int, default=100, help="Linhas dos rankings (padrão: 100)")
+    p.add_argument("--pasta", help="Pasta da exportação (padrão: ANALISE_PASTA ou analitico)")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_analise_relatorio)
+
+    p = acoes.add_parser("sql", help="Consulta livre (SQL do DuckDB) sobre as visões exportadas")
+    p.add_argument("--consulta", required=True, help="SQL (visões: movimentacoes, movimentacoes_mensal, produtos, ...)")
+    p.add_argument("--pasta", help="Pasta da exportação (padrão: ANALISE_PASTA ou analitico)")
+    p.add_argument("--formato", choices=["json", "jsonl", "csv"], default="json")
+    p.add_argument("--saida", help="Arquivo de saída (padrão: tela)")
+    p.set_defaults(funcao=comando_analise_sql)
+
+    return parser
+
+# ============================================================================
+# PONTO DE ENTRADA
+# ============================================================================
+
+def main(argv=None):
+    args = criar_parser().parse_args(argv)
+    resultados, erros = args.funcao(args)
+
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8", newline="") as destino:
+            escrever_resultados(resultados, args.formato, destino)
+    else:
+        escrever_resultados(resultados, args.formato, sys.stdout)
+
+    return 1 if erros else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
+
+# ============================================================================
+# FIM DO ARQUIVO QUATRO_CANTOS.PY
+# ============================================================================
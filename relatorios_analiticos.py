@@ -0,0 +1,450 @@
+# ============================================================================
+# MÓDULO RELATORIOS_ANALITICOS - RELATÓRIOS PESADOS SOBRE A EXPORTAÇÃO COLUNAR
+# ============================================================================
+# Relatórios que agregam o histórico inteiro (valor do estoque por
+# categoria ao longo dos meses, vendas por fornecedor) não devem disputar o
+# banco transacional com as vendas. Este módulo os executa com o DuckDB,
+# embutido no processo, sobre os arquivos gerados por exportacao_analitica.py:
+#
+# - Nenhuma conexão com o banco do sistema (não importa database.py): a
+#   carga no SQLite/PostgreSQL é zero
+# - Leitura colunar em paralelo (todos os núcleos), só das colunas usadas,
+#   e poda de partições: filtros por empresa e mês pulam pastas inteiras
+#   (company_id=.../mes=...) sem abrir os arquivos
+# - Resumo mensal por produto (movimentacoes_mensal) mantido em memória:
+#   a primeira consulta lê o histórico inteiro; as seguintes só releem as
+#   partições cujos arquivos mudaram desde então (em geral o mês corrente).
+#   O resumo fica salvo na pasta da exportação (_resumo_movimentacoes.json
+#   e .parquet): cada execução da linha de comando parte dele, sem reler o
+#   histórico. Os relatórios de movimentação agregam esse resumo, dezenas
+#   de vezes menor que o histórico, e respondem em menos de um segundo
+#   mesmo com dezenas de milhões de movimentações
+#
+# VISÕES DISPONÍVEIS (consultas livres com consultar()):
+#   movimentacoes        histórico (company_id e mes vêm das partições)
+#   movimentacoes_mensal resumo por empresa, mês e produto (vendas, unidades,
+#                        faturamento das saídas; variacao = entradas - saídas)
+#   produtos             versão mais recente de cada produto
+#   produtos_historico   todas as versões exportadas
+#   funcionarios
+#
+# Os dados são os da última exportação (python exportacao_analitica.py
+# exportar), não os do momento da consulta.
+#
+# DEPENDÊNCIA OPCIONAL:
+#   pip install duckdb        (pyarrow também, para exportações --formato arrow)
+#
+# USO:
+#   python -m quatro_cantos analise relatorio --nome vendas_por_fornecedor --empresa 3 --desde 2026-01
+#   python -m quatro_cantos analise sql --consulta "SELECT mes, sum(quantidade) FROM movimentacoes GROUP BY mes"
+#   python -m quatro_cantos analise listar
+# ============================================================================
+
+import glob
+import json
+import os
+import sys
+import threading
+import time
+
+import duckdb
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+PASTA_PADRAO = os.getenv("ANALISE_PASTA", "analitico")   # destino de exportacao_analitica.py
+THREADS = int(os.getenv("ANALISE_THREADS", "0"))           # 0 = todos os núcleos
+MEMORIA = os.getenv("ANALISE_MEMORIA")                     # ex: "2GB" (padrão do DuckDB: 80% da RAM)
+
+ARQUIVO_RESUMO = "_resumo_movimentacoes.json"             # aponta para o .parquet do resumo
+
+# Colunas de partição sempre lidas como texto (company_id "007" não vira 7)
+_PARTICOES = {"movimentacoes": ("company_id", "mes"), "produtos": ("company_id", "mes"),
+              "funcionarios": ("company_id",)}
+
+# ============================================================================
+# RELATÓRIOS PRÉ-DEFINIDOS
+# ============================================================================
+# Cada relatório: descrição, tabelas exportadas que usa e SQL com {filtros}
+# (empresa e período) aplicados antes da agregação. Os de movimentação leem
+# movimentacoes_mensal, não o histórico linha a linha.
+
+RELATORIOS = {
+    "vendas_por_mes": (
+        "Vendas, unidades e faturamento por empresa e mês",
+        ("movimentacoes",),
+        """
+        SELECT company_id, mes, sum(vendas) AS vendas, sum(unidades) AS unidades,
+               round(sum(faturamento), 2) AS faturamento, count(*) AS produtos_vendidos
+        FROM movimentacoes_mensal
+        WHERE vendas > 0 {filtros}
+        GROUP BY ALL
+        ORDER BY company_id, mes
+        """,
+    ),
+    "vendas_por_fornecedor": (
+        "Unidades e faturamento das vendas por fornecedor do produto",
+        ("movimentacoes", "produtos"),
+        """
+        SELECT m.company_id, coalesce(nullif(p.fornecedor, ''), '(sem fornecedor)') AS fornecedor,
+               sum(m.unidades) AS unidades, round(sum(m.faturamento), 2) AS faturamento,
+               count(*) AS produtos_vendidos
+        FROM (SELECT company_id, produto_id, sum(unidades) AS unidades, sum(faturamento) AS faturamento
+              FROM movimentacoes_mensal WHERE vendas > 0 {filtros} GROUP BY ALL) AS m
+        LEFT JOIN (SELECT * FROM produtos WHERE TRUE {filtros_empresa}) AS p
+               ON p.company_id = m.company_id AND p.id = m.produto_id
+        GROUP BY ALL
+        ORDER BY m.company_id, faturamento DESC
+        LIMIT {limite}
+        """,
+    ),
+    "top_produtos": (
+        "Produtos com maior faturamento no período",
+        ("movimentacoes", "produtos"),
+        """
+        SELECT m.company_id, m.produto_id, p.codigo, p.nome, p.categoria,
+               m.unidades, round(m.faturamento, 2) AS faturamento
+        FROM (SELECT company_id, produto_id, sum(unidades) AS unidades, sum(faturamento) AS faturamento
+              FROM movimentacoes_mensal WHERE vendas > 0 {filtros} GROUP BY ALL
+              ORDER BY faturamento DESC LIMIT {limite}) AS m
+        LEFT JOIN (SELECT * FROM produtos WHERE TRUE {filtros_empresa}) AS p
+               ON p.company_id = m.company_id AND p.id = m.produto_id
+        ORDER BY faturamento DESC
+        LIMIT {limite}
+        """,
+    ),
+    "estoque_por_categoria": (
+        "Produtos, unidades e valor atual do estoque por categoria",
+        ("produtos",),
+        """
+        SELECT company_id, coalesce(nullif(categoria, ''), '(sem categoria)') AS categoria,
+               count(*) AS produtos, sum(quantidade) AS unidades,
+               round(sum(quantidade * valor_unitario), 2) AS valor
+        FROM produtos
+        WHERE TRUE {filtros_empresa}
+        GROUP BY ALL
+        ORDER BY company_id, valor DESC
+        """,
+    ),
+    "valorizacao_por_categoria": (
+        "Valor do estoque por categoria no fim de cada mês (estoque atual menos as "
+        "movimentações posteriores, a preço atual)",
+        ("movimentacoes", "produtos"),
+        """
+        WITH produtos_empresa AS (
+            SELECT company_id, id AS produto_id, coalesce(nullif(categoria, ''), '(sem categoria)') AS categoria,
+                   quantidade, valor_unitario
+            FROM produtos
+            WHERE TRUE {filtros_empresa}
+        ),
+        variacao AS (
+            SELECT company_id, mes, categoria, sum(variacao) AS unidades,
+                   sum(variacao * valor_unitario) AS valor
+            FROM movimentacoes_mensal JOIN produtos_empresa USING (company_id, produto_id)
+            GROUP BY ALL
+        ),
+        grade AS (
+            SELECT a.company_id, a.categoria, a.unidades, a.valor, meses.mes
+            FROM (SELECT company_id, categoria, sum(quantidade) AS unidades,
+                         sum(quantidade * valor_unitario) AS valor
+                  FROM produtos_empresa GROUP BY ALL) AS a
+            JOIN (SELECT DISTINCT company_id, mes FROM movimentacoes_mensal WHERE TRUE {filtros_empresa}) AS meses
+                 USING (company_id)
+        ),
+        saldos AS (
+            -- Fim do mês = atual - variação dos meses seguintes
+            SELECT g.company_id, g.mes, g.categoria,
+                   g.unidades - coalesce(sum(v.unidades) OVER seguintes, 0) AS unidades,
+                   g.valor - coalesce(sum(v.valor) OVER seguintes, 0) AS valor
+            FROM grade AS g
+            LEFT JOIN variacao AS v USING (company_id, categoria, mes)
+            WINDOW seguintes AS (PARTITION BY g.company_id, g.categoria ORDER BY g.mes DESC
+                                 ROWS BETWEEN UNBOUNDED PRECEDING AND 1 PRECEDING)
+        )
+        SELECT company_id, mes, categoria, unidades, round(valor, 2) AS valor
+        FROM saldos
+        WHERE TRUE {filtros_periodo}
+        ORDER BY company_id, mes, valor DESC
+        """,
+    ),
+}
+
+
+def listar_relatorios():
+    return [{"nome": nome, "descricao": descricao, "tabelas": ", ".join(tabelas)}
+            for nome, (descricao, tabelas, _) in RELATORIOS.items()]
+
+# Resumo de movimentacoes_mensal para um conjunto de partições ({origem});
+# _particao (pasta company_id=.../mes=...) identifica o que reler quando os
+# arquivos de uma partição mudam.
+_RESUMO_SQL = """
+    SELECT company_id, mes, produto_id,
+           count(*) FILTER (WHERE tipo = 'saida') AS vendas,
+           coalesce(sum(quantidade) FILTER (WHERE tipo = 'saida'), 0) AS unidades,
+           coalesce(sum(quantidade * valor_unitario) FILTER (WHERE tipo = 'saida'), 0) AS faturamento,
+           sum(CASE WHEN tipo = 'entrada' THEN quantidade ELSE -quantidade END) AS variacao,
+           {particao} AS _particao
+    FROM {origem}
+    GROUP BY ALL
+"""
+
+# ============================================================================
+# MOTOR (CONEXÃO DUCKDB COM AS VISÕES SOBRE OS ARQUIVOS)
+# ============================================================================
+
+class MotorAnalitico:
+    """
+    Conexão DuckDB em memória com as visões sobre uma pasta exportada.
+
+    Os arquivos são lidos a cada consulta, e o resumo mensal é atualizado
+    antes de cada consulta que o usa: uma nova exportação aparece na
+    consulta seguinte. Use uma instância por
+    pasta; as consultas de threads diferentes usam cursores próprios.
+    """
+
+    def __init__(self, pasta=None):
+        self.pasta = os.path.abspath(pasta or PASTA_PADRAO)
+        if not os.path.isdir(self.pasta):
+            raise ValueError(f"Pasta da exportação não encontrada: {self.pasta} "
+                             f"(gere com: python exportacao_analitica.py exportar --destino {pasta or PASTA_PADRAO})")
+        self.formatos = {}
+        self._conjuntos_arrow = {}           # registrados em cada cursor (o registro é por conexão)
+        self._resumidas = {}                 # pasta da partição -> assinatura dos arquivos
+        self._trava_resumo = threading.Lock()
+        self._resumo_carregado = False
+        self.conexao = duckdb.connect(":memory:")
+        if THREADS:
+            self.conexao.execute(f"SET threads = {THREADS}")
+        if MEMORIA:
+            self.conexao.execute(f"SET memory_limit = '{MEMORIA}'")
+        self.tabelas = [nome for nome in _PARTICOES if self._criar_visao(nome)]
+        if "produtos" in self.tabelas:
+            self.conexao.execute("CREATE VIEW produtos_historico AS SELECT * EXCLUDE (mes) FROM _produtos")
+            self.conexao.execute(
+                "CREATE VIEW produtos AS SELECT * FROM produtos_historico "
+                "QUALIFY row_number() OVER (PARTITION BY company_id, id ORDER BY atualizado_em DESC NULLS LAST) = 1")
+        if "movimentacoes" in self.tabelas:
+            self.conexao.execute(
+                "CREATE TABLE movimentacoes_mensal (company_id VARCHAR, mes VARCHAR, produto_id BIGINT, "
+                "vendas BIGINT, unidades BIGINT, faturamento DOUBLE, variacao BIGINT, _particao VARCHAR)")
+
+    def _criar_visao(self, nome):
+        pasta = os.path.join(self.pasta, nome)
+        if not os.path.isdir(pasta):
+            return False
+        origem = "_produtos" if nome == "produtos" else nome
+        niveis = "/".join("*" for _ in _PARTICOES[nome])
+        arquivos = os.path.join(pasta, niveis, "*.parquet").replace("'", "''")
+        tipos = ", ".join(f"'{coluna}': VARCHAR" for coluna in _PARTICOES[nome])
+        if any(arquivo.endswith(".parquet") for _, _, lista in os.walk(pasta) for arquivo in lista):
+            self.conexao.execute(
+                f"CREATE VIEW {origem} AS SELECT * FROM read_parquet('{arquivos}', hive_partitioning = true, "
+                f"hive_types = {{{tipos}}}, union_by_name = true)")
+            self.formatos[nome] = "parquet"
+            return True
+        # Exportação em Arrow IPC: lida pelo pyarrow.dataset, sem cópia
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+        particionamento = ds.partitioning(pa.schema([(coluna, pa.string()) for coluna in _PARTICOES[nome]]),
+                                          flavor="hive")
+        conjunto = ds.dataset(pasta, format="ipc", partitioning=particionamento)
+        if not conjunto.files:
+            return False
+        self._conjuntos_arrow[f"_{nome}_arrow"] = conjunto
+        self.conexao.register(f"_{nome}_arrow", conjunto)
+        self.conexao.execute(f"CREATE VIEW {origem} AS SELECT * FROM _{nome}_arrow")
+        self.formatos[nome] = "arrow"
+        return True
+
+    # ------------------------------------------------------------------------
+    # Resumo mensal (movimentacoes_mensal)
+    # ------------------------------------------------------------------------
+
+    def _assinaturas(self):
+        """Pasta de cada partição de movimentações -> (arquivo, tamanho, mtime) dos seus arquivos."""
+        extensao = ".parquet" if self.formatos.get("movimentacoes") == "parquet" else ".arrow"
+        assinaturas = {}
+        raiz = os.path.join(self.pasta, "movimentacoes")
+        for empresa in os.scandir(raiz):
+            if not empresa.is_dir():
+                continue
+            for mes in os.scandir(empresa.path):
+                if not mes.is_dir():
+                    continue
+                arquivos = tuple(sorted((arquivo.name, arquivo.stat().st_size, arquivo.stat().st_mtime_ns)
+                                        for arquivo in os.scandir(mes.path)
+                                        if arquivo.is_file() and arquivo.name.endswith(extensao)))
+                if arquivos:
+                    assinaturas[mes.path] = arquivos
+        return assinaturas
+
+    def atualizar_resumo(self):
+        """
+        Relê no resumo as partições novas, alteradas ou removidas desde a
+        última chamada (chamada automaticamente pelos relatórios).
+
+        Returns:
+            int: Partições relidas
+        """
+        if "movimentacoes" not in self.tabelas:
+            return 0
+        with self._trava_resumo:
+            if not self._resumo_carregado:
+                self._carregar_resumo()
+                self._resumo_carregado = True
+            atuais = self._assinaturas()
+            mudaram = [pasta for pasta, assinatura in atuais.items() if self._resumidas.get(pasta) != assinatura]
+            removidas = [pasta for pasta in self._resumidas if pasta not in atuais]
+            if not mudaram and not removidas:
+                return 0
+            cursor = self.conexao.cursor()
+            cursor.execute("BEGIN")
+            try:
+                cursor.execute("DELETE FROM movimentacoes_mensal WHERE list_contains($pastas, _particao)",
+                               {"pastas": mudaram + removidas})
+                if self.formatos["movimentacoes"] == "parquet":
+                    tipos = ", ".join(f"'{coluna}': VARCHAR" for coluna in _PARTICOES["movimentacoes"])
+                    origem = (f"read_parquet($arquivos, hive_partitioning = true, hive_types = {{{tipos}}}, "
+                              f"union_by_name = true, filename = true)")
+                    arquivos = [os.path.join(pasta, nome) for pasta in mudaram for nome, _, _ in atuais[pasta]]
+                    cursor.execute(f"INSERT INTO movimentacoes_mensal BY NAME "
+                                   f"{_RESUMO_SQL.format(origem=origem, particao='parse_dirpath(filename)')}",
+                                   {"arquivos": arquivos})
+                else:
+                    # Arrow IPC: uma partição por vez, lida pelo pyarrow.dataset
+                    import pyarrow as pa
+                    import pyarrow.dataset as ds
+                    particionamento = ds.partitioning(
+                        pa.schema([(coluna, pa.string()) for coluna in _PARTICOES["movimentacoes"]]), flavor="hive")
+                    for pasta in mudaram:
+                        conjunto = ds.dataset([os.path.join(pasta, nome) for nome, _, _ in atuais[pasta]],
+                                              format="ipc", partitioning=particionamento,
+                                              partition_base_dir=os.path.join(self.pasta, "movimentacoes"))
+                        cursor.register("_particao_arrow", conjunto)
+                        cursor.execute(f"INSERT INTO movimentacoes_mensal BY NAME "
+                                       f"{_RESUMO_SQL.format(origem='_particao_arrow', particao='$pasta')}",
+                                       {"pasta": pasta})
+                        cursor.unregister("_particao_arrow")
+                cursor.execute("COMMIT")
+            except Exception:
+                cursor.execute("ROLLBACK")
+                raise
+            self._resumidas = atuais
+            self._salvar_resumo(cursor)
+            return len(mudaram) + len(removidas)
+
+    def _carregar_resumo(self):
+        """Parte do resumo salvo por uma execução anterior (se for desta pasta e estiver íntegro)."""
+        try:
+            with open(os.path.join(self.pasta, ARQUIVO_RESUMO), encoding="utf-8") as arquivo:
+                salvo = json.load(arquivo)
+            if salvo["pasta"] != self.pasta:
+                return
+            self.conexao.execute("INSERT INTO movimentacoes_mensal BY NAME SELECT * FROM read_parquet($arquivo)",
+                                 {"arquivo": os.path.join(self.pasta, salvo["arquivo"])})
+        except (OSError, ValueError, KeyError, duckdb.Error):
+            return   # sem resumo salvo: a primeira atualização relê tudo
+        self._resumidas = {pasta: tuple(tuple(arquivo) for arquivo in arquivos)
+                           for pasta, arquivos in salvo["particoes"].items()}
+
+    def _salvar_resumo(self, cursor):
+        """Grava o resumo (novo .parquet e depois o .json que aponta para ele) e apaga os anteriores."""
+        nome = f"_resumo_movimentacoes-{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}.parquet"
+        caminho = os.path.join(self.pasta, ARQUIVO_RESUMO)
+        try:
+            cursor.execute(f"COPY movimentacoes_mensal TO '{os.path.join(self.pasta, nome).replace(chr(39), chr(39) * 2)}' "
+                           f"(FORMAT parquet)")
+            with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+                json.dump({"pasta": self.pasta, "arquivo": nome, "particoes": self._resumidas}, arquivo)
+            os.replace(caminho + ".tmp", caminho)
+        except (OSError, duckdb.Error) as erro:
+            print(f"[ALERTA] Resumo analítico não salvo em {self.pasta}: {erro}", file=sys.stderr)
+            return
+        for anterior in glob.glob(os.path.join(glob.escape(self.pasta), "_resumo_movimentacoes-*.parquet")):
+            if os.path.basename(anterior) != nome:
+                try:
+                    os.remove(anterior)
+                except OSError:
+                    pass
+
+    # ------------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------------
+
+    def _cursor(self, sql, parametros=None):
+        cursor = self.conexao.cursor()   # um por consulta: seguro entre threads
+        for nome, conjunto in self._conjuntos_arrow.items():
+            cursor.register(nome, conjunto)
+        return cursor.execute(sql, parametros or {})
+
+    def consultar(self, sql, parametros=None):
+        """Executa SQL (DuckDB) sobre as visões; devolve uma lista de dicionários."""
+        if "movimentacoes_mensal" in sql:
+            self.atualizar_resumo()
+        cursor = self._cursor(sql, parametros)
+        colunas = [descricao[0] for descricao in cursor.description]
+        return [dict(zip(colunas, linha)) for linha in cursor.fetchall()]
+
+    def consultar_arrow(self, sql, parametros=None):
+        """Mesmo que consultar(), devolvendo uma tabela pyarrow (sem conversão para Python)."""
+        if "movimentacoes_mensal" in sql:
+            self.atualizar_resumo()
+        return self._cursor(sql, parametros).arrow()
+
+    def relatorio(self, nome, empresa=None, desde=None, ate=None, limite=100):
+        """
+        Executa um relatório pré-definido (veja RELATORIOS / listar_relatorios()).
+
+        Args:
+            empresa: company_id (padrão: todas)
+            desde, ate: Meses "AAAA-MM" (inclusive)
+            limite: Linhas nos relatórios de ranking
+
+        Returns:
+            list: Linhas do relatório (dicionários)
+        """
+        if nome not in RELATORIOS:
+            raise ValueError(f"Relatório desconhecido: {nome} (disponíveis: {', '.join(RELATORIOS)})")
+        _, tabelas, sql = RELATORIOS[nome]
+        faltando = [tabela for tabela in tabelas if tabela not in self.tabelas]
+        if faltando:
+            raise ValueError(f"Exportação sem {', '.join(faltando)} em {self.pasta}")
+
+        parametros, filtros_empresa, filtros_periodo = {}, "", ""
+        if empresa is not None:
+            parametros["empresa"] = str(empresa)
+            filtros_empresa = " AND company_id = $empresa"
+        if desde:
+            parametros["desde"] = desde
+            filtros_periodo += " AND mes >= $desde"
+        if ate:
+            parametros["ate"] = ate
+            filtros_periodo += " AND mes <= $ate"
+        sql = sql.format(filtros=filtros_empresa + filtros_periodo, filtros_empresa=filtros_empresa,
+                         filtros_periodo=filtros_periodo, limite=int(limite))
+        # O DuckDB recusa parâmetros que o SQL não usa (ex: período no estoque atual)
+        return self.consultar(sql, {chave: valor for chave, valor in parametros.items() if f"${chave}" in sql})
+
+
+_motores = {}
+_trava = threading.Lock()
+
+
+def motor(pasta=None):
+    """Motor da pasta (criado na primeira vez e reaproveitado pelo processo)."""
+    pasta = os.path.abspath(pasta or PASTA_PADRAO)
+    with _trava:
+        if pasta not in _motores:
+            _motores[pasta] = MotorAnalitico(pasta)
+        return _motores[pasta]
+
+
+def executar_relatorio(nome, pasta=None, **filtros):
+    """Atalho: motor(pasta).relatorio(nome, ...) com o tempo gasto em segundos."""
+    inicio = time.perf_counter()
+    linhas = motor(pasta).relatorio(nome, **filtros)
+    return linhas, time.perf_counter() - inicio
+
+# ============================================================================
+# FIM DO MÓDULO RELATORIOS_ANALITICOS
+# ============================================================================
@@ -14,6 +14,8 @@
 # - Formatação de relatórios
 # ============================================================================
 
+from metricas import FUNCIONARIOS, LATENCIA_FUNCIONARIO, SALARIOS_BRUTOS, medir
+
 # ============================================================================
 # FUNÇÕES DE CÁLCULO (LÓGICA PURA)
 # ============================================================================
@@ -43,6 +45,11 @@ def calcular_ir(base_calculo):
     else:
         return (base_calculo * 0.275) - 896.00
 
+def _contar_funcionario(calculo):
+    FUNCIONARIOS.inc()
+    SALARIOS_BRUTOS.inc(calculo["bruto"])
+
+@medir(LATENCIA_FUNCIONARIO, apos=_contar_funcionario, operacao="folha")
 def processar_funcionario(nome, cargo, horas_extras):
     """Processa os cálculos completos para um funcionário"""
     tabela_cargos = {
@@ -0,0 +1,273 @@
+# ============================================================================
+# MÓDULO SERIALIZACAO - EXPORTAÇÃO RÁPIDA EM JSON (SEM OBJETOS ORM)
+# ============================================================================
+# Os métodos to_dict() dos modelos são ótimos para um objeto só, mas em
+# listagens grandes (exportar 100 mil produtos, por exemplo) o custo maior
+# é o ORM criar um objeto Python completo para cada linha.
+#
+# Este módulo faz o caminho curto:
+# - SELECT apenas das colunas necessárias (linhas como tuplas, sem ORM)
+# - Cursor no servidor (yield_per) lendo em lotes, sem carregar tudo na memória
+# - Cada lote é convertido direto para bytes JSON e entregue em pedaços
+#
+# O formato gerado é idêntico ao de to_dict() (mesmas chaves). Se a
+# biblioteca orjson estiver instalada ela é usada; senão, o json padrão.
+#
+# USO:
+#   for pedaco in produtos_json(db, company_id="1"):
+#       arquivo.write(pedaco)
+# ============================================================================
+
+import json
+from datetime import date, datetime
+
+from sqlalchemy import select
+
+from database import Funcionario, Produto
+from models import Empresa, Permissao, Usuario, usuario_permissoes
+
+try:
+    import orjson  # Dependência opcional: pip install orjson
+except ImportError:  # pragma: no cover - depende do ambiente
+    orjson = None
+
+# Linhas lidas do banco por lote (e por pedaço de JSON gerado)
+TAMANHO_LOTE_PADRAO = 5000
+
+# ============================================================================
+# PROJEÇÕES (CHAVE DO JSON -> COLUNA), NA MESMA ORDEM DE to_dict()
+# ============================================================================
+COLUNAS_PRODUTO = [
+    ("id", Produto.id),
+    ("company_id", Produto.company_id),
+    ("codigo", Produto.codigo),
+    ("nome", Produto.nome),
+    ("tipo_material", Produto.tipo_material),
+    ("categoria", Produto.categoria),
+    ("unidade_medida", Produto.unidade_medida),
+    ("quantidade", Produto.quantidade),
+    ("data", Produto.data_fabricacao),
+    ("fornecedor", Produto.fornecedor),
+    ("local", Produto.local_armazem),
+    ("valor", Produto.valor_unitario),
+]
+
+COLUNAS_FUNCIONARIO = [
+    ("id", Funcionario.id),
+    ("company_id", Funcionario.company_id),
+    ("nome", Funcionario.nome),
+    ("cargo", Funcionario.cargo),
+    ("admissao", Funcionario.admissao),
+]
+
+COLUNAS_EMPRESA = [
+    ("id", Empresa.id),
+    ("nome", Empresa.nome),
+    ("cnpj", Empresa.cnpj),
+    ("segmento", Empresa.segmento),
+    ("ativa", Empresa.ativa),
+    ("data_cadastro", Empresa.data_cadastro),
+    ("data_atualizacao", Empresa.data_atualizacao),
+]
+
+COLUNAS_USUARIO = [
+    ("id", Usuario.id),
+    ("empresa_id", Usuario.empresa_id),
+    ("nome", Usuario.nome),
+    ("email", Usuario.email),
+    ("ativo", Usuario.ativo),
+    ("is_admin", Usuario.is_admin),
+    ("ultimo_login", Usuario.ultimo_login),
+    ("data_cadastro", Usuario.data_cadastro),
+]
+
+COLUNAS_PERMISSAO = [
+    ("id", Permissao.id),
+    ("codigo", Permissao.codigo),
+    ("nome", Permissao.nome),
+    ("descricao", Permissao.descricao),
+    ("ativa", Permissao.ativa),
+]
+
+# ============================================================================
+# CODIFICAÇÃO JSON
+# ============================================================================
+
+def _padrao_json(valor):
+    """Datas no mesmo formato de to_dict() (isoformat)."""
+    if isinstance(valor, (datetime, date)):
+        return valor.isoformat()
+    raise TypeError(f"Tipo não serializável em JSON: {type(valor).__name__}")
+
+
+def json_bytes(dados):
+    """
+    Converte dados Python em bytes JSON (UTF-8).
+
+    Usa orjson quando disponível (datas viram isoformat nos dois casos).
+    """
+    if orjson is not None:
+        return orjson.dumps(dados)
+    return json.dumps(dados, ensure_ascii=False, separators=(",", ":"), default=_padrao_json).encode("utf-8")
+
+# ============================================================================
+# LEITURA EM LOTES (CURSOR NO SERVIDOR)
+# ============================================================================
+
+def _lotes_de_linhas(db, colunas, filtros=(), ordem=None, tamanho_lote=None):
+    """
+    Executa SELECT só das colunas pedidas e devolve as linhas em lotes.
+
+    yield_per ativa o cursor no servidor (stream_results) no PostgreSQL,
+    então a memória usada é proporcional ao lote, não à tabela.
+
+    Yields:
+        list: Lote de linhas (tuplas)
+    """
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE_PADRAO
+    consulta = select(*[coluna for _, coluna in colunas])
+    for filtro in filtros:
+        consulta = consulta.where(filtro)
+    ordem = ordem if ordem is not None else colunas[0][1]
+    consulta = consulta.order_by(*ordem) if isinstance(ordem, (list, tuple)) else consulta.order_by(ordem)
+    resultado = db.execute(consulta.execution_options(yield_per=tamanho_lote))
+    for lote in resultado.partitions(tamanho_lote):
+        yield lote
+
+
+def _dicts_do_lote(chaves, lote):
+    return [dict(zip(chaves, linha)) for linha in lote]
+
+
+def iterar_dicts(db, colunas, filtros=(), ordem=None, tamanho_lote=None):
+    """
+    Itera dicionários no formato de to_dict(), sem criar objetos ORM.
+
+    Args:
+        db: Sessão do banco
+        colunas: Projeção (lista de pares chave/coluna, ex: COLUNAS_PRODUTO)
+        filtros: Condições SQLAlchemy (ex: [Produto.company_id == "1"])
+        ordem: Coluna (ou lista de colunas) de ordenação (padrão: a primeira da projeção)
+        tamanho_lote: Linhas por lote
+
+    Yields:
+        dict: Um dicionário por linha
+    """
+    chaves = [chave for chave, _ in colunas]
+    for lote in _lotes_de_linhas(db, colunas, filtros, ordem, tamanho_lote):
+        yield from _dicts_do_lote(chaves, lote)
+
+
+def iterar_json(lotes_de_dicts):
+    """
+    Converte lotes de dicionários em um array JSON entregue em pedaços (bytes).
+
+    Cada lote é codificado de uma vez; os pedaços juntos formam um único
+    array JSON válido: b"[" ... b"," ... b"]".
+
+    Yields:
+        bytes: Pedaço do JSON
+    """
+    primeiro = True
+    for lote in lotes_de_dicts:
+        if not lote:
+            continue
+        conteudo = json_bytes(lote)[1:-1]  # remove os colchetes do lote
+        yield (b"[" if primeiro else b",") + conteudo
+        primeiro = False
+    yield b"[]" if primeiro else b"]"
+
+
+def _json_da_projecao(db, colunas, filtros=(), ordem=None, tamanho_lote=None):
+    chaves = [chave for chave, _ in colunas]
+    lotes = (_dicts_do_lote(chaves, lote) for lote in _lotes_de_linhas(db, colunas, filtros, ordem, tamanho_lote))
+    return iterar_json(lotes)
+
+# ============================================================================
+# EXPORTAÇÕES PRONTAS
+# ============================================================================
+
+def filtros_produtos(company_id=None, apenas_com_estoque=False):
+    """Filtros usados nas listagens de produtos (empresa e estoque > 0)."""
+    filtros = []
+    if company_id is not None:
+        filtros.append(Produto.company_id == company_id)
+    if apenas_com_estoque:
+        filtros.append(Produto.quantidade > 0)
+    return filtros
+
+
+def produtos_json(db, company_id=None, apenas_com_estoque=False, tamanho_lote=None):
+    """Produtos como array JSON em pedaços (mesmas chaves de Produto.to_dict)."""
+    return _json_da_projecao(db, COLUNAS_PRODUTO, filtros_produtos(company_id, apenas_com_estoque),
+                             Produto.id, tamanho_lote)
+
+
+def funcionarios_json(db, company_id=None, tamanho_lote=None):
+    """Funcionários como array JSON em pedaços (mesmas chaves de Funcionario.to_dict)."""
+    filtros = [Funcionario.company_id == company_id] if company_id is not None else []
+    return _json_da_projecao(db, COLUNAS_FUNCIONARIO, filtros, Funcionario.id, tamanho_lote)
+
+
+def _lotes_usuarios_com_permissoes(db, filtros, ordem, tamanho_lote):
+    """
+    Usuários com a lista de permissões, em duas consultas por lote.
+
+    Em vez de carregar usuario.permissoes (uma consulta por usuário), busca
+    as permissões de todo o lote de usuários de uma vez (IN) e agrupa em Python.
+    """
+    chaves_usuario = [chave for chave, _ in COLUNAS_USUARIO]
+    chaves_permissao = [chave for chave, _ in COLUNAS_PERMISSAO]
+
+    for lote in _lotes_de_linhas(db, COLUNAS_USUARIO, filtros, ordem, tamanho_lote):
+        usuarios = _dicts_do_lote(chaves_usuario, lote)
+        por_id = {}
+        for usuario in usuarios:
+            usuario["permissoes"] = []
+            por_id[usuario["id"]] = usuario
+
+        consulta = (
+            select(usuario_permissoes.c.usuario_id, *[coluna for _, coluna in COLUNAS_PERMISSAO])
+            .join(Permissao, Permissao.id == usuario_permissoes.c.permissao_id)
+            .where(usuario_permissoes.c.usuario_id.in_(list(por_id)))
+            .order_by(usuario_permissoes.c.usuario_id, Permissao.id)
+        )
+        for linha in db.execute(consulta):
+            por_id[linha[0]]["permissoes"].append(dict(zip(chaves_permissao, linha[1:])))
+        yield usuarios
+
+
+def iterar_usuarios(db, empresa_id=None, include_permissions=False, ordem=None, tamanho_lote=None):
+    """
+    Itera usuários como dicionários (mesmas chaves de Usuario.to_dict), sem objetos ORM.
+
+    Args:
+        empresa_id: Filtra os usuários de uma empresa
+        include_permissions: Inclui a lista "permissoes" (como to_dict(include_permissions=True))
+        ordem: Coluna ou lista de colunas de ordenação (padrão: Usuario.id)
+    """
+    filtros = [Usuario.empresa_id == empresa_id] if empresa_id is not None else []
+    ordem = ordem if ordem is not None else Usuario.id
+    if not include_permissions:
+        yield from iterar_dicts(db, COLUNAS_USUARIO, filtros, ordem, tamanho_lote)
+        return
+    for lote in _lotes_usuarios_com_permissoes(db, filtros, ordem, tamanho_lote or TAMANHO_LOTE_PADRAO):
+        yield from lote
+
+
+def usuarios_json(db, empresa_id=None, include_permissions=False, tamanho_lote=None):
+    """
+    Usuários como array JSON em pedaços (mesmas chaves de Usuario.to_dict).
+
+    Args:
+        empresa_id: Filtra os usuários de uma empresa
+        include_permissions: Inclui a lista "permissoes" (como to_dict(include_permissions=True))
+    """
+    filtros = [Usuario.empresa_id == empresa_id] if empresa_id is not None else []
+    if not include_permissions:
+        return _json_da_projecao(db, COLUNAS_USUARIO, filtros, Usuario.id, tamanho_lote)
+    return iterar_json(_lotes_usuarios_com_permissoes(db, filtros, Usuario.id, tamanho_lote or TAMANHO_LOTE_PADRAO))
+
+# ============================================================================
+# FIM DO MÓDULO SERIALIZACAO
+# ============================================================================
@@ -0,0 +1,544 @@
+# ============================================================================
+# MÓDULO SHARDS - DADOS DAS EMPRESAS DISTRIBUÍDOS EM VÁRIOS BANCOS
+# ============================================================================
+# Com DATABASE_SHARDS, os dados de cada empresa (produtos, movimentações,
+# alertas, previsões e funcionários) podem ficar em bancos diferentes, para
+# que os clientes maiores não disputem I/O com todos os outros.
+#
+# - O banco de DATABASE_URL é o shard "principal" e guarda também o
+#   catálogo: empresas, usuários, permissões, tokens e a tabela
+#   empresa_shards (empresa -> shard). Login e permissões não mudam.
+# - Empresas sem linha no catálogo ficam no SHARD_PADRAO ("principal").
+# - sessao_da_empresa(empresa_id) abre a sessão no shard da empresa; a API,
+#   o console com login e a linha de comando (--empresa) usam essa sessão.
+# - executar_em_shards(funcao) executa uma consulta em todos os shards em
+#   paralelo (listagens administrativas, ex: listar_empresas).
+# - mover_empresa(empresa_id, destino) muda uma empresa de shard sem parar
+#   o sistema (veja abaixo).
+#
+# CONFIGURAÇÃO (.env):
+#   DATABASE_SHARDS=grandes=postgresql://u:s@db2/qc,sqlite=sqlite:///shard_b.db
+#   SHARD_PADRAO=principal      shard das empresas sem linha no catálogo
+#   SHARD_CACHE_TTL=5           segundos que cada processo guarda o catálogo
+#
+# MUDANÇA DE SHARD (ONLINE):
+#   1. Copia produtos e movimentações com a empresa funcionando normalmente
+#   2. Congela a empresa no catálogo (escritas recusadas com
+#      EmpresaEmMigracao; leituras continuam) e espera SHARD_CACHE_TTL + 1 s,
+#      para que todos os processos vejam o congelamento
+#   3. Sincroniza o que mudou (saldos, produtos novos, movimentações novas)
+#      e copia alertas, previsões, funcionários e chaves de idempotência
+#   4. Confere contagens e saldo total, aponta o catálogo para o destino e
+#      descongela; só então apaga os dados da origem
+#   Se algo falhar antes do passo 4, a cópia parcial é apagada do destino e
+#   a empresa continua na origem.
+#
+#   Os ids das linhas mudam no destino (cada banco gera os seus); as
+#   referências a produto_id são remapeadas na cópia.
+#
+# USO (LINHA DE COMANDO):
+#   python -m quatro_cantos shards mapa
+#   python -m quatro_cantos shards resumo
+#   python -m quatro_cantos shards mover --empresa 3 --destino grandes
+# ============================================================================
+
+import contextlib
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import bindparam, create_engine, delete, event, func, insert, select, update
+from sqlalchemy.orm import sessionmaker
+
+from database import Base, MovimentacaoEstoque, Produto, SessaoRoteada, engine
+from models import EmpresaShard
+
+# ============================================================================
+# CONFIGURAÇÕES
+# ============================================================================
+PRINCIPAL = "principal"
+SHARD_PADRAO = os.getenv("SHARD_PADRAO", PRINCIPAL)
+SHARD_CACHE_TTL = float(os.getenv("SHARD_CACHE_TTL", "5"))
+TAMANHO_LOTE_PADRAO = 1000
+
+
+def _ler_shards(texto):
+    """"a=url1,b=url2" -> {"a": "url1", "b": "url2"}"""
+    shards = {}
+    for item in filter(None, (parte.strip() for parte in (texto or "").split(","))):
+        nome, separador, url = item.partition("=")
+        if not separador or not nome.strip() or not url.strip():
+            raise ValueError(f"DATABASE_SHARDS inválido: '{item}' (use nome=url)")
+        url = url.strip()
+        if url.startswith("postgres://"):
+            url = url.replace("postgres://", "postgresql://", 1)
+        shards[nome.strip()] = url
+    if PRINCIPAL in shards:
+        raise ValueError(f"'{PRINCIPAL}' é o banco de DATABASE_URL e não pode ser redefinido em DATABASE_SHARDS")
+    return shards
+
+
+SHARDS = _ler_shards(os.getenv("DATABASE_SHARDS"))
+
+# Tabelas com dados da empresa (coluna company_id), na ordem de cópia.
+# As que têm produto_id são remapeadas para os ids do destino.
+TABELAS_DA_EMPRESA = ["produtos", "movimentacoes_estoque", "alertas_estoque", "previsoes_demanda", "funcionarios",
+                      "chaves_idempotencia"]
+_REMAPEADAS = {"movimentacoes_estoque", "alertas_estoque", "previsoes_demanda"}
+
+
+class EmpresaEmMigracao(RuntimeError):
+    """Escrita recusada: a empresa está mudando de shard (tente de novo em instantes)."""
+
+
+class EmpresaForaDaSessao(ValueError):
+    """Escrita recusada: a linha é de outra empresa, cujos dados podem estar em outro shard."""
+
+# ============================================================================
+# ENGINES DOS SHARDS
+# ============================================================================
+_engines = {PRINCIPAL: engine}
+_fabricas = {}
+_trava = threading.Lock()
+
+
+def nomes_dos_shards():
+    return [PRINCIPAL] + sorted(SHARDS)
+
+
+def sharding_ativo():
+    """True se há algum shard além do principal."""
+    return bool(SHARDS)
+
+
+def engine_do_shard(nome):
+    """Engine do shard (criada e migrada na primeira vez)."""
+    engine_shard = _engines.get(nome)
+    if engine_shard is not None:
+        return engine_shard
+    if nome not in SHARDS:
+        raise ValueError(f"Shard desconhecido: '{nome}' (configurados: {', '.join(nomes_dos_shards())})")
+    with _trava:
+        if nome not in _engines:
+            from metricas import instrumentar_pool
+            from migrations import inicializar_esquema
+            engine_shard = create_engine(SHARDS[nome])
+            # Mensagens das migrações vão para stderr (não misturam com resultados)
+            with contextlib.redirect_stdout(sys.stderr):
+                inicializar_esquema(engine_shard)
+            instrumentar_pool(engine_shard)
+            _engines[nome] = engine_shard
+    return _engines[nome]
+
+
+def descartar_conexoes_herdadas():
+    """Processo filho (fork): descarta, sem fechar, as conexões herdadas do pai em todos os shards."""
+    for engine_shard in list(_engines.values()):
+        engine_shard.dispose(close=False)
+
+
+def _fabrica(nome):
+    fabrica = _fabricas.get(nome)
+    if fabrica is None:
+        fabrica = _fabricas[nome] = sessionmaker(autocommit=False, autoflush=False,
+                                                 bind=engine_do_shard(nome), class_=SessaoEmpresa)
+    return fabrica
+
+# ============================================================================
+# CATÁLOGO (EMPRESA -> SHARD)
+# ============================================================================
+_catalogo = {}   # empresa_id -> (shard, estado, válido até)
+
+
+def localizar_empresa(empresa_id, usar_cache=True):
+    """
+    Shard e estado ("ativa" ou "congelada") da empresa.
+
+    Sem DATABASE_SHARDS não há consulta: tudo está no principal.
+    """
+    if not sharding_ativo():
+        return PRINCIPAL, "ativa"
+    empresa_id = int(empresa_id)
+    agora = time.monotonic()
+    if usar_cache:
+        guardado = _catalogo.get(empresa_id)
+        if guardado is not None and guardado[2] > agora:
+            return guardado[0], guardado[1]
+    with engine.connect() as conn:
+        linha = conn.execute(
+            select(EmpresaShard.shard, EmpresaShard.estado).where(EmpresaShard.empresa_id == empresa_id)
+        ).first()
+    shard, estado = (linha[0], linha[1]) if linha else (SHARD_PADRAO, "ativa")
+    _catalogo[empresa_id] = (shard, estado, agora + SHARD_CACHE_TTL)
+    return shard, estado
+
+
+def _gravar_catalogo(empresa_id, shard, estado):
+    with sessionmaker(bind=engine)() as db:
+        db.merge(EmpresaShard(empresa_id=int(empresa_id), shard=shard, estado=estado))
+        db.commit()
+    _catalogo.pop(int(empresa_id), None)
+
+
+def mapa_de_shards():
+    """Linhas do catálogo: empresa, shard e estado (empresas sem linha usam o padrão)."""
+    from models import Empresa
+    with engine.connect() as conn:
+        linhas = conn.execute(
+            select(Empresa.id, Empresa.nome, EmpresaShard.shard, EmpresaShard.estado)
+            .outerjoin(EmpresaShard, EmpresaShard.empresa_id == Empresa.id)
+            .order_by(Empresa.id)
+        ).all()
+    return [{"empresa_id": empresa_id, "nome": nome, "shard": shard or SHARD_PADRAO, "estado": estado or "ativa"}
+            for empresa_id, nome, shard, estado in linhas]
+
+
+def posicoes_das_empresas():
+    """
+    Catálogo inteiro em uma consulta: {company_id: (shard, estado, carimbo)}.
+
+    O carimbo (atualizado_em da linha, em ISO) muda a cada mudança de shard,
+    inclusive de volta para o shard anterior. Empresas sem linha ficam de
+    fora (estão no SHARD_PADRAO); sem DATABASE_SHARDS o resultado é vazio.
+    """
+    if not sharding_ativo():
+        return {}
+    with engine.connect() as conn:
+        linhas = conn.execute(select(EmpresaShard.empresa_id, EmpresaShard.shard, EmpresaShard.estado,
+                                     EmpresaShard.atualizado_em)).all()
+    return {str(empresa_id): (shard, estado, atualizado_em.isoformat() if atualizado_em else None)
+            for empresa_id, shard, estado, atualizado_em in linhas}
+
+
+def shard_dono(posicoes, company_id):
+    """Shard em que a empresa está segundo posicoes_das_empresas() (company_id não numérico: principal)."""
+    if not str(company_id or "").isdigit():
+        return PRINCIPAL
+    posicao = posicoes.get(str(company_id))
+    return posicao[0] if posicao else SHARD_PADRAO
+
+# ============================================================================
+# SESSÃO POR EMPRESA
+# ============================================================================
+
+class SessaoEmpresa(SessaoRoteada):
+    """
+    Sessão no shard de uma empresa; recusa escritas se ela mudou ou está
+    mudando de shard, e produtos ou movimentações de outra empresa.
+    """
+
+
+@event.listens_for(SessaoEmpresa, "before_flush")
+def _verificar_shard(sessao, contexto_flush, instancias):
+    empresa_id = sessao.info.get("empresa_id")
+    if empresa_id is None:
+        return
+    shard, estado = localizar_empresa(empresa_id)
+    if estado != "ativa" or shard != sessao.info["shard"]:
+        raise EmpresaEmMigracao(f"Empresa {empresa_id} está mudando de shard; tente novamente em instantes")
+    for instancia in (*sessao.new, *sessao.dirty):
+        if isinstance(instancia, (Produto, MovimentacaoEstoque)) and instancia.company_id != str(empresa_id):
+            raise EmpresaForaDaSessao(f"{type(instancia).__name__} da empresa {instancia.company_id} "
+                                      f"numa sessão da empresa {empresa_id} (use sessao_da_empresa dela)")
+
+
+def sessao_da_empresa(empresa_id):
+    """Nova sessão no shard da empresa (o chamador fecha)."""
+    shard, _ = localizar_empresa(empresa_id)
+    sessao = _fabrica(shard)()
+    sessao.info["empresa_id"] = int(empresa_id)
+    sessao.info["shard"] = shard
+    return sessao
+
+# ============================================================================
+# FAN-OUT (CONSULTA EM TODOS OS SHARDS)
+# ============================================================================
+
+def executar_em_shards(funcao, shards=None, paralelo=True):
+    """
+    Executa funcao(sessao, nome_shard) em cada shard, em paralelo.
+
+    Returns:
+        tuple: ({shard: resultado}, {shard: mensagem de erro}); um shard fora
+               do ar não impede o resultado dos outros
+    """
+    nomes = list(shards or nomes_dos_shards())
+
+    def executar(nome):
+        with _fabrica(nome)() as sessao:
+            return funcao(sessao, nome)
+
+    resultados, erros = {}, {}
+    if paralelo and len(nomes) > 1:
+        with ThreadPoolExecutor(max_workers=len(nomes), thread_name_prefix="shard") as executor:
+            futuros = {nome: executor.submit(executar, nome) for nome in nomes}
+        pendentes = futuros.items()
+    else:
+        pendentes = [(nome, None) for nome in nomes]
+    for nome, futuro in pendentes:
+        try:
+            resultados[nome] = futuro.result() if futuro is not None else executar(nome)
+        except Exception as erro:
+            erros[nome] = f"{type(erro).__name__}: {erro}"
+    return resultados, erros
+
+
+def resumo_por_empresa():
+    """
+    Produtos e valor em estoque de cada empresa, somando todos os shards.
+
+    Só conta as linhas do shard em que o catálogo diz que a empresa está
+    (uma cópia em andamento ou uma origem mantida não entra em dobro).
+
+    Returns:
+        tuple: ({company_id: {"shard", "produtos", "valor_estoque"}}, erros por shard)
+    """
+    produtos = Base.metadata.tables["produtos"]
+
+    def agregar(sessao, nome):
+        return sessao.execute(
+            select(produtos.c.company_id, func.count(), func.coalesce(func.sum(produtos.c.quantidade * produtos.c.valor_unitario), 0))
+            .group_by(produtos.c.company_id)
+        ).all()
+
+    por_shard, erros = executar_em_shards(agregar)
+    resumo = {}
+    for nome, linhas in por_shard.items():
+        for company_id, quantidade, valor in linhas:
+            dono = localizar_empresa(company_id)[0] if str(company_id or "").isdigit() else PRINCIPAL
+            if dono == nome:
+                resumo[company_id] = {"shard": nome, "produtos": quantidade, "valor_estoque": float(valor or 0)}
+    return resumo, erros
+
+# ============================================================================
+# MUDANÇA DE SHARD
+# ============================================================================
+
+def _tabela(nome):
+    return Base.metadata.tables[nome]
+
+
+def _linhas_em_lotes(conn, tabela, company_id, tamanho_lote):
+    """Linhas da empresa em lotes ordenados por id."""
+    ultimo = 0
+    while True:
+        lote = conn.execute(
+            select(tabela).where(tabela.c.company_id == company_id, tabela.c.id > ultimo)
+            .order_by(tabela.c.id).limit(tamanho_lote)
+        ).mappings().all()
+        if not lote:
+            return
+        ultimo = lote[-1]["id"]
+        yield lote
+
+
+def _sem_id(linha):
+    return {coluna: valor for coluna, valor in linha.items() if coluna != "id"}
+
+
+def _inserir_produtos(conn_destino, linhas, mapa):
+    """Insere produtos no destino e guarda origem -> destino no mapa."""
+    produtos = _tabela("produtos")
+    novos = conn_destino.execute(
+        insert(produtos).returning(produtos.c.id, sort_by_parameter_order=True),
+        [_sem_id(linha) for linha in linhas]
+    ).scalars().all()
+    for linha, novo_id in zip(linhas, novos):
+        mapa[linha["id"]] = novo_id
+
+
+def _inserir_linhas(conn_destino, nome_tabela, lote, mapa, copiadas=None):
+    """Insere linhas filhas remapeando produto_id. Retorna as órfãs (produto sem cópia)."""
+    linhas, orfas = [], 0
+    for linha in lote:
+        if nome_tabela in _REMAPEADAS:
+            if linha["produto_id"] not in mapa:
+                orfas += 1
+                continue
+            linha = dict(linha, produto_id=mapa[linha["produto_id"]])
+        if copiadas is not None:
+            copiadas.add(linha["id"])
+        linhas.append(_sem_id(linha))
+    if linhas:
+        conn_destino.execute(insert(_tabela(nome_tabela)), linhas)
+    return orfas
+
+
+def _copiar(conn_origem, conn_destino, nome_tabela, company_id, mapa, tamanho_lote, copiadas=None):
+    """Copia todas as linhas da empresa (remapeando produto_id). Retorna as órfãs."""
+    tabela = _tabela(nome_tabela)
+    orfas = 0
+    for lote in _linhas_em_lotes(conn_origem, tabela, company_id, tamanho_lote):
+        if nome_tabela == "produtos":
+            _inserir_produtos(conn_destino, lote, mapa)
+        else:
+            orfas += _inserir_linhas(conn_destino, nome_tabela, lote, mapa, copiadas)
+    return orfas
+
+
+def _copiar_movimentacoes_faltantes(conn_origem, conn_destino, company_id, mapa, copiadas, tamanho_lote):
+    """
+    Copia as movimentações que ainda não estão no destino.
+
+    Compara os ids (não só "id > último copiado"): uma movimentação de
+    produto criado durante a cópia, ou cujo id foi gerado antes mas
+    gravado depois, também entra. Retorna as órfãs (produto excluído).
+    """
+    tabela = _tabela("movimentacoes_estoque")
+    faltantes = [id_origem for id_origem in conn_origem.execute(
+        select(tabela.c.id).where(tabela.c.company_id == company_id).order_by(tabela.c.id)
+    ).scalars() if id_origem not in copiadas]
+    orfas = 0
+    for inicio in range(0, len(faltantes), tamanho_lote):
+        lote = conn_origem.execute(
+            select(tabela).where(tabela.c.id.in_(faltantes[inicio:inicio + tamanho_lote])).order_by(tabela.c.id)
+        ).mappings().all()
+        orfas += _inserir_linhas(conn_destino, "movimentacoes_estoque", lote, mapa, copiadas)
+    return orfas
+
+
+def _sincronizar_produtos(conn_origem, conn_destino, company_id, mapa, tamanho_lote):
+    """Atualiza no destino os produtos já copiados, insere os novos e remove os excluídos."""
+    produtos = _tabela("produtos")
+    colunas = [coluna.name for coluna in produtos.columns if coluna.name != "id"]
+    comando = update(produtos).where(produtos.c.id == bindparam("_id_destino")).values(
+        {coluna: bindparam(coluna) for coluna in colunas})
+    vistos = set()
+    for lote in _linhas_em_lotes(conn_origem, produtos, company_id, tamanho_lote):
+        vistos.update(linha["id"] for linha in lote)
+        existentes = [dict(_sem_id(linha), _id_destino=mapa[linha["id"]]) for linha in lote if linha["id"] in mapa]
+        if existentes:
+            conn_destino.execute(comando, existentes)
+        novos = [linha for linha in lote if linha["id"] not in mapa]
+        if novos:
+            _inserir_produtos(conn_destino, novos, mapa)
+    excluidos = [mapa.pop(id_origem) for id_origem in list(mapa) if id_origem not in vistos]
+    if excluidos:
+        conn_destino.execute(delete(produtos).where(produtos.c.id.in_(excluidos)))
+
+
+def _contagens(conn, company_id):
+    """Linhas por tabela e saldo total de produtos da empresa (para a conferência)."""
+    resultado = {}
+    for nome in TABELAS_DA_EMPRESA:
+        tabela = _tabela(nome)
+        resultado[nome] = conn.execute(select(func.count()).where(tabela.c.company_id == company_id)).scalar()
+    produtos = _tabela("produtos")
+    resultado["saldo_total"] = conn.execute(
+        select(func.coalesce(func.sum(produtos.c.quantidade), 0)).where(produtos.c.company_id == company_id)).scalar()
+    return resultado
+
+
+def _apagar_empresa(engine_alvo, company_id, tamanho_lote=TAMANHO_LOTE_PADRAO):
+    """Apaga os dados da empresa em lotes (transações curtas), filhos antes de produtos."""
+    for nome in reversed(TABELAS_DA_EMPRESA):
+        tabela = _tabela(nome)
+        while True:
+            with engine_alvo.begin() as conn:
+                ids = conn.execute(select(tabela.c.id).where(tabela.c.company_id == company_id)
+                                   .limit(tamanho_lote)).scalars().all()
+                if not ids:
+                    break
+                conn.execute(delete(tabela).where(tabela.c.id.in_(ids)))
+
+
+def mover_empresa(empresa_id, destino, tamanho_lote=TAMANHO_LOTE_PADRAO, apagar_origem=True, espera=None,
+                  saida=sys.stderr):
+    """
+    Muda os dados de uma empresa para outro shard, sem parar o sistema.
+
+    Args:
+        empresa_id: Id da empresa (produtos.company_id = str(empresa_id))
+        destino: Nome do shard de destino
+        apagar_origem: Se False, mantém a cópia antiga na origem (ignorada pelo sistema)
+        espera: Segundos de congelamento antes da sincronização final
+                (padrão: SHARD_CACHE_TTL + 1, para todos os processos perceberem)
+
+    Linhas órfãs (movimentação, alerta ou previsão de produto excluído na
+    origem) não são copiadas e aparecem em "orfas".
+
+    Returns:
+        dict: origem, destino, linhas copiadas por tabela, órfãs, segundos
+              totais e segundos com escritas bloqueadas
+    """
+    inicio = time.perf_counter()
+    origem, estado = localizar_empresa(empresa_id, usar_cache=False)
+    if not sharding_ativo():
+        raise ValueError("Nenhum shard configurado (DATABASE_SHARDS)")
+    if destino == origem:
+        raise ValueError(f"A empresa {empresa_id} já está no shard '{destino}'")
+    if estado != "ativa":
+        raise ValueError(f"A empresa {empresa_id} já está sendo movida (estado '{estado}')")
+    engine_origem, engine_destino = engine_do_shard(origem), engine_do_shard(destino)
+    company_id = str(empresa_id)
+
+    with engine_destino.connect() as conn:
+        restantes = {nome: n for nome, n in _contagens(conn, company_id).items() if nome != "saldo_total" and n}
+    if restantes:
+        raise ValueError(f"O shard '{destino}' já tem dados da empresa {empresa_id}: {restantes}")
+
+    mapa, copiadas = {}, set()
+    congelada_em = None
+    try:
+        # 1. Cópia com a empresa funcionando
+        print(f"[SHARDS] Empresa {empresa_id}: copiando de '{origem}' para '{destino}'...", file=saida)
+        with engine_origem.connect() as conn_origem, engine_destino.begin() as conn_destino:
+            _copiar(conn_origem, conn_destino, "produtos", company_id, mapa, tamanho_lote)
+            # Órfãs aqui (produto criado depois da cópia dos produtos) entram na sincronização final
+            _copiar(conn_origem, conn_destino, "movimentacoes_estoque", company_id, mapa, tamanho_lote, copiadas)
+
+        # 2. Congela e espera todos os processos verem
+        _gravar_catalogo(empresa_id, origem, "congelada")
+        congelada_em = time.perf_counter()
+        espera = SHARD_CACHE_TTL + 1 if espera is None else espera
+        print(f"[SHARDS] Empresa {empresa_id} congelada; aguardando {espera:.0f} s...", file=saida)
+        time.sleep(espera)
+
+        # 3. Sincronização final (uma transação no destino)
+        with engine_origem.connect() as conn_origem, engine_destino.begin() as conn_destino:
+            _sincronizar_produtos(conn_origem, conn_destino, company_id, mapa, tamanho_lote)
+            orfas = _copiar_movimentacoes_faltantes(conn_origem, conn_destino, company_id, mapa, copiadas,
+                                                    tamanho_lote)
+            for nome in ("alertas_estoque", "previsoes_demanda", "funcionarios", "chaves_idempotencia"):
+                orfas += _copiar(conn_origem, conn_destino, nome, company_id, mapa, tamanho_lote)
+
+            # 4. Conferência
+            na_origem, no_destino = _contagens(conn_origem, company_id), _contagens(conn_destino, company_id)
+        esperado = sum(na_origem[nome] for nome in TABELAS_DA_EMPRESA) - orfas
+        if (sum(no_destino[nome] for nome in TABELAS_DA_EMPRESA) != esperado
+                or no_destino["produtos"] != na_origem["produtos"]
+                or no_destino["saldo_total"] != na_origem["saldo_total"]):
+            raise RuntimeError(f"Conferência falhou: origem {na_origem}, destino {no_destino}, órfãs {orfas}")
+
+        _gravar_catalogo(empresa_id, destino, "ativa")
+    except BaseException:
+        print(f"[SHARDS] Falha ao mover a empresa {empresa_id}; desfazendo a cópia em '{destino}'", file=saida)
+        _apagar_empresa(engine_destino, company_id, tamanho_lote)
+        _gravar_catalogo(empresa_id, origem, "ativa")
+        raise
+    congelada = time.perf_counter() - congelada_em
+
+    from cache_produtos import limpar_cache
+    limpar_cache()   # ids dos produtos mudaram
+
+    if apagar_origem:
+        print(f"[SHARDS] Empresa {empresa_id} ativa em '{destino}'; apagando os dados de '{origem}'...", file=saida)
+        _apagar_empresa(engine_origem, company_id, tamanho_lote)
+
+    return {
+        "empresa_id": int(empresa_id),
+        "origem": origem,
+        "destino": destino,
+        "linhas": {nome: no_destino[nome] for nome in TABELAS_DA_EMPRESA},
+        "saldo_total": no_destino["saldo_total"],
+        "orfas": orfas,
+        "origem_apagada": apagar_origem,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "segundos_congelada": round(congelada, 3),
+    }
+
+# ============================================================================
+# FIM DO MÓDULO SHARDS
+# ============================================================================
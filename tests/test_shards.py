@@ -0,0 +1,202 @@
+# ============================================================================
+# TESTES - SHARDS (MUDANÇA DE SHARD E ROTEAMENTO POR EMPRESA)
+# ============================================================================
+# Dois bancos SQLite temporários: o principal (DATABASE_URL) e "grandes"
+# (DATABASE_SHARDS). As variáveis são definidas antes de importar database
+# e shards, que as leem na importação; cada teste usa empresas próprias.
+#
+# EXECUÇÃO:
+#   python -m pytest -q tests/test_shards.py
+# ============================================================================
+
+import importlib
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import pytest
+
+PASTA_PROJETO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PASTA_PROJETO not in sys.path:
+    sys.path.insert(0, PASTA_PROJETO)
+
+
+@pytest.fixture(scope="module")
+def sistema(tmp_path_factory):
+    """Módulos do sistema apontando para os dois bancos temporários."""
+    if "database" in sys.modules:
+        pytest.skip("database já importado com outro DATABASE_URL neste processo")
+    pasta = tmp_path_factory.mktemp("shards")
+    variaveis = {
+        "DATABASE_URL": f"sqlite:///{pasta / 'principal.db'}",
+        "DATABASE_SHARDS": f"grandes=sqlite:///{pasta / 'grandes.db'}",
+        "SHARD_CACHE_TTL": "0",   # cada escrita relê o catálogo
+    }
+    anteriores = {nome: os.environ.get(nome) for nome in variaveis}
+    os.environ.update(variaveis)
+
+    database = importlib.import_module("database")
+    shards = importlib.import_module("shards")
+    from models import Empresa
+
+    database.init_db()
+    shards.engine_do_shard("grandes")
+    with database.SessionLocal() as db:
+        for empresa_id in range(1, 8):
+            db.add(Empresa(id=empresa_id, nome=f"Empresa {empresa_id}", cnpj=f"00.000.000/0001-{empresa_id:02d}"))
+        db.commit()
+
+    yield shards
+
+    for nome, valor in anteriores.items():
+        if valor is None:
+            os.environ.pop(nome, None)
+        else:
+            os.environ[nome] = valor
+
+
+def _entrada(sistema, empresa_id, codigo, nome, quantidade):
+    from estoque_entrada import registrar_entrada_produto
+    with sistema.sessao_da_empresa(empresa_id) as db:
+        produto, _ = registrar_entrada_produto(db, codigo, nome, quantidade, valor_unitario=2.0,
+                                               company_id=str(empresa_id))
+        return produto.quantidade
+
+
+def _saida(sistema, empresa_id, nome, quantidade):
+    from estoque_saida import registrar_saida_produto
+    with sistema.sessao_da_empresa(empresa_id) as db:
+        return registrar_saida_produto(db, nome, quantidade, company_id=str(empresa_id))
+
+
+def _linhas(sistema, shard, modelo, company_id):
+    with sistema.engine_do_shard(shard).connect() as conn:
+        tabela = modelo.__table__
+        return conn.execute(tabela.select().where(tabela.c.company_id == company_id)).mappings().all()
+
+
+def _saldos(sistema, shard, company_id):
+    from database import Produto
+    return {linha["codigo"]: linha["quantidade"] for linha in _linhas(sistema, shard, Produto, company_id)}
+
+# ============================================================================
+# MUDANÇA DE SHARD
+# ============================================================================
+
+def test_mover_empresa_com_escritas_durante_a_copia(sistema, monkeypatch):
+    from database import MovimentacaoEstoque
+    for codigo in range(1, 6):
+        _entrada(sistema, 1, codigo, f"Peça {codigo}", 10)
+
+    copiar_original = sistema._copiar
+
+    def copiar_e_escrever(conn_origem, conn_destino, nome_tabela, *args, **kwargs):
+        resultado = copiar_original(conn_origem, conn_destino, nome_tabela, *args, **kwargs)
+        if nome_tabela == "produtos":
+            # A empresa continua funcionando entre a cópia dos produtos e a das movimentações
+            _entrada(sistema, 1, 2, "Peça 2", 5)
+            _entrada(sistema, 1, 99, "Peça nova", 7)
+            assert _saida(sistema, 1, "Peça 3", 4)["status"] == "sucesso"
+        return resultado
+
+    monkeypatch.setattr(sistema, "_copiar", copiar_e_escrever)
+    resultado = sistema.mover_empresa(1, "grandes", tamanho_lote=2, espera=0)
+
+    assert sistema.localizar_empresa(1, usar_cache=False) == ("grandes", "ativa")
+    assert _saldos(sistema, "grandes", "1") == {1: 10, 2: 15, 3: 6, 4: 10, 5: 10, 99: 7}
+    assert len(_linhas(sistema, "grandes", MovimentacaoEstoque, "1")) == 8
+    assert resultado["saldo_total"] == 58 and resultado["orfas"] == 0
+    assert _saldos(sistema, "principal", "1") == {}
+    assert _linhas(sistema, "principal", MovimentacaoEstoque, "1") == []
+
+
+def test_escritas_recusadas_com_a_empresa_congelada(sistema, monkeypatch):
+    from database import Produto
+    from estoque_entrada import registrar_entrada_produto
+    _entrada(sistema, 2, 1, "Chapa", 10)
+
+    gravar_original = sistema._gravar_catalogo
+    tentativas = []
+
+    def gravar_e_escrever(empresa_id, shard, estado):
+        gravar_original(empresa_id, shard, estado)
+        if estado == "congelada":
+            with sistema.sessao_da_empresa(empresa_id) as db:
+                with pytest.raises(sistema.EmpresaEmMigracao):
+                    registrar_entrada_produto(db, 1, "Chapa", 5, company_id="2")
+                db.rollback()
+                # Leituras continuam durante o congelamento
+                tentativas.append(db.query(Produto.quantidade).filter_by(company_id="2").scalar())
+
+    monkeypatch.setattr(sistema, "_gravar_catalogo", gravar_e_escrever)
+    sistema.mover_empresa(2, "grandes", espera=0)
+
+    assert tentativas == [10]
+    assert _saldos(sistema, "grandes", "2") == {1: 10}
+    assert _entrada(sistema, 2, 1, "Chapa", 5) == 15
+
+# ============================================================================
+# ROTEAMENTO POR EMPRESA
+# ============================================================================
+
+def test_lote_da_linha_de_comando_grava_cada_linha_no_shard_da_empresa(sistema, tmp_path):
+    import quatro_cantos
+    sistema._gravar_catalogo(4, "grandes", "ativa")
+    arquivo = tmp_path / "entradas.csv"
+    arquivo.write_text("codigo,nome,quantidade,empresa\n"
+                       "1,Parafuso,10,4\n"
+                       "1,Parafuso,20,5\n"
+                       "2,Porca,30,4\n", encoding="utf-8")
+    saida = tmp_path / "resultado.json"
+
+    assert quatro_cantos.main(["estoque", "entrada", "--arquivo", str(arquivo), "--saida", str(saida)]) == 0
+    assert [linha["status"] for linha in json.loads(saida.read_text(encoding="utf-8"))] == ["novo"] * 3
+    assert _saldos(sistema, "grandes", "4") == {1: 10, 2: 30}
+    assert _saldos(sistema, "principal", "4") == {}
+    assert _saldos(sistema, "principal", "5") == {1: 20}
+    assert _saldos(sistema, "grandes", "5") == {}
+
+    # Sem a coluna "empresa", vale o --empresa
+    arquivo.write_text("nome,quantidade\nPorca,4\n", encoding="utf-8")
+    assert quatro_cantos.main(["estoque", "saida", "--empresa", "4", "--arquivo", str(arquivo),
+                               "--saida", str(saida)]) == 0
+    assert _saldos(sistema, "grandes", "4") == {1: 10, 2: 26}
+
+
+def test_sessao_da_empresa_recusa_linhas_de_outra_empresa(sistema):
+    from database import Produto
+    sistema._gravar_catalogo(4, "grandes", "ativa")
+    with sistema.sessao_da_empresa(4) as db:
+        db.add(Produto(company_id="5", codigo=77, nome="Arruela", quantidade=1))
+        with pytest.raises(sistema.EmpresaForaDaSessao):
+            db.flush()
+        db.rollback()
+    assert 77 not in _saldos(sistema, "grandes", "5")
+
+
+def test_previsoes_de_cada_empresa_no_proprio_shard(sistema):
+    from database import PrevisaoDemanda, Produto, SessionLocal
+    from previsao_demanda import executar_rotina
+    sistema._gravar_catalogo(6, "grandes", "ativa")
+    for empresa_id in (6, 7):
+        _entrada(sistema, empresa_id, 1, "Rolamento", 50)
+        assert _saida(sistema, empresa_id, "Rolamento", 5)["status"] == "sucesso"
+    # Cópia antiga da empresa 6 no principal (mudança com apagar_origem=False): ignorada
+    with SessionLocal() as db:
+        db.add(Produto(company_id="6", codigo=1, nome="Rolamento", quantidade=50))
+        db.commit()
+
+    amanha = datetime.utcnow().date() + timedelta(days=1)
+    resumos = executar_rotina(data_referencia=amanha)
+
+    calculadas = [resumo["company_id"] for resumo in resumos]
+    assert calculadas.count("6") == 1 and calculadas.count("7") == 1
+    assert len(_linhas(sistema, "grandes", PrevisaoDemanda, "6")) == 1
+    assert _linhas(sistema, "principal", PrevisaoDemanda, "6") == []
+    assert len(_linhas(sistema, "principal", PrevisaoDemanda, "7")) == 1
+    assert _linhas(sistema, "grandes", PrevisaoDemanda, "7") == []
+
+# ============================================================================
+# FIM DOS TESTES DE SHARDS
+# ============================================================================